@@ -0,0 +1 @@
+# Empty file to make modules a package
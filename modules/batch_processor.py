@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Batch Processor
+Analizon dosje të tëra me vizatime pa interface grafik
+
+Përdorimi:
+    python -m modules.batch_processor vizatimet/ -o rezultatet/ -j 8
+    python -m modules.batch_processor "paketa/**/*.pdf" --no-extract-text
+    python -m modules.batch_processor vizatimet/ --db technical_analyzer.db
+    python -m modules.batch_processor vizatimet/ --excel batch.xlsx --pdf batch.pdf
+"""
+
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from modules.pipeline import (AnalysisPipeline, DEFAULT_OPTIONS, SUPPORTED_EXTENSIONS,
+                              merge_options, missing_processors, save_results)
+
+# Pipeline-i i çdo procesi worker, krijohet një herë në initializer
+_worker_pipeline = None
+_worker_options = None
+_worker_error = None
+
+
+def collect_files(inputs):
+    """Gjen skedarët e mbështetur nga dosje, skedarë ose glob patterns"""
+    files = []
+    seen = set()
+
+    for entry in inputs:
+        if os.path.isdir(entry):
+            candidates = (str(p) for p in sorted(Path(entry).rglob('*')) if p.is_file())
+        elif os.path.isfile(entry):
+            candidates = [entry]
+        else:
+            candidates = sorted(glob.glob(entry, recursive=True))
+
+        for candidate in candidates:
+            if Path(candidate).suffix.lower() not in SUPPORTED_EXTENSIONS:
+                continue
+            key = os.path.abspath(candidate)
+            if key not in seen:
+                seen.add(key)
+                files.append(candidate)
+
+    return files
+
+
+def result_filename(filepath, output_dir, base_dir=None):
+    """Emri i skedarit të rezultatit, unik edhe për nën-dosje me emra të njëjtë"""
+    path = Path(filepath)
+    if base_dir:
+        try:
+            path = path.resolve().relative_to(Path(base_dir).resolve())
+        except ValueError:
+            pass
+    stem = '__'.join(path.with_suffix('').parts[-4:]).replace(':', '')
+    return os.path.join(output_dir, f"{stem}{path.suffix.lower().replace('.', '_')}.json")
+
+
+def _init_worker(options, cache_db=None, ocr_language=None, result_db=None):
+    """Inicializon procesorët një herë për çdo proces worker"""
+    global _worker_pipeline, _worker_options, _worker_error
+    _worker_options = options
+    try:
+        cache = result_store = None
+        if cache_db or result_db:
+            from modules.database_manager import DatabaseManager
+            cache = DatabaseManager(cache_db) if cache_db else None
+            # Çdo worker ka lidhjen e vet; WAL lejon shkrime nga shumë procese pa bllokuar leximet
+            result_store = DatabaseManager(result_db) if result_db else None
+        _worker_pipeline = AnalysisPipeline(cache=cache, result_store=result_store)
+        if ocr_language and hasattr(_worker_pipeline.symbol_recognizer, 'set_language'):
+            _worker_pipeline.symbol_recognizer.set_language(ocr_language)
+        # Motori OCR ngarkohet një herë këtu, jo në skedarin e parë
+        if options.get('extract_text') and hasattr(_worker_pipeline.symbol_recognizer, 'warm_up'):
+            _worker_pipeline.symbol_recognizer.warm_up()
+    except Exception as e:
+        # Një initializer që dështon do ta rinisë pool-in pafundësisht
+        _worker_error = f"Processor initialization error: {e}"
+
+
+def _process_one(task):
+    """Proceson një vizatim brenda worker-it dhe ruan rezultatin"""
+    filepath, output_file = task
+    started = time.perf_counter()
+    record = {'file': filepath, 'output': output_file}
+
+    try:
+        if _worker_pipeline is None:
+            raise RuntimeError(_worker_error)
+        results = _worker_pipeline.analyze(filepath, _worker_options)
+        save_results(results, output_file)
+        record.update({
+            'status': 'ok',
+            'symbols': len(results.get('symbols') or []),
+            'text': len(results.get('text') or []),
+            'bom': len(results.get('bom') or []),
+            'cached': bool(results.get('cached')),
+            'warnings': results.get('warnings') or [],
+            'stages': {stage: entry['wall_ms'] for stage, entry in
+                       (results.get('timings') or {}).get('stages', {}).items()},
+        })
+    except Exception as e:
+        record.update({'status': 'error', 'error': str(e), 'output': None})
+
+    record['seconds'] = round(time.perf_counter() - started, 4)
+    return record
+
+
+class BatchProcessor:
+    """Ekzekuton pipeline-in mbi shumë skedarë me një multiprocessing pool"""
+
+    def __init__(self, output_dir, workers=None, options=None, base_dir=None, cache_db=None,
+                 ocr_language=None, result_db=None):
+        self.output_dir = output_dir
+        self.cache_db = cache_db
+        self.result_db = result_db
+        self.ocr_language = ocr_language
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.options = merge_options(options)
+        self.base_dir = base_dir
+
+    def run(self, files, progress_callback=None):
+        """Proceson skedarët dhe kthen përmbledhjen e batch-it"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        tasks = [(f, result_filename(f, self.output_dir, self.base_dir)) for f in files]
+        records = []
+        started = time.perf_counter()
+
+        for db_path in {self.cache_db, self.result_db} - {None}:
+            from modules.database_manager import DatabaseManager
+            DatabaseManager(db_path).initialize_database()
+
+        if self.workers == 1:
+            _init_worker(self.options, self.cache_db, self.ocr_language, self.result_db)
+            for record in map(_process_one, tasks):
+                records.append(record)
+                if progress_callback:
+                    progress_callback(record, len(records), len(tasks))
+        else:
+            with multiprocessing.Pool(self.workers, initializer=_init_worker,
+                                      initargs=(self.options, self.cache_db, self.ocr_language,
+                                                self.result_db)) as pool:
+                # chunksize i vogël mban balancën kur skedarët kanë madhësi shumë të ndryshme
+                for record in pool.imap_unordered(_process_one, tasks, chunksize=1):
+                    records.append(record)
+                    if progress_callback:
+                        progress_callback(record, len(records), len(tasks))
+
+        elapsed = time.perf_counter() - started
+        summary = self.build_summary(records, elapsed)
+        save_results(summary, os.path.join(self.output_dir, 'summary.json'))
+        return summary
+
+    def build_summary(self, records, elapsed):
+        """Krijon përmbledhjen me statistikat e throughput"""
+        succeeded = [r for r in records if r['status'] == 'ok']
+        failed = [r for r in records if r['status'] != 'ok']
+        per_file = sorted(r['seconds'] for r in records)
+        stage_ms = {}
+        for record in succeeded:
+            for stage, wall_ms in (record.get('stages') or {}).items():
+                stage_ms[stage] = round(stage_ms.get(stage, 0.0) + wall_ms, 3)
+
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'workers': self.workers,
+            'options': self.options,
+            'total_files': len(records),
+            'succeeded': len(succeeded),
+            'failed': len(failed),
+            'cache_hits': sum(1 for r in succeeded if r.get('cached')),
+            'elapsed_seconds': round(elapsed, 3),
+            'files_per_second': round(len(records) / elapsed, 3) if elapsed > 0 else 0.0,
+            'median_file_seconds': per_file[len(per_file) // 2] if per_file else 0.0,
+            'max_file_seconds': per_file[-1] if per_file else 0.0,
+            'total_symbols': sum(r.get('symbols', 0) for r in succeeded),
+            'total_text': sum(r.get('text', 0) for r in succeeded),
+            # Koha totale (ms, e mbledhur nga të gjithë worker-at) sipas hapit
+            'stage_ms': dict(sorted(stage_ms.items(), key=lambda entry: -entry[1])),
+            'files': sorted(records, key=lambda r: r['file']),
+        }
+
+
+def build_parser():
+    """Krijon parser-in e argumenteve të CLI"""
+    parser = argparse.ArgumentParser(
+        description="Technical Drawing Analyzer - analizë batch pa interface grafik")
+    parser.add_argument('inputs', nargs='+', help="Dosje, skedarë ose glob patterns (p.sh. 'dir/**/*.pdf')")
+    parser.add_argument('-o', '--output', default='batch_results', help="Dosja e rezultateve")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="Numri i proceseve worker")
+    parser.add_argument('--ocr-lang', choices=['eng', 'alb', 'eng+alb'], help="Gjuha e OCR")
+    parser.add_argument('--excel', help="Eksporto të gjitha rezultatet në një workbook Excel (p.sh. batch.xlsx)")
+    parser.add_argument('--pdf', help="Raporti PDF i batch-it me thumbnail-e të shënuara (p.sh. batch.pdf)")
+    parser.add_argument('--cache-db', help="Baza SQLite për cache-in e rezultateve (p.sh. technical_analyzer.db)")
+    parser.add_argument('--db', dest='result_db',
+                        help="Ruaj simbolet dhe tekstin në bazën SQLite për kërkim (python -m modules.database_manager)")
+    for option in DEFAULT_OPTIONS:
+        parser.add_argument(f"--no-{option.replace('_', '-')}", dest=option, action='store_false',
+                            help=f"Çaktivizo '{option}'")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Mos shfaq progresin për çdo skedar")
+    return parser
+
+
+def main(argv=None):
+    """Pika hyrëse e CLI"""
+    args = build_parser().parse_args(argv)
+    options = {option: getattr(args, option) for option in DEFAULT_OPTIONS}
+
+    files = collect_files(args.inputs)
+    if not files:
+        print("Nuk u gjet asnjë skedar i mbështetur.")
+        return 1
+
+    # Pa procesorët çdo skedar do të dështonte një nga një në worker-a; ndalo që në fillim
+    missing = missing_processors()
+    if missing:
+        print(f"Mungojnë modulet e procesorëve: {', '.join(missing)}")
+        return 1
+
+    base_dir = args.inputs[0] if len(args.inputs) == 1 and os.path.isdir(args.inputs[0]) else None
+    processor = BatchProcessor(args.output, workers=args.workers, options=options, base_dir=base_dir,
+                               cache_db=args.cache_db, ocr_language=args.ocr_lang, result_db=args.result_db)
+    started = time.perf_counter()
+
+    def report(record, done, total):
+        if args.quiet:
+            return
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        status = 'OK' if record['status'] == 'ok' else f"GABIM: {record.get('error')}"
+        if record.get('warnings'):
+            status += f" ({'; '.join(record['warnings'])})"
+        print(f"[{done}/{total}] {record['file']} ({record['seconds']:.2f}s, {rate:.2f} files/s) {status}")
+
+    print(f"Duke procesuar {len(files)} skedarë me {processor.workers} workers...")
+    summary = processor.run(files, progress_callback=report)
+
+    print("=" * 50)
+    print(f"Skedarë: {summary['total_files']}  OK: {summary['succeeded']}  Gabime: {summary['failed']}")
+    print(f"Koha: {summary['elapsed_seconds']:.2f}s  Throughput: {summary['files_per_second']:.2f} files/s")
+    print(f"Përmbledhja: {os.path.join(args.output, 'summary.json')}")
+
+    if args.excel:
+        from modules.output_generator import OutputGenerator
+
+        outputs = [record['output'] for record in summary['files'] if record['status'] == 'ok']
+        OutputGenerator().export_batch_to_excel(outputs, args.excel)
+        print(f"Excel: {args.excel} ({len(outputs)} skedarë)")
+    if args.pdf:
+        from modules.output_generator import OutputGenerator
+
+        outputs = [record['output'] for record in summary['files'] if record['status'] == 'ok']
+        report = OutputGenerator().export_batch_to_pdf(outputs, args.pdf, workers=args.workers)
+        print(f"PDF: {args.pdf} ({report['drawings']} vizatime, {report['pages']} faqe, "
+              f"{report['elapsed_seconds']:.2f}s)")
+    return 0 if summary['failed'] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
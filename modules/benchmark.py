@@ -0,0 +1,546 @@
+"""
+Benchmark
+Matje të riprodhueshme të pipeline-it mbi vizatime sintetike
+
+Vizatimet gjenerohen në mënyrë deterministike (seed) me tuba, valvola,
+instrumente dhe etiketa DN/PN, në madhësi, dendësi dhe numër faqesh të
+zgjedhura. Çdo hap (DocumentProcessor, SymbolRecognizer, OutputGenerator)
+matet veçmas dhe pastaj e gjithë analiza; raporti JSON mund të krahasohet
+me një raport të mëparshëm:
+
+    python -m modules.benchmark --scenarios small medium -r 5 -o bench.json
+    python -m modules.benchmark -o bench_new.json --compare bench.json
+
+Me --cascade zbulimi bëhet nga e trashë në të hollë dhe raporti shton recall-in
+e zbulimit të plotë dhe humbjen e recall-it nga kaskada. Memo i klasifikimit
+zbrazet para çdo kalimi, kështu që hit rate-i i raportuar vjen vetëm nga
+simbolet që përsëriten brenda vizatimit (--no-symbol-cache e çaktivizon).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from modules.line_network import build_runs, detect_segments, merge_segments
+from modules.pipeline import AnalysisPipeline, load_stage, merge_options, save_results
+from modules.profiler import StageProfiler
+
+# Skenarët: madhësia e faqes (pixel në DPI të DocumentProcessor), simbole për megapixel, faqe
+# (rreth 7 simbole/MP zënë të gjitha vendet në tuba; dendësitë më të mëdha kufizohen aty)
+SCENARIOS = OrderedDict([
+    ('small', {'width': 2400, 'height': 1700, 'density': 4.0, 'pages': 1}),
+    ('medium', {'width': 4800, 'height': 3400, 'density': 4.0, 'pages': 1}),
+    ('dense', {'width': 4800, 'height': 3400, 'density': 7.0, 'pages': 1}),
+    ('large', {'width': 9600, 'height': 6800, 'density': 4.0, 'pages': 1}),
+    ('multipage', {'width': 3300, 'height': 2300, 'density': 4.0, 'pages': 4}),
+    # Eksport CAD: etiketat janë tekst i ngulitur në PDF, jo pixel
+    ('cad_pdf', {'width': 4800, 'height': 3400, 'density': 4.0, 'pages': 2, 'text_layer': True}),
+])
+DEFAULT_SCENARIOS = ('small', 'medium', 'multipage')
+
+# Madhësia (pixel) e template-ve të bibliotekës sintetike
+TEMPLATE_SIZE = 60
+# Madhësitë e simboleve në vizatim (brenda shkallëve të SymbolRecognizer)
+SYMBOL_SIZES = (45, 60, 75)
+# Distanca mes tubave paralelë
+PIPE_SPACING = 340
+PIPE_THICKNESS = 2
+# Distanca mes simboleve në një tub; segmentet e tubit mes tyre mbeten më të gjata
+# se filtri i vijave të SymbolRecognizer (2 x madhësia maksimale e simbolit)
+SYMBOL_SPACING = 325
+
+LABEL_SIZES = ('DN25', 'DN50', 'DN80', 'DN100', 'DN150', 'DN200')
+LABEL_RATINGS = ('PN10', 'PN16', 'PN25', 'PN40')
+# Madhësia (pt) e etiketave si tekst PDF; në 200 dpi afërsisht sa etiketat e vizatuara
+LABEL_FONT_SIZE = 6.5
+
+# Ndryshim (%) mbi të cilin krahasimi me raportin bazë shënohet si regresion
+REGRESSION_THRESHOLD = 10.0
+# Ndryshimet më të vogla se kaq (ms) janë zhurmë matjeje edhe kur kalojnë pragun në %
+REGRESSION_MIN_MS = 5.0
+
+
+def _draw_valve_body(image, size):
+    """Dy trekëndësha me majë në qendër (trupi i valvolës)"""
+    half = size // 2
+    margin = max(3, size // 8)
+    left = np.array([[2, margin], [half, half], [2, size - margin]], np.int32)
+    right = np.array([[size - 3, margin], [half, half], [size - 3, size - margin]], np.int32)
+    cv2.polylines(image, [left, right], True, 0, 2)
+
+
+def draw_gate_valve(size):
+    image = np.full((size, size), 255, np.uint8)
+    _draw_valve_body(image, size)
+    return image
+
+
+def draw_check_valve(size):
+    image = draw_gate_valve(size)
+    cv2.line(image, (size // 2, size // 8), (size // 2, size - size // 8), 0, 2)
+    return image
+
+
+def draw_ball_valve(size):
+    image = draw_gate_valve(size)
+    cv2.circle(image, (size // 2, size // 2), max(3, size // 7), 0, -1)
+    return image
+
+
+def draw_pressure_instrument(size):
+    image = np.full((size, size), 255, np.uint8)
+    cv2.circle(image, (size // 2, size // 2), size // 2 - 3, 0, 2)
+    return image
+
+
+def draw_control_instrument(size):
+    image = draw_pressure_instrument(size)
+    cv2.line(image, (3, size // 2), (size - 4, size // 2), 0, 2)
+    return image
+
+
+# (type, name, funksioni i vizatimit, prefiksi i tag-ut)
+SYMBOL_KINDS = (
+    ('valve', 'Gate Valve', draw_gate_valve, 'V'),
+    ('valve', 'Check Valve', draw_check_valve, 'V'),
+    ('valve', 'Ball Valve', draw_ball_valve, 'V'),
+    ('instrument', 'Pressure Indicator', draw_pressure_instrument, 'PI'),
+    ('instrument', 'Control Instrument', draw_control_instrument, 'FIC'),
+)
+
+
+def write_symbol_library(directory):
+    """Shkruan template-t e simboleve sintetike (type__Name.png) për SymbolRecognizer"""
+    os.makedirs(directory, exist_ok=True)
+    for symbol_type, name, draw, _ in SYMBOL_KINDS:
+        cv2.imwrite(os.path.join(directory, f"{symbol_type}__{name}.png"), draw(TEMPLATE_SIZE))
+    return directory
+
+
+def generate_drawing(width, height, density, seed=0, draw_labels=True):
+    """Gjeneron një faqe P&ID sintetike
+
+    Kthen (imazhi gri, simbolet, etiketat); simbolet dhe etiketat janë
+    "e vërteta" (ground truth) në formatin e rezultateve të analizës. Me
+    draw_labels=False etiketat nuk vizatohen (shkruhen si tekst PDF).
+    """
+    rng = random.Random(seed)
+    image = np.full((height, width), 255, np.uint8)
+
+    # Tubat horizontalë dhe disa lidhje vertikale mes tyre
+    rows = list(range(PIPE_SPACING // 2, height - PIPE_SPACING // 4, PIPE_SPACING))
+    for y in rows:
+        cv2.line(image, (0, y), (width - 1, y), 0, PIPE_THICKNESS)
+    grid = list(range(2 * PIPE_SPACING, width - 2 * PIPE_SPACING, PIPE_SPACING)) or [width // 2]
+    columns = sorted(rng.sample(grid, min(len(grid), max(1, width // 1600))))
+    for x in columns:
+        cv2.line(image, (x, rows[0]), (x, rows[-1]), 0, PIPE_THICKNESS)
+
+    # Vendet e mundshme në tuba, me hapësirë për simbolin dhe etiketat
+    slot = SYMBOL_SPACING
+    slots = [(x, y, 0) for y in rows for x in range(slot, width - slot, slot)
+             if min(abs(x - column) for column in columns) > slot // 2]
+    slots += [(x, y, 90) for x in columns for y in range(rows[0] + slot // 2, rows[-1] - slot // 2 + 1, slot)
+              if min(abs(y - row) for row in rows) > PIPE_SPACING // 4]
+    count = min(len(slots), int(round(density * width * height / 1e6)))
+    chosen = sorted(rng.sample(range(len(slots)), count))
+
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    symbols, labels = [], []
+    for number, slot_index in enumerate(chosen, 1):
+        x, y, rotation = slots[slot_index]
+        symbol_type, name, draw, prefix = SYMBOL_KINDS[rng.randrange(len(SYMBOL_KINDS))]
+        size = SYMBOL_SIZES[rng.randrange(len(SYMBOL_SIZES))]
+        glyph = draw(size)
+        if rotation:
+            glyph = np.ascontiguousarray(np.rot90(glyph))
+        x0, y0 = x - size // 2, y - size // 2
+        # Tubi ndërpritet te simboli, si në vizatimet e vërteta
+        image[y0:y0 + size, x0:x0 + size] = glyph
+
+        symbols.append({'type': symbol_type, 'name': name, 'confidence': 100.0, 'rotation': rotation,
+                        'position': [x, y], 'bbox': [x0, y0, size, size]})
+
+        # Etiketat: tag-u mbi simbolin, madhësia dhe presioni poshtë tij
+        contents = [f"{prefix}-{100 + number}", rng.choice(LABEL_SIZES), rng.choice(LABEL_RATINGS)]
+        offsets = [-size // 2 - 14, size // 2 + 26, size // 2 + 50]
+        if rotation:
+            offsets = [-size // 2 - 14, -size // 2 - 36, size // 2 + 26]
+        for content, dy in zip(contents, offsets):
+            (tw, th), _ = cv2.getTextSize(content, font, 0.6, 1)
+            tx = x + size // 2 + 8 if rotation else x - tw // 2
+            ty = y + dy
+            if draw_labels:
+                cv2.putText(image, content, (tx, ty), font, 0.6, 0, 1, cv2.LINE_AA)
+            labels.append({'content': content, 'confidence': 100.0,
+                           'position': [tx + tw // 2, ty - th // 2], 'bbox': [tx, ty - th, tw, th + 2]})
+
+    return image, symbols, labels
+
+
+def write_scenario(name, directory, seed=0, dpi=200, scenario=None):
+    """Shkruan skedarin e skenarit (PNG për një faqe, PDF për disa) dhe të vërtetën e tij"""
+    scenario = scenario or SCENARIOS[name]
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha1()
+    pages = []
+    text_layer = scenario.get('text_layer', False)
+    for page in range(scenario['pages']):
+        image, symbols, labels = generate_drawing(scenario['width'], scenario['height'], scenario['density'],
+                                                  seed=seed * 1000 + page, draw_labels=not text_layer)
+        digest.update(image.tobytes())
+        pages.append((image, symbols, labels))
+
+    if scenario['pages'] == 1 and not text_layer:
+        filepath = os.path.join(directory, f"{name}.png")
+        cv2.imwrite(filepath, pages[0][0])
+    else:
+        import fitz
+
+        filepath = os.path.join(directory, f"{name}.pdf")
+        doc = fitz.open()
+        for image, _, labels in pages:
+            _, png = cv2.imencode('.png', image)
+            # Faqja në pikë PDF, që renderimi në dpi të japë të njëjtët pixel
+            page = doc.new_page(width=image.shape[1] * 72.0 / dpi, height=image.shape[0] * 72.0 / dpi)
+            page.insert_image(page.rect, stream=png.tobytes())
+            if text_layer:
+                # Etiketat si tekst i vërtetë, në pozicionin (baseline) ku do të ishin vizatuar
+                for label in labels:
+                    x, y, _, h = label['bbox']
+                    page.insert_text((x * 72.0 / dpi, (y + h - 2) * 72.0 / dpi), label['content'],
+                                     fontsize=LABEL_FONT_SIZE)
+                digest.update(''.join(label['content'] for label in labels).encode('utf-8'))
+        doc.save(filepath)
+        doc.close()
+
+    return {
+        'file': filepath,
+        'pages': [{'symbols': symbols, 'labels': labels} for _, symbols, labels in pages],
+        'checksum': digest.hexdigest()[:16],
+    }
+
+
+def detection_recall(found, expected):
+    """Pjesa e simboleve të vërteta që kanë një detektim me qendër brenda bbox-it të tyre"""
+    if not expected:
+        return None
+    centers = np.array([item['position'][:2] for item in found], dtype=np.float64).reshape(-1, 2)
+    hits = 0
+    for item in expected:
+        x, y, w, h = item['bbox']
+        inside = ((centers[:, 0] >= x) & (centers[:, 0] <= x + w) &
+                  (centers[:, 1] >= y) & (centers[:, 1] <= y + h))
+        hits += bool(inside.any())
+    return round(hits / len(expected), 3)
+
+
+class Benchmark:
+    """Mat hapat e analizës mbi skenarët sintetikë"""
+
+    def __init__(self, workdir=None, repeat=3, ocr=None, page_workers=1, trace_memory=False, seed=0,
+                 cascade=False, cascade_threshold=None, symbol_cache=False):
+        self.workdir = workdir or tempfile.mkdtemp(prefix='tda_bench_')
+        self.repeat = max(1, repeat)
+        self.ocr = ocr
+        self.page_workers = max(1, page_workers)
+        self.trace_memory = trace_memory
+        self.seed = seed
+        self.cascade = cascade
+        self.cascade_threshold = cascade_threshold
+        self.symbol_cache = symbol_cache
+        self.ocr_error = None
+        self._processors = None
+
+    def processors(self):
+        """DocumentProcessor, SymbolRecognizer (me bibliotekën sintetike) dhe OutputGenerator"""
+        if self._processors is None:
+            from modules.document_processor import DocumentProcessor
+            from modules.output_generator import OutputGenerator
+            from modules.symbol_cache import DEFAULT_CACHE_SIZE
+            from modules.symbol_recognizer import SymbolRecognizer
+
+            library = write_symbol_library(os.path.join(self.workdir, 'symbols'))
+            recognizer = SymbolRecognizer(library_dir=library, cascade=self.cascade,
+                                          cache_size=DEFAULT_CACHE_SIZE if self.symbol_cache else 0)
+            if self.cascade_threshold is not None:
+                recognizer.cascade_threshold = self.cascade_threshold
+            if self.ocr is not False:
+                try:
+                    recognizer.warm_up()
+                except Exception as e:
+                    # Pa motor OCR hapi 'ocr' anashkalohet dhe BOM përdor etiketat e gjeneruara
+                    self.ocr_error = str(e)
+            self._processors = (DocumentProcessor(), recognizer, OutputGenerator())
+        return self._processors
+
+    @property
+    def ocr_enabled(self):
+        self.processors()
+        return self.ocr is not False and self.ocr_error is None
+
+    def _reset_symbol_cache(self):
+        """Zbraz memo-n e klasifikimit që çdo kalim të nisë pa rezultatet e kalimit të mëparshëm"""
+        cache = getattr(self.processors()[1], 'symbol_cache', None)
+        if cache is not None:
+            cache.clear()
+            cache.reset_stats()
+
+    def _measure_stages(self, scenario_data, options):
+        """Një kalim i hapave veç e veç; kthen (profiler, simbolet e gjetura)"""
+        doc_processor, recognizer, output_generator = self.processors()
+        filepath = scenario_data['file']
+        profiler = StageProfiler(trace_memory=self.trace_memory)
+        found = []
+        self._reset_symbol_cache()
+        try:
+            for page, truth in enumerate(scenario_data['pages']):
+                with profiler.stage(load_stage(filepath), page=page):
+                    processed_data = doc_processor.process_file(filepath, tiled=False, page=page)
+                with profiler.stage('symbol_detection', page=page):
+                    symbols = recognizer.detect_symbols(processed_data)
+                if options['extract_text']:
+                    with profiler.stage('ocr', page=page):
+                        text_data = recognizer.extract_text(processed_data)
+                else:
+                    text_data = truth['labels']
+                pipes = None
+                if options['pipe_lengths']:
+                    with profiler.stage('pipes', page=page):
+                        segments = merge_segments(detect_segments(processed_data['image'], symbols))
+                        pipes = build_runs(segments, symbols)
+                with profiler.stage('bom', page=page):
+                    output_generator.generate_bom(symbols, text_data, pipes)
+                found.append(symbols)
+                del processed_data
+        finally:
+            profiler.close()
+        return profiler, found
+
+    def _full_detection_recall(self, scenario_data):
+        """Recall-i i zbulimit pa kaskadë mbi të njëjtat faqe (referenca për humbjen)"""
+        doc_processor, recognizer, _ = self.processors()
+        found = []
+        recognizer.cascade = False
+        try:
+            for page in range(len(scenario_data['pages'])):
+                processed_data = doc_processor.process_file(scenario_data['file'], tiled=False, page=page)
+                found.extend(recognizer.detect_symbols(processed_data))
+        finally:
+            recognizer.cascade = self.cascade
+        return detection_recall(found, [s for page in scenario_data['pages'] for s in page['symbols']])
+
+    def _measure_end_to_end(self, scenario_data, options):
+        doc_processor, recognizer, output_generator = self.processors()
+        # Me të njëjtin gjurmim memorieje si hapat veç e veç, që kohët të krahasohen
+        pipeline = AnalysisPipeline(doc_processor, recognizer, output_generator, page_workers=self.page_workers,
+                                    trace_memory=self.trace_memory)
+        self._reset_symbol_cache()
+        started = time.perf_counter()
+        results = pipeline.analyze(scenario_data['file'], options, use_cache=False)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        peaks = [entry['peak_mem_mb'] for entry in results['timings']['stages'].values()
+                 if entry.get('peak_mem_mb') is not None]
+        return elapsed_ms, max(peaks) if peaks else None
+
+    def run_scenario(self, name, scenario=None):
+        """Gjeneron skenarin dhe kthen statistikat (ms) të çdo hapi mbi repeat kalime"""
+        scenario = scenario or SCENARIOS[name]
+        scenario_data = write_scenario(name, os.path.join(self.workdir, 'drawings'), seed=self.seed,
+                                       scenario=scenario)
+        # Teksti i ngulitur lexohet edhe pa motor OCR
+        options = merge_options({'extract_text': self.ocr_enabled or scenario.get('text_layer', False),
+                                 'calculate_dimensions': False})
+
+        # Kalimi i parë (importet, cache-t e skedarëve, regex-et) nuk matet
+        self._measure_stages(scenario_data, options)
+
+        stage_runs, end_to_end, peaks, recall, cache_stats = {}, [], {}, None, None
+        for _ in range(self.repeat):
+            profiler, found = self._measure_stages(scenario_data, options)
+            if cache_stats is None and hasattr(self.processors()[1], 'cache_stats'):
+                cache_stats = self.processors()[1].cache_stats()
+            for stage, entry in profiler.summary()['stages'].items():
+                stage_runs.setdefault(stage, []).append(entry['wall_ms'])
+                if entry['peak_mem_mb'] is not None:
+                    peaks[stage] = max(peaks.get(stage, 0.0), entry['peak_mem_mb'])
+            elapsed_ms, peak = self._measure_end_to_end(scenario_data, options)
+            end_to_end.append(elapsed_ms)
+            if peak is not None:
+                peaks['end_to_end'] = max(peaks.get('end_to_end', 0.0), peak)
+            if recall is None:
+                recall = detection_recall([s for page in found for s in page],
+                                          [s for page in scenario_data['pages'] for s in page['symbols']])
+
+        stages = OrderedDict()
+        for stage, runs in list(stage_runs.items()) + [('end_to_end', end_to_end)]:
+            stages[stage] = {
+                'median_ms': round(statistics.median(runs), 3),
+                'min_ms': round(min(runs), 3),
+                'max_ms': round(max(runs), 3),
+            }
+            if stage in peaks:
+                stages[stage]['peak_mem_mb'] = peaks[stage]
+
+        result = {
+            'scenario': dict(scenario),
+            'checksum': scenario_data['checksum'],
+            'symbols': sum(len(page['symbols']) for page in scenario_data['pages']),
+            'labels': sum(len(page['labels']) for page in scenario_data['pages']),
+            'detection_recall': recall,
+            'stages': stages,
+        }
+        if cache_stats:
+            result['symbol_cache'] = cache_stats
+        if self.cascade:
+            full_recall = self._full_detection_recall(scenario_data)
+            result['full_detection_recall'] = full_recall
+            if full_recall is not None and recall is not None:
+                result['cascade_recall_loss'] = round(full_recall - recall, 3)
+        return result
+
+    def run(self, names=DEFAULT_SCENARIOS, progress_callback=None):
+        """Ekzekuton skenarët dhe kthen raportin e plotë"""
+        # Ngrohja: biblioteka, indeksi i simboleve dhe motori OCR nuk maten
+        self.processors()
+        report = {
+            'timestamp': datetime.now().isoformat(),
+            'environment': environment_info(),
+            'repeat': self.repeat,
+            'seed': self.seed,
+            'page_workers': self.page_workers,
+            'trace_memory': self.trace_memory,
+            'ocr': self.ocr_enabled,
+            'ocr_error': self.ocr_error,
+            'cascade': self.cascade,
+            'cascade_threshold': self._processors[1].cascade_threshold if self.cascade else None,
+            'symbol_cache': self.symbol_cache,
+            'scenarios': OrderedDict(),
+        }
+        for name in names:
+            report['scenarios'][name] = self.run_scenario(name)
+            if progress_callback:
+                progress_callback(name, report['scenarios'][name])
+        return report
+
+
+def environment_info():
+    """Versionet që ndikojnë në kohët e matura"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+    }
+
+
+def is_regression(entry, base):
+    """A është hapi më i ngadaltë se në raportin bazë përtej pragjeve"""
+    if not base or base['median_ms'] <= 0:
+        return False
+    slower = entry['median_ms'] - base['median_ms']
+    return slower > REGRESSION_MIN_MS and slower > base['median_ms'] * REGRESSION_THRESHOLD / 100.0
+
+
+def format_scenario(name, result, baseline=None):
+    """Tabela tekst e një skenari; me baseline shton ndryshimin në %"""
+    scenario = result['scenario']
+    lines = [f"{name}: {scenario['width']}x{scenario['height']} px, {scenario['pages']} faqe, "
+             f"{result['symbols']} simbole, {result['labels']} etiketa, recall {result['detection_recall']}"]
+    if 'full_detection_recall' in result:
+        lines[0] += f" (pa kaskadë {result['full_detection_recall']}, humbja {result.get('cascade_recall_loss')})"
+    if result.get('symbol_cache'):
+        cache = result['symbol_cache']
+        lines[0] += f", memo {cache['hit_rate']:.0%} ({cache['hits']}/{cache['lookups']})"
+    base_stages = (baseline or {}).get('stages', {})
+    if baseline and baseline.get('checksum') != result['checksum']:
+        lines.append("  ! vizatimet ndryshojnë nga raporti bazë; krahasimi nuk është i drejtpërdrejtë")
+    for stage, entry in result['stages'].items():
+        line = f"  {stage:<18}{entry['median_ms']:>11.1f} ms  (min {entry['min_ms']:.1f})"
+        if entry.get('peak_mem_mb') is not None:
+            line += f"  {entry['peak_mem_mb']:.1f} MB"
+        base = base_stages.get(stage)
+        if base and base['median_ms'] > 0:
+            change = 100.0 * (entry['median_ms'] - base['median_ms']) / base['median_ms']
+            flag = '  REGRESION' if is_regression(entry, base) else ''
+            line += f"  {change:+.1f}% vs {base['median_ms']:.1f} ms{flag}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def build_parser():
+    """Krijon parser-in e argumenteve të CLI"""
+    parser = argparse.ArgumentParser(
+        description="Technical Drawing Analyzer - benchmark mbi vizatime sintetike")
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(DEFAULT_SCENARIOS),
+                        help="Skenarët që maten")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="Kalime për çdo skenar (raportohet mediana)")
+    parser.add_argument('-o', '--output', help="Ruaj raportin JSON")
+    parser.add_argument('--compare', help="Raport JSON i mëparshëm për krahasim")
+    parser.add_argument('--workdir', help="Dosja për vizatimet dhe bibliotekën sintetike")
+    parser.add_argument('--seed', type=int, default=0, help="Seed i gjeneratorit")
+    parser.add_argument('--page-workers', type=int, default=1, help="Procese për faqet në analizën e plotë")
+    parser.add_argument('--no-ocr', dest='ocr', action='store_false', default=None, help="Mos mat OCR")
+    parser.add_argument('--memory', action='store_true', help="Mat edhe memorien maksimale (tracemalloc)")
+    parser.add_argument('--cascade', action='store_true',
+                        help="Zbulim nga e trashë në të hollë (raporton edhe humbjen e recall-it)")
+    parser.add_argument('--cascade-threshold', type=float, help="Pragu i përafërt i kaskadës")
+    parser.add_argument('--symbol-cache', action='store_true',
+                        help="Me memo-n e klasifikimit të simboleve (hit rate në raport)")
+    return parser
+
+
+def main(argv=None):
+    """Pika hyrëse e CLI"""
+    args = build_parser().parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    if baseline and baseline.get('trace_memory') != args.memory:
+        print("Kujdes: raporti bazë është matur me/pa --memory; tracemalloc ngadalëson hapat")
+    if baseline and bool(baseline.get('cascade')) != args.cascade:
+        print("Krahasim me/pa kaskadë: ndryshimi i symbol_detection/ocr është efekti i kaskadës")
+
+    benchmark = Benchmark(workdir=args.workdir, repeat=args.repeat, ocr=args.ocr,
+                          page_workers=args.page_workers, trace_memory=args.memory, seed=args.seed,
+                          cascade=args.cascade, cascade_threshold=args.cascade_threshold,
+                          symbol_cache=args.symbol_cache)
+
+    def report(name, result):
+        print(format_scenario(name, result, (baseline or {}).get('scenarios', {}).get(name)))
+
+    print(f"tracemalloc: {'aktiv' if args.memory else 'joaktiv'} (hapat dhe end_to_end)")
+
+    result = benchmark.run(args.scenarios, progress_callback=report)
+    if result['ocr_error']:
+        print(f"OCR u anashkalua: {result['ocr_error']}")
+    if args.output:
+        save_results(result, args.output)
+        print(f"Raporti: {args.output}")
+
+    # Kodi 3 kur ndonjë hap është ngadalësuar përtej pragut
+    if baseline:
+        for name, scenario in result['scenarios'].items():
+            base_stages = baseline.get('scenarios', {}).get(name, {}).get('stages', {})
+            if any(is_regression(entry, base_stages.get(stage)) for stage, entry in scenario['stages'].items()):
+                return 3
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,786 @@
+"""
+Database Manager
+Baza lokale SQLite e aplikacionit
+
+Përveç cache-it të analizave dhe trace-ve, baza është edhe magazina e
+rezultateve: simbolet dhe teksti i çdo vizatimi ruhen si rreshta (me indekse
+sipas llojit, vizatimit dhe faqes) dhe teksti indeksohet me FTS5, kështu që
+pyetje si "vizatimet me valvola PN16" nuk kërkojnë rileximin e JSON-eve.
+Baza punon në modalitetin WAL; çdo thread/proces ka lidhjen e vet.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+
+from modules.pipeline import json_default
+
+DEFAULT_DB_PATH = 'technical_analyzer.db'
+
+# Kufijtë e paracaktuar të cache-it të analizave
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_MAX_AGE_DAYS = 90
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Sa trace ekzekutimesh mbahen në bazë (më të vjetrat fshihen)
+TRACE_MAX_RUNS = 500
+
+# Sa rreshta futen me një executemany në magazinën e rezultateve
+INSERT_BATCH_SIZE = 5000
+
+# Gjendjet e punëve të shërbimit (modules.job_service)
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+JOB_FINISHED = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+JOB_COLUMNS = ("id, file_path, options, client, priority, status, cancel_requested, progress, message, "
+               "error, worker, submitted_at, started_at, finished_at")
+
+# Punët e përfunduara më të vjetra se kaq fshihen në nisjen e shërbimit
+JOB_MAX_AGE_DAYS = 30
+
+RESULT_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS drawings (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL UNIQUE,
+        name TEXT NOT NULL,
+        file_hash TEXT,
+        page_count INTEGER NOT NULL DEFAULT 1,
+        recognizer_version TEXT,
+        analyzed_at REAL NOT NULL,
+        symbol_count INTEGER NOT NULL DEFAULT 0,
+        text_count INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS symbols (
+        id INTEGER PRIMARY KEY,
+        drawing_id INTEGER NOT NULL REFERENCES drawings(id) ON DELETE CASCADE,
+        page INTEGER NOT NULL DEFAULT 0,
+        type TEXT COLLATE NOCASE,
+        name TEXT COLLATE NOCASE,
+        confidence REAL,
+        x REAL, y REAL, width REAL, height REAL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_symbols_type ON symbols(type, drawing_id, page);
+    CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols(name, drawing_id, page);
+    CREATE INDEX IF NOT EXISTS idx_symbols_drawing_page ON symbols(drawing_id, page);
+
+    CREATE TABLE IF NOT EXISTS text_items (
+        id INTEGER PRIMARY KEY,
+        drawing_id INTEGER NOT NULL REFERENCES drawings(id) ON DELETE CASCADE,
+        page INTEGER NOT NULL DEFAULT 0,
+        content TEXT NOT NULL,
+        confidence REAL,
+        x REAL, y REAL, width REAL, height REAL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_text_drawing_page ON text_items(drawing_id, page);
+"""
+
+# Radha e shërbimit të punëve (modules.job_service); rezultati ruhet i kompresuar në kolonën result
+JOB_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        file_path TEXT NOT NULL,
+        options TEXT NOT NULL,
+        client TEXT,
+        priority INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL,
+        cancel_requested INTEGER NOT NULL DEFAULT 0,
+        progress REAL NOT NULL DEFAULT 0,
+        message TEXT,
+        error TEXT,
+        worker TEXT,
+        submitted_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL,
+        result BLOB
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, priority DESC, submitted_at);
+"""
+
+# Indeksi i tekstit; external content: FTS mban vetëm indeksin, teksti mbetet në text_items
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS text_fts USING fts5(
+        content, content='text_items', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+"""
+
+
+def hash_file(filepath):
+    """Llogarit SHA-256 të përmbajtjes së skedarit në copa"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fts_query(text):
+    """Kthen tekstin e përdoruesit në një query FTS5: çdo fjalë si frazë, të gjitha të detyrueshme
+
+    Një '*' në fund të fjalës kërkon prefiksin (p.sh. 'DN*').
+    """
+    terms = []
+    for word in (text or '').split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return ' '.join(terms)
+
+
+def _item_box(item):
+    """(x, y, gjerësia, lartësia) e elementit; pozicioni kur mungon bbox"""
+    bbox = item.get('bbox')
+    if bbox is not None and len(bbox) >= 4:
+        return tuple(float(v) for v in bbox[:4])
+    position = item.get('position')
+    if position is not None and len(position) >= 2:
+        return float(position[0]), float(position[1]), None, None
+    return None, None, None, None
+
+
+def _item_page(item):
+    page = item.get('page')
+    return int(page) if page is not None else 0
+
+
+def _confidence(item):
+    value = item.get('confidence')
+    return float(value) if value is not None else None
+
+
+def _batches(rows, size=INSERT_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def make_cache_key(file_hash, options, recognizer_version):
+    """Çelësi i cache-it: përmbajtja + opsionet + versioni i modeleve"""
+    payload = json.dumps({
+        'file': file_hash,
+        'options': {key: bool(options[key]) for key in sorted(options)},
+        'version': str(recognizer_version),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DatabaseManager:
+    """Menaxhon bazën SQLite dhe cache-in e rezultateve të analizës"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, cache_max_bytes=CACHE_MAX_BYTES,
+                 cache_max_age_days=CACHE_MAX_AGE_DAYS):
+        self.db_path = db_path
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_max_age_days = cache_max_age_days
+        self.fts_enabled = None
+        self._local = threading.local()
+
+    def _connection(self):
+        """Lidhja e këtij thread-i (dhe procesi); krijohet një herë dhe ripërdoret"""
+        local = self._local
+        if getattr(local, 'conn', None) is None or local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            # WAL: lexuesit nuk bllokohen nga shkrimi; NORMAL mjafton me WAL
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            local.conn, local.pid, local.depth = conn, os.getpid(), 0
+        return local.conn
+
+    @contextmanager
+    def connect(self, write=False):
+        """Lidhja e thread-it si transaksion (lidhjet SQLite nuk ndahen mes thread-eve)
+
+        Me write=True transaksioni merr menjëherë kyçin e shkrimit (BEGIN IMMEDIATE), që
+        shkrimet paralele të presin njëri-tjetrin në vend që të dështojnë me "database is locked".
+        Commit/rollback bëhet vetëm në nivelin e jashtëm kur thirrjet janë të mbivendosura.
+        """
+        conn = self._connection()
+        local = self._local
+        if write and local.depth == 0 and not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        local.depth += 1
+        try:
+            yield conn
+            if local.depth == 1:
+                conn.commit()
+        except BaseException:
+            if local.depth == 1:
+                conn.rollback()
+            raise
+        finally:
+            local.depth -= 1
+
+    def close(self):
+        """Mbyll lidhjen e këtij thread-i"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+    def initialize_database(self):
+        """Krijon tabelat nëse nuk ekzistojnë"""
+        directory = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self.connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS file_hashes (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    hash TEXT NOT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    file_hash TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    recognizer_version TEXT NOT NULL,
+                    results BLOB NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_cache_last_access ON analysis_cache(last_access);
+                CREATE INDEX IF NOT EXISTS idx_cache_version ON analysis_cache(recognizer_version);
+                CREATE INDEX IF NOT EXISTS idx_cache_file_hash ON analysis_cache(file_hash);
+
+                CREATE TABLE IF NOT EXISTS run_traces (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    file_hash TEXT,
+                    file_name TEXT,
+                    started_at REAL NOT NULL,
+                    wall_ms REAL NOT NULL,
+                    options TEXT,
+                    recognizer_version TEXT,
+                    summary TEXT NOT NULL,
+                    trace BLOB NOT NULL
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_traces_started ON run_traces(started_at);
+            """)
+            conn.executescript(RESULT_SCHEMA)
+            conn.executescript(JOB_SCHEMA)
+        self._ensure_fts()
+
+    def _ensure_fts(self):
+        """Krijon indeksin FTS5; pa FTS5 kërkimi i tekstit bëhet me LIKE"""
+        if self.fts_enabled is None:
+            try:
+                with self.connect() as conn:
+                    conn.executescript(FTS_SCHEMA)
+                self.fts_enabled = True
+            except sqlite3.OperationalError as e:
+                print(f"FTS5 not available, falling back to LIKE search: {e}")
+                self.fts_enabled = False
+        return self.fts_enabled
+
+    # Analysis cache
+
+    def get_file_hash(self, filepath):
+        """Kthen hash-in e skedarit; rillogaritet vetëm kur ndryshon madhësia ose mtime"""
+        stat = os.stat(filepath)
+        path = os.path.abspath(filepath)
+
+        with self.connect() as conn:
+            row = conn.execute("SELECT size, mtime, hash FROM file_hashes WHERE path = ?",
+                               (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+            return row[2]
+
+        file_hash = hash_file(filepath)
+        with self.connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO file_hashes (path, size, mtime, hash) VALUES (?, ?, ?, ?)",
+                         (path, stat.st_size, stat.st_mtime, file_hash))
+        return file_hash
+
+    def get_cached_analysis(self, filepath, options, recognizer_version):
+        """Kthen analysis_results e ruajtura, ose None nëse nuk ka"""
+        key = make_cache_key(self.get_file_hash(filepath), options, recognizer_version)
+
+        with self.connect() as conn:
+            row = conn.execute("SELECT results FROM analysis_cache WHERE cache_key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE analysis_cache SET last_access = ?, hits = hits + 1 WHERE cache_key = ?",
+                         (time.time(), key))
+
+        return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+
+    def store_analysis(self, filepath, options, recognizer_version, results):
+        """Ruan analysis_results në cache dhe zbaton kufijtë e madhësisë/moshës"""
+        file_hash = self.get_file_hash(filepath)
+        key = make_cache_key(file_hash, options, recognizer_version)
+        payload = zlib.compress(json.dumps(results, ensure_ascii=False, default=json_default).encode('utf-8'))
+        now = time.time()
+
+        with self.connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO analysis_cache
+                    (cache_key, file_hash, options, recognizer_version, results, size_bytes,
+                     created_at, last_access, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)
+            """, (key, file_hash, json.dumps(options, sort_keys=True), str(recognizer_version),
+                  payload, len(payload), now, now))
+
+        self.evict_cache()
+
+    def evict_cache(self, max_bytes=None, max_age_days=None):
+        """Fshin hyrjet e vjetra, pastaj më pak të përdorurat (LRU) derisa të hyjë në kufi"""
+        max_bytes = self.cache_max_bytes if max_bytes is None else max_bytes
+        max_age_days = self.cache_max_age_days if max_age_days is None else max_age_days
+        removed = 0
+
+        with self.connect() as conn:
+            if max_age_days:
+                cutoff = time.time() - max_age_days * 86400
+                removed += conn.execute("DELETE FROM analysis_cache WHERE last_access < ?",
+                                        (cutoff,)).rowcount
+
+            if max_bytes:
+                total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM analysis_cache").fetchone()[0]
+                if total > max_bytes:
+                    stale = []
+                    for key, size in conn.execute(
+                            "SELECT cache_key, size_bytes FROM analysis_cache ORDER BY last_access ASC"):
+                        if total <= max_bytes:
+                            break
+                        stale.append((key,))
+                        total -= size
+                    conn.executemany("DELETE FROM analysis_cache WHERE cache_key = ?", stale)
+                    removed += len(stale)
+
+        return removed
+
+    def invalidate_cache(self, keep_version=None):
+        """Fshin cache-in pas ndryshimit të modeleve
+
+        Me keep_version ruhen vetëm hyrjet e atij versioni; pa të fshihet gjithçka.
+        """
+        with self.connect() as conn:
+            if keep_version is None:
+                return conn.execute("DELETE FROM analysis_cache").rowcount
+            return conn.execute("DELETE FROM analysis_cache WHERE recognizer_version != ?",
+                                (str(keep_version),)).rowcount
+
+    def cache_stats(self):
+        """Statistikat e cache-it"""
+        with self.connect() as conn:
+            entries, size, hits = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0), COALESCE(SUM(hits), 0) FROM analysis_cache"
+            ).fetchone()
+        return {'entries': entries, 'size_bytes': size, 'hits': hits}
+
+    # Run traces
+
+    def store_trace(self, profiler, filepath=None, options=None, recognizer_version=None):
+        """Ruan trace-in e një ekzekutimi (StageProfiler); kthen id-në e rreshtit"""
+        file_hash = None
+        if filepath and os.path.exists(filepath):
+            file_hash = self.get_file_hash(filepath)
+        summary = profiler.summary()
+        trace = zlib.compress(json.dumps(profiler.to_dict(), default=json_default).encode('utf-8'))
+
+        with self.connect() as conn:
+            row_id = conn.execute("""
+                INSERT INTO run_traces
+                    (file_hash, file_name, started_at, wall_ms, options, recognizer_version, summary, trace)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (file_hash, os.path.basename(filepath) if filepath else None, profiler.started_at,
+                  summary['wall_ms'], json.dumps(options, sort_keys=True) if options else None,
+                  str(recognizer_version) if recognizer_version else None,
+                  json.dumps(summary, default=json_default), trace)).lastrowid
+            conn.execute("DELETE FROM run_traces WHERE id <= ?", (row_id - TRACE_MAX_RUNS,))
+        return row_id
+
+    def get_traces(self, limit=20):
+        """Përmbledhjet e ekzekutimeve të fundit, më i riu i pari"""
+        with self.connect() as conn:
+            rows = conn.execute("""
+                SELECT id, file_name, started_at, wall_ms, recognizer_version, summary
+                FROM run_traces ORDER BY id DESC LIMIT ?
+            """, (limit,)).fetchall()
+        return [{'id': row[0], 'file': row[1], 'started_at': row[2], 'wall_ms': row[3],
+                 'recognizer_version': row[4], 'summary': json.loads(row[5])} for row in rows]
+
+    def get_trace(self, trace_id):
+        """Trace-i i plotë (eventet) i një ekzekutimi, ose None"""
+        with self.connect() as conn:
+            row = conn.execute("SELECT trace FROM run_traces WHERE id = ?", (trace_id,)).fetchone()
+        return json.loads(zlib.decompress(row[0]).decode('utf-8')) if row else None
+
+    def stage_stats(self, limit=50):
+        """Koha mesatare (ms) e çdo hapi në ekzekutimet e fundit, për peshat e progresit"""
+        totals, counts = {}, {}
+        for run in self.get_traces(limit):
+            for stage, entry in run['summary'].get('stages', {}).items():
+                totals[stage] = totals.get(stage, 0.0) + entry['wall_ms'] / max(1, entry['count'])
+                counts[stage] = counts.get(stage, 0) + 1
+        return {stage: totals[stage] / counts[stage] for stage in totals}
+
+    # Result store
+
+    def store_results(self, results, filepath=None, recognizer_version=None):
+        """Ruan simbolet dhe tekstin e një analize; zëvendëson rezultatet e mëparshme të skedarit
+
+        Kthen id-në e vizatimit.
+        """
+        filepath = filepath or results.get('file')
+        if not filepath:
+            raise ValueError("Rezultatet nuk kanë skedar")
+        path = os.path.abspath(filepath)
+        file_hash = self.get_file_hash(filepath) if os.path.exists(filepath) else None
+        symbols = results.get('symbols') or []
+        text_data = [item for item in results.get('text') or [] if item.get('content')]
+        fts = self._ensure_fts()
+
+        with self.connect(write=True) as conn:
+            row = conn.execute("SELECT id FROM drawings WHERE path = ?", (path,)).fetchone()
+            if row:
+                self._delete_drawing(conn, row[0])
+            drawing_id = conn.execute("""
+                INSERT INTO drawings (path, name, file_hash, page_count, recognizer_version, analyzed_at,
+                                      symbol_count, text_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (path, os.path.basename(path), file_hash, int(results.get('page_count') or 1),
+                  str(recognizer_version) if recognizer_version else None, time.time(),
+                  len(symbols), len(text_data))).lastrowid
+
+            for batch in _batches((drawing_id, _item_page(s), s.get('type'), s.get('name'), _confidence(s))
+                                  + _item_box(s) for s in symbols):
+                conn.executemany("""
+                    INSERT INTO symbols (drawing_id, page, type, name, confidence, x, y, width, height)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, batch)
+            for batch in _batches((drawing_id, _item_page(t), str(t['content']), _confidence(t)) + _item_box(t)
+                                  for t in text_data):
+                conn.executemany("""
+                    INSERT INTO text_items (drawing_id, page, content, confidence, x, y, width, height)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, batch)
+            if fts:
+                conn.execute("INSERT INTO text_fts (rowid, content) "
+                             "SELECT id, content FROM text_items WHERE drawing_id = ?", (drawing_id,))
+        return drawing_id
+
+    def _delete_drawing(self, conn, drawing_id):
+        if self._ensure_fts():
+            # External content: hyrjet e FTS hiqen me komandën 'delete' para rreshtave burim
+            conn.execute("INSERT INTO text_fts (text_fts, rowid, content) "
+                         "SELECT 'delete', id, content FROM text_items WHERE drawing_id = ?", (drawing_id,))
+        conn.execute("DELETE FROM symbols WHERE drawing_id = ?", (drawing_id,))
+        conn.execute("DELETE FROM text_items WHERE drawing_id = ?", (drawing_id,))
+        conn.execute("DELETE FROM drawings WHERE id = ?", (drawing_id,))
+
+    def remove_drawing(self, filepath):
+        """Heq një vizatim nga magazina; kthen True nëse ekzistonte"""
+        with self.connect(write=True) as conn:
+            row = conn.execute("SELECT id FROM drawings WHERE path = ?", (os.path.abspath(filepath),)).fetchone()
+            if row:
+                self._delete_drawing(conn, row[0])
+        return row is not None
+
+    def _text_filter(self, text, column='t.id'):
+        """Kushti SQL (dhe parametrat) që kufizon rreshtat e text_items te ato që përmbajnë text"""
+        if self._ensure_fts():
+            return f"{column} IN (SELECT rowid FROM text_fts WHERE text_fts MATCH ?)", [fts_query(text)]
+        words = text.split()
+        return (' AND '.join("t.content LIKE ?" for _ in words) or '1',
+                [f"%{word.rstrip('*')}%" for word in words])
+
+    def find_drawings(self, text=None, symbol_type=None, symbol_name=None, page=None, same_page=False,
+                      limit=100):
+        """Vizatimet që përmbajnë tekstin dhe simbolet e dhëna
+
+        symbol_type/symbol_name krahasohen pa dallim shkronjash; me same_page teksti
+        dhe simboli duhet të jenë në të njëjtën faqe. Kthen listë dict-esh me numrin
+        e simboleve dhe të teksteve që përputhen.
+        """
+        symbol_conditions, symbol_params = [], []
+        for column, value in (('s.type', symbol_type), ('s.name', symbol_name), ('s.page', page)):
+            if value is not None:
+                symbol_conditions.append(f"{column} = ?")
+                symbol_params.append(value)
+        text_conditions, text_params = [], []
+        if text and text.strip():
+            condition, text_params = self._text_filter(text)
+            text_conditions.append(condition)
+            if page is not None:
+                text_conditions.append("t.page = ?")
+                text_params.append(page)
+
+        if not symbol_conditions and not text_conditions:
+            query, params = "SELECT id AS drawing_id, 0 AS symbols, 0 AS texts FROM drawings", []
+        elif not text_conditions:
+            query = f"""SELECT s.drawing_id, COUNT(*) AS symbols, 0 AS texts FROM symbols s
+                        WHERE {' AND '.join(symbol_conditions)} GROUP BY s.drawing_id"""
+            params = symbol_params
+        elif not symbol_conditions:
+            query = f"""SELECT t.drawing_id, 0 AS symbols, COUNT(*) AS texts FROM text_items t
+                        WHERE {' AND '.join(text_conditions)} GROUP BY t.drawing_id"""
+            params = text_params
+        else:
+            # Të dyja anët grupohen veç e veç (sipas vizatimit, ose vizatimit+faqes) dhe pastaj bashkohen
+            group = 'drawing_id, page' if same_page else 'drawing_id'
+            join = 'tm.drawing_id = sm.drawing_id' + (' AND tm.page = sm.page' if same_page else '')
+            query = f"""
+                SELECT sm.drawing_id, SUM(sm.n) AS symbols, SUM(tm.n) AS texts
+                FROM (SELECT {group}, COUNT(*) AS n FROM symbols s
+                      WHERE {' AND '.join(symbol_conditions)} GROUP BY {group}) sm
+                JOIN (SELECT {group}, COUNT(*) AS n FROM text_items t
+                      WHERE {' AND '.join(text_conditions)} GROUP BY {group}) tm ON {join}
+                GROUP BY sm.drawing_id"""
+            params = symbol_params + text_params
+
+        with self.connect() as conn:
+            rows = conn.execute(f"""
+                SELECT d.id, d.path, d.name, d.page_count, d.analyzed_at, m.symbols, m.texts
+                FROM ({query}) AS m
+                JOIN drawings d ON d.id = m.drawing_id
+                ORDER BY d.path LIMIT ?
+            """, params + [limit]).fetchall()
+        return [{'id': row[0], 'path': row[1], 'name': row[2], 'page_count': row[3], 'analyzed_at': row[4],
+                 'symbols': row[5], 'text': row[6]} for row in rows]
+
+    def search_text(self, text, limit=50, drawing_id=None):
+        """Rreshtat e tekstit që përmbajnë text, më të përshtatshmit të parët (bm25 me FTS5)"""
+        condition, params = "", []
+        if drawing_id is not None:
+            condition, params = " AND t.drawing_id = ?", [drawing_id]
+
+        if self._ensure_fts():
+            query = f"""
+                SELECT d.path, t.drawing_id, t.page, t.content, t.confidence, t.x, t.y, t.width, t.height
+                FROM text_fts JOIN text_items t ON t.id = text_fts.rowid JOIN drawings d ON d.id = t.drawing_id
+                WHERE text_fts MATCH ?{condition}
+                ORDER BY text_fts.rank LIMIT ?"""
+            params = [fts_query(text)] + params
+        else:
+            like, like_params = self._text_filter(text)
+            query = f"""
+                SELECT d.path, t.drawing_id, t.page, t.content, t.confidence, t.x, t.y, t.width, t.height
+                FROM text_items t JOIN drawings d ON d.id = t.drawing_id
+                WHERE {like}{condition}
+                ORDER BY t.id LIMIT ?"""
+            params = like_params + params
+
+        with self.connect() as conn:
+            rows = conn.execute(query, params + [limit]).fetchall()
+        return [{'file': row[0], 'drawing_id': row[1], 'page': row[2], 'content': row[3], 'confidence': row[4],
+                 'bbox': list(row[5:9]) if row[7] is not None else None} for row in rows]
+
+    def drawing_results(self, drawing_id, page=None):
+        """Simbolet dhe teksti i ruajtur i një vizatimi (ose i një faqeje)"""
+        condition, params = "drawing_id = ?", [drawing_id]
+        if page is not None:
+            condition += " AND page = ?"
+            params.append(page)
+
+        with self.connect() as conn:
+            symbols = conn.execute(f"SELECT type, name, confidence, page, x, y, width, height FROM symbols "
+                                   f"WHERE {condition} ORDER BY id", params).fetchall()
+            text_data = conn.execute(f"SELECT content, confidence, page, x, y, width, height FROM text_items "
+                                     f"WHERE {condition} ORDER BY id", params).fetchall()
+        return {
+            'symbols': [{'type': r[0], 'name': r[1], 'confidence': r[2], 'page': r[3],
+                         'bbox': list(r[4:8]) if r[6] is not None else None} for r in symbols],
+            'text': [{'content': r[0], 'confidence': r[1], 'page': r[2],
+                      'bbox': list(r[3:7]) if r[5] is not None else None} for r in text_data],
+        }
+
+    def store_stats(self):
+        """Numri i vizatimeve, simboleve dhe rreshtave të tekstit në magazinë"""
+        with self.connect() as conn:
+            drawings, symbols, text_items = conn.execute(
+                "SELECT (SELECT COUNT(*) FROM drawings), (SELECT COUNT(*) FROM symbols), "
+                "(SELECT COUNT(*) FROM text_items)").fetchone()
+        return {'drawings': drawings, 'symbols': symbols, 'text': text_items}
+
+    # Jobs
+
+    def _job(self, row):
+        """Rreshti i tabelës jobs si dict"""
+        return {'id': row[0], 'file': row[1], 'options': json.loads(row[2]), 'client': row[3], 'priority': row[4],
+                'status': row[5], 'cancel_requested': bool(row[6]), 'progress': row[7], 'message': row[8],
+                'error': row[9], 'worker': row[10], 'submitted_at': row[11], 'started_at': row[12],
+                'finished_at': row[13]}
+
+    def submit_job(self, filepath, options=None, client=None, priority=0):
+        """Shton një punë në radhë; kthen id-në"""
+        job_id = uuid.uuid4().hex
+        with self.connect(write=True) as conn:
+            conn.execute("""
+                INSERT INTO jobs (id, file_path, options, client, priority, status, submitted_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (job_id, filepath, json.dumps(options or {}, sort_keys=True), client, int(priority),
+                  JOB_QUEUED, time.time()))
+        return job_id
+
+    def claim_job(self, worker=None):
+        """Merr punën e radhës (prioriteti, pastaj radha e dorëzimit) dhe e shënon 'running'"""
+        with self.connect(write=True) as conn:
+            row = conn.execute(f"""
+                SELECT {JOB_COLUMNS} FROM jobs WHERE status = ?
+                ORDER BY priority DESC, submitted_at LIMIT 1
+            """, (JOB_QUEUED,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            conn.execute("UPDATE jobs SET status = ?, started_at = ?, worker = ?, message = NULL WHERE id = ?",
+                         (JOB_RUNNING, now, worker, row[0]))
+        job = self._job(row)
+        job.update({'status': JOB_RUNNING, 'started_at': now, 'worker': worker, 'message': None})
+        return job
+
+    def update_job_progress(self, job_id, progress, message=None):
+        """Ruan progresin e një pune që po ekzekutohet; kthen True nëse është kërkuar anulimi"""
+        with self.connect(write=True) as conn:
+            conn.execute("UPDATE jobs SET progress = ?, message = ? WHERE id = ? AND status = ?",
+                         (float(progress), message, job_id, JOB_RUNNING))
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def finish_job(self, job_id, status, result=None, error=None):
+        """Mbyll punën me gjendjen përfundimtare (done/failed/cancelled) dhe rezultatin"""
+        payload = None
+        if result is not None:
+            payload = zlib.compress(json.dumps(result, ensure_ascii=False, default=json_default).encode('utf-8'))
+        with self.connect(write=True) as conn:
+            conn.execute("""
+                UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?,
+                    progress = CASE WHEN ? = ? THEN 100 ELSE progress END
+                WHERE id = ?
+            """, (status, payload, error, time.time(), status, JOB_DONE, job_id))
+
+    def cancel_job(self, job_id):
+        """Anulon punën: në radhë anulohet menjëherë, në ekzekutim shënohet për ndalim
+
+        Kthen gjendjen pas kërkesës, ose None nëse puna nuk ekziston.
+        """
+        with self.connect(write=True) as conn:
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row[0] == JOB_QUEUED:
+                conn.execute("UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ? WHERE id = ?",
+                             (JOB_CANCELLED, time.time(), job_id))
+                return JOB_CANCELLED
+            if row[0] == JOB_RUNNING:
+                conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            return row[0]
+
+    def get_job(self, job_id):
+        """Gjendja e punës (pa rezultatin), ose None"""
+        with self.connect() as conn:
+            row = conn.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def get_job_result(self, job_id):
+        """analysis_results e një pune të përfunduar, ose None"""
+        with self.connect() as conn:
+            row = conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(zlib.decompress(row[0]).decode('utf-8')) if row and row[0] else None
+
+    def list_jobs(self, status=None, client=None, limit=100):
+        """Punët më të reja të parat, sipas gjendjes/klientit"""
+        conditions, params = [], []
+        for column, value in (('status', status), ('client', client)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.connect() as conn:
+            rows = conn.execute(f"SELECT {JOB_COLUMNS} FROM jobs {where} "
+                                f"ORDER BY submitted_at DESC LIMIT ?", params + [limit]).fetchall()
+        return [self._job(row) for row in rows]
+
+    def active_job_files(self):
+        """Skedarët e punëve në radhë ose në ekzekutim"""
+        with self.connect() as conn:
+            rows = conn.execute("SELECT file_path FROM jobs WHERE status IN (?, ?)",
+                                (JOB_QUEUED, JOB_RUNNING)).fetchall()
+        return [row[0] for row in rows]
+
+    def job_counts(self):
+        """Numri i punëve sipas gjendjes"""
+        with self.connect() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def recover_jobs(self, max_age_days=JOB_MAX_AGE_DAYS):
+        """Pas një ndalimi të papritur: punët 'running' kthehen në radhë (ose anulohen nëse
+        ishte kërkuar anulimi) dhe fshihen punët e vjetra të përfunduara"""
+        now = time.time()
+        with self.connect(write=True) as conn:
+            conn.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE status = ? AND cancel_requested = 1",
+                         (JOB_CANCELLED, now, JOB_RUNNING))
+            requeued = conn.execute("UPDATE jobs SET status = ?, progress = 0, started_at = NULL, worker = NULL "
+                                    "WHERE status = ?", (JOB_QUEUED, JOB_RUNNING)).rowcount
+            if max_age_days:
+                conn.execute(f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(JOB_FINISHED))}) "
+                             f"AND finished_at < ?", JOB_FINISHED + (now - max_age_days * 86400,))
+        return requeued
+
+
+def main(argv=None):
+    """Kërkim në magazinën e rezultateve nga rreshti i komandës"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Kërkon vizatimet e analizuara sipas tekstit dhe simboleve")
+    parser.add_argument('text', nargs='?', help="Teksti që kërkohet (p.sh. 'PN16', 'DN*')")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Baza SQLite")
+    parser.add_argument('--type', dest='symbol_type', help="Lloji i simbolit (p.sh. valve)")
+    parser.add_argument('--name', dest='symbol_name', help="Emri i simbolit (p.sh. 'Gate Valve')")
+    parser.add_argument('--page', type=int, help="Vetëm faqja e dhënë (nga 0)")
+    parser.add_argument('--same-page', action='store_true', help="Teksti dhe simboli në të njëjtën faqe")
+    parser.add_argument('--lines', action='store_true', help="Shfaq rreshtat e tekstit që përputhen")
+    parser.add_argument('-n', '--limit', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"Baza nuk ekziston: {args.db}")
+        return 1
+    db = DatabaseManager(args.db)
+    db.initialize_database()
+    started = time.perf_counter()
+
+    if args.lines and args.text:
+        matches = db.search_text(args.text, limit=args.limit)
+        for match in matches:
+            print(f"{match['file']} [faqja {match['page'] + 1}] {match['content']}")
+    else:
+        matches = db.find_drawings(args.text, args.symbol_type, args.symbol_name, page=args.page,
+                                   same_page=args.same_page, limit=args.limit)
+        for match in matches:
+            print(f"{match['path']}  simbole: {match['symbols']}  tekst: {match['text']}")
+
+    stats = db.store_stats()
+    print(f"{len(matches)} rezultate në {(time.perf_counter() - started) * 1000:.1f} ms "
+          f"({stats['drawings']} vizatime, {stats['symbols']} simbole, {stats['text']} rreshta teksti)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
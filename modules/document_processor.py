@@ -0,0 +1,261 @@
+"""
+Document Processor
+Ngarkon dokumentet teknike (PDF, imazhe) dhe i përgatit për analizë
+
+PDF-të e eksportuara nga CAD kanë shtresë teksti të vërtetë: rreshtat e saj
+lexohen me koordinata (në pixel të faqes së renderuar) dhe kalojnë te
+rezultatet pa OCR; OCR mbetet vetëm për faqet pa tekst dhe për imazhet raster
+brenda faqes.
+"""
+
+import math
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from modules.shared_image import BACKEND_FILE
+from modules.tiling import DEFAULT_TILE_OVERLAP, DEFAULT_TILE_SIZE, PdfTileSource, RasterTileSource
+
+# Skanimet A0 në 600 dpi kalojnë kufirin e PIL për "decompression bomb"
+Image.MAX_IMAGE_PIXELS = None
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp')
+CAD_EXTENSIONS = ('.dwg', '.dxf')
+# Formatet CAD që lexohen drejtpërdrejt si vektor (DWG duhet eksportuar si DXF)
+VECTOR_EXTENSIONS = ('.dxf',)
+
+# Mbi këtë numër pixelësh faqja procesohet me pllaka (~ A1 në 300 dpi)
+TILING_PIXEL_THRESHOLD = 40_000_000
+
+# Imazhi që mbulon kaq nga faqja është skanim; me shtresë teksti ai është skanim i kërkueshëm
+# (teksti është vetë rezultati i OCR), ndaj nuk ri-OCR-ohet
+SCANNED_PAGE_FRACTION = 0.9
+
+
+class DocumentProcessor:
+    """Ngarkon dhe përgatit dokumentet për zbulimin e simboleve dhe OCR"""
+
+    def __init__(self, dpi=200, tile_size=DEFAULT_TILE_SIZE, tile_overlap=DEFAULT_TILE_OVERLAP,
+                 tiling_threshold=TILING_PIXEL_THRESHOLD, tile_backend=BACKEND_FILE, text_layer=True):
+        self.dpi = dpi
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.tiling_threshold = tiling_threshold
+        # Ku mbahet faqja raster e pllakave: 'file' (memmap në disk) ose 'memory' (shared_memory)
+        self.tile_backend = tile_backend
+        # Përdor tekstin e ngulitur të PDF-së në vend të OCR kur faqja e ka
+        self.text_layer = text_layer
+
+    def get_page_size(self, filepath, page=0):
+        """Kthen (width, height) në pixel pa dekoduar imazhin"""
+        file_ext = Path(filepath).suffix.lower()
+
+        if file_ext == '.pdf':
+            import fitz
+            with fitz.open(filepath) as doc:
+                rect = doc[page].rect
+            zoom = self.dpi / 72.0
+            return int(rect.width * zoom), int(rect.height * zoom)
+
+        # PIL lexon vetëm header-in deri sa të kërkohen pixelët
+        with Image.open(filepath) as image:
+            return image.size
+
+    def page_dpi(self, filepath):
+        """Rezolucioni i faqes në pixel për inç (PDF: dpi i renderimit; imazhet: nga header-i, nëse e ka)"""
+        if Path(filepath).suffix.lower() == '.pdf':
+            return float(self.dpi)
+        try:
+            with Image.open(filepath) as image:
+                dpi = image.info.get('dpi')
+        except Exception:
+            return None
+        if not dpi or not dpi[0] or float(dpi[0]) <= 1:
+            return None
+        return float(dpi[0])
+
+    def should_tile(self, filepath, page=0):
+        """A duhet procesuar skedari me pllaka"""
+        try:
+            width, height = self.get_page_size(filepath, page)
+        except Exception:
+            return False
+        return width * height > self.tiling_threshold
+
+    def load_image(self, filepath):
+        """Ngarkon një imazh raster si RGB"""
+        image = cv2.imread(filepath)
+        if image is None:
+            raise ValueError("Could not load image")
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    def pdf_to_image(self, filepath, page=0, dpi=None):
+        """Renderon një faqe PDF si imazh RGB"""
+        import fitz
+
+        zoom = (dpi or self.dpi) / 72.0
+        with fitz.open(filepath) as doc:
+            pix = doc[page].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
+
+        if pix.n == 1:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        return image[:, :, :3].copy()
+
+    def extract_text_layer(self, filepath, page=0, dpi=None):
+        """Rreshtat e tekstit të ngulitur dhe kutitë e imazheve raster të një faqeje PDF
+
+        Kthen (text, raster_regions) në pixel të faqes së renderuar në dpi;
+        text është None kur faqja nuk ka shtresë teksti (atëherë duhet OCR).
+        Imazhet sa gjithë faqja (skanimet) nuk kthehen si raster_regions.
+        """
+        import fitz
+
+        zoom = (dpi or self.dpi) / 72.0
+        with fitz.open(filepath) as doc:
+            pdf_page = doc[page]
+            # Koordinatat e PyMuPDF janë të faqes pa rrotullim; renderimi e rrotullon
+            matrix = pdf_page.rotation_matrix * fitz.Matrix(zoom, zoom)
+            flags = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+            blocks = pdf_page.get_text('dict', flags=flags)['blocks']
+            images = pdf_page.get_image_info()
+            page_rect = pdf_page.rect
+
+        text = []
+        for block in blocks:
+            for line in block.get('lines', []):
+                content = ' '.join(span['text'].strip() for span in line['spans'] if span['text'].strip())
+                if not content:
+                    continue
+                x0, y0, x1, y1 = _pixel_box(fitz.Rect(line['bbox']) * matrix)
+                text.append({
+                    'content': content,
+                    'confidence': 100.0,
+                    'position': [(x0 + x1) // 2, (y0 + y1) // 2],
+                    'bbox': [x0, y0, x1 - x0, y1 - y0],
+                })
+
+        page_area = abs(page_rect.width * page_rect.height) * zoom * zoom
+        raster_regions = []
+        for image in images:
+            x0, y0, x1, y1 = _pixel_box(fitz.Rect(image['bbox']) * matrix)
+            if x1 > x0 and y1 > y0 and (x1 - x0) * (y1 - y0) < SCANNED_PAGE_FRACTION * page_area:
+                raster_regions.append([x0, y0, x1 - x0, y1 - y0])
+        return (text or None), raster_regions
+
+    def _text_layer_fields(self, filepath, page):
+        """Fushat 'text_layer' dhe 'raster_regions' të processed_data për një faqe PDF"""
+        if not self.text_layer:
+            return {}
+        try:
+            text, raster_regions = self.extract_text_layer(filepath, page)
+        except Exception as e:
+            print(f"PDF text layer error: {e}")
+            return {}
+        return {'text_layer': text, 'raster_regions': raster_regions}
+
+    def page_count(self, filepath):
+        """Numri i faqeve të dokumentit (1 për imazhet raster)"""
+        if Path(filepath).suffix.lower() != '.pdf':
+            return 1
+
+        import fitz
+        with fitz.open(filepath) as doc:
+            return doc.page_count
+
+    def iter_pages(self, filepath, dpi=None, pages=None):
+        """Renderon faqet një nga një (generator); në memorie mbahet vetëm faqja aktuale"""
+        import fitz
+
+        zoom = (dpi or self.dpi) / 72.0
+        matrix = fitz.Matrix(zoom, zoom)
+        with fitz.open(filepath) as doc:
+            for index in (range(doc.page_count) if pages is None else pages):
+                pix = doc[index].get_pixmap(matrix=matrix, alpha=False)
+                image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
+                if pix.n == 1:
+                    image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+                else:
+                    image = image[:, :, :3].copy()
+                del pix
+                yield index, image
+
+    def open_tiles(self, filepath, page=0):
+        """Hap një burim pllakash për faqen (PDF ose raster)"""
+        if Path(filepath).suffix.lower() == '.pdf':
+            return PdfTileSource(filepath, page=page, dpi=self.dpi)
+        return RasterTileSource(filepath, backend=self.tile_backend)
+
+    def load_vector(self, filepath):
+        """Lexon një vizatim DXF si vektor (simbole nga blloqet, tekst nga TEXT/MTEXT)"""
+        from modules.dxf_reader import read_dxf
+
+        drawing = read_dxf(filepath)
+        return {
+            'file': filepath,
+            'type': Path(filepath).suffix.lower().lstrip('.'),
+            'page': 0,
+            'width': drawing.width,
+            'height': drawing.height,
+            'tiled': False,
+            'vector': True,
+            'drawing': drawing,
+        }
+
+    def process_file(self, filepath, tiled=None, page=0):
+        """Proceson skedarin (ose një faqe të PDF) dhe kthen të dhënat për analizë
+
+        Me tiled=None, pllakat zgjidhen automatikisht për faqe shumë të mëdha;
+        atëherë rezultati mban 'tile_source' në vend të 'image'. DXF lexohet si
+        vektor dhe rezultati mban 'drawing' (VectorDrawing). Faqet PDF me tekst
+        të ngulitur mbajnë 'text_layer' dhe 'raster_regions' (imazhet për OCR).
+        'dpi' (None kur skanimi nuk e ka) kthen gjatësitë në pixel në njësi reale.
+        """
+        file_ext = Path(filepath).suffix.lower()
+
+        if file_ext in VECTOR_EXTENSIONS:
+            return self.load_vector(filepath)
+        if file_ext in CAD_EXTENSIONS:
+            raise ValueError(f"Formati {file_ext} nuk mbështetet ende për analizë; eksportojeni si DXF")
+        if file_ext != '.pdf' and file_ext not in IMAGE_EXTENSIONS:
+            raise ValueError(f"Formati {file_ext} nuk mbështetet")
+
+        if tiled is None:
+            tiled = self.should_tile(filepath, page)
+
+        # Teksti i ngulitur (vetëm PDF); mungon kur faqja duhet OCR e plotë
+        text_fields = self._text_layer_fields(filepath, page) if file_ext == '.pdf' else {}
+
+        if tiled:
+            source = self.open_tiles(filepath, page)
+            return dict({
+                'file': filepath,
+                'type': file_ext.lstrip('.'),
+                'page': page,
+                'width': source.width,
+                'height': source.height,
+                'tiled': True,
+                'tile_source': source,
+                'dpi': self.page_dpi(filepath),
+            }, **text_fields)
+
+        image = self.pdf_to_image(filepath, page=page) if file_ext == '.pdf' else self.load_image(filepath)
+        return dict({
+            'file': filepath,
+            'type': file_ext.lstrip('.'),
+            'page': page,
+            'image': image,
+            'width': image.shape[1],
+            'height': image.shape[0],
+            'tiled': False,
+            'dpi': self.page_dpi(filepath),
+        }, **text_fields)
+
+
+def _pixel_box(rect):
+    """Rect i PyMuPDF (pas shkallëzimit) si kuti pixel të plota (x0, y0, x1, y1)"""
+    rect = rect.normalize()
+    return (int(math.floor(rect.x0)), int(math.floor(rect.y0)),
+            int(math.ceil(rect.x1)), int(math.ceil(rect.y1)))
@@ -0,0 +1,444 @@
+"""
+DXF Reader
+Lexon vizatimet DXF si vektor: blloqet (INSERT) janë simbole, TEXT/MTEXT janë tekst
+
+Nuk ka rasterizim dhe as computer vision: koordinatat merren drejtpërdrejt nga
+entitetet. Seksioni ENTITIES (pjesa më e madhe e skedarit) lexohet me një
+skaner të thjeshtë çiftesh kod/vlerë; ezdxf ngarkon vetëm header-in dhe
+definicionet e blloqeve. Kutitë e blloqeve llogariten një herë për definicion
+dhe transformohen për të gjitha INSERT-et njëherësh me numpy.
+
+Koordinatat e rezultateve janë në njësitë e vizatimit, me boshtin y poshtë
+(si pixelët e imazheve), me origjinë në cepin e sipërm majtas të vizatimit.
+"""
+
+import gc
+import io
+import math
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from modules.spatial_index import GridIndex
+
+# Fjalë kyçe në emrin e bllokut -> lloji i simbolit
+BLOCK_TYPE_KEYWORDS = {
+    'valve': ('VALVE', 'VALV', 'VLV'),
+    'pump': ('PUMP',),
+    'instrument': ('INSTR', 'GAUGE', 'TRANSMIT', 'SENSOR'),
+    'equipment': ('TANK', 'VESSEL', 'EXCHANGER', 'FILTER', 'COMPRESSOR'),
+    'fitting': ('REDUCER', 'FLANGE', 'ELBOW', 'TEE'),
+}
+
+# Blloqet që mbulojnë më shumë se kjo pjesë e vizatimit janë korniza/title block, jo simbole
+FRAME_AREA_RATIO = 0.25
+
+# Gjerësia mesatare e një shkronje në raport me lartësinë (pa matje fonti)
+CHAR_WIDTH_RATIO = 0.6
+MTEXT_LINE_SPACING = 1.5
+
+# TEXT halign -> pjesa e gjerësisë në të majtë të pikës së ankorimit
+_TEXT_HALIGN = {0: 0.0, 1: 0.5, 2: 1.0, 3: 0.0, 4: 0.5, 5: 0.0}
+# TEXT valign -> pjesa e lartësisë poshtë pikës së ankorimit (0 = baseline)
+_TEXT_VALIGN = {0: 0.0, 1: 0.0, 2: 0.5, 3: 1.0}
+
+
+def block_symbol_type(block_name):
+    """Lloji i simbolit nga emri i bllokut ("<lloji>__<Emri>" ose fjalë kyçe)"""
+    symbol_type, separator, name = block_name.partition('__')
+    if separator:
+        return symbol_type, name or symbol_type
+
+    upper = block_name.upper()
+    for symbol_type, keywords in BLOCK_TYPE_KEYWORDS.items():
+        if any(keyword in upper for keyword in keywords):
+            return symbol_type, block_name
+    return 'block', block_name
+
+
+def _rotated_boxes(placements):
+    """Kutitë (N, 4) e teksteve nga (x, y, w, h, majtas, poshtë, rrotullimi) rreth ankorimit"""
+    p = np.array(placements, dtype=np.float64).reshape(-1, 7)
+    xs = (np.array([0.0, 1.0, 1.0, 0.0])[None, :] - p[:, 4:5]) * p[:, 2:3]
+    ys = (np.array([0.0, 0.0, 1.0, 1.0])[None, :] - p[:, 5:6]) * p[:, 3:4]
+    angle = np.radians(p[:, 6:7])
+    cos_a, sin_a = np.cos(angle), np.sin(angle)
+    world_x = p[:, 0:1] + xs * cos_a - ys * sin_a
+    world_y = p[:, 1:2] + xs * sin_a + ys * cos_a
+    return np.stack([world_x.min(axis=1), world_y.min(axis=1), world_x.max(axis=1), world_y.max(axis=1)],
+                    axis=1)
+
+
+class VectorDrawing:
+    """Simbolet dhe teksti i një vizatimi DXF, me indeks hapësinor për pyetje sipas zonës"""
+
+    def __init__(self, filepath, symbols, text, width, height, insunits=0):
+        self.filepath = filepath
+        self.symbols = symbols
+        self.text = text
+        self.width = width
+        self.height = height
+        self.insunits = insunits
+        self._symbol_index = None
+        self._text_index = None
+
+    @property
+    def symbol_index(self):
+        if self._symbol_index is None:
+            self._symbol_index = GridIndex.from_items(self.symbols)
+        return self._symbol_index
+
+    @property
+    def text_index(self):
+        if self._text_index is None:
+            self._text_index = GridIndex.from_items(self.text)
+        return self._text_index
+
+    def query(self, x0, y0, x1, y1):
+        """Simbolet dhe teksti brenda drejtkëndëshit (koordinatat e rezultateve)"""
+        return {
+            'symbols': [self.symbols[i] for i in self.symbol_index.query(x0, y0, x1, y1)],
+            'text': [self.text[i] for i in self.text_index.query(x0, y0, x1, y1)],
+        }
+
+
+@contextmanager
+def _gc_paused():
+    """Ndalon garbage collector-in gjatë krijimit të qindra mijëra dict-eve të vegjël
+
+    Këto objekte nuk kanë cikle, por GC i skanon sërish e sërish ndërsa rriten;
+    pa të, leximi i ENTITIES është disa herë më i shpejtë.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _first(codes, code, default=None):
+    values = codes.get(code)
+    return values[0] if values else default
+
+
+def _float(codes, code, default=0.0):
+    value = _first(codes, code)
+    try:
+        return float(value) if value is not None else default
+    except ValueError:
+        return default
+
+
+def _int(codes, code, default=0):
+    return int(_float(codes, code, default))
+
+
+# Entitetet dhe kodet që lexon skaneri; pjesa tjetër anashkalohet
+_SCANNED_ENTITIES = ('INSERT', 'ATTRIB', 'TEXT', 'MTEXT')
+_SCANNED_CODES = ('0', '1', '2', '3', '5', '8', '10', '11', '20', '21', '40', '41', '42', '50', '67',
+                  '71', '72', '73', '230')
+# Kodet shkruhen me hapësira ("  0", " 10"); format i njohur -> kodi, pa strip() për çdo rresht
+_CODE_KEYS = {variant: code for code in _SCANNED_CODES
+              for variant in (code, code.rjust(3), code.ljust(3), code.rjust(3) + ' ')}
+
+
+def scan_entities(lines, start, end):
+    """Skanon çiftet kod/vlerë të ENTITIES dhe kthen INSERT, TEXT, MTEXT si dict {kod: [vlera]}
+
+    ATTRIB-et i shtohen INSERT-it të fundit (deri te SEQEND). Entitetet e
+    paperspace (kodi 67 = 1) anashkalohen.
+    """
+    inserts, texts, mtexts = [], [], []
+    current, kind, owner = None, None, None
+
+    def finish():
+        """Ruan entitetin aktual; kthen True nëse ishte INSERT i modelspace"""
+        if current is None or _first(current, '67', '0').strip() == '1':
+            return False
+        if kind == 'INSERT':
+            current['attribs'] = []
+            inserts.append(current)
+            return True
+        if kind == 'ATTRIB':
+            if owner is not None:
+                owner['attribs'].append((_first(current, '2', ''), _first(current, '1', '')))
+        elif kind == 'TEXT':
+            texts.append(current)
+        elif kind == 'MTEXT':
+            mtexts.append(current)
+        return False
+
+    code_keys = _CODE_KEYS
+    for code, value in zip(lines[start:end:2], lines[start + 1:end:2]):
+        key = code_keys.get(code)
+        if key is None:
+            key = code_keys.get(code.strip())
+        if key == '0':
+            next_kind = value.strip()
+            if finish():
+                owner = current
+            elif next_kind != 'ATTRIB':
+                owner = None
+            kind = next_kind
+            current = {} if kind in _SCANNED_ENTITIES else None
+        elif key is not None and current is not None:
+            current.setdefault(key, []).append(value)
+    finish()
+
+    return inserts, texts, mtexts
+
+
+def _find_section(lines, name):
+    """Kthen (fillimi, fundi) e përmbajtjes së një seksioni, si indekse rreshtash"""
+    # list.index kërkon në C; kontrollohet vetëm që përputhja është vërtet "0 SECTION / 2 <emri>"
+    index = -1
+    while True:
+        try:
+            index = lines.index(name, index + 1)
+        except ValueError:
+            return None
+        if index >= 3 and index % 2 == 1 and lines[index - 1].strip() == '2' \
+                and lines[index - 2].strip() == 'SECTION' and lines[index - 3].strip() == '0':
+            break
+
+    end = index
+    while True:
+        try:
+            end = lines.index('ENDSEC', end + 1)
+        except ValueError:
+            return index + 1, len(lines)
+        if end % 2 == 1 and lines[end - 1].strip() == '0':
+            return index + 1, end - 1
+
+
+class DxfReader:
+    """Lexon modelspace të një DXF dhe e kthen në VectorDrawing"""
+
+    def __init__(self, frame_area_ratio=FRAME_AREA_RATIO):
+        self.frame_area_ratio = frame_area_ratio
+
+    def read(self, filepath):
+        """Lexon skedarin; ngre ValueError nëse DXF është i dëmtuar"""
+        import ezdxf
+
+        with _gc_paused():
+            try:
+                doc, records = self._load(filepath)
+            except (IOError, UnicodeDecodeError, ezdxf.DXFError) as e:
+                raise ValueError(f"DXF i pavlefshëm: {Path(filepath).name}: {e}")
+            inserts, texts, mtexts = records
+
+            symbols, symbol_boxes = self._read_inserts(doc, inserts)
+            text, text_boxes = self._read_text(texts, mtexts)
+
+        boxes = [b for b in (symbol_boxes, text_boxes) if len(b)]
+        if boxes:
+            all_boxes = np.concatenate(boxes)
+            min_x, min_y = all_boxes[:, 0].min(), all_boxes[:, 1].min()
+            max_x, max_y = all_boxes[:, 2].max(), all_boxes[:, 3].max()
+        else:
+            min_x = min_y = max_x = max_y = 0.0
+
+        # Kornizat dhe title block-u nuk janë simbole
+        drawing_area = max((max_x - min_x) * (max_y - min_y), 1e-9)
+        if len(symbol_boxes):
+            areas = (symbol_boxes[:, 2] - symbol_boxes[:, 0]) * (symbol_boxes[:, 3] - symbol_boxes[:, 1])
+            keep = areas <= self.frame_area_ratio * drawing_area
+            symbols = [s for s, k in zip(symbols, keep) if k]
+            symbol_boxes = symbol_boxes[keep]
+
+        self._to_page(symbols, symbol_boxes, min_x, max_y)
+        self._to_page(text, text_boxes, min_x, max_y)
+
+        return VectorDrawing(str(filepath), symbols, text,
+                             width=float(max_x - min_x), height=float(max_y - min_y),
+                             insunits=int(doc.header.get('$INSUNITS', 0)))
+
+    def _load(self, filepath):
+        """Ngarkon header + blloqet me ezdxf dhe skanon ENTITIES veçmas"""
+        import ezdxf
+        from ezdxf.filemanagement import dxf_file_info
+
+        with open(filepath, 'rb') as f:
+            binary = f.read(22).startswith(b'AutoCAD Binary DXF')
+        if binary:
+            doc = ezdxf.readfile(str(filepath))
+            return doc, self._records_from_doc(doc)
+
+        info = dxf_file_info(str(filepath))
+        with open(filepath, 'r', encoding=info.encoding, errors='replace') as f:
+            lines = f.read().splitlines()
+
+        section = _find_section(lines, 'ENTITIES')
+        if section is None:
+            # Strukturë e pazakontë: ezdxf lexon gjithçka
+            doc = ezdxf.read(io.StringIO('\n'.join(lines)))
+            return doc, self._records_from_doc(doc)
+
+        start, end = section
+        records = scan_entities(lines, start, end)
+        # ezdxf merr skedarin pa përmbajtjen e ENTITIES (vetëm header, tabela, blloqe)
+        doc = ezdxf.read(io.StringIO('\n'.join(lines[:start] + lines[end:])))
+        return doc, records
+
+    @staticmethod
+    def _records_from_doc(doc):
+        """Entitetet e modelspace të ezdxf -> të njëjtat dict si scan_entities"""
+        inserts, texts, mtexts = [], [], []
+        for entity in doc.modelspace():
+            kind = entity.dxftype()
+            if kind not in ('INSERT', 'TEXT', 'MTEXT'):
+                continue
+            record = {}
+            dxf = entity.dxf
+            record['8'] = [dxf.layer]
+            record['5'] = [dxf.handle or '']
+            if kind == 'INSERT':
+                record.update({'2': [dxf.name], '10': [dxf.insert.x], '20': [dxf.insert.y],
+                               '41': [dxf.xscale], '42': [dxf.yscale], '50': [dxf.rotation],
+                               '210': [dxf.extrusion.x], '220': [dxf.extrusion.y],
+                               '230': [dxf.extrusion.z]})
+                record['attribs'] = [(a.dxf.tag, a.dxf.text) for a in entity.attribs]
+                inserts.append(record)
+            elif kind == 'TEXT':
+                record.update({'1': [dxf.text], '10': [dxf.insert.x], '20': [dxf.insert.y],
+                               '40': [dxf.height], '41': [dxf.get('width', 1.0)], '50': [dxf.rotation],
+                               '72': [dxf.get('halign', 0)], '73': [dxf.get('valign', 0)]})
+                if dxf.hasattr('align_point'):
+                    record.update({'11': [dxf.align_point.x], '21': [dxf.align_point.y]})
+                texts.append(record)
+            else:
+                record.update({'1': [entity.text], '10': [dxf.insert.x], '20': [dxf.insert.y],
+                               '40': [dxf.char_height], '41': [dxf.get('width', 0.0)],
+                               '71': [dxf.get('attachment_point', 1)], '50': [entity.get_rotation()]})
+                mtexts.append(record)
+        return inserts, texts, mtexts
+
+    def _block_extents(self, doc, names):
+        """Kutia e çdo definicioni blloku në koordinatat e veta (minus base point)"""
+        from ezdxf import bbox
+
+        cache = bbox.Cache()
+        extents = {}
+        for name in names:
+            block = doc.blocks.get(name)
+            if block is None or block.block.is_xref:
+                continue
+            # ATTDEF janë vetëm definicione; vlerat (ATTRIB) lexohen veçmas
+            box = bbox.extents((e for e in block if e.dxftype() != 'ATTDEF'), cache=cache)
+            if not box.has_data:
+                continue
+            base = block.block.dxf.base_point
+            extents[name] = (box.extmin.x - base.x, box.extmin.y - base.y,
+                             box.extmax.x - base.x, box.extmax.y - base.y)
+        return extents
+
+    def _read_inserts(self, doc, inserts):
+        """INSERT-et -> simbole; kutitë transformohen të gjitha bashkë"""
+        inserts = [r for r in inserts if not _first(r, '2', '*').strip().startswith('*')]
+        extents = self._block_extents(doc, {_first(r, '2').strip() for r in inserts})
+        inserts = [r for r in inserts if _first(r, '2').strip() in extents]
+        if not inserts:
+            return [], np.zeros((0, 4))
+
+        names = [_first(r, '2').strip() for r in inserts]
+        local = np.array([extents[name] for name in names], dtype=np.float64)
+        params = np.array([(_float(r, '10'), _float(r, '20'), _float(r, '41', 1.0), _float(r, '42', 1.0),
+                            _float(r, '50')) for r in inserts], dtype=np.float64)
+
+        # Kulmet lokale (N, 4) -> shkallëzim, rrotullim, zhvendosje në WCS
+        corner_x = local[:, [0, 2, 2, 0]] * params[:, 2:3]
+        corner_y = local[:, [1, 1, 3, 3]] * params[:, 3:4]
+        angle = np.radians(params[:, 4:5])
+        cos_a, sin_a = np.cos(angle), np.sin(angle)
+        world_x = params[:, 0:1] + corner_x * cos_a - corner_y * sin_a
+        world_y = params[:, 1:2] + corner_x * sin_a + corner_y * cos_a
+        boxes = np.stack([world_x.min(axis=1), world_y.min(axis=1),
+                          world_x.max(axis=1), world_y.max(axis=1)], axis=1)
+
+        # Ekstruzioni (0, 0, -1) pasqyron blloqet në boshtin x (OCS -> WCS)
+        flipped = np.array([_float(r, '230', 1.0) < 0 for r in inserts])
+        if flipped.any():
+            boxes[flipped, 0], boxes[flipped, 2] = -boxes[flipped, 2], -boxes[flipped, 0].copy()
+
+        symbols = []
+        for record, name, rotation in zip(inserts, names, params[:, 4]):
+            symbol_type, symbol_name = block_symbol_type(name)
+            symbols.append({
+                'type': symbol_type,
+                'name': symbol_name,
+                'confidence': 100.0,
+                'rotation': round(float(rotation) % 360.0, 2),
+                'layer': _first(record, '8', '0').strip(),
+                'handle': _first(record, '5', '').strip(),
+                'attributes': {tag.strip(): value for tag, value in record['attribs']},
+            })
+        return symbols, boxes
+
+    def _read_text(self, texts, mtexts):
+        """TEXT/MTEXT -> elemente teksti; kutia përafrohet nga lartësia dhe numri i shkronjave"""
+        from ezdxf.tools.text import plain_mtext, plain_text
+
+        items, placements = [], []
+
+        for record in texts:
+            raw = _first(record, '1', '')
+            # plain_text vetëm kur ka kode speciale (%%c, %%d, ...)
+            content = (plain_text(raw) if '%%' in raw or '\\' in raw else raw).strip()
+            if not content:
+                continue
+            height = _float(record, '40', 1.0)
+            width = len(content) * height * CHAR_WIDTH_RATIO * _float(record, '41', 1.0)
+            halign, valign = _int(record, '72'), _int(record, '73')
+            x, y = _float(record, '10'), _float(record, '20')
+            if (halign, valign) != (0, 0) and '11' in record:
+                x, y = _float(record, '11'), _float(record, '21')
+            placements.append((x, y, width, height, _TEXT_HALIGN.get(halign, 0.0),
+                               _TEXT_VALIGN.get(valign, 0.0), _float(record, '50')))
+            items.append({'content': content, 'confidence': 100.0, 'layer': _first(record, '8', '0').strip(),
+                          'height': height})
+
+        for record in mtexts:
+            # Teksti i gjatë ndahet në copa me kodin 3 para kodit 1
+            raw = ''.join(record.get('3', [])) + _first(record, '1', '')
+            content = plain_mtext(raw).strip()
+            if not content:
+                continue
+            lines = [line.strip() for line in content.split('\n')]
+            char_height = _float(record, '40', 1.0)
+            width = _float(record, '41') or max(len(line) for line in lines) * char_height * CHAR_WIDTH_RATIO
+            height = char_height * (1 + (len(lines) - 1) * MTEXT_LINE_SPACING)
+            # attachment_point 1..9: 1 = lart majtas, 5 = qendër, 9 = poshtë djathtas
+            attachment = _int(record, '71', 1)
+            left = ((attachment - 1) % 3) / 2.0
+            below = 1.0 - ((attachment - 1) // 3) / 2.0
+            if '11' in record and '50' not in record:
+                rotation = math.degrees(math.atan2(_float(record, '21'), _float(record, '11', 1.0)))
+            else:
+                rotation = _float(record, '50')
+            placements.append((_float(record, '10'), _float(record, '20'), width, height, left, below, rotation))
+            items.append({'content': ' '.join(line for line in lines if line), 'confidence': 100.0,
+                          'layer': _first(record, '8', '0').strip(), 'height': char_height})
+
+        return items, _rotated_boxes(placements)
+
+    @staticmethod
+    def _to_page(items, boxes, min_x, max_y):
+        """Shton position/bbox në koordinatat e faqes (y poshtë, origjina lart majtas)"""
+        if not items:
+            return
+        left, top = boxes[:, 0] - min_x, max_y - boxes[:, 3]
+        width, height = boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]
+        bboxes = np.round(np.stack([left, top, width, height], axis=1), 3).tolist()
+        positions = np.round(np.stack([left + width / 2, top + height / 2], axis=1), 3).tolist()
+        for item, bbox, position in zip(items, bboxes, positions):
+            item['bbox'] = bbox
+            item['position'] = position
+
+
+def read_dxf(filepath):
+    """Lexon një DXF dhe kthen VectorDrawing"""
+    return DxfReader().read(filepath)
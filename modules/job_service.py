@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Job Service
+Shërbim lokal HTTP me radhë punësh për shumë klientë
+
+Një server i vetëm ngarkon procesorët (modelet, OCR) një herë dhe i ndan mes
+worker thread-eve, në vend që çdo instancë Tk të ngarkojë të vetët. Punët
+ruhen në SQLite (tabela jobs e DatabaseManager), kështu që radha mbijeton
+rinisjen e shërbimit. Anulimi i një pune në ekzekutim kalon te pipeline-i me
+CancelToken dhe e ndal në hapin e ardhshëm. Skedarët e ngarkuar fshihen kur
+puna e tyre përfundon, anulohet ose pastrohet nga baza.
+
+Worker-at janë thread-e mbi të njëjtët procesorë: OpenCV, numpy dhe OCR e
+lirojnë GIL-in në thirrjet e rënda, por pjesët në Python (kandidatët e
+simboleve, bashkimi i vijave, BOM) ekzekutohen një nga një. -j rrit kështu
+numrin e punëve njëkohësisht, jo CPU-të që përdor analiza: për punë të rënda
+CPU, batch_processor (procese) shkallëzohet më mirë.
+
+Një `file` në trupin e POST /jobs është rrugë në diskun e serverit. Kur
+serveri dëgjon në një adresë jo-lokale këto rrugë pranohen vetëm brenda
+--file-root; pa të klientët mund të dërgojnë vetëm skedarë (?filename=).
+
+API (JSON):
+    POST   /jobs                  {"file": "...", "options": {...}, "priority": 0, "client": "..."}
+    POST   /jobs?filename=a.pdf   trupi = përmbajtja e skedarit (klientë në makina të tjera)
+    GET    /jobs                  ?status=queued&client=...&limit=50
+    GET    /jobs/<id>             gjendja dhe progresi
+    GET    /jobs/<id>/result      analysis_results (409 kur puna nuk ka përfunduar)
+    DELETE /jobs/<id>             anulim (ose POST /jobs/<id>/cancel)
+    GET    /health
+
+Përdorimi:
+    python -m modules.job_service --db technical_analyzer.db --port 8765 -j 4
+"""
+
+import argparse
+import ipaddress
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from modules.database_manager import (DEFAULT_DB_PATH, JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_QUEUED,
+                                      JOB_RUNNING, DatabaseManager)
+from modules.pipeline import (AnalysisPipeline, DEFAULT_OPTIONS, SUPPORTED_EXTENSIONS, json_default,
+                              load_processors)
+from modules.stage_graph import AnalysisCancelled, CancelToken
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Madhësia maksimale e një skedari të ngarkuar përmes API-së
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+
+# Sa shpesh (s) shkruhet progresi i një pune në bazë
+PROGRESS_INTERVAL = 0.5
+
+
+def is_local_host(host):
+    """True kur serveri dëgjon vetëm në këtë makinë (loopback)"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def default_workers():
+    """Worker-at sipas host-it: një për CPU, të paktën një"""
+    return max(1, os.cpu_count() or 1)
+
+
+class JobService:
+    """Radha e punëve + worker thread-et që ndajnë të njëjtët procesorë"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, workers=None, upload_dir=None, processors=None,
+                 warm_up=True, ocr_engines=None, file_root=None, allow_paths=True):
+        self.db = DatabaseManager(db_path)
+        self.workers = max(1, workers or default_workers())
+        # Motorët OCR të përbashkët; me më pak motorë se worker-a, OCR-ja e punëve pret me radhë
+        self.ocr_engines = max(1, ocr_engines or self.workers)
+        self.upload_dir = upload_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)), 'job_uploads')
+        self.processors = processors
+        self.warm_up = warm_up
+        # Rrugët e klientëve pranohen vetëm brenda file_root (nëse është dhënë);
+        # me allow_paths=False dhe pa file_root pranohen vetëm skedarë të ngarkuar
+        self.file_root = os.path.realpath(file_root) if file_root else None
+        self.allow_paths = allow_paths or self.file_root is not None
+        self.started_at = None
+        self._threads = []
+        self._stopping = threading.Event()
+        self._wakeup = threading.Condition()
+        # CancelToken i çdo pune në ekzekutim në këtë proces
+        self._tokens = {}
+        self._running = {}
+
+    def start(self):
+        """Rikthen punët e ndërprera, ngarkon procesorët një herë dhe nis worker-at"""
+        self.db.initialize_database()
+        requeued = self.db.recover_jobs()
+        if requeued:
+            print(f"{requeued} punë të ndërprera u kthyen në radhë")
+        self.purge_uploads()
+
+        if self.processors is None:
+            self.processors = load_processors()
+        recognizer = self.processors[1]
+        if hasattr(recognizer, 'ocr_workers'):
+            recognizer.ocr_workers = max(recognizer.ocr_workers, self.ocr_engines)
+        if self.warm_up and hasattr(recognizer, 'warm_up'):
+            try:
+                recognizer.warm_up()
+            except Exception as e:
+                print(f"OCR warm-up error: {e}")
+
+        self.started_at = time.time()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, args=(f"worker-{index + 1}",),
+                                      name=f"job-worker-{index + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """Ndalon worker-at pasi të mbarojnë punët aktuale"""
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # Radha
+
+    def submit(self, filepath, options=None, client=None, priority=0):
+        """Shton në radhë një skedar në diskun e serverit; kthen gjendjen e punës"""
+        return self._enqueue(self.check_path(filepath), options, client, priority)
+
+    def check_path(self, filepath):
+        """Rruga që do të analizohet; PermissionError kur klienti nuk e ka leje këtë rrugë të serverit"""
+        if not self.allow_paths:
+            raise PermissionError("Shërbimi pranon vetëm skedarë të ngarkuar (POST /jobs?filename=...)")
+        if self.file_root is None or not filepath:
+            return filepath
+        # Rruga reale ruhet në radhë, që një symlink i ndryshuar më vonë të mos dalë jashtë dosjes
+        path = os.path.realpath(filepath)
+        if os.path.commonpath([self.file_root, path]) != self.file_root:
+            raise PermissionError(f"Skedari është jashtë dosjes së lejuar: {self.file_root}")
+        return path
+
+    def _enqueue(self, filepath, options=None, client=None, priority=0):
+        if not filepath or not os.path.isfile(filepath):
+            raise ValueError(f"Skedari nuk ekziston: {filepath}")
+        if os.path.splitext(filepath)[1].lower() not in SUPPORTED_EXTENSIONS:
+            raise ValueError(f"Format i pambështetur: {filepath}")
+        options = options or {}
+        unknown = sorted(set(options) - set(DEFAULT_OPTIONS))
+        if unknown:
+            raise ValueError(f"Opsione të panjohura: {', '.join(unknown)}")
+
+        job_id = self.db.submit_job(os.path.abspath(filepath), options, client=client, priority=priority)
+        with self._wakeup:
+            self._wakeup.notify()
+        return self.db.get_job(job_id)
+
+    def submit_upload(self, filename, data, options=None, client=None, priority=0):
+        """Ruan skedarin e dërguar nga klienti në upload_dir dhe e shton në radhë"""
+        name = os.path.basename(filename or '')
+        if not name:
+            raise ValueError("Mungon emri i skedarit (?filename=...)")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        path = os.path.join(self.upload_dir, f"{uuid.uuid4().hex[:12]}_{name}")
+        with open(path, 'wb') as f:
+            f.write(data)
+        try:
+            return self._enqueue(path, options, client=client, priority=priority)
+        except ValueError:
+            os.remove(path)
+            raise
+
+    def cancel(self, job_id):
+        """Anulon punën; ajo që po ekzekutohet ndalon në raportin e ardhshëm të progresit"""
+        status = self.db.cancel_job(job_id)
+        token = self._tokens.get(job_id)
+        if status == JOB_RUNNING and token is not None:
+            token.cancel(f"Puna {job_id} u anulua")
+        elif status == JOB_CANCELLED:
+            # Puna në radhë nuk do të ekzekutohet më
+            job = self.db.get_job(job_id)
+            if job:
+                self._remove_upload(job['file'])
+        return status
+
+    def _is_upload(self, path):
+        """True nëse skedari është ngarkuar përmes API-së (jo një skedar i klientit në disk)"""
+        upload_dir = os.path.abspath(self.upload_dir)
+        return os.path.dirname(os.path.abspath(path)) == upload_dir
+
+    def _remove_upload(self, path):
+        """Fshin skedarin e ngarkuar të një pune që ka përfunduar"""
+        if not path or not self._is_upload(path):
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Upload cleanup error: {e}")
+
+    def purge_uploads(self):
+        """Fshin ngarkimet pa punë në radhë/ekzekutim (punët e përfunduara ose të pastruara); kthen numrin"""
+        if not os.path.isdir(self.upload_dir):
+            return 0
+        active = {os.path.abspath(path) for path in self.db.active_job_files()}
+        removed = 0
+        for entry in os.scandir(self.upload_dir):
+            if entry.is_file() and os.path.abspath(entry.path) not in active:
+                self._remove_upload(entry.path)
+                removed += 1
+        return removed
+
+    def health(self):
+        """Gjendja e shërbimit për /health"""
+        return {
+            'status': 'ok',
+            'workers': self.workers,
+            'running': sorted(self._running.values()),
+            'jobs': self.db.job_counts(),
+            'uptime_seconds': round(time.time() - self.started_at, 1) if self.started_at else 0.0,
+        }
+
+    # Worker-at
+
+    def _worker_loop(self, name):
+        while not self._stopping.is_set():
+            try:
+                job = self.db.claim_job(name)
+            except Exception as e:
+                print(f"Job claim error: {e}")
+                job = None
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(1.0)
+                continue
+            self._run_job(job, name)
+        self.db.close()
+
+    def _run_job(self, job, worker):
+        job_id = job['id']
+        token = self._tokens[job_id] = CancelToken()
+        self._running[job_id] = job['file']
+        last_write = [0.0]
+
+        def on_progress(message, progress):
+            now = time.monotonic()
+            if now - last_write[0] >= PROGRESS_INTERVAL:
+                last_write[0] = now
+                # Anulimi mund të vijë edhe nga një proces tjetër mbi të njëjtën bazë
+                if self.db.update_job_progress(job_id, progress, message):
+                    token.cancel()
+
+        try:
+            # Një pipeline për punë (profiler-i i vet); procesorët janë të përbashkët
+            pipeline = AnalysisPipeline(*self.processors, cache=self.db, result_store=self.db, page_workers=1)
+            results = pipeline.analyze(job['file'], job['options'], status_callback=on_progress,
+                                       cancel_token=token)
+            token.raise_if_cancelled()
+            self.db.finish_job(job_id, JOB_DONE, result=results)
+        except AnalysisCancelled:
+            self.db.finish_job(job_id, JOB_CANCELLED)
+        except Exception as e:
+            print(f"Job {job_id} error: {e}")
+            self.db.finish_job(job_id, JOB_FAILED, error=str(e))
+        finally:
+            self._running.pop(job_id, None)
+            self._tokens.pop(job_id, None)
+            # Rezultati është në bazë; skedari i ngarkuar nuk duhet më
+            self._remove_upload(job['file'])
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """Rrugët e API-së; shërbimi merret nga self.server.service"""
+
+    server_version = 'TechnicalDrawingAnalyzer/1.0'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if getattr(self.server, 'verbose', False):
+            super().log_message(format, *args)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, {'error': message})
+
+    def _route(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        return parts, query
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_UPLOAD_BYTES:
+            raise ValueError(f"Skedari është më i madh se {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+        return self.rfile.read(length) if length else b''
+
+    def do_GET(self):
+        parts, query = self._route()
+        if parts == ['health']:
+            return self._send(200, self.service.health())
+        if parts == ['jobs']:
+            try:
+                limit = int(query.get('limit', 100))
+            except ValueError:
+                return self._error(400, f"limit duhet të jetë numër i plotë: {query['limit']}")
+            if limit < 1:
+                return self._error(400, "limit duhet të jetë të paktën 1")
+            return self._send(200, self.service.db.list_jobs(status=query.get('status'), client=query.get('client'),
+                                                             limit=limit))
+        if len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = self.service.db.get_job(parts[1])
+            if job is None:
+                return self._error(404, "Puna nuk ekziston")
+            if len(parts) == 2:
+                return self._send(200, job)
+            if parts[2] == 'result':
+                if job['status'] != JOB_DONE:
+                    return self._send(409, {'error': "Puna nuk ka përfunduar", 'status': job['status']})
+                return self._send(200, self.service.db.get_job_result(parts[1]))
+        self._error(404, "Rruga nuk ekziston")
+
+    def do_POST(self):
+        parts, query = self._route()
+        try:
+            if parts == ['jobs']:
+                body = self._read_body()
+                options = json.loads(query['options']) if 'options' in query else None
+                priority = int(query.get('priority', 0))
+                if 'filename' in query:
+                    job = self.service.submit_upload(query['filename'], body, options, client=query.get('client'),
+                                                     priority=priority)
+                else:
+                    request = json.loads(body.decode('utf-8') or '{}')
+                    job = self.service.submit(request.get('file'), request.get('options'),
+                                              client=request.get('client'), priority=int(request.get('priority', 0)))
+                return self._send(202, job)
+            if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+                return self._cancel(parts[1])
+        except PermissionError as e:
+            return self._error(403, str(e))
+        except (ValueError, KeyError) as e:
+            return self._error(400, str(e))
+        self._error(404, "Rruga nuk ekziston")
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if len(parts) == 2 and parts[0] == 'jobs':
+            return self._cancel(parts[1])
+        self._error(404, "Rruga nuk ekziston")
+
+    def _cancel(self, job_id):
+        status = self.service.cancel(job_id)
+        if status is None:
+            return self._error(404, "Puna nuk ekziston")
+        self._send(200, {'id': job_id, 'status': status,
+                         'cancel_requested': status not in (JOB_DONE, JOB_FAILED, JOB_CANCELLED)})
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False):
+    """Serveri HTTP (një thread për kërkesë) mbi një JobService të nisur"""
+    server = ThreadingHTTPServer((host, port), JobRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+class JobClient:
+    """Klient i thjeshtë i API-së (urllib, pa varësi të jashtme)"""
+
+    def __init__(self, base_url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", client=None, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.client = client
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None, data=None):
+        from urllib.error import HTTPError
+        from urllib.request import Request, urlopen
+
+        headers = {}
+        if payload is not None:
+            data = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            headers['Content-Type'] = 'application/octet-stream'
+        request = Request(f"{self.base_url}{path}", data=data, method=method, headers=headers)
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except HTTPError as e:
+            detail = json.loads(e.read().decode('utf-8') or '{}').get('error', e.reason)
+            raise RuntimeError(f"HTTP {e.code}: {detail}") from None
+
+    def submit(self, filepath, options=None, priority=0, upload=False):
+        """Dorëzon një skedar; me upload=True dërgohet përmbajtja (serveri në makinë tjetër)"""
+        if upload:
+            from urllib.parse import urlencode
+
+            query = {'filename': os.path.basename(filepath), 'priority': priority}
+            if options:
+                query['options'] = json.dumps(options)
+            if self.client:
+                query['client'] = self.client
+            with open(filepath, 'rb') as f:
+                return self._request('POST', f"/jobs?{urlencode(query)}", data=f.read())
+        return self._request('POST', '/jobs', {'file': os.path.abspath(filepath), 'options': options,
+                                               'client': self.client, 'priority': priority})
+
+    def status(self, job_id):
+        return self._request('GET', f"/jobs/{job_id}")
+
+    def result(self, job_id):
+        return self._request('GET', f"/jobs/{job_id}/result")
+
+    def cancel(self, job_id):
+        return self._request('DELETE', f"/jobs/{job_id}")
+
+    def wait(self, job_id, poll=0.5, timeout=None):
+        """Pret derisa puna të përfundojë; kthen gjendjen përfundimtare"""
+        started = time.monotonic()
+        while True:
+            job = self.status(job_id)
+            if job['status'] not in (JOB_QUEUED, JOB_RUNNING):
+                return job
+            if timeout is not None and time.monotonic() - started > timeout:
+                raise TimeoutError(f"Puna {job_id} nuk përfundoi brenda {timeout}s")
+            time.sleep(poll)
+
+
+def main(argv=None):
+    """Pika hyrëse e shërbimit"""
+    parser = argparse.ArgumentParser(description="Technical Drawing Analyzer - shërbim lokal me radhë punësh")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Baza SQLite (punët, cache-i, rezultatet)")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="Adresa (127.0.0.1 = vetëm kjo makinë)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('-j', '--workers', type=int, default=default_workers(),
+                        help="Punë njëkohësisht (thread-e; pjesët Python ndajnë GIL-in)")
+    parser.add_argument('--file-root',
+                        help="Dosja ku lejohen rrugët 'file' të klientëve (e detyrueshme për t'i pranuar "
+                             "kur --host nuk është lokal)")
+    parser.add_argument('--upload-dir', help="Dosja e skedarëve të ngarkuar përmes API-së")
+    parser.add_argument('--ocr-engines', type=int,
+                        help="Motorë OCR të përbashkët (parazgjedhje: një për worker; "
+                             "secili mban modelet në memorie)")
+    parser.add_argument('--no-warm-up', action='store_true', help="Mos ngarko OCR para punës së parë")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Shfaq çdo kërkesë HTTP")
+    args = parser.parse_args(argv)
+
+    allow_paths = is_local_host(args.host)
+    if not allow_paths and not args.file_root:
+        print(f"{args.host} nuk është adresë lokale: pranohen vetëm skedarë të ngarkuar (shih --file-root)")
+    service = JobService(args.db, workers=args.workers, upload_dir=args.upload_dir,
+                         warm_up=not args.no_warm_up, ocr_engines=args.ocr_engines, file_root=args.file_root,
+                         allow_paths=allow_paths).start()
+    server = create_server(service, args.host, args.port, verbose=args.verbose)
+    print(f"Shërbimi në http://{args.host}:{server.server_port} me {service.workers} workers (Ctrl+C për ndalim)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop(timeout=5)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
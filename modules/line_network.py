@@ -0,0 +1,282 @@
+"""
+Line Network
+Rrjeti i tubave: segmentet e vijave, bashkimi i tyre dhe lidhjet me simbolet
+
+Segmentet gjenden me HoughLinesP mbi hartën e bojës dhe bashkohen në mënyrë
+të vektorizuar: grupohen sipas këndit dhe distancës nga origjina (ρ), dhe
+intervalet që mbivendosen përgjatë drejtimit bashkohen me një renditje dhe
+një maksimum kumulativ, pa cikël Python për segment. Lidhjet (fundi i një
+segmenti te trupi i një tjetri, fundi te kutia e simbolit) gjenden me
+GridIndex dhe komponentët dalin nga një union-find me numpy. Çdo komponent
+është një linjë tubi me gjatësinë e vet në pixel.
+"""
+
+import math
+
+import cv2
+import numpy as np
+
+from modules.spatial_index import GridIndex, boxes_from_items
+
+# Parametrat e HoughLinesP (pixel); vijat më të shkurtra janë tekst ose pjesë simbolesh
+DEFAULT_MIN_LENGTH = 24
+DEFAULT_MAX_GAP = 3
+HOUGH_THRESHOLD = 30
+
+# Dy segmente janë në të njëjtën vijë kur këndi ndryshon më pak se kaq...
+ANGLE_TOLERANCE = math.radians(2.0)
+# ...distanca mes tyre është sa trashësia e vijës (HoughLinesP jep disa për vijat e trasha)...
+OFFSET_TOLERANCE = 2.5
+# ...dhe boshllëku përgjatë vijës nuk e kalon këtë
+MERGE_GAP = 6.0
+# Sa koshe këndi larg mund të kalojë një segment i shkurtër (shih _merge_pass)
+SNAP_BINS = 4
+
+# Fundi i segmentit lidhet me një segment tjetër (T) ose me simbolin brenda kësaj distance
+JOIN_DISTANCE = 6.0
+SYMBOL_MARGIN = 6.0
+
+
+def _gray(image):
+    if image.ndim == 3:
+        return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    return image
+
+
+def detect_segments(image, symbols=(), min_length=DEFAULT_MIN_LENGTH, max_gap=DEFAULT_MAX_GAP,
+                    threshold=HOUGH_THRESHOLD):
+    """Segmentet e vijave (N, 4) [x0, y0, x1, y1] nga HoughLinesP mbi hartën e bojës
+
+    Kutitë e simboleve fshihen nga harta para kërkimit: vijat e simbolit nuk
+    janë tuba, dhe pa to HoughLinesP nuk gjen vija të pjerrëta që kalojnë
+    nëpër disa simbole në rresht.
+    """
+    from modules.symbol_index import ink_map
+
+    binary = ink_map(_gray(image))
+    for x0, y0, x1, y1 in boxes_from_items(list(symbols)):
+        binary[max(int(y0), 0):max(int(math.ceil(y1)) + 1, 0), max(int(x0), 0):max(int(math.ceil(x1)) + 1, 0)] = 0
+    lines = cv2.HoughLinesP(binary, 1, np.pi / 180, threshold, minLineLength=min_length, maxLineGap=max_gap)
+    if lines is None:
+        return np.zeros((0, 4), dtype=np.float32)
+    return lines.reshape(-1, 4).astype(np.float32)
+
+
+def segment_lengths(segments):
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    return np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+
+
+def point_segment_distances(xs, ys, segments):
+    """Distanca nga pika i te segmenti i (vektorët kanë të njëjtën gjatësi)"""
+    x0, y0, x1, y1 = segments[:, 0], segments[:, 1], segments[:, 2], segments[:, 3]
+    dx, dy = x1 - x0, y1 - y0
+    squared = dx * dx + dy * dy
+    t = np.clip(((xs - x0) * dx + (ys - y0) * dy) / np.maximum(squared, 1e-12), 0.0, 1.0)
+    return np.hypot(xs - (x0 + t * dx), ys - (y0 + t * dy))
+
+
+def segment_index(segments):
+    """GridIndex mbi kutitë e segmenteve"""
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    return GridIndex(np.column_stack([np.minimum(segments[:, 0], segments[:, 2]),
+                                      np.minimum(segments[:, 1], segments[:, 3]),
+                                      np.maximum(segments[:, 0], segments[:, 2]),
+                                      np.maximum(segments[:, 1], segments[:, 3])]))
+
+
+def segments_near(segments, xs, ys, radii, index=None):
+    """Çiftet (pika, segmenti, distanca) me distancë të saktë deri te segmenti <= rrezja
+
+    Renditja është sipas pikës dhe pastaj sipas distancës, si te GridIndex.within_many.
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+    radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), xs.shape)
+    index = index if index is not None else segment_index(segments)
+    points, items, _ = index.within_many(xs, ys, radii)
+    dist = point_segment_distances(xs[points], ys[points], segments[items])
+    near = dist <= radii[points]
+    points, items, dist = points[near], items[near], dist[near]
+    order = np.lexsort((items, dist, points))
+    return points[order], items[order], dist[order]
+
+
+def _chain(values, tolerance, breaks):
+    """Grupet e vlerave të renditura: grup i ri kur hapi > tolerance ose te breaks"""
+    start = np.ones(values.size, dtype=bool)
+    start[1:] = (np.diff(values) > tolerance) | breaks
+    return np.cumsum(start) - 1
+
+
+def _merge_pass(segments, angle_tolerance, offset_tolerance, gap, shift):
+    """Një kalim bashkimi, me koshat e këndit të zhvendosur me shift (0 ose 0.5 kosh)"""
+    x0, y0, x1, y1 = segments.T
+    lengths = np.maximum(segment_lengths(segments), 1e-6)
+    bins = max(1, int(round(np.pi / angle_tolerance)))
+    width = np.pi / bins
+    theta = np.arctan2(y1 - y0, x1 - x0) % np.pi
+    angle_bin = np.floor(theta / width + shift).astype(np.int64) % bins
+
+    # Segmentet e shkurtra përgjatë trashësisë së vijës kanë kënd të pasaktë (2 pixel në 30
+    # japin 4°): kalojnë te koshi më i rëndë (sipas gjatësisë) kur skajet devijojnë nga vija
+    # përmes mesit të tyre jo më shumë se offset_tolerance
+    weight = np.bincount(angle_bin, lengths, minlength=bins)
+    best_bin, best_weight = angle_bin, weight[angle_bin]
+    for step in range(-SNAP_BINS, SNAP_BINS + 1):
+        if not step:
+            continue
+        candidate = (angle_bin + step) % bins
+        delta = (theta - (candidate - shift + 0.5) * width + np.pi / 2) % np.pi - np.pi / 2
+        better = (lengths / 2 * np.abs(np.sin(delta)) <= offset_tolerance) & (weight[candidate] > best_weight)
+        best_bin, best_weight = np.where(better, candidate, best_bin), np.where(better, weight[candidate], best_weight)
+    angle_bin = best_bin
+
+    # Drejtimi i koshit është i njëjtë për të gjithë anëtarët, edhe për θ afër 0 dhe afër π
+    center = (angle_bin - shift + 0.5) * width
+    cos, sin = np.cos(center), np.sin(center)
+    rho = ((y0 + y1) * cos - (x0 + x1) * sin) / 2
+    ta, tb = x0 * cos + y0 * sin, x1 * cos + y1 * sin
+    t0, t1 = np.minimum(ta, tb), np.maximum(ta, tb)
+
+    # Vijat paralele brenda offset_tolerance në të njëjtin kosh janë e njëjta vijë
+    line = np.empty(len(segments), dtype=np.int64)
+    order = np.lexsort((rho, angle_bin))
+    line[order] = _chain(rho[order], offset_tolerance, np.diff(angle_bin[order]) != 0)
+
+    # Brenda çdo vije intervalet [t0, t1] renditen sipas t0; një interval nis grup të ri
+    # kur fillon pas maksimumit kumulativ të t1 (+ gap). Baza line * span i mban vijat të ndara.
+    order = np.lexsort((t0, line))
+    line, t0, t1 = line[order], t0[order], t1[order]
+    span = float(t1.max() - t0.min()) + gap + 1.0
+    base = line * span - t0.min()
+    reach = np.maximum.accumulate(t1 + base)
+    start = np.ones(len(order), dtype=bool)
+    start[1:] = (line[1:] != line[:-1]) | (t0[1:] + base[1:] > reach[:-1] + gap)
+    run = np.cumsum(start) - 1
+    firsts = np.flatnonzero(start)
+
+    # Drejtimi dhe ρ i çdo grupi: mesatare sipas gjatësisë, jo qendra e koshit
+    weights = lengths[order]
+    total = np.add.reduceat(weights, firsts)
+    delta = (theta[order] - center[order] + np.pi / 2) % np.pi - np.pi / 2
+    phi = center[order][firsts] + np.add.reduceat(delta * weights, firsts) / total
+    cos, sin = np.cos(phi), np.sin(phi)
+    x0, y0, x1, y1 = x0[order], y0[order], x1[order], y1[order]
+    ta = x0 * cos[run] + y0 * sin[run]
+    tb = x1 * cos[run] + y1 * sin[run]
+    low = np.minimum.reduceat(np.minimum(ta, tb), firsts)
+    high = np.maximum.reduceat(np.maximum(ta, tb), firsts)
+    rho = np.add.reduceat(((y0 + y1) * cos[run] - (x0 + x1) * sin[run]) / 2 * weights, firsts) / total
+    return np.column_stack([low * cos - rho * sin, low * sin + rho * cos,
+                            high * cos - rho * sin, high * sin + rho * cos])
+
+
+def merge_segments(segments, angle_tolerance=ANGLE_TOLERANCE, offset_tolerance=OFFSET_TOLERANCE, gap=MERGE_GAP):
+    """Bashkon segmentet kolineare që mbivendosen ose ndahen nga boshllëqe të vegjël
+
+    Kalimi i dytë me koshat e këndit të zhvendosur bashkon segmentet që ranë
+    në dy anët e kufirit të një koshi.
+    """
+    merged = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    for shift in (0.0, 0.5):
+        if len(merged) < 2:
+            break
+        merged = _merge_pass(merged, angle_tolerance, offset_tolerance, gap, shift)
+    return merged
+
+
+def connected_components(count, a, b):
+    """Union-find me numpy: etiketa e komponentit (0..k-1) për çdo nyje, nga brinjët (a, b)
+
+    Në çdo raund rrënja më e madhe e çdo brinje varet te më e vogla
+    (np.minimum.at), pastaj shtigjet shkurtohen me pointer jumping.
+    """
+    parent = np.arange(count, dtype=np.int64)
+    a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+    while a.size:
+        root_a, root_b = parent[a], parent[b]
+        pending = root_a != root_b
+        if not pending.any():
+            break
+        a, b, root_a, root_b = a[pending], b[pending], root_a[pending], root_b[pending]
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+    return np.unique(parent, return_inverse=True)[1]
+
+
+def build_runs(segments, symbols=(), join_distance=JOIN_DISTANCE, symbol_margin=SYMBOL_MARGIN,
+               require_symbols=True):
+    """Linjat e tubave: komponentët e segmenteve të lidhura, me simbolet në skajet e tyre
+
+    Segmentet me të dy skajet brenda kutisë së një simboli janë vizatimi i
+    simbolit dhe hiqen. Me require_symbols mbahen vetëm linjat që prekin të
+    paktën një simbol (kornizat, tabelat dhe vijat e kuotave nuk janë tuba).
+    Kthen [{'length', 'bbox', 'segments', 'symbols'}], gjatësia në pixel.
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    symbol_boxes = boxes_from_items(list(symbols))
+    attached_segments, attached_symbols = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    if len(segments) and len(symbol_boxes):
+        count = len(segments)
+        xs = np.concatenate([segments[:, 0], segments[:, 2]])
+        ys = np.concatenate([segments[:, 1], segments[:, 3]])
+        points, owners, _ = GridIndex(symbol_boxes + [-symbol_margin, -symbol_margin, symbol_margin,
+                                                      symbol_margin]).within_many(xs, ys, 0.0)
+        pairs = (points % count) * len(symbol_boxes) + owners
+        inside = np.intersect1d(pairs[points < count], pairs[points >= count]) // len(symbol_boxes)
+        keep = np.ones(count, dtype=bool)
+        keep[inside] = False
+        renumber = np.cumsum(keep) - 1
+        attached = keep[points % count]
+        attached_segments, attached_symbols = renumber[points[attached] % count], owners[attached]
+        segments = segments[keep]
+
+        # Simbolet e vizatuara mbi një vijë të pandërprerë (vija kalon nga qendra)
+        if len(segments):
+            radii = np.minimum(symbol_boxes[:, 2] - symbol_boxes[:, 0], symbol_boxes[:, 3] - symbol_boxes[:, 1]) / 2
+            through_symbols, through_segments, _ = segments_near(
+                segments, (symbol_boxes[:, 0] + symbol_boxes[:, 2]) / 2,
+                (symbol_boxes[:, 1] + symbol_boxes[:, 3]) / 2, radii)
+            attached_segments = np.concatenate([attached_segments, through_segments])
+            attached_symbols = np.concatenate([attached_symbols, through_symbols])
+
+    count = len(segments)
+    if not count:
+        return []
+
+    # Lidhjet T dhe L: një skaj brenda join_distance nga trupi i një segmenti tjetër
+    points, others, _ = segments_near(segments, np.concatenate([segments[:, 0], segments[:, 2]]),
+                                      np.concatenate([segments[:, 1], segments[:, 3]]), join_distance)
+    owners = points % count
+    joined = owners != others
+    labels = connected_components(count, owners[joined], others[joined])
+
+    run_symbols = {}
+    for run, symbol in set(zip(labels[attached_segments].tolist(), attached_symbols.tolist())):
+        run_symbols.setdefault(run, []).append(symbol)
+
+    lengths = segment_lengths(segments)
+    order = np.argsort(labels, kind='stable')
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    runs = []
+    for run, members in enumerate(np.split(order, bounds)):
+        if require_symbols and run not in run_symbols:
+            continue
+        run_segments = segments[members]
+        x0 = float(min(run_segments[:, 0].min(), run_segments[:, 2].min()))
+        y0 = float(min(run_segments[:, 1].min(), run_segments[:, 3].min()))
+        x1 = float(max(run_segments[:, 0].max(), run_segments[:, 2].max()))
+        y1 = float(max(run_segments[:, 1].max(), run_segments[:, 3].max()))
+        runs.append({
+            'length': round(float(lengths[members].sum()), 1),
+            'bbox': [x0, y0, x1 - x0, y1 - y0],
+            'segments': np.round(run_segments, 1).tolist(),
+            'symbols': sorted(run_symbols.get(run, [])),
+        })
+    return runs
@@ -0,0 +1,218 @@
+"""
+OCR Engine Pool
+Motorë OCR të ngarkuar një herë dhe të ndarë mes dokumenteve
+
+Një easyocr.Reader kërkon disa sekonda për t'u ngarkuar, prandaj motorët
+krijohen me vonesë (në përdorimin e parë) dhe mbahen për gjithë jetën e
+procesit. Çdo proces worker i batch-it ka pool-in e vet. Brenda një procesi
+pool-i mban deri në `size` motorë: thread-et që e kalojnë këtë numër presin
+motorin e lirë. Çdo motor mban modelet e veta në memorie, ndaj shërbimi i
+punëve e cakton size sipas numrit të worker-ave (`--ocr-engines`).
+"""
+
+import importlib.util
+import shutil
+import sys
+import threading
+from contextlib import contextmanager
+from queue import Queue
+
+import numpy as np
+
+# Gjuhët e SettingsWindow -> kodet e secilit motor
+LANGUAGES = {
+    'eng': {'tesseract': 'eng', 'easyocr': ['en']},
+    'alb': {'tesseract': 'sqi', 'easyocr': ['sq']},
+    'eng+alb': {'tesseract': 'eng+sqi', 'easyocr': ['en', 'sq']},
+}
+DEFAULT_LANGUAGE = 'eng'
+
+# Sa rajone teksti i dërgohen motorit në një thirrje
+DEFAULT_BATCH_SIZE = 32
+
+# Hapësira (pixel) mes rajoneve kur bashkohen në një imazh për tesseract
+MONTAGE_GAP = 16
+
+
+class OcrUnavailable(RuntimeError):
+    """Asnjë motor OCR nuk mund të ngarkohet (paketa ose binari mungon)"""
+
+
+def _tesseract_cmd():
+    """Komanda e tesseract: ajo e konfiguruar në pytesseract (nëse është importuar), ose 'tesseract' në PATH"""
+    module = sys.modules.get('pytesseract.pytesseract')
+    return getattr(module, 'tesseract_cmd', None) or 'tesseract'
+
+
+def backend_ready(backend):
+    """A është motori i instaluar: paketa Python dhe, për tesseract, edhe binari"""
+    if backend == 'easyocr':
+        return importlib.util.find_spec('easyocr') is not None
+    if backend == 'tesseract':
+        # pytesseract instalohet shpesh pa binarin; pa të çdo thirrje dështon
+        return importlib.util.find_spec('pytesseract') is not None and shutil.which(_tesseract_cmd()) is not None
+    return False
+
+
+def available_backends():
+    """Motorët OCR të instaluar, sipas preferencës (pa i importuar)"""
+    return [backend for backend in ('easyocr', 'tesseract') if backend_ready(backend)]
+
+
+class EasyOcrEngine:
+    """easyocr: njohje e grupuar e shumë rajoneve me një thirrje recognize()"""
+
+    name = 'easyocr'
+
+    def __init__(self, language=DEFAULT_LANGUAGE, gpu=False):
+        import easyocr
+
+        self.language = language
+        self.reader = easyocr.Reader(LANGUAGES[language]['easyocr'], gpu=gpu, verbose=False)
+
+    def recognize_batch(self, image, boxes, batch_size=DEFAULT_BATCH_SIZE):
+        """Njeh tekstin në kutitë [x, y, w, h] të imazhit; kthen (text, confidence 0-100)"""
+        if not boxes:
+            return []
+
+        # easyocr pret kutitë si [x_min, x_max, y_min, y_max]
+        horizontal = [[int(x), int(x + w), int(y), int(y + h)] for x, y, w, h in boxes]
+        results = [('', 0.0)] * len(boxes)
+
+        for start in range(0, len(horizontal), batch_size):
+            chunk = horizontal[start:start + batch_size]
+            recognized = self.reader.recognize(image, horizontal_list=chunk, free_list=[],
+                                               batch_size=batch_size, detail=1)
+            # recognize() kthen rezultatet me të njëjtën radhë si kutitë
+            for offset, (_, text, confidence) in enumerate(recognized[:len(chunk)]):
+                results[start + offset] = (text.strip(), float(confidence) * 100.0)
+
+        return results
+
+
+class TesseractEngine:
+    """tesseract: rajonet bashkohen në një imazh të vetëm dhe njihen me një thirrje"""
+
+    name = 'tesseract'
+
+    def __init__(self, language=DEFAULT_LANGUAGE):
+        import pytesseract
+
+        self.language = language
+        self.pytesseract = pytesseract
+        self.lang_code = LANGUAGES[language]['tesseract']
+        # Kontrollon që binari ekziston, që gabimi të dalë këtu e jo në mes të analizës
+        pytesseract.get_tesseract_version()
+
+    def recognize_batch(self, image, boxes, batch_size=DEFAULT_BATCH_SIZE):
+        """Njeh tekstin në kutitë [x, y, w, h] të imazhit; kthen (text, confidence 0-100)"""
+        results = []
+        for start in range(0, len(boxes), batch_size):
+            results.extend(self._recognize_montage(image, boxes[start:start + batch_size]))
+        return results
+
+    def _recognize_montage(self, image, boxes):
+        """Vendos rajonet njëri poshtë tjetrit dhe i lidh fjalët me rajonin sipas y"""
+        crops = [image[int(y):int(y + h), int(x):int(x + w)] for x, y, w, h in boxes]
+        width = max(crop.shape[1] for crop in crops) + 2 * MONTAGE_GAP
+        height = sum(crop.shape[0] + MONTAGE_GAP for crop in crops) + MONTAGE_GAP
+        montage = np.full((height, width) + image.shape[2:], 255, dtype=np.uint8)
+
+        spans = []
+        y = MONTAGE_GAP
+        for crop in crops:
+            montage[y:y + crop.shape[0], MONTAGE_GAP:MONTAGE_GAP + crop.shape[1]] = crop
+            spans.append((y, y + crop.shape[0]))
+            y += crop.shape[0] + MONTAGE_GAP
+
+        data = self.pytesseract.image_to_data(montage, lang=self.lang_code, config='--psm 6',
+                                              output_type=self.pytesseract.Output.DICT)
+
+        words = [[] for _ in crops]
+        for text, conf, top, h in zip(data['text'], data['conf'], data['top'], data['height']):
+            text = str(text).strip()
+            if not text or float(conf) < 0:
+                continue
+            center = top + h / 2
+            for index, (y0, y1) in enumerate(spans):
+                if y0 - MONTAGE_GAP / 2 <= center < y1 + MONTAGE_GAP / 2:
+                    words[index].append((text, float(conf)))
+                    break
+
+        return [(' '.join(w for w, _ in region), sum(c for _, c in region) / len(region))
+                if region else ('', 0.0) for region in words]
+
+
+ENGINE_CLASSES = {
+    'easyocr': EasyOcrEngine,
+    'tesseract': TesseractEngine,
+}
+
+
+class OcrEnginePool:
+    """Pool i motorëve OCR për një (backend, gjuhë); motorët krijohen kur kërkohen"""
+
+    def __init__(self, backend, language=DEFAULT_LANGUAGE, size=1):
+        if language not in LANGUAGES:
+            raise ValueError(f"Gjuha OCR nuk mbështetet: {language}")
+        self.backend = backend
+        self.language = language
+        self.size = max(1, size)
+        self._idle = Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def engine(self):
+        """Merr një motor të lirë (ose krijon një të ri deri në size) dhe e kthen pas përdorimit"""
+        engine = None
+        with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                engine = ENGINE_CLASSES[self.backend](self.language)
+            except Exception as e:
+                with self._lock:
+                    self._created -= 1
+                raise OcrUnavailable(f"Motori OCR '{self.backend}' nuk u ngarkua: {e}") from e
+        else:
+            engine = self._idle.get()
+
+        try:
+            yield engine
+        finally:
+            self._idle.put(engine)
+
+    def warm_up(self):
+        """Ngarkon motorin paraprakisht (p.sh. në initializer të worker-it)"""
+        with self.engine():
+            pass
+
+
+# Pool-et e procesit, të ndara nga të gjithë SymbolRecognizer-ët
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_ocr_pool(language=DEFAULT_LANGUAGE, backend=None, size=1):
+    """Kthen pool-in e përbashkët për gjuhën e zgjedhur"""
+    if backend is None:
+        backends = available_backends()
+        if not backends:
+            raise OcrUnavailable("Asnjë motor OCR nuk është instaluar "
+                                 "(easyocr, ose pytesseract me binarin tesseract)")
+        backend = backends[0]
+
+    key = (backend, language)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = OcrEnginePool(backend, language, size)
+        elif pool.size < size:
+            pool.size = size
+        return pool
@@ -0,0 +1,429 @@
+"""
+Output Generator
+Gjeneron BOM nga simbolet dhe teksti, dhe eksporton rezultatet (Excel, PDF)
+
+Çdo simbol lidhet me etiketat afër tij ("DN100", "PN16", "V-101", ...).
+Etiketat indeksohen një herë për faqe në një GridIndex, kështu që për çdo
+simbol kontrollohen vetëm etiketat brenda rrezes, jo i gjithë teksti i faqes.
+Linjat e tubave (line_network) marrin madhësinë nga etiketa më e afërt me
+vijën ose nga simbolet në skajet e tyre, dhe BOM mbledh metrat sipas DN.
+"""
+
+import json
+import re
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from modules.spatial_index import GridIndex
+
+# Rrezja e kërkimit të etiketave, në shumëfisha të madhësisë së simbolit
+LABEL_RADIUS_FACTOR = 3.0
+# Rrezja minimale (njësitë e faqes) për simbolet pa bbox ose shumë të vegjël
+MIN_LABEL_RADIUS = 60.0
+
+# Fushat e BOM -> modelet e etiketave që i plotësojnë
+LABEL_PATTERNS = OrderedDict([
+    ('size', re.compile(r'\b(DN\s?\d{1,4}|NPS\s?\d+(?:[./]\d+)?|\d+(?:[./]\d+)?\s?(?:"|in\b|mm\b))', re.I)),
+    ('rating', re.compile(r'\b(PN\s?\d{1,3}|(?:CLASS|CL)\s?\d{3,4}|\d{3,4}\s?#)', re.I)),
+    ('material', re.compile(r'\b(SS\s?3\d{2}L?|CS|A105|A106|A216|WCB|CF8M?|PVC|HDPE|PP|CAST IRON|DUCTILE IRON|'
+                            r'STAINLESS STEEL|CARBON STEEL|BRONZE|BRASS)\b', re.I)),
+    ('tag', re.compile(r'\b([A-Z]{1,4}-?\d{2,5}[A-Z]?)\b')),
+])
+
+# Rreshtat e tubave në BOM: gjatësia mblidhet sipas madhësisë (DN) dhe materialit
+PIPE_TYPE = 'pipe'
+PIPE_NAME = 'Pipe'
+PIPE_FIELDS = ('size', 'material')
+# Njësitë e sasisë: copë për simbolet, metra për tubat (pixel kur faqja nuk ka dpi)
+UNIT_PIECES = 'copë'
+UNIT_METERS = 'm'
+UNIT_PIXELS = 'px'
+METERS_PER_INCH = 0.0254
+
+# Kolonat e fletëve Excel: (titulli, çelësi ose funksioni që e nxjerr vlerën nga elementi)
+BOM_SHEET_COLUMNS = (
+    ('Sasia', 'quantity'), ('Njësia', 'unit'), ('Lloji', 'type'), ('Emri', 'name'), ('Përshkrimi', 'description'),
+    ('Madhësia', 'size'), ('Presioni', 'rating'), ('Materiali', 'material'), ('Kostoja', 'cost'),
+    ('Tag', 'tags'),
+)
+SYMBOL_SHEET_COLUMNS = (
+    ('Lloji', 'type'), ('Emri', 'name'), ('Siguria %', 'confidence'), ('Rrotullimi', 'rotation'),
+    ('X', lambda item: _box(item)[0]), ('Y', lambda item: _box(item)[1]),
+    ('Gjerësia', lambda item: _box(item)[2]), ('Lartësia', lambda item: _box(item)[3]),
+    ('Shtresa', 'layer'),
+)
+TEXT_SHEET_COLUMNS = (
+    ('Teksti', 'content'), ('Siguria %', 'confidence'),
+    ('X', lambda item: _box(item)[0]), ('Y', lambda item: _box(item)[1]),
+    ('Gjerësia', lambda item: _box(item)[2]), ('Lartësia', lambda item: _box(item)[3]),
+    ('Shtresa', 'layer'),
+)
+PAGE_COLUMN = ('Faqja', lambda item: item['page'] + 1 if item.get('page') is not None else None)
+FILE_COLUMN = ('Skedari', 'file')
+
+# Kufiri i rreshtave të një flete Excel (pa titullin); mbi të vazhdohet në "Emri (2)"
+EXCEL_MAX_ROWS = 1048575
+# Mbi kaq faqe nuk krijohet fletë për çdo faqe (kolona "Faqja" mbetet në fletët kryesore)
+MAX_PAGE_SHEETS = 200
+
+# Atributet e blloqeve DXF -> fushat e BOM
+ATTRIBUTE_FIELDS = {
+    'TAG': 'tag', 'SIZE': 'size', 'DN': 'size', 'RATING': 'rating', 'PN': 'rating',
+    'CLASS': 'rating', 'MATERIAL': 'material', 'MAT': 'material',
+}
+
+
+def parse_label(content):
+    """Kthen fushat e BOM që gjenden në një tekst, p.sh. {'size': 'DN100'}"""
+    fields = {}
+    for field, pattern in LABEL_PATTERNS.items():
+        match = pattern.search(content or '')
+        if match:
+            value = re.sub(r'\s+', '', match.group(1)).upper()
+            # Madhësitë dhe presionet janë gjithashtu "tag"; mos i dyfisho
+            if field == 'tag' and value in fields.values():
+                continue
+            fields[field] = value
+    return fields
+
+
+def _center(item):
+    if item.get('bbox'):
+        x, y, w, h = item['bbox'][:4]
+        return x + w / 2.0, y + h / 2.0
+    x, y = item.get('position', (0, 0))[:2]
+    return float(x), float(y)
+
+
+def _box(item):
+    if item.get('bbox'):
+        return item['bbox'][:4]
+    x, y = item.get('position', (None, None))[:2]
+    return x, y, None, None
+
+
+def _cell(value):
+    """Vlera e qelizës: listat/dict-et si tekst, pa karakteret që Excel nuk i pranon"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if hasattr(value, 'item'):
+        return value.item()
+    if isinstance(value, (list, tuple, dict)):
+        value = json.dumps(value, ensure_ascii=False, default=str)
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    return ILLEGAL_CHARACTERS_RE.sub('', str(value))
+
+
+class _SheetWriter:
+    """Fletë write-only: rreshtat shkruhen menjëherë në disk, me vazhdim kur mbushet"""
+
+    def __init__(self, workbook, title, columns, max_rows=EXCEL_MAX_ROWS):
+        self.workbook = workbook
+        self.title = title
+        self.columns = columns
+        self.max_rows = max_rows
+        self.parts = 0
+        self.rows = 0
+        self._sheet = None
+
+    def _new_sheet(self):
+        self.parts += 1
+        title = self.title if self.parts == 1 else f"{self.title} ({self.parts})"
+        self._sheet = self.workbook.create_sheet(title[:31])
+        self._sheet.append([heading for heading, _ in self.columns])
+        self.rows = 0
+
+    def append(self, item):
+        if self._sheet is None or self.rows >= self.max_rows:
+            self._new_sheet()
+        self._sheet.append([_cell(item.get(field) if isinstance(field, str) else field(item))
+                            for _, field in self.columns])
+        self.rows += 1
+
+    def ensure(self):
+        """Krijon fletën (vetëm me titujt) edhe kur nuk ka rreshta"""
+        if self._sheet is None:
+            self._new_sheet()
+
+
+def _search_radius(symbol, factor=LABEL_RADIUS_FACTOR, minimum=MIN_LABEL_RADIUS):
+    if symbol.get('bbox'):
+        return max(minimum, factor * max(symbol['bbox'][2], symbol['bbox'][3]))
+    return minimum
+
+
+class LabelIndex:
+    """Etiketat e një faqeje (vetëm tekstet që përmbajnë fusha BOM) me indeks hapësinor"""
+
+    def __init__(self, text_data):
+        self.labels = []
+        for item in text_data or []:
+            fields = parse_label(item.get('content', ''))
+            if fields:
+                self.labels.append((item, fields))
+        self.index = GridIndex.from_items([item for item, _ in self.labels])
+
+    def __len__(self):
+        return len(self.labels)
+
+    def fields_near(self, x, y, radius, page=None):
+        """Fushat nga etiketat brenda rrezes; secila fushë merret nga etiketa më e afërt"""
+        return self.fields_near_many([x], [y], [radius], [page])[0]
+
+    def fields_near_many(self, xs, ys, radii, pages=None):
+        """fields_near për shumë pika me një pyetje të vetme në indeks"""
+        results = [{} for _ in xs]
+        if not len(self.labels):
+            return results
+
+        points, items, _ = self.index.within_many(xs, ys, radii)
+        # Çiftet vijnë të renditura sipas distancës, kështu që setdefault mban më të afërtën
+        for point, index in zip(points.tolist(), items.tolist()):
+            item, label_fields = self.labels[index]
+            page = pages[point] if pages is not None else None
+            if page is not None and item.get('page', page) != page:
+                continue
+            fields = results[point]
+            for field, value in label_fields.items():
+                fields.setdefault(field, value)
+        return results
+
+    def nearest(self, x, y, k=1, max_distance=None):
+        """k etiketat më të afërta: [(text_item, fields, distance)]"""
+        return [(self.labels[i][0], self.labels[i][1], distance)
+                for i, distance in self.index.nearest(x, y, k=k, max_distance=max_distance)]
+
+
+class OutputGenerator:
+    """Gjeneron BOM dhe eksportet e rezultateve"""
+
+    def __init__(self, label_radius_factor=LABEL_RADIUS_FACTOR, min_label_radius=MIN_LABEL_RADIUS, drawing_scale=1.0):
+        self.label_radius_factor = label_radius_factor
+        self.min_label_radius = min_label_radius
+        # Shkalla e vizatimit për gjatësitë e tubave (50 për 1:50); me 1 gjatësia është ajo në letër
+        self.drawing_scale = drawing_scale
+
+    def associate_labels(self, symbols, text_data):
+        """Kthen për çdo simbol fushat (size, rating, material, tag) nga etiketat afër tij"""
+        labels = LabelIndex(text_data)
+        centers = [_center(symbol) for symbol in symbols]
+        nearby = labels.fields_near_many(
+            [x for x, _ in centers], [y for _, y in centers],
+            [_search_radius(symbol, self.label_radius_factor, self.min_label_radius) for symbol in symbols],
+            [symbol.get('page') for symbol in symbols])
+
+        associations = []
+        for symbol, label_fields in zip(symbols, nearby):
+            fields = {}
+            # Atributet e bllokut (DXF) kanë përparësi mbi tekstin përreth
+            for tag, value in (symbol.get('attributes') or {}).items():
+                field = ATTRIBUTE_FIELDS.get(str(tag).upper())
+                if field and value:
+                    fields.setdefault(field, str(value).strip())
+            for field, value in label_fields.items():
+                fields.setdefault(field, value)
+            associations.append(fields)
+        return associations
+
+    def associate_pipe_labels(self, pipes, text_data, symbol_fields=None):
+        """Fushat (size, material) e çdo linje tubi
+
+        Secila fushë merret nga etiketa më e afërt me vijat e linjës (brenda
+        min_label_radius); ajo që mungon merret nga simbolet në skajet e linjës
+        (vlera më e shpeshtë), kur jepen fushat e tyre (symbol_fields).
+        """
+        from modules.line_network import segments_near
+
+        associations = [{} for _ in pipes]
+        labels = LabelIndex(text_data)
+        if len(labels) and pipes:
+            counts = [len(pipe['segments']) for pipe in pipes]
+            segments = np.array([segment for pipe in pipes for segment in pipe['segments']],
+                                dtype=np.float64).reshape(-1, 4)
+            owners = np.repeat(np.arange(len(pipes)), counts)
+            centers = [_center(item) for item, _ in labels.labels]
+            points, items, dist = segments_near(segments, [x for x, _ in centers], [y for _, y in centers],
+                                                self.min_label_radius)
+            # Çiftet sipas distancës, kështu që setdefault mban etiketën më të afërt për çdo linjë
+            order = np.argsort(dist, kind='stable')
+            for point, item in zip(points[order].tolist(), items[order].tolist()):
+                label, label_fields = labels.labels[point]
+                pipe = pipes[owners[item]]
+                if pipe.get('page') is not None and label.get('page', pipe['page']) != pipe['page']:
+                    continue
+                fields = associations[owners[item]]
+                for field in PIPE_FIELDS:
+                    if field in label_fields:
+                        fields.setdefault(field, label_fields[field])
+
+        if symbol_fields is not None:
+            for pipe, fields in zip(pipes, associations):
+                for field in PIPE_FIELDS:
+                    values = Counter(symbol_fields[index][field] for index in pipe.get('symbols', ())
+                                     if index < len(symbol_fields) and symbol_fields[index].get(field))
+                    if values and field not in fields:
+                        fields[field] = values.most_common(1)[0][0]
+        return associations
+
+    def pipe_length(self, pipe):
+        """(gjatësia, njësia) e një linje: metra me dpi dhe drawing_scale, pixel pa dpi"""
+        if not pipe.get('dpi'):
+            return pipe['length'], UNIT_PIXELS
+        return pipe['length'] / pipe['dpi'] * METERS_PER_INCH * self.drawing_scale, UNIT_METERS
+
+    def generate_bom(self, symbols, text_data, pipes=None):
+        """Grupon simbolet sipas llojit, emrit dhe fushave të etiketave në rreshta BOM
+
+        Linjat e tubave (pipes, nga line_network) japin rreshta me gjatësinë e
+        mbledhur sipas madhësisë; çdo linjë merr edhe 'size' e vet.
+        """
+        rows = OrderedDict()
+        associations = self.associate_labels(symbols, text_data)
+        for symbol, fields in zip(symbols, associations):
+            name = symbol.get('name') or symbol.get('type') or 'N/A'
+            key = (symbol.get('type'), name, fields.get('size'), fields.get('rating'), fields.get('material'))
+            row = rows.get(key)
+            if row is None:
+                description = ' '.join(part for part in (name, fields.get('size'), fields.get('rating')) if part)
+                row = rows[key] = {
+                    'quantity': 0,
+                    'unit': UNIT_PIECES,
+                    'type': symbol.get('type', 'N/A'),
+                    'name': name,
+                    'description': description,
+                    'size': fields.get('size', 'N/A'),
+                    'rating': fields.get('rating', 'N/A'),
+                    'material': fields.get('material', 'N/A'),
+                    'cost': 'N/A',
+                    'tags': [],
+                }
+            row['quantity'] += 1
+            if fields.get('tag'):
+                row['tags'].append(fields['tag'])
+
+        pipe_rows = OrderedDict()
+        for pipe, fields in zip(pipes or [], self.associate_pipe_labels(pipes or [], text_data, associations)):
+            pipe['size'] = fields.get('size', 'N/A')
+            length, unit = self.pipe_length(pipe)
+            key = (fields.get('size'), fields.get('material'), unit)
+            row = pipe_rows.get(key)
+            if row is None:
+                row = pipe_rows[key] = {
+                    'quantity': 0.0,
+                    'unit': unit,
+                    'type': PIPE_TYPE,
+                    'name': PIPE_NAME,
+                    'description': ' '.join(part for part in (PIPE_NAME, fields.get('size')) if part),
+                    'size': fields.get('size', 'N/A'),
+                    'rating': 'N/A',
+                    'material': fields.get('material', 'N/A'),
+                    'cost': 'N/A',
+                    'tags': [],
+                }
+            row['quantity'] += length
+
+        bom = []
+        for row in list(rows.values()) + list(pipe_rows.values()):
+            row['tags'] = ', '.join(sorted(set(row['tags'])))
+            if row['unit'] == UNIT_METERS:
+                row['quantity'] = round(row['quantity'], 2)
+            elif row['unit'] == UNIT_PIXELS:
+                row['quantity'] = round(row['quantity'])
+            bom.append(row)
+        return bom
+
+    def export_to_excel(self, data, filename):
+        """Eksporton BOM, simbolet, tekstin dhe një fletë për çdo faqe, në modalitet write-only
+
+        Rreshtat shkruhen një nga një në disk (openpyxl write_only), kështu që
+        memoria nuk rritet me numrin e rreshtave.
+        """
+        from openpyxl import Workbook
+
+        symbols, text_data = data.get('symbols') or [], data.get('text') or []
+        pages = sorted({item['page'] for item in list(symbols) + list(text_data) if item.get('page') is not None})
+        multipage = len(pages) > 1
+        extra = (PAGE_COLUMN,) if multipage else ()
+
+        workbook = Workbook(write_only=True)
+        bom_sheet = _SheetWriter(workbook, 'BOM', BOM_SHEET_COLUMNS + extra)
+        bom_sheet.ensure()
+        for row in data.get('bom') or []:
+            bom_sheet.append(row)
+
+        # Fletët krijohen që në fillim, që renditja të jetë BOM, Simbolet, Teksti, Faqja 1..N
+        sheets = {'Simbol': _SheetWriter(workbook, 'Simbolet', SYMBOL_SHEET_COLUMNS + extra),
+                  'Tekst': _SheetWriter(workbook, 'Teksti', TEXT_SHEET_COLUMNS + extra)}
+        for sheet in sheets.values():
+            sheet.ensure()
+
+        page_sheets = {}
+        if multipage and len(pages) <= MAX_PAGE_SHEETS:
+            page_columns = (('Elementi', 'kind'), ('Lloji', 'type'), ('Emri / Teksti', 'value'),
+                            ('Siguria %', 'confidence'), ('X', 'x'), ('Y', 'y'), ('Gjerësia', 'width'),
+                            ('Lartësia', 'height'))
+            for page in pages:
+                page_sheets[page] = _SheetWriter(workbook, f"Faqja {page + 1}", page_columns)
+                page_sheets[page].ensure()
+
+        for kind, items in (('Simbol', symbols), ('Tekst', text_data)):
+            sheet = sheets[kind]
+            for item in items:
+                sheet.append(item)
+                page_sheet = page_sheets.get(item.get('page'))
+                if page_sheet is not None:
+                    x, y, width, height = _box(item)
+                    page_sheet.append({'kind': kind, 'type': item.get('type', 'Text'),
+                                       'value': item.get('name') if kind == 'Simbol' else item.get('content'),
+                                       'confidence': item.get('confidence'),
+                                       'x': x, 'y': y, 'width': width, 'height': height})
+
+        workbook.save(filename)
+
+    def export_batch_to_excel(self, result_files, filename):
+        """Bashkon rezultatet e një batch-i (skedarët JSON) në një workbook të vetëm
+
+        Skedarët lexohen një nga një, kështu që në memorie mbahet vetëm njëri prej tyre.
+        """
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        files_sheet = _SheetWriter(workbook, 'Skedarët', (('Skedari', 'file'), ('Faqe', 'page_count'),
+                                                          ('Simbole', 'symbols'), ('Tekste', 'text'),
+                                                          ('Rreshta BOM', 'bom'), ('Data', 'timestamp')))
+        sheets = {
+            'bom': _SheetWriter(workbook, 'BOM', (FILE_COLUMN,) + BOM_SHEET_COLUMNS + (PAGE_COLUMN,)),
+            'symbols': _SheetWriter(workbook, 'Simbolet', (FILE_COLUMN,) + SYMBOL_SHEET_COLUMNS + (PAGE_COLUMN,)),
+            'text': _SheetWriter(workbook, 'Teksti', (FILE_COLUMN,) + TEXT_SHEET_COLUMNS + (PAGE_COLUMN,)),
+        }
+        files_sheet.ensure()
+        for sheet in sheets.values():
+            sheet.ensure()
+
+        for result_file in result_files:
+            with open(result_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            source = data.get('file') or result_file
+            files_sheet.append({'file': source, 'page_count': data.get('page_count', 1),
+                                'symbols': len(data.get('symbols') or []), 'text': len(data.get('text') or []),
+                                'bom': len(data.get('bom') or []), 'timestamp': data.get('timestamp')})
+            for key, sheet in sheets.items():
+                for item in data.get(key) or []:
+                    item['file'] = source
+                    sheet.append(item)
+            del data
+
+        workbook.save(filename)
+
+    def export_to_pdf(self, data, filename):
+        """Eksporton raportin PDF të një vizatimi: thumbnail i shënuar, simbolet dhe BOM"""
+        from modules.pdf_report import build_drawing_pdf
+
+        build_drawing_pdf(data, filename)
+
+    def export_batch_to_pdf(self, result_files, filename, workers=None):
+        """Raporti PDF i një batch-i (skedarët JSON); vizatimet renderohen paralelisht dhe bashkohen në disk"""
+        from modules.pdf_report import PdfReportGenerator
+
+        return PdfReportGenerator(workers=workers).build(result_files, filename)
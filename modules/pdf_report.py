@@ -0,0 +1,437 @@
+"""
+PDF Report
+Raporti PDF i një batch-i: një seksion për vizatim me thumbnail të shënuar dhe tabelat
+
+Çdo vizatim renderohet në një proces worker: thumbnail-i lexohet drejtpërdrejt
+në rezolucion të ulët (PDF-të renderohen në dpi të vogël, imazhet zvogëlohen
+gjatë dekodimit), simbolet dhe linjat e tubave vizatohen sipër tij, dhe faqet
+e vizatimit (thumbnail, përmbledhja e simboleve, BOM) shkruhen me reportlab në
+një PDF të përkohshëm në disk. Procesi kryesor i fut këto PDF me radhë në
+raportin përfundimtar sapo të jenë gati dhe i fshin; raporti shkruhet në disk
+në mënyrë inkrementale, kështu që në memorie nuk mbahen kurrë thumbnail-et e
+të gjithë batch-it. Në ekzekutim mbahen të shumtën 2 × workers vizatime.
+
+    python -m modules.pdf_report rezultatet/ -o raporti.pdf -j 8
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+# Brinja më e gjatë e thumbnail-it në pixel (rreth 150 dpi në gjerësinë e faqes A4)
+THUMBNAIL_SIZE = 1100
+JPEG_QUALITY = 80
+# DPI i DocumentProcessor: koordinatat e rezultateve të PDF-ve janë në këtë rezolucion
+DEFAULT_DPI = 200
+# Faqet me thumbnail për çdo vizatim; faqet e tjera shfaqen vetëm në tabela
+MAX_THUMBNAIL_PAGES = 8
+# Kufiri i faqeve të raportit (pt) dhe pjesa e lartësisë që zë thumbnail-i
+PAGE_MARGIN = 36
+THUMBNAIL_HEIGHT_RATIO = 0.55
+# Pas kaq vizatimesh raporti ruhet në disk dhe rihapet, që faqet e futura të lirohen nga memoria
+FLUSH_EVERY = 16
+
+# Ngjyrat e shënimeve (RGB)
+SYMBOL_COLOR = (220, 30, 30)
+PIPE_COLOR = (30, 90, 220)
+
+
+def _page_of(item):
+    return item.get('page') or 0
+
+
+def _page_numbers(data):
+    """Faqet e vizatimit (0, 1, ...) nga përmbledhja ose nga elementet"""
+    if data.get('pages'):
+        return [entry['page'] for entry in data['pages']]
+    count = data.get('page_count') or 1
+    return list(range(count))
+
+
+def load_thumbnail(source, page=0, dpi=DEFAULT_DPI, max_size=THUMBNAIL_SIZE):
+    """Lexon faqen në rezolucion të ulët; kthen (imazhi RGB, shkalla ndaj koordinatave të rezultateve)"""
+    import numpy as np
+
+    if Path(source).suffix.lower() == '.pdf':
+        from modules.document_processor import DocumentProcessor
+
+        processor = DocumentProcessor(dpi=dpi)
+        width, height = processor.get_page_size(source, page)
+        scale = min(1.0, max_size / max(width, height, 1))
+        return processor.pdf_to_image(source, page, dpi=dpi * scale), scale
+
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = None
+    with Image.open(source) as image:
+        width, height = image.size
+        scale = min(1.0, max_size / max(width, height, 1))
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        # JPEG-të dekodohen direkt në shkallë të reduktuar; të tjerat zvogëlohen me hapa
+        image.draft('RGB', size)
+        image = image.convert('RGB')
+        image.thumbnail(size, reducing_gap=2.0)
+        return np.array(image), image.size[0] / max(width, 1)
+
+
+def annotate(image, symbols, pipes, scale):
+    """Vizaton kutitë e simboleve dhe segmentet e tubave mbi thumbnail"""
+    import cv2
+    import numpy as np
+
+    image = np.ascontiguousarray(image)
+    for pipe in pipes:
+        for x1, y1, x2, y2 in pipe.get('segments') or []:
+            cv2.line(image, (round(x1 * scale), round(y1 * scale)), (round(x2 * scale), round(y2 * scale)),
+                     PIPE_COLOR, 1, cv2.LINE_AA)
+    for symbol in symbols:
+        if not symbol.get('bbox'):
+            continue
+        x, y, w, h = symbol['bbox'][:4]
+        cv2.rectangle(image, (round(x * scale), round(y * scale)),
+                      (round((x + w) * scale), round((y + h) * scale)), SYMBOL_COLOR, 1)
+    return image
+
+
+def _write_thumbnail(data, page, filename, dpi, max_size):
+    """Thumbnail-i i shënuar i një faqeje si JPEG; kthen (gjerësia, lartësia) ose None pa burim"""
+    import cv2
+
+    source = data.get('file')
+    if not source or not os.path.exists(source) or Path(source).suffix.lower() == '.dxf':
+        return None
+    image, scale = load_thumbnail(source, page, dpi, max_size)
+    symbols = [item for item in data.get('symbols') or [] if _page_of(item) == page]
+    pipes = [item for item in data.get('pipes') or [] if _page_of(item) == page]
+    image = annotate(image, symbols, pipes, scale)
+    cv2.imwrite(filename, cv2.cvtColor(image, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return image.shape[1], image.shape[0]
+
+
+def _document(filename, title):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+
+    return SimpleDocTemplate(filename, pagesize=A4, title=title, leftMargin=PAGE_MARGIN, rightMargin=PAGE_MARGIN,
+                             topMargin=PAGE_MARGIN, bottomMargin=PAGE_MARGIN)
+
+
+def _table(rows):
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+
+    table = Table(rows, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ]))
+    return table
+
+
+def symbol_rows(symbols):
+    """Përmbledhja e simboleve: një rresht për (lloji, emri) me numrin dhe sigurinë mesatare"""
+    groups = {}
+    for symbol in symbols:
+        key = (symbol.get('type', 'N/A'), symbol.get('name', 'N/A'))
+        count, confidence = groups.get(key, (0, 0.0))
+        groups[key] = (count + 1, confidence + float(symbol.get('confidence') or 0))
+    rows = [['Lloji', 'Emri', 'Numri', 'Siguria %']]
+    for (kind, name), (count, confidence) in sorted(groups.items(), key=lambda entry: -entry[1][0]):
+        rows.append([kind, name, count, f"{confidence / count:.1f}"])
+    return rows
+
+
+def bom_rows(bom, multipage=False):
+    """Tabela e BOM (me kolonën Faqja për vizatimet me shumë faqe)"""
+    from modules.output_generator import UNIT_PIECES
+
+    header = ['Nr.', 'Sasia', 'Njësia', 'Përshkrimi', 'Madhësia', 'Materiali']
+    rows = [header + (['Faqja'] if multipage else [])]
+    for i, item in enumerate(bom, 1):
+        quantity = item.get('quantity', 1)
+        row = [i, f"{quantity:g}" if isinstance(quantity, (int, float)) else quantity,
+               item.get('unit', UNIT_PIECES), item.get('description', 'N/A'), item.get('size', 'N/A'),
+               item.get('material', 'N/A')]
+        if multipage:
+            row.append(_page_of(item) + 1)
+        rows.append(row)
+    return rows
+
+
+def drawing_story(data, workdir, dpi=DEFAULT_DPI, thumbnail_size=THUMBNAIL_SIZE, title=None):
+    """Elementet reportlab të seksionit të një vizatimi; thumbnail-et shkruhen në workdir"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Image, KeepTogether, PageBreak, Paragraph, Spacer
+
+    styles = getSampleStyleSheet()
+    # Korniza e SimpleDocTemplate ka 6 pt padding në çdo anë
+    frame_width, frame_height = A4[0] - 2 * PAGE_MARGIN - 12, A4[1] * THUMBNAIL_HEIGHT_RATIO
+    symbols, text_data, pipes = data.get('symbols') or [], data.get('text') or [], data.get('pipes') or []
+    pages = _page_numbers(data)
+    multipage = len(pages) > 1
+
+    story = [
+        # Paragraph lexon markup, ndaj emrat e skedarëve escape-ohen
+        Paragraph(escape(title or "Raporti i Analizës"), styles['Title']),
+        Paragraph(escape(f"Skedari: {data.get('file', 'N/A')}"), styles['Normal']),
+        Paragraph(f"Faqe: {len(pages)} | Simbole: {len(symbols)} | Tekste: {len(text_data)} | "
+                  f"Linja tubash: {len(pipes)} | Rreshta BOM: {len(data.get('bom') or [])}", styles['Normal']),
+        Spacer(1, 12),
+    ]
+
+    for page in pages[:MAX_THUMBNAIL_PAGES]:
+        thumbnail = os.path.join(workdir, f"page_{page}.jpg")
+        try:
+            size = _write_thumbnail(data, page, thumbnail, dpi, thumbnail_size)
+        except Exception as e:
+            print(f"Thumbnail error: {e}")
+            size = None
+        page_symbols = [item for item in symbols if _page_of(item) == page]
+        # Titulli i faqes nuk ndahet nga thumbnail-i i saj
+        section = [Paragraph(f"Faqja {page + 1}", styles['Heading2'])] if multipage else []
+        if size is not None:
+            fit = min(frame_width / size[0], frame_height / size[1])
+            section += [Image(thumbnail, width=size[0] * fit, height=size[1] * fit), Spacer(1, 8)]
+        if section:
+            story.append(KeepTogether(section))
+        if page_symbols:
+            story.append(_table(symbol_rows(page_symbols)))
+            story.append(Spacer(1, 12))
+
+    if len(pages) > MAX_THUMBNAIL_PAGES:
+        rest = [item for item in symbols if _page_of(item) not in pages[:MAX_THUMBNAIL_PAGES]]
+        story.append(Paragraph(f"Faqet {MAX_THUMBNAIL_PAGES + 1}-{len(pages)}", styles['Heading2']))
+        if rest:
+            story.append(_table(symbol_rows(rest)))
+
+    bom = data.get('bom') or []
+    if bom:
+        story.append(PageBreak())
+        story.append(Paragraph("BOM", styles['Heading2']))
+        story.append(_table(bom_rows(bom, multipage)))
+    return story
+
+
+def build_drawing_pdf(data, filename, dpi=DEFAULT_DPI, thumbnail_size=THUMBNAIL_SIZE, title=None):
+    """Shkruan seksionin e një vizatimi si PDF më vete; kthen numrin e faqeve"""
+    workdir = tempfile.mkdtemp(prefix='tda_report_', dir=os.path.dirname(os.path.abspath(filename)))
+    try:
+        document = _document(filename, title or os.path.basename(data.get('file') or ''))
+        document.build(drawing_story(data, workdir, dpi, thumbnail_size, title))
+        return document.page
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        _release_render_cache()
+
+
+def _release_render_cache():
+    """Zbraz store-in e MuPDF: pa këtë memoria e worker-it rritet me çdo PDF të renderuar"""
+    import fitz
+
+    fitz.TOOLS.store_shrink(100)
+
+
+def _render_task(index, result_file, output_file, dpi, thumbnail_size):
+    """Renderon një vizatim në worker; kthen rekordin (pa imazhe, vetëm rrugën e PDF-së)"""
+    started = time.perf_counter()
+    record = {'index': index, 'result': result_file, 'output': output_file}
+    try:
+        with open(result_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        record['file'] = data.get('file') or result_file
+        record['symbols'] = len(data.get('symbols') or [])
+        record['bom'] = len(data.get('bom') or [])
+        record['pages'] = build_drawing_pdf(data, output_file, dpi, thumbnail_size,
+                                            title=os.path.basename(record['file']))
+        record['status'] = 'ok'
+    except Exception as e:
+        record.update({'status': 'error', 'error': str(e), 'output': None})
+        record.setdefault('file', result_file)
+    record['seconds'] = round(time.perf_counter() - started, 4)
+    return record
+
+
+class PdfReportGenerator:
+    """Ndërton raportin PDF të një batch-i me worker paralelë dhe bashkim të rrjedhshëm"""
+
+    def __init__(self, workers=None, dpi=DEFAULT_DPI, thumbnail_size=THUMBNAIL_SIZE, flush_every=FLUSH_EVERY):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.dpi = dpi
+        self.thumbnail_size = thumbnail_size
+        self.flush_every = max(1, flush_every)
+
+    def _records(self, result_files, workdir):
+        """Rekordet e vizatimeve sipas radhës; renderimi bëhet në worker-a, 2 × workers njëherësh"""
+        tasks = ((i, result_file, os.path.join(workdir, f"{i:06d}.pdf"), self.dpi, self.thumbnail_size)
+                 for i, result_file in enumerate(result_files))
+        if self.workers == 1:
+            for task in tasks:
+                yield _render_task(*task)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        window = deque()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for task in tasks:
+                window.append(pool.submit(_render_task, *task))
+                if len(window) >= 2 * self.workers:
+                    break
+            try:
+                while window:
+                    record = window.popleft().result()
+                    task = next(tasks, None)
+                    if task is not None:
+                        window.append(pool.submit(_render_task, *task))
+                    yield record
+            finally:
+                for future in window:
+                    future.cancel()
+
+    def build(self, result_files, filename, progress_callback=None):
+        """Shkruan raportin në filename; kthen përmbledhjen (vizatimet, faqet, gabimet, koha)"""
+        import fitz
+
+        result_files = list(result_files)
+        directory = os.path.dirname(os.path.abspath(filename))
+        workdir = tempfile.mkdtemp(prefix='tda_report_', dir=directory)
+        partial = os.path.join(workdir, 'report.pdf')
+        started = time.perf_counter()
+        records, toc = [], []
+        report, saved, pending = fitz.open(), False, 0
+
+        try:
+            for record in self._records(result_files, workdir):
+                records.append(record)
+                if record['status'] == 'ok':
+                    with fitz.open(record['output']) as section:
+                        toc.append([1, os.path.basename(record['file']), report.page_count + 1])
+                        report.insert_pdf(section)
+                    os.remove(record['output'])
+                    pending += 1
+                else:
+                    print(f"PDF report error: {record['file']}: {record['error']}")
+                # Faqet e futura ruhen në disk dhe dokumenti rihapet, që memoria të mos rritet me batch-in
+                if pending >= self.flush_every:
+                    report = self._flush(report, partial, saved)
+                    saved, pending = True, 0
+                if progress_callback:
+                    progress_callback(record, len(records), len(result_files))
+
+            if report.page_count == 0:
+                raise ValueError("Asnjë vizatim nuk u renderua")
+            self._insert_index(report, records, toc, workdir)
+            report.set_toc(toc)
+            report.save(filename, garbage=3, deflate=True)
+        finally:
+            report.close()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        elapsed = time.perf_counter() - started
+        succeeded = [r for r in records if r['status'] == 'ok']
+        return {
+            'file': filename,
+            'drawings': len(succeeded),
+            'failed': len(records) - len(succeeded),
+            'pages': sum(r['pages'] for r in succeeded),
+            'elapsed_seconds': round(elapsed, 3),
+            'drawings_per_second': round(len(records) / elapsed, 3) if elapsed > 0 else 0.0,
+            'errors': [{'file': r['file'], 'error': r['error']} for r in records if r['status'] != 'ok'],
+        }
+
+    @staticmethod
+    def _flush(report, partial, saved):
+        import fitz
+
+        if saved:
+            report.saveIncr()
+        else:
+            report.save(partial)
+        report.close()
+        _release_render_cache()
+        return fitz.open(partial)
+
+    def _insert_index(self, report, records, toc, workdir):
+        """Faqja e parë: lista e vizatimeve me numrat e faqeve (numrat zhvendosen me faqet e indeksit)"""
+        import fitz
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import Paragraph
+
+        styles = getSampleStyleSheet()
+        index_file = os.path.join(workdir, 'index.pdf')
+        offset = 0
+        starts = iter(entry[2] for entry in toc)
+        rows = [['Nr.', 'Skedari', 'Simbole', 'Rreshta BOM', 'Faqja']]
+        for i, record in enumerate(records, 1):
+            ok = record['status'] == 'ok'
+            rows.append([i, os.path.basename(record['file']), record.get('symbols', ''), record.get('bom', ''),
+                         next(starts) if ok else 'Gabim'])
+
+        # Numri i faqeve të indeksit dihet vetëm pas ndërtimit; ndërtohet sërish me numrat e zhvendosur
+        for _ in range(2):
+            shifted = [rows[0]] + [row[:4] + [row[4] + offset if isinstance(row[4], int) else row[4]]
+                                   for row in rows[1:]]
+            document = _document(index_file, "Raporti i Batch-it")
+            document.build([Paragraph("Raporti i Batch-it", styles['Title']),
+                            Paragraph(f"Vizatime: {len(records)}", styles['Normal']),
+                            _table(shifted)])
+            if document.page == offset:
+                break
+            offset = document.page
+
+        with fitz.open(index_file) as index:
+            report.insert_pdf(index, start_at=0)
+        for entry in toc:
+            entry[2] += offset
+        toc.insert(0, [1, "Indeksi", 1])
+
+
+def collect_results(inputs):
+    """Skedarët JSON të rezultateve nga dosje ose skedarë (pa summary.json e batch-it)"""
+    files = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            files.extend(str(path) for path in sorted(Path(entry).glob('*.json')) if path.name != 'summary.json')
+        else:
+            files.append(entry)
+    return files
+
+
+def build_parser():
+    """Krijon parser-in e argumenteve të CLI"""
+    parser = argparse.ArgumentParser(description="Technical Drawing Analyzer - raporti PDF i një batch-i")
+    parser.add_argument('inputs', nargs='+', help="Dosja e rezultateve të batch-it ose skedarë JSON")
+    parser.add_argument('-o', '--output', default='batch_report.pdf', help="Skedari PDF i raportit")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="Numri i proceseve worker")
+    parser.add_argument('--dpi', type=float, default=DEFAULT_DPI, help="DPI i analizës (koordinatat e PDF-ve)")
+    parser.add_argument('--thumbnail-size', type=int, default=THUMBNAIL_SIZE,
+                        help="Brinja më e gjatë e thumbnail-it në pixel")
+    return parser
+
+
+def main(argv=None):
+    """Pika hyrëse e CLI"""
+    args = build_parser().parse_args(argv)
+    files = collect_results(args.inputs)
+    if not files:
+        print("Nuk u gjet asnjë rezultat JSON.")
+        return 1
+
+    generator = PdfReportGenerator(workers=args.workers, dpi=args.dpi, thumbnail_size=args.thumbnail_size)
+    summary = generator.build(files, args.output)
+    print(f"PDF: {args.output} ({summary['drawings']} vizatime, {summary['pages']} faqe, "
+          f"{summary['elapsed_seconds']:.2f}s, {summary['drawings_per_second']:.2f} vizatime/s)")
+    return 0 if summary['failed'] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
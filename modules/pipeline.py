@@ -0,0 +1,534 @@
+"""
+Analysis Pipeline
+Ekzekuton hapat e analizës pa interface grafik (pa Tk)
+"""
+
+import importlib.util
+import json
+import os
+from datetime import datetime
+
+from modules.profiler import StageProfiler
+from modules.stage_graph import StageGraph, check_cancelled
+
+# Formatet që pranon edhe browse_file në main.py
+SUPPORTED_EXTENSIONS = ('.pdf', '.dwg', '.dxf', '.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp')
+
+# Opsionet e analizës, të njëjta me checkbox-et e interface-it
+DEFAULT_OPTIONS = {
+    'detect_symbols': True,
+    'extract_text': True,
+    'generate_bom': True,
+    'calculate_dimensions': True,
+    # Teksti i ngulitur i PDF-ve (eksportet CAD) në vend të OCR
+    'pdf_text_layer': True,
+    # Linjat e tubave (rrjeti i vijave) dhe gjatësitë e tyre në BOM
+    'pipe_lengths': True,
+}
+
+
+# Modulet e procesorëve; pa to pipeline-i nuk ka çfarë të ekzekutojë
+PROCESSOR_MODULES = ('modules.document_processor', 'modules.symbol_recognizer', 'modules.output_generator')
+
+
+def missing_processors():
+    """Kthen modulet e procesorëve që mungojnë në instalim (pa i importuar)"""
+    return [name for name in PROCESSOR_MODULES if importlib.util.find_spec(name) is None]
+
+
+def load_processors():
+    """Ngarkon procesorët e sistemit nga modulet"""
+    missing = missing_processors()
+    if missing:
+        raise RuntimeError(f"Mungojnë modulet e procesorëve: {', '.join(missing)}")
+    from modules.document_processor import DocumentProcessor
+    from modules.symbol_recognizer import SymbolRecognizer
+    from modules.output_generator import OutputGenerator
+
+    return DocumentProcessor(), SymbolRecognizer(), OutputGenerator()
+
+
+def recognizer_version(symbol_recognizer):
+    """Versioni i modeleve të njohjes, pjesë e çelësit të cache-it"""
+    version = getattr(symbol_recognizer, 'version', None)
+    return str(version) if version else type(symbol_recognizer).__name__
+
+
+def load_stage(filepath):
+    """Emri i hapit të leximit sipas llojit të skedarit"""
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == '.pdf':
+        return 'pdf_render'
+    if ext == '.dxf':
+        return 'dxf_read'
+    return 'decode'
+
+
+def merge_options(options=None):
+    """Kthen opsionet e plota duke plotësuar vlerat që mungojnë"""
+    merged = dict(DEFAULT_OPTIONS)
+    if options:
+        merged.update({key: bool(value) for key, value in options.items()})
+    return merged
+
+
+def json_default(value):
+    """Konverton tipet e numpy për json.dump"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def save_results(results, filename):
+    """Ruan rezultatet e analizës si JSON"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False, default=json_default)
+
+
+class AnalysisPipeline:
+    """Lidh DocumentProcessor, SymbolRecognizer dhe OutputGenerator"""
+
+    def __init__(self, doc_processor=None, symbol_recognizer=None, output_generator=None, cache=None,
+                 page_workers=1, result_store=None, stage_timeouts=None, tile_workers=1, trace_memory=False):
+        if doc_processor is None or symbol_recognizer is None or output_generator is None:
+            defaults = load_processors()
+            doc_processor = doc_processor or defaults[0]
+            symbol_recognizer = symbol_recognizer or defaults[1]
+            output_generator = output_generator or defaults[2]
+
+        self.doc_processor = doc_processor
+        self.symbol_recognizer = symbol_recognizer
+        self.output_generator = output_generator
+        # DatabaseManager opsional për cache-in e rezultateve
+        self.cache = cache
+        # DatabaseManager opsional ku ruhen simbolet dhe teksti për kërkim (FTS5)
+        self.result_store = result_store
+        # Procese paralele për faqet e PDF-ve me shumë faqe
+        self.page_workers = max(1, page_workers or 1)
+        # Procese paralele për pllakat e një faqeje shumë të madhe (faqja ndahet me SharedImage)
+        self.tile_workers = max(1, tile_workers or 1)
+        # Afatet kohore (s) sipas hapit, p.sh. {'ocr': 120}
+        self.stage_timeouts = dict(stage_timeouts or {})
+        # Memoria maksimale e hapave me tracemalloc (ngadalëson analizën; për benchmark-un)
+        self.trace_memory = trace_memory
+        # Profiler-i i analizës së fundit (për eksportin e trace-it)
+        self.last_profiler = None
+
+    def _stage_weights(self):
+        """Kohët mesatare të hapave nga ekzekutimet e mëparshme (nëse ka bazë)"""
+        if self.cache is None or not hasattr(self.cache, 'stage_stats'):
+            return None
+        try:
+            return self.cache.stage_stats()
+        except Exception as e:
+            print(f"Stage stats error: {e}")
+            return None
+
+    def analyze(self, filepath, options=None, status_callback=None, use_cache=True, page_callback=None,
+                cancel_token=None):
+        """Analizon një skedar dhe kthen analysis_results
+
+        page_callback thirret për çdo faqe sapo të jetë gati (PDF me shumë faqe).
+        Kohët e hapave ruhen në results['timings'] dhe në self.last_profiler;
+        progresi i raportuar llogaritet nga hapat e përfunduar. Me cancel_token
+        analiza ndalon me AnalysisCancelled në hapin e ardhshëm pas cancel().
+        """
+        options = merge_options(options)
+        profiler = StageProfiler(name=os.path.basename(filepath), trace_memory=self.trace_memory,
+                                 weights=self._stage_weights(), progress_callback=status_callback)
+        self.last_profiler = profiler
+
+        cache = self.cache if use_cache else None
+        version = recognizer_version(self.symbol_recognizer)
+        try:
+            if cache is not None:
+                with profiler.stage('cache_lookup'):
+                    cached = self.cached_results(filepath, options, version)
+                if cached is not None:
+                    cached['file'] = filepath
+                    cached['cached'] = True
+                    self._store_results(cached, filepath, version, profiler)
+                    profiler.finish("Rezultatet u morën nga cache")
+                    return cached
+
+            results = self._run(filepath, options, profiler, page_callback, cancel_token)
+            warnings = self._warnings(filepath, options)
+            if warnings:
+                results['warnings'] = warnings
+
+            if cache is not None:
+                with profiler.stage('cache_store'):
+                    self.cache_results(filepath, options, results, version)
+            self._store_results(results, filepath, version, profiler)
+        finally:
+            profiler.close()
+
+        results['timings'] = profiler.summary()
+        self._symbol_cache_stats(results)
+        # Trace-i ruhet edhe kur cache-i anashkalohet (use_cache=False)
+        if self.cache is not None and hasattr(self.cache, 'store_trace'):
+            try:
+                self.cache.store_trace(profiler, filepath, options, version)
+            except Exception as e:
+                print(f"Trace store error: {e}")
+
+        profiler.finish()
+        return results
+
+    def cached_results(self, filepath, options, version=None):
+        """analysis_results e ruajtura për skedarin dhe opsionet (të plota), ose None
+
+        Çelësi i cache-it (përmbajtja, opsionet, versioni i modeleve) ndërtohet vetëm këtu
+        dhe në cache_results, që analiza e revizioneve të përdorë të njëjtat hyrje.
+        """
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.get_cached_analysis(filepath, options, version or recognizer_version(
+                self.symbol_recognizer))
+        except Exception as e:
+            print(f"Cache lookup error: {e}")
+            return None
+
+    def cache_results(self, filepath, options, results, version=None):
+        """Ruan analysis_results në cache (nëse ka); gabimet e cache-it nuk ndalin analizën"""
+        if self.cache is None:
+            return
+        try:
+            self.cache.store_analysis(filepath, options, version or recognizer_version(self.symbol_recognizer),
+                                      results)
+        except Exception as e:
+            print(f"Cache store error: {e}")
+
+    def _warnings(self, filepath, options):
+        """Hapat që u anashkaluan pa e ndalur analizën (p.sh. OCR pa motor të instaluar)"""
+        warnings = []
+        if options['extract_text'] and load_stage(filepath) != 'dxf_read' and \
+                hasattr(self.symbol_recognizer, 'ocr_status'):
+            reason = self.symbol_recognizer.ocr_status()
+            if reason:
+                warnings.append(f"OCR u anashkalua: {reason}")
+        return warnings
+
+    def _symbol_cache_stats(self, results):
+        """Shton hit rate-in e memo-s së klasifikimit te rezultatet dhe e ruan memo-n në disk"""
+        if not hasattr(self.symbol_recognizer, 'cache_stats'):
+            return
+        stats = self.symbol_recognizer.cache_stats()
+        if stats is not None:
+            results['symbol_cache'] = stats
+            self.symbol_recognizer.save_cache()
+
+    def _store_results(self, results, filepath, version, profiler):
+        """Ruan simbolet dhe tekstin në magazinën e rezultateve, nëse është dhënë"""
+        if self.result_store is None:
+            return
+        try:
+            with profiler.stage('result_store'):
+                self.result_store.store_results(results, filepath, version)
+        except Exception as e:
+            print(f"Result store error: {e}")
+
+    def _run(self, filepath, options, profiler, page_callback=None, cancel_token=None):
+        """Ekzekuton të gjithë hapat e analizës"""
+        page_count = self.doc_processor.page_count(filepath) if hasattr(self.doc_processor, 'page_count') else 1
+        if page_count > 1:
+            return self._run_pages(filepath, options, profiler, page_count, page_callback, cancel_token)
+
+        stage = load_stage(filepath)
+        profiler.plan([stage] + self._planned_stages(filepath, options))
+
+        def read_document():
+            with profiler.stage(stage, "Duke lexuar dokumentin...", file=os.path.basename(filepath)):
+                return self.doc_processor.process_file(filepath)
+
+        # Leximi është varësia e çdo hapi tjetër; grafi i jep afatin dhe anulimin
+        graph = StageGraph(cancel_token, self.stage_timeouts).add(stage, read_document)
+        processed_data = graph.run()[stage]
+
+        symbols, text_data, bom_data, pipes = self.analyze_processed(processed_data, options, profiler,
+                                                                     cancel_token)
+
+        return {
+            'symbols': symbols,
+            'text': text_data,
+            'bom': bom_data,
+            'pipes': pipes,
+            'file': filepath,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def _planned_stages(self, filepath, options):
+        """Hapat pas leximit që pritet të ekzekutohen për këtë skedar dhe këto opsione"""
+        if load_stage(filepath) == 'dxf_read':
+            stages = []
+        elif hasattr(self.doc_processor, 'should_tile') and self.doc_processor.should_tile(filepath):
+            stages = ['tiles']
+        else:
+            stages = [stage for stage, option in (('symbol_detection', 'detect_symbols'),
+                                                  ('ocr', 'extract_text')) if options[option]]
+        if options['pipe_lengths'] and load_stage(filepath) != 'dxf_read':
+            stages.append('pipes')
+        if options['generate_bom']:
+            stages.append('bom')
+        return stages
+
+    def _run_pages(self, filepath, options, profiler, page_count, page_callback=None, cancel_token=None):
+        """Analizon një PDF me shumë faqe; faqet vijnë me radhë sapo përfundojnë"""
+        symbols, text_data, bom_data, pipes, pages = [], [], [], [], []
+        # Çdo faqe është një njësi pune: render + zbulim + OCR + BOM
+        profiler.plan(['page'], units=page_count)
+        profiler.advance(0, page_count, "Duke filluar procesimin e faqeve...", stage='page')
+
+        for page_result in self.iter_page_results(filepath, options, page_count=page_count,
+                                                  cancel_token=cancel_token):
+            profiler.merge(page_result.pop('trace', []))
+            symbols.extend(page_result['symbols'])
+            text_data.extend(page_result['text'])
+            bom_data.extend(page_result['bom'])
+            pipes.extend(page_result['pipes'])
+            pages.append({
+                'page': page_result['page'],
+                'width': page_result['width'],
+                'height': page_result['height'],
+                'symbols': len(page_result['symbols']),
+                'text': len(page_result['text']),
+                'bom': len(page_result['bom']),
+                'pipes': len(page_result['pipes']),
+            })
+            if page_callback:
+                page_callback(page_result)
+            profiler.complete_units(1, f"Faqja {len(pages)}/{page_count} u analizua")
+            check_cancelled(cancel_token)
+
+        return {
+            'symbols': symbols,
+            'text': text_data,
+            'bom': bom_data,
+            'pipes': pipes,
+            'pages': pages,
+            'page_count': page_count,
+            'file': filepath,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def analyze_processed(self, processed_data, options, profiler=None, cancel_token=None):
+        """Zbulim simbolesh, OCR, linjat e tubave dhe BOM mbi të dhënat e një faqeje
+
+        Zbulimi dhe OCR varen vetëm nga processed_data, ndaj ekzekutohen
+        njëkohësisht; tubat presin simbolet dhe BOM pret të gjitha.
+        Kthen (symbols, text, bom, pipes).
+        """
+        profiler = profiler or StageProfiler(trace_memory=False)
+        graph = StageGraph(cancel_token, self.stage_timeouts)
+        if not options.get('pdf_text_layer', True) and processed_data.get('text_layer') is not None:
+            processed_data = dict(processed_data, text_layer=None, raster_regions=[])
+        # Vijat gjurmohen vetëm në raster (jo në DXF)
+        tracing = options['pipe_lengths'] and (processed_data.get('tiled') or
+                                               processed_data.get('image') is not None)
+
+        if processed_data.get('tiled'):
+            graph.add('tiles', lambda: self._analyze_tiled(processed_data, options, profiler, cancel_token))
+            sources = ('tiles',)
+            if tracing:
+                graph.add('pipes', lambda tiles: self._pipe_network(processed_data, tiles[0], options, profiler,
+                                                                    segments=tiles[2]), deps=('tiles',))
+        else:
+            graph.add('symbol_detection', lambda: self._detect_symbols(processed_data, options, profiler))
+            graph.add('ocr', lambda: self._extract_text(processed_data, options, profiler))
+            sources = ('symbol_detection', 'ocr')
+            if tracing:
+                graph.add('pipes', lambda symbol_detection: self._pipe_network(processed_data, symbol_detection,
+                                                                               options, profiler),
+                          deps=('symbol_detection',))
+
+        if options['generate_bom']:
+            graph.add('bom', lambda **found: self._generate_bom(*_elements(found), found.get('pipes'), profiler),
+                      deps=sources + (('pipes',) if tracing else ()))
+
+        stage_results = graph.run()
+        symbols, text_data = _elements(stage_results)
+        return symbols, text_data, stage_results.get('bom', []), stage_results.get('pipes', [])
+
+    def _detect_symbols(self, processed_data, options, profiler):
+        if not options['detect_symbols']:
+            return []
+        if processed_data.get('vector'):
+            # DXF: simbolet vijnë drejtpërdrejt nga entitetet
+            return list(processed_data['drawing'].symbols)
+        with profiler.stage('symbol_detection', "Duke zbuluar simbolet..."):
+            return self.symbol_recognizer.detect_symbols(processed_data)
+
+    def _extract_text(self, processed_data, options, profiler):
+        if not options['extract_text']:
+            return []
+        if processed_data.get('vector'):
+            return list(processed_data['drawing'].text)
+        if processed_data.get('text_layer') is not None:
+            # PDF me tekst të ngulitur: OCR vetëm për imazhet raster brenda faqes
+            with profiler.stage('ocr', "Duke lexuar tekstin e PDF...", source='text_layer',
+                                raster_regions=len(processed_data.get('raster_regions') or [])):
+                return self.symbol_recognizer.extract_text(processed_data)
+        with profiler.stage('ocr', "Duke ekstraktuar tekstin..."):
+            return self.symbol_recognizer.extract_text(processed_data)
+
+    def _pipe_network(self, processed_data, symbols, options, profiler, segments=None):
+        with profiler.stage('pipes', "Duke gjurmuar linjat e tubave...", symbols=len(symbols)):
+            return self.trace_pipes(processed_data.get('image'), symbols, options, dpi=processed_data.get('dpi'),
+                                    segments=segments)
+
+    def trace_pipes(self, image, symbols, options, dpi=None, segments=None):
+        """Linjat e tubave të një faqeje (line_network), me dpi për konvertimin e gjatësisë
+
+        Segmentet e gatshme (nga pllakat, në koordinata faqeje) vetëm bashkohen;
+        përndryshe gjenden në image, pa kutitë e simboleve.
+        """
+        from modules.line_network import build_runs, detect_segments, merge_segments
+
+        if segments is None:
+            segments = detect_segments(image, symbols)
+        runs = build_runs(merge_segments(segments), symbols, require_symbols=options['detect_symbols'])
+        for run in runs:
+            run['dpi'] = dpi
+        return runs
+
+    def _generate_bom(self, symbols, text_data, pipes, profiler):
+        with profiler.stage('bom', "Duke gjeneruar BOM...", symbols=len(symbols), text=len(text_data)):
+            if pipes is None:
+                return self.output_generator.generate_bom(symbols, text_data)
+            return self.output_generator.generate_bom(symbols, text_data, pipes)
+
+    def analyze_page(self, filepath, page, options=None, trace_memory=None, cancel_token=None):
+        """Analizon një faqe të vetme; çdo element etiketohet me numrin e faqes
+
+        Eventet e kohës së hapave kthehen në 'trace' (bashkohen te profiler-i i analizës).
+        """
+        options = merge_options(options)
+        profiler = StageProfiler(trace_memory=self.trace_memory if trace_memory is None else trace_memory)
+        try:
+            with profiler.stage('page', page=page):
+                with profiler.stage(load_stage(filepath), page=page):
+                    processed_data = self.doc_processor.process_file(filepath, page=page)
+                width, height = processed_data.get('width'), processed_data.get('height')
+                symbols, text_data, bom_data, pipes = self.analyze_processed(processed_data, options, profiler,
+                                                                             cancel_token)
+                del processed_data
+        finally:
+            profiler.close()
+
+        return {
+            'page': page,
+            'width': width,
+            'height': height,
+            'symbols': [dict(item, page=page) for item in symbols],
+            'text': [dict(item, page=page) for item in text_data],
+            'bom': [dict(item, page=page) for item in bom_data],
+            'pipes': [dict(item, page=page) for item in pipes],
+            'trace': profiler.events,
+        }
+
+    def iter_page_results(self, filepath, options=None, page_count=None, workers=None, cancel_token=None):
+        """Generator që kthen rezultatet e faqeve sipas radhës
+
+        Faqet renderohen vetëm kur i vjen radha (secili worker renderon faqen e vet),
+        dhe në ekzekutim mbahen të shumtën 2 × workers faqe, kështu që faqet e para
+        janë gati para se të renderohet e fundit. Kur gjeneratori mbyllet
+        (p.sh. pas anulimit) faqet që s'kanë nisur hiqen nga radha.
+        """
+        options = merge_options(options)
+        workers = self.page_workers if workers is None else workers
+        if page_count is None:
+            page_count = self.doc_processor.page_count(filepath)
+
+        if workers <= 1 or page_count <= 1:
+            for page in range(page_count):
+                check_cancelled(cancel_token)
+                yield self.analyze_page(filepath, page, options, cancel_token=cancel_token)
+            return
+
+        from collections import deque
+        from concurrent.futures import ProcessPoolExecutor
+
+        window = deque()
+        pages = iter(range(page_count))
+        # Worker-at marrin procesorët e konfiguruar (biblioteka, pragu, gjuha e OCR, kaskada), jo ata të parazgjedhur
+        with ProcessPoolExecutor(max_workers=min(workers, page_count), initializer=_init_page_worker,
+                                 initargs=(self.doc_processor, self.symbol_recognizer, self.output_generator,
+                                           self.stage_timeouts, self.trace_memory)) as pool:
+            for page in pages:
+                window.append(pool.submit(_analyze_page_task, filepath, page, options))
+                if len(window) >= 2 * workers:
+                    break
+
+            try:
+                while window:
+                    result = window.popleft().result()
+                    check_cancelled(cancel_token)
+                    next_page = next(pages, None)
+                    if next_page is not None:
+                        window.append(pool.submit(_analyze_page_task, filepath, next_page, options))
+                    yield result
+            finally:
+                for future in window:
+                    future.cancel()
+
+    def _analyze_tiled(self, processed_data, options, profiler, cancel_token=None):
+        """Analizon një faqe të madhe pllakë pas pllake"""
+        from modules.tiling import DEFAULT_TILE_OVERLAP, DEFAULT_TILE_SIZE, TiledAnalyzer
+
+        source = processed_data['tile_source']
+        text_layer = processed_data.get('text_layer')
+        raster_regions = processed_data.get('raster_regions') or []
+        extract_text = options['extract_text']
+        if text_layer is not None:
+            # Pllakat bëjnë OCR vetëm nëse faqja ka imazhe raster pa shtresë teksti
+            extract_text = extract_text and bool(raster_regions)
+        analyzer = TiledAnalyzer(self.symbol_recognizer,
+                                 tile_size=getattr(self.doc_processor, 'tile_size', DEFAULT_TILE_SIZE),
+                                 overlap=getattr(self.doc_processor, 'tile_overlap', DEFAULT_TILE_OVERLAP),
+                                 workers=self.tile_workers)
+
+        def on_tile(done, total):
+            check_cancelled(cancel_token)
+            profiler.advance(done, total, f"Duke analizuar pllakat ({done}/{total})...")
+
+        try:
+            with profiler.stage('tiles', "Duke analizuar pllakat...", width=source.width, height=source.height):
+                symbols, text_data, segments = analyzer.analyze(source,
+                                                                detect_symbols=options['detect_symbols'],
+                                                                extract_text=extract_text,
+                                                                extract_lines=options['pipe_lengths'],
+                                                                progress_callback=on_tile,
+                                                                profiler=profiler)
+            if text_layer is not None and options['extract_text']:
+                from modules.symbol_recognizer import combine_text_layer
+
+                text_data = combine_text_layer(text_layer, text_data, raster_regions)
+            return symbols, text_data, segments
+        finally:
+            source.close()
+
+
+def _elements(stage_results):
+    """(symbols, text) nga rezultatet e grafit: nga 'tiles' ose nga hapat e veçantë"""
+    if 'tiles' in stage_results:
+        return stage_results['tiles'][:2]
+    return stage_results['symbol_detection'], stage_results['ocr']
+
+
+# Pipeline-i i çdo procesi worker për faqet, krijohet një herë në initializer
+_page_pipeline = None
+
+
+def _init_page_worker(doc_processor, symbol_recognizer, output_generator, stage_timeouts=None, trace_memory=False):
+    """Inicializon pipeline-in një herë për çdo proces worker të faqeve me procesorët e thirrësit"""
+    global _page_pipeline
+    _page_pipeline = AnalysisPipeline(doc_processor, symbol_recognizer, output_generator, page_workers=1,
+                                      stage_timeouts=stage_timeouts, trace_memory=trace_memory)
+
+
+def _analyze_page_task(filepath, page, options):
+    """Renderon dhe analizon një faqe brenda worker-it"""
+    return _page_pipeline.analyze_page(filepath, page, options)
@@ -0,0 +1,242 @@
+"""
+Preview Pyramid
+Piramidë imazhi me shumë rezolucione për preview me zoom dhe pan
+
+Piramida ndërtohet një herë për skedar; canvas-i kërkon vetëm pllakat që
+shihen në ekran, në nivelin që i përshtatet zoom-it aktual.
+"""
+
+import math
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+PYRAMID_TILE_SIZE = 256
+PDF_BASE_DPI = 300
+
+# Sa pllaka mbahen në memorie për çdo piramidë
+TILE_CACHE_SIZE = 256
+
+# Rreshta për bandë gjatë ndërtimit të niveleve (numër çift)
+BUILD_STRIP_ROWS = 1024
+
+
+_POOL_KERNEL = np.ones((2, 2), dtype=np.uint8)
+
+
+def _min_pool2(band):
+    """Zvogëlon 2x duke mbajtur pixelin më të errët, që vijat e holla të mos zhduken"""
+    # erode me kernel 2x2 (i vektorizuar në OpenCV) = minimumi i çdo blloku 2x2
+    eroded = cv2.erode(band, _POOL_KERNEL, anchor=(0, 0),
+                       borderType=cv2.BORDER_CONSTANT, borderValue=255)
+    return eroded[::2, ::2]
+
+
+class _TileCache:
+    """LRU i thjeshtë për pllakat e renderuara"""
+
+    def __init__(self, max_tiles=TILE_CACHE_SIZE):
+        self.max_tiles = max_tiles
+        self._tiles = OrderedDict()
+
+    def get(self, key):
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+        return tile
+
+    def put(self, key, tile):
+        self._tiles[key] = tile
+        self._tiles.move_to_end(key)
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+
+    def clear(self):
+        self._tiles.clear()
+
+
+class BasePyramid:
+    """Logjika e përbashkët: nivelet, zgjedhja e nivelit dhe pllakat e dukshme"""
+
+    def __init__(self, width, height, tile_size=PYRAMID_TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.level_count = 1
+        while max(self.level_size(self.level_count - 1)) > tile_size:
+            self.level_count += 1
+        self._cache = _TileCache()
+
+    def level_size(self, level):
+        """Madhësia (w, h) e një niveli; niveli 0 është rezolucioni i plotë"""
+        factor = 2 ** level
+        return max(1, math.ceil(self.width / factor)), max(1, math.ceil(self.height / factor))
+
+    def level_for_scale(self, scale):
+        """Niveli më i vogël që ka ende të paktën aq pixel sa ekrani"""
+        if scale >= 1.0:
+            return 0
+        level = int(math.floor(math.log2(1.0 / scale)))
+        return max(0, min(level, self.level_count - 1))
+
+    def visible_tiles(self, level, x0, y0, x1, y1):
+        """Pllakat (tx, ty) që prekin drejtkëndëshin në koordinatat e nivelit"""
+        level_w, level_h = self.level_size(level)
+        ts = self.tile_size
+        tx0, ty0 = max(0, int(x0 // ts)), max(0, int(y0 // ts))
+        tx1 = min(int(math.ceil(level_w / ts)), int(math.ceil(x1 / ts)))
+        ty1 = min(int(math.ceil(level_h / ts)), int(math.ceil(y1 / ts)))
+        return [(tx, ty) for ty in range(ty0, ty1) for tx in range(tx0, tx1)]
+
+    def tile_bounds(self, level, tx, ty):
+        """Drejtkëndëshi (x0, y0, x1, y1) i pllakës në koordinatat e nivelit"""
+        level_w, level_h = self.level_size(level)
+        ts = self.tile_size
+        return tx * ts, ty * ts, min((tx + 1) * ts, level_w), min((ty + 1) * ts, level_h)
+
+    def get_tile(self, level, tx, ty):
+        """Kthen pllakën RGB (nga cache nëse ekziston)"""
+        key = (level, tx, ty)
+        tile = self._cache.get(key)
+        if tile is None:
+            tile = self._render_tile(level, *self.tile_bounds(level, tx, ty))
+            self._cache.put(key, tile)
+        return tile
+
+    def overview(self, max_size=800):
+        """Imazh i plotë i vogël (niveli i parë që hyn në max_size)"""
+        level = 0
+        while level < self.level_count - 1 and max(self.level_size(level)) > max_size:
+            level += 1
+        level_w, level_h = self.level_size(level)
+        return self._render_tile(level, 0, 0, level_w, level_h)
+
+    def _render_tile(self, level, x0, y0, x1, y1):
+        raise NotImplementedError
+
+    def close(self):
+        self._cache.clear()
+
+
+class RasterPyramid(BasePyramid):
+    """Piramidë për imazhe raster; nivelet ruhen si memmap në një dosje të përkohshme"""
+
+    def __init__(self, filepath=None, image=None, tile_size=PYRAMID_TILE_SIZE, cache_dir=None):
+        if image is None:
+            image = cv2.imread(filepath, cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError("Could not load image")
+            cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+        elif image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+
+        super().__init__(image.shape[1], image.shape[0], tile_size)
+        self.filepath = filepath
+        self._dir = tempfile.mkdtemp(prefix='pyramid_', dir=cache_dir)
+        self._levels = []
+
+        base = self._new_level(0, image.shape)
+        base[:] = image
+        del image
+        self._levels.append(base)
+
+        for level in range(1, self.level_count):
+            level_w, level_h = self.level_size(level)
+            self._levels.append(self._build_level(self._levels[-1], level, (level_h, level_w, 3)))
+
+    def _new_level(self, level, shape):
+        path = os.path.join(self._dir, f'level_{level}.raw')
+        return np.memmap(path, dtype=np.uint8, mode='w+', shape=shape)
+
+    def _build_level(self, source, level, shape):
+        """Ndërton nivelin në banda, pa ngarkuar nivelin e mëparshëm të tërin"""
+        target = self._new_level(level, shape)
+        for y in range(0, source.shape[0], BUILD_STRIP_ROWS):
+            reduced = _min_pool2(np.asarray(source[y:y + BUILD_STRIP_ROWS]))
+            ty = y // 2
+            target[ty:ty + reduced.shape[0], :reduced.shape[1]] = reduced[:shape[0] - ty, :shape[1]]
+        target.flush()
+        return target
+
+    def _render_tile(self, level, x0, y0, x1, y1):
+        return np.ascontiguousarray(self._levels[level][y0:y1, x0:x1])
+
+    def close(self):
+        super().close()
+        self._levels = []
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+
+class PdfPyramid(BasePyramid):
+    """Piramidë për PDF; çdo pllakë renderohet drejtpërdrejt me PyMuPDF në nivelin e kërkuar"""
+
+    def __init__(self, filepath, page=0, dpi=PDF_BASE_DPI, tile_size=PYRAMID_TILE_SIZE):
+        import fitz
+
+        self.filepath = filepath
+        self.page_number = page
+        self.zoom = dpi / 72.0
+        self._doc = fitz.open(filepath)
+        self._page = self._doc[page]
+        rect = self._page.rect
+        super().__init__(int(math.ceil(rect.width * self.zoom)), int(math.ceil(rect.height * self.zoom)),
+                         tile_size)
+
+    def _render_tile(self, level, x0, y0, x1, y1):
+        import fitz
+
+        zoom = self.zoom / (2 ** level)
+        clip = fitz.Rect(x0 / zoom, y0 / zoom, x1 / zoom, y1 / zoom)
+        pix = self._page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+        tile = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
+        tile = cv2.cvtColor(tile, cv2.COLOR_GRAY2RGB) if pix.n == 1 else tile[:, :, :3]
+        # Rrumbullakimi i PyMuPDF mund të japë një pixel më shumë/më pak
+        return np.ascontiguousarray(cv2.resize(tile, (x1 - x0, y1 - y0))
+                                    if tile.shape[:2] != (y1 - y0, x1 - x0) else tile)
+
+    def close(self):
+        super().close()
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+
+def build_pyramid(filepath, page=0):
+    """Krijon piramidën e duhur për llojin e skedarit"""
+    if Path(filepath).suffix.lower() == '.pdf':
+        return PdfPyramid(filepath, page=page)
+    return RasterPyramid(filepath)
+
+
+class PyramidCache:
+    """Mban piramidat e skedarëve të hapur së fundmi, që të mos rindërtohen"""
+
+    def __init__(self, max_items=2):
+        self.max_items = max_items
+        self._items = OrderedDict()
+
+    def get(self, filepath, page=0):
+        """Kthen piramidën e skedarit, duke e ndërtuar vetëm herën e parë"""
+        stat = os.stat(filepath)
+        key = (os.path.abspath(filepath), page, stat.st_size, stat.st_mtime)
+
+        pyramid = self._items.get(key)
+        if pyramid is None:
+            pyramid = build_pyramid(filepath, page=page)
+            self._items[key] = pyramid
+        self._items.move_to_end(key)
+
+        while len(self._items) > self.max_items:
+            _, old = self._items.popitem(last=False)
+            old.close()
+        return pyramid
+
+    def clear(self):
+        for pyramid in self._items.values():
+            pyramid.close()
+        self._items.clear()
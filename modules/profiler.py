@@ -0,0 +1,283 @@
+"""
+Stage Profiler
+Mat kohën (wall/CPU) dhe memorien maksimale të çdo hapi të analizës
+
+Çdo hap (decode, pdf_render, symbol_detection, ocr, bom, ...) regjistrohet si
+event që mund të eksportohet si JSON ose Chrome trace (chrome://tracing,
+Perfetto). Progresi i analizës llogaritet nga hapat e përfunduar, me pesha
+nga kohët mesatare të matura në ekzekutimet e mëparshme.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Pesha (ms tipike) e hapave kur baza nuk ka ende matje
+DEFAULT_STAGE_WEIGHTS = {
+    'decode': 300.0,
+    'pdf_render': 400.0,
+    'dxf_read': 500.0,
+    'open_tiles': 500.0,
+    'symbol_detection': 800.0,
+    'ocr': 3000.0,
+    'tiles': 8000.0,
+    'page': 4000.0,
+    'pipes': 400.0,
+    'bom': 50.0,
+}
+
+# tracemalloc është global për procesin: niset nga profiler-i i parë që e kërkon dhe ndalet
+# kur mbyllet i fundit, që një analizë të mos e ndalë gjurmimin e një analize tjetër
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+# Hapat e gjurmuar që po ekzekutohen në të gjitha thread-et e procesit
+_traced_stages = 0
+
+# Progresi mbahet nën 100 deri sa analiza të mbarojë vërtet
+MAX_RUNNING_PROGRESS = 99
+
+
+def peak_rss_mb():
+    """Memoria maksimale e procesit (RSS) deri tani, në MB; None nëse nuk dihet"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux e jep në KB, macOS në bytes
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+class StageProfiler:
+    """Regjistron hapat e një ekzekutimi dhe raporton progresin prej tyre"""
+
+    def __init__(self, name='analysis', trace_memory=False, weights=None, progress_callback=None):
+        self.name = name
+        self.trace_memory = trace_memory
+        self.weights = dict(DEFAULT_STAGE_WEIGHTS)
+        if weights:
+            self.weights.update({stage: value for stage, value in weights.items() if value and value > 0})
+        self.progress_callback = progress_callback
+        self.events = []
+        self.started_at = time.time()
+        self._clock_origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        self._planned = []
+        self._units = 1
+        self._done_weight = 0.0
+        self._current_fraction = 0.0
+        self._last_progress = 0
+
+        # tracemalloc e ngadalëson çdo alokim, ndaj aktivizohet vetëm kur kërkohet (benchmark --memory)
+        self._uses_tracemalloc = False
+        if trace_memory:
+            global _tracemalloc_users
+            with _tracemalloc_lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                _tracemalloc_users += 1
+            self._uses_tracemalloc = True
+
+    def _now_us(self):
+        """Koha absolute në mikrosekonda (e krahasueshme mes proceseve)"""
+        return (self.started_at + (time.perf_counter() - self._clock_origin)) * 1e6
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    # Progresi
+
+    def plan(self, stages, units=1):
+        """Deklaron hapat kryesorë që pritet të ekzekutohen (units herë, p.sh. për faqe)"""
+        self._planned = list(stages)
+        self._units = max(1, units)
+        self._done_weight = 0.0
+        self._current_fraction = 0.0
+
+    def _total_weight(self):
+        return sum(self.weights.get(stage, 1.0) for stage in self._planned) * self._units
+
+    def _report(self, message):
+        if not self.progress_callback or not self._planned:
+            return
+        # Hapat e pavarur mund të raportojnë njëkohësisht nga thread-e të ndryshme
+        with self._lock:
+            total = self._total_weight()
+            progress = 100.0 * (self._done_weight + self._current_fraction) / total if total else 0.0
+            # Progresi nuk kthehet kurrë mbrapa
+            self._last_progress = max(self._last_progress, min(MAX_RUNNING_PROGRESS, int(progress)))
+            progress = self._last_progress
+        self.progress_callback(message, progress)
+
+    def advance(self, done, total, message=None, stage=None):
+        """Progresi brenda hapit aktual (p.sh. pllakat ose faqet e përfunduara)"""
+        stack = self._stack()
+        stage = stage or (stack[0]['name'] if stack else None)
+        weight = self.weights.get(stage, 1.0)
+        with self._lock:
+            self._current_fraction = weight * min(1.0, done / total) if total else 0.0
+        self._report(message or f"{stage} ({done}/{total})")
+
+    def complete_units(self, count=1, message=None):
+        """Shënon si të përfunduara count njësi të plota (p.sh. faqe të analizuara në worker)"""
+        with self._lock:
+            self._done_weight += count * sum(self.weights.get(stage, 1.0) for stage in self._planned)
+            self._current_fraction = 0.0
+        self._report(message)
+
+    def finish(self, message="Procesimi përfundoi me sukses!"):
+        """Raporton 100% në fund të ekzekutimit"""
+        if self.progress_callback:
+            self.progress_callback(message, 100)
+        self._last_progress = 100
+
+    # Matja
+
+    @contextmanager
+    def stage(self, name, message=None, **args):
+        """Mat një hap; hapat mund të jenë të mbivendosur (p.sh. ocr brenda tiles)"""
+        stack = self._stack()
+        top_level = not stack
+        if top_level and message:
+            self._report(message)
+
+        global _traced_stages
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            with _tracemalloc_lock:
+                current, peak = tracemalloc.get_traced_memory()
+                if stack:
+                    stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak)
+                # Peak-u është i gjithë procesit: nuk rivendoset kur një hap tjetër (thread ose
+                # analizë paralele) po matet, kështu që peak-u i tij nuk humbet; hapat
+                # njëkohës raportojnë maksimumin e përbashkët
+                if _traced_stages == len(stack):
+                    tracemalloc.reset_peak()
+                _traced_stages += 1
+        else:
+            current = 0
+
+        frame = {'name': name, 'child_peak': 0, 'mem_start': current}
+        stack.append(frame)
+        start_us = self._now_us()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield frame
+        finally:
+            wall_ms = (time.perf_counter() - wall_start) * 1000.0
+            cpu_ms = (time.process_time() - cpu_start) * 1000.0
+            stack.pop()
+
+            peak_bytes = None
+            if tracing:
+                with _tracemalloc_lock:
+                    _traced_stages -= 1
+                    _, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame['child_peak'])
+                peak_bytes = max(0, peak - frame['mem_start'])
+                if stack:
+                    stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak)
+
+            event = {
+                'name': name,
+                'ts': start_us,
+                'wall_ms': round(wall_ms, 3),
+                'cpu_ms': round(cpu_ms, 3),
+                'peak_mem_mb': round(peak_bytes / (1024 * 1024), 3) if peak_bytes is not None else None,
+                'depth': len(stack),
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': args,
+            }
+            with self._lock:
+                self.events.append(event)
+
+            if top_level and name in self._planned:
+                with self._lock:
+                    self._done_weight += self.weights.get(name, 1.0)
+                    self._current_fraction = 0.0
+                self._report(message or name)
+
+    def merge(self, events):
+        """Shton eventet e një profiler-i tjetër (p.sh. nga procesi worker i një faqeje)"""
+        with self._lock:
+            self.events.extend(events)
+
+    def close(self):
+        """Liron tracemalloc; ndalet vetëm kur nuk e përdor më asnjë profiler tjetër"""
+        global _tracemalloc_users
+        if not self._uses_tracemalloc:
+            return
+        self._uses_tracemalloc = False
+        with _tracemalloc_lock:
+            _tracemalloc_users -= 1
+            if _tracemalloc_users == 0 and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    # Eksporti
+
+    def wall_ms(self):
+        """Kohëzgjatja totale e ekzekutimit deri tani"""
+        return round((time.perf_counter() - self._clock_origin) * 1000.0, 3)
+
+    def summary(self):
+        """Totalet për çdo hap: numri, wall, CPU dhe memoria maksimale"""
+        stages = {}
+        for event in self.events:
+            entry = stages.setdefault(event['name'], {'count': 0, 'wall_ms': 0.0, 'cpu_ms': 0.0,
+                                                      'peak_mem_mb': None})
+            entry['count'] += 1
+            entry['wall_ms'] = round(entry['wall_ms'] + event['wall_ms'], 3)
+            entry['cpu_ms'] = round(entry['cpu_ms'] + event['cpu_ms'], 3)
+            if event.get('peak_mem_mb') is not None:
+                entry['peak_mem_mb'] = max(entry['peak_mem_mb'] or 0.0, event['peak_mem_mb'])
+        return {
+            'name': self.name,
+            'wall_ms': self.wall_ms(),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': stages,
+        }
+
+    def to_dict(self):
+        """Trace i plotë si dict (për JSON)"""
+        return {'name': self.name, 'started_at': self.started_at, 'summary': self.summary(),
+                'events': list(self.events)}
+
+    def to_chrome_trace(self):
+        """Trace në formatin e Chrome (chrome://tracing, Perfetto)"""
+        trace_events = []
+        for event in self.events:
+            args = dict(event.get('args') or {})
+            args.update({'cpu_ms': event['cpu_ms'], 'peak_mem_mb': event.get('peak_mem_mb')})
+            trace_events.append({
+                'name': event['name'],
+                'cat': self.name,
+                'ph': 'X',
+                'ts': round(event['ts'], 1),
+                'dur': round(event['wall_ms'] * 1000.0, 1),
+                'pid': event['pid'],
+                'tid': event['tid'],
+                'args': args,
+            })
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def save(self, filename, chrome=None):
+        """Ruan trace-in; formati Chrome zgjidhet për chrome=True ose skedarë *.trace.json"""
+        if chrome is None:
+            chrome = filename.endswith('.trace.json')
+        data = self.to_chrome_trace() if chrome else self.to_dict()
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1, default=str)
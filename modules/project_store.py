@@ -0,0 +1,389 @@
+"""
+Project Store
+Formati kompakt i projektit (.tdap) me kolona dhe lexim sipas nevojës
+
+Projekti është një arkiv zip: index.json mban metadatat (skedari, faqet,
+kohët, revizioni) dhe skemën e kolonave; simbolet, teksti dhe BOM ruhen si
+kolona të veçanta të kompresuara. Numrat ruhen si vargje numpy (.npy), tekstet
+me fjalor (kodet int32 + vlerat unike), ndërsa fushat e parregullta si rreshta
+JSON. Hapja e projektit lexon vetëm indeksin; kolonat lexohen kur kërkohen.
+JSON mbetet format importi/eksporti.
+"""
+
+import io
+import json
+import os
+import zipfile
+
+import numpy as np
+
+from modules.pipeline import json_default, save_results
+
+PROJECT_EXTENSION = '.tdap'
+PROJECT_FORMAT = 'tda-project'
+PROJECT_FORMAT_VERSION = 1
+INDEX_MEMBER = 'index.json'
+
+# Listat e elementeve që ruhen si kolona; pjesa tjetër e rezultateve shkon në indeks
+COLLECTIONS = ('symbols', 'text', 'bom')
+
+# Gjatësia maksimale e listave numerike (bbox, position) që ruhen si matricë
+MAX_VECTOR_LENGTH = 8
+
+COMPRESSION_LEVEL = 6
+
+
+def is_project_file(filename):
+    """A është skedari në formatin binar (sipas prapashtesës)"""
+    return str(filename).lower().endswith(PROJECT_EXTENSION)
+
+
+def _numeric_array(values):
+    """Vlerat si varg numpy numerik (1D ose matricë me rreshta të njëjtë), ose None"""
+    if not values or any(type(v) is str or v is None for v in values):
+        return None
+    try:
+        array = np.array(values)
+    except (ValueError, TypeError):
+        return None
+    # 'b' (bool) dhe 'O' (lista me gjatësi të ndryshme, dict) ruhen si JSON
+    if array.dtype.kind not in 'iuf':
+        return None
+    # NaN përdoret si shenjë për fushën që mungon
+    if array.dtype.kind == 'f' and np.isnan(array).any():
+        return None
+    if array.ndim == 1 or (array.ndim == 2 and array.shape[1] <= MAX_VECTOR_LENGTH):
+        return array
+    return None
+
+
+def _column_kind(values):
+    """Lloji i kolonës nga vlerat e pranishme: number, vector, string ose json"""
+    if values and all(type(v) is str for v in values):
+        return 'string', None
+    array = _numeric_array(values)
+    if array is None:
+        return 'json', None
+    return ('number' if array.ndim == 1 else 'vector'), array
+
+
+def _npy_bytes(array):
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _encode_column(items, key):
+    """Kodon fushën key të elementeve; kthen (skema, {emri i anëtarit: bajtet})"""
+    present = [i for i, item in enumerate(items) if key in item]
+    values = [items[i][key] for i in present]
+    kind, array = _column_kind(values)
+    spec = {'key': key, 'kind': kind}
+
+    if kind in ('number', 'vector'):
+        column = np.full((len(items),) + array.shape[1:], np.nan, dtype=np.float64)
+        column[present] = array
+        spec['integer'] = array.dtype.kind in 'iu'
+        # NaN në kolonë = fusha mungon në atë element
+        spec['missing'] = len(present) < len(items)
+        return spec, {f"{key}.npy": _npy_bytes(column)}
+
+    if kind == 'string':
+        unique = list(dict.fromkeys(values))
+        codes = {value: code for code, value in enumerate(unique)}
+        column = np.full(len(items), -1, dtype=np.int32)
+        column[present] = [codes[value] for value in values]
+        return spec, {f"{key}.npy": _npy_bytes(column),
+                      f"{key}.values.json": json.dumps(unique, ensure_ascii=False).encode('utf-8')}
+
+    # Fushat e parregullta: një rresht JSON për element ('-' = mungon)
+    lines = ['-'] * len(items)
+    for i, value in zip(present, values):
+        lines[i] = json.dumps(value, ensure_ascii=False, default=json_default)
+    return spec, {f"{key}.jsonl": '\n'.join(lines).encode('utf-8')}
+
+
+def _page_ranges(items):
+    """Rreshtat [start, stop) të çdo faqeje, nëse elementet janë të renditura sipas faqes"""
+    pages = _numeric_array([item.get('page') for item in items])
+    if pages is None or pages.ndim != 1 or pages.dtype.kind not in 'iu' or (np.diff(pages) < 0).any():
+        return None
+    values, starts, counts = np.unique(pages, return_index=True, return_counts=True)
+    return {str(page): [start, start + count]
+            for page, start, count in zip(values.tolist(), starts.tolist(), counts.tolist())}
+
+
+def save_project(results, filename):
+    """Ruan analysis_results: .tdap me kolona, çdo prapashtesë tjetër si JSON"""
+    if isinstance(results, LazyResults):
+        results = results.materialize()
+    if is_project_file(filename):
+        _save_columns(results, filename)
+    else:
+        save_results(results, filename)
+
+
+def _save_columns(results, filename):
+    """Shkruan arkivin .tdap (kolonat e kompresuara + indeksi)"""
+    index = {
+        'format': PROJECT_FORMAT,
+        'version': PROJECT_FORMAT_VERSION,
+        'metadata': {key: value for key, value in results.items() if key not in COLLECTIONS},
+        'collections': {},
+    }
+
+    tmp_path = f"{filename}.tmp"
+    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED,
+                         compresslevel=COMPRESSION_LEVEL) as archive:
+        for name in COLLECTIONS:
+            items = results.get(name)
+            if items is None:
+                continue
+            items = list(items)
+            keys = list(dict.fromkeys(key for item in items for key in item))
+            columns = []
+            for key in keys:
+                spec, members = _encode_column(items, key)
+                for member, payload in members.items():
+                    archive.writestr(f"{name}/{member}", payload)
+                columns.append(spec)
+            index['collections'][name] = {'count': len(items), 'columns': columns,
+                                          'pages': _page_ranges(items)}
+
+        archive.writestr(INDEX_MEMBER, json.dumps(index, ensure_ascii=False, default=json_default))
+    os.replace(tmp_path, filename)
+
+
+class ProjectReader:
+    """Lexon një projekt .tdap; kolonat ngarkohen vetëm kur kërkohen"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        with zipfile.ZipFile(filename) as archive:
+            index = json.loads(archive.read(INDEX_MEMBER).decode('utf-8'))
+        if index.get('format') != PROJECT_FORMAT or index.get('version') != PROJECT_FORMAT_VERSION:
+            raise ValueError(f"Format projekti i panjohur: {index.get('format')} v{index.get('version')}")
+        self.metadata = index['metadata']
+        self.collections = index['collections']
+        self._columns = {}
+
+    def count(self, collection):
+        """Numri i elementeve në koleksion (None nëse koleksioni nuk u ruajt)"""
+        entry = self.collections.get(collection)
+        return entry['count'] if entry else None
+
+    def keys(self, collection):
+        """Fushat e ruajtura të koleksionit"""
+        return [spec['key'] for spec in self.collections[collection]['columns']]
+
+    def page_rows(self, collection, page):
+        """Rreshtat [start, stop) të faqes, ose None kur nuk janë të renditura sipas faqes"""
+        pages = self.collections[collection].get('pages')
+        if pages is None:
+            return None
+        return tuple(pages.get(str(page), (0, 0)))
+
+    def kind(self, collection, key):
+        """Lloji i kolonës (number, vector, string, json), ose None nëse fusha mungon"""
+        for spec in self.collections.get(collection, {}).get('columns', []):
+            if spec['key'] == key:
+                return spec['kind']
+        return None
+
+    def _spec(self, collection, key):
+        for spec in self.collections[collection]['columns']:
+            if spec['key'] == key:
+                return spec
+        raise KeyError(f"{collection}/{key}")
+
+    def column(self, collection, key):
+        """Kolona e dekoduar: vargu numpy (number/vector), (kodet, vlerat) për string, lista për json"""
+        cache_key = (collection, key)
+        if cache_key not in self._columns:
+            kind = self._spec(collection, key)['kind']
+            prefix = f"{collection}/{key}"
+            with zipfile.ZipFile(self.filename) as archive:
+                if kind in ('number', 'vector'):
+                    column = np.load(io.BytesIO(archive.read(f"{prefix}.npy")), allow_pickle=False)
+                elif kind == 'string':
+                    codes = np.load(io.BytesIO(archive.read(f"{prefix}.npy")), allow_pickle=False)
+                    values = json.loads(archive.read(f"{prefix}.values.json").decode('utf-8'))
+                    column = (codes, values)
+                else:
+                    column = archive.read(f"{prefix}.jsonl").decode('utf-8').split('\n')
+            self._columns[cache_key] = column
+        return self._columns[cache_key]
+
+    def strings(self, collection, key, default=''):
+        """Kolona tekst si varg numpy (default për elementet pa këtë fushë)"""
+        codes, values = self.column(collection, key)
+        lookup = np.array(list(values) + [default], dtype=str)
+        return lookup[np.where(codes < 0, len(values), codes)]
+
+    def numbers(self, collection, key):
+        """Kolona numerike si float64 (NaN = mungon)"""
+        return np.asarray(self.column(collection, key), dtype=np.float64)
+
+    def items(self, collection, start=0, stop=None, page=None):
+        """Materializon elementet [start, stop) (ose të një faqeje) si dict-e"""
+        count = self.count(collection)
+        if count is None:
+            return []
+        if page is not None:
+            rows = self.page_rows(collection, page)
+            if rows is None:
+                pages = self.numbers(collection, 'page') if 'page' in self.keys(collection) else None
+                selected = np.flatnonzero(pages == page) if pages is not None else np.array([], dtype=np.int64)
+                return [self.items(collection, int(i), int(i) + 1)[0] for i in selected]
+            start, stop = rows
+        stop = count if stop is None else min(stop, count)
+        size = max(0, stop - start)
+        items = [{} for _ in range(size)]
+
+        for spec in self.collections[collection]['columns']:
+            key, kind = spec['key'], spec['kind']
+            column = self.column(collection, key)
+            if kind == 'number':
+                values = column[start:stop]
+                present = ~np.isnan(values) if spec.get('missing') else np.ones(size, dtype=bool)
+                values = np.where(present, values, 0).astype(np.int64) if spec['integer'] else values
+                for item, value, ok in zip(items, values.tolist(), present.tolist()):
+                    if ok:
+                        item[key] = value
+            elif kind == 'vector':
+                values = column[start:stop]
+                present = ~np.isnan(values).any(axis=1) if spec.get('missing') else np.ones(size, dtype=bool)
+                values = np.nan_to_num(values).astype(np.int64) if spec['integer'] else values
+                for item, value, ok in zip(items, values.tolist(), present.tolist()):
+                    if ok:
+                        item[key] = value
+            elif kind == 'string':
+                codes, lookup = column
+                for item, code in zip(items, codes[start:stop].tolist()):
+                    if code >= 0:
+                        item[key] = lookup[code]
+            else:
+                for item, line in zip(items, column[start:stop]):
+                    if line != '-':
+                        item[key] = json.loads(line)
+        return items
+
+    def results(self):
+        """Gjithë analysis_results si një LazyResults"""
+        return LazyResults(self)
+
+
+class LazyResults(dict):
+    """analysis_results i një projekti .tdap; listat e elementeve lexohen në aksesin e parë
+
+    Metadatat (skedari, faqet, kohët) janë të pranishme menjëherë; 'symbols',
+    'text' dhe 'bom' materializohen nga kolonat vetëm kur kërkohen.
+    """
+
+    def __init__(self, reader):
+        super().__init__(reader.metadata)
+        self.reader = reader
+        self.pending = {name for name in COLLECTIONS if reader.count(name) is not None}
+
+    def is_loaded(self, key):
+        """A janë materializuar elementet e koleksionit"""
+        return key not in self.pending
+
+    def _load(self, key):
+        if key in self.pending:
+            self.pending.discard(key)
+            dict.__setitem__(self, key, self.reader.items(key))
+
+    def _load_all(self):
+        for key in list(self.pending):
+            self._load(key)
+
+    def __getitem__(self, key):
+        self._load(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._load(key)
+        return super().get(key, default)
+
+    def __setitem__(self, key, value):
+        self.pending.discard(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.pending.discard(key)
+        super().__delitem__(key)
+
+    def pop(self, key, *default):
+        self._load(key)
+        return super().pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        self._load(key)
+        return super().setdefault(key, default)
+
+    def __contains__(self, key):
+        return key in self.pending or super().__contains__(key)
+
+    def __len__(self):
+        return len(set(super().keys()) | self.pending)
+
+    def __iter__(self):
+        self._load_all()
+        return super().__iter__()
+
+    def keys(self):
+        self._load_all()
+        return super().keys()
+
+    def values(self):
+        self._load_all()
+        return super().values()
+
+    def items(self):
+        self._load_all()
+        return super().items()
+
+    def __eq__(self, other):
+        self._load_all()
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def materialize(self):
+        """Kopje e plotë si dict i zakonshëm (p.sh. për eksport JSON)"""
+        self._load_all()
+        return dict(super().items())
+
+    copy = materialize
+
+
+def load_project(filename):
+    """Hap një projekt: .tdap me lexim sipas nevojës, çdo gjë tjetër si JSON"""
+    if is_project_file(filename):
+        return ProjectReader(filename).results()
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def convert_project(source, target):
+    """Konverton mes JSON dhe .tdap sipas prapashtesës së target"""
+    save_project(load_project(source), target)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Konverton projektet mes JSON dhe .tdap")
+    parser.add_argument('source', help="Projekti burim (.json ose .tdap)")
+    parser.add_argument('target', help="Projekti i ri; formati sipas prapashtesës")
+    args = parser.parse_args(argv)
+
+    convert_project(args.source, args.target)
+    source_size, target_size = os.path.getsize(args.source), os.path.getsize(args.target)
+    print(f"{args.source} ({source_size / 1024:.1f} KB) -> {args.target} ({target_size / 1024:.1f} KB)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
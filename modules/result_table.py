@@ -0,0 +1,244 @@
+"""
+Result Table
+Tabelë me kolona numpy për pamjet e rezultateve dhe të BOM
+
+Rreshtat mbahen si kolona (jo si elemente Treeview); filtrimi dhe renditja
+bëhen mbi kolonat, dhe pamja e interface-it materializon vetëm rreshtat e
+dritares së dukshme, kështu që edhe 30k+ elemente hapen menjëherë.
+"""
+
+import math
+
+import numpy as np
+
+# Kolonat: (çelësi, lloji, formati i shfaqjes); 'number' ruhet si float (NaN = bosh)
+RESULT_COLUMNS = (
+    ('category', 'text', None),
+    ('type', 'text', None),
+    ('value', 'text', None),
+    ('confidence', 'number', '{:.1f}%'),
+    ('page', 'number', '{:.0f}'),
+)
+
+BOM_COLUMNS = (
+    ('item', 'number', '{:.0f}'),
+    # Gjatësitë e tubave janë në metra me dy shifra dhjetore
+    ('quantity', 'number', '{:g}'),
+    ('unit', 'text', None),
+    ('description', 'text', None),
+    ('size', 'text', None),
+    ('material', 'text', None),
+    ('cost', 'text', None),
+)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _row_columns(columns, rows):
+    """Rreshtat (tuple) si kolona numpy"""
+    data = {}
+    for position, (name, kind, _) in enumerate(columns):
+        values = [row[position] for row in rows]
+        if kind == 'number':
+            data[name] = np.array([_number(v) for v in values], dtype=np.float64)
+        else:
+            data[name] = np.array(['' if v is None else str(v) for v in values], dtype=str)
+    return data
+
+
+def _concat_columns(columns, parts):
+    """Bashkon pjesët (dict kolonash) me radhë"""
+    data = {}
+    for name, kind, _ in columns:
+        arrays = [part[name] for part in parts]
+        if kind == 'number':
+            data[name] = np.concatenate(arrays).astype(np.float64) if arrays else np.array([], dtype=np.float64)
+        else:
+            data[name] = np.concatenate(arrays).astype(str) if arrays else np.array([], dtype=str)
+    return data
+
+
+def _project_part(analysis_results, collection, category, type_key, value_key):
+    """Kolonat e tabelës direkt nga kolonat e një projekti .tdap të pa-materializuar
+
+    Kthen None kur elementet janë ngarkuar tashmë ose kolonat nuk kanë llojin e pritur.
+    """
+    reader = getattr(analysis_results, 'reader', None)
+    if reader is None or analysis_results.is_loaded(collection):
+        return None
+    count = reader.count(collection)
+    kinds = {key: reader.kind(collection, key) for key in (type_key, value_key, 'confidence', 'page')
+             if key is not None}
+    if any(kind not in (None, expected) for kind, expected in (
+            (kinds.get(type_key), 'string'), (kinds[value_key], 'string'),
+            (kinds['confidence'], 'number'), (kinds['page'], 'number'))):
+        return None
+
+    def text(key):
+        if kinds.get(key) is None:
+            return np.full(count, 'N/A')
+        return reader.strings(collection, key, default='N/A')
+
+    def number(key):
+        if kinds[key] is None:
+            return np.full(count, np.nan)
+        return reader.numbers(collection, key)
+
+    return {
+        'category': np.full(count, category),
+        'type': text(type_key) if type_key else np.full(count, 'Text'),
+        'value': text(value_key),
+        'confidence': number('confidence'),
+        'page': number('page') + 1,
+    }
+
+
+class ResultTable:
+    """Kolona numpy + pamja aktuale (indekset pas filtrit dhe renditjes)"""
+
+    def __init__(self, columns, rows=(), data=None):
+        self.columns = [name for name, _, _ in columns]
+        self.kinds = {name: kind for name, kind, _ in columns}
+        self.formats = {name: fmt for name, _, fmt in columns}
+        # data: kolonat e gatshme (p.sh. nga një projekt .tdap) në vend të rreshtave
+        self.data = data if data is not None else _row_columns(columns, rows)
+        self.size = len(self.data[self.columns[0]]) if self.columns else 0
+        self._search = None
+        self._lower = {}
+
+        self.query = ''
+        self.sort_column = None
+        self.descending = False
+        self.view = np.arange(self.size, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.view)
+
+    def _lowered(self, name):
+        if name not in self._lower:
+            self._lower[name] = np.char.lower(self.data[name])
+        return self._lower[name]
+
+    def _search_text(self):
+        """Një varg për rresht (kolonat tekst, me shkronja të vogla) për filtrin"""
+        if self._search is None:
+            text_columns = [name for name in self.columns if self.kinds[name] == 'text']
+            search = np.full(self.size, '', dtype=str)
+            for name in text_columns:
+                search = np.char.add(np.char.add(search, self._lowered(name)), '\t')
+            self._search = search
+        return self._search
+
+    def set_filter(self, query):
+        """Mban vetëm rreshtat që përmbajnë të gjitha fjalët e query (pa dallim shkronjash)"""
+        self.query = (query or '').strip().lower()
+        self._refresh()
+
+    def sort_by(self, column, descending=None):
+        """Rendit sipas kolonës; pa descending, klikimi i dytë në të njëjtën kolonë e kthen renditjen"""
+        if descending is None:
+            descending = not self.descending if column == self.sort_column else False
+        self.sort_column, self.descending = column, descending
+        self._refresh()
+
+    def _refresh(self):
+        indices = np.arange(self.size, dtype=np.int64)
+        if self.query:
+            mask = np.ones(self.size, dtype=bool)
+            search = self._search_text()
+            for word in self.query.split():
+                mask &= np.char.find(search, word) >= 0
+            indices = indices[mask]
+
+        if self.sort_column is not None and indices.size:
+            if self.kinds[self.sort_column] == 'number':
+                keys = self.data[self.sort_column][indices]
+                keys = -keys if self.descending else keys
+                # Vlerat që mungojnë (NaN) mbeten në fund në të dy drejtimet
+                keys = np.where(np.isnan(keys), np.inf, keys)
+            else:
+                _, keys = np.unique(self._lowered(self.sort_column)[indices], return_inverse=True)
+                keys = -keys if self.descending else keys
+            # E qëndrueshme: rreshtat e barabartë mbajnë renditjen origjinale
+            indices = indices[np.argsort(keys, kind='stable')]
+
+        self.view = indices
+
+    def format(self, name, value):
+        """Vlera e shfaqur në qelizë"""
+        if self.kinds[name] == 'number':
+            if math.isnan(value):
+                return ''
+            return self.formats[name].format(value) if self.formats[name] else f"{value:g}"
+        return value
+
+    def rows(self, start, stop):
+        """Rreshtat e formatuar [start, stop) të pamjes aktuale"""
+        indices = self.view[max(0, start):max(0, stop)]
+        columns = [(name, self.data[name][indices]) for name in self.columns]
+        return [tuple(self.format(name, values[i].item()) for name, values in columns)
+                for i in range(indices.size)]
+
+    def source_index(self, position):
+        """Indeksi origjinal i rreshtit në pozicionin e pamjes"""
+        return int(self.view[position])
+
+
+def results_table(analysis_results):
+    """Simbolet, teksti, ndryshimet e revizionit dhe kohët e hapave si një tabelë"""
+    parts, rows = [], []
+
+    def page_of(item):
+        return item['page'] + 1 if item.get('page') is not None else None
+
+    def flush():
+        if rows:
+            parts.append(_row_columns(RESULT_COLUMNS, rows))
+            rows.clear()
+
+    # Projekti .tdap: kolonat lexohen direkt, pa materializuar elementet
+    part = _project_part(analysis_results, 'symbols', "Simbol", 'type', 'name')
+    if part is not None:
+        parts.append(part)
+    else:
+        for symbol in analysis_results.get('symbols') or []:
+            rows.append(("Simbol", symbol.get('type', 'N/A'), symbol.get('name', 'N/A'),
+                         symbol.get('confidence'), page_of(symbol)))
+    flush()
+    part = _project_part(analysis_results, 'text', "Tekst", None, 'content')
+    if part is not None:
+        parts.append(part)
+    else:
+        for text in analysis_results.get('text') or []:
+            rows.append(("Tekst", "Text", text.get('content', 'N/A'), text.get('confidence'), page_of(text)))
+    flush()
+
+    revision = analysis_results.get('revision')
+    if revision:
+        for change, label in (('added', "Shtuar"), ('removed', "Hequr")):
+            for symbol in revision[change]['symbols']:
+                rows.append((label, symbol.get('type', 'N/A'), symbol.get('name', 'N/A'),
+                             symbol.get('confidence'), page_of(symbol)))
+            for text in revision[change]['text']:
+                rows.append((label, "Text", text.get('content', 'N/A'), text.get('confidence'), page_of(text)))
+
+    timings = analysis_results.get('timings')
+    if timings:
+        for stage, entry in timings['stages'].items():
+            rows.append(("Koha", stage, f"{entry['wall_ms']:.1f} ms (CPU {entry['cpu_ms']:.1f} ms, "
+                                        f"{entry['peak_mem_mb'] or 0:.1f} MB)", None, None))
+    flush()
+
+    return ResultTable(RESULT_COLUMNS, data=_concat_columns(RESULT_COLUMNS, parts))
+
+
+def bom_table(bom):
+    """Rreshtat e BOM me numrin rendor si kolonë"""
+    return ResultTable(BOM_COLUMNS, [(i, item.get('quantity', 1), item.get('unit', ''), item.get('description', 'N/A'),
+                                      item.get('size', 'N/A'), item.get('material', 'N/A'),
+                                      item.get('cost', 'N/A')) for i, item in enumerate(bom or [], 1)])
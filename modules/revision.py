@@ -0,0 +1,369 @@
+"""
+Revision Analyzer
+Ri-analizë inkrementale e një revizioni të ri (Rev A -> Rev B) të një vizatimi
+
+Rezultatet e revizionit të mëparshëm merren nga cache-i i DatabaseManager.
+Dy rasterët shtrihen (zhvendosje me phase correlation), krahasohen me një
+tolerancë prej disa pixelësh, dhe zbulimi + OCR ekzekutohen vetëm në pllakat
+që kanë ndryshuar. Pjesa tjetër e rezultateve kalon nga revizioni i vjetër.
+"""
+
+import math
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from modules.document_processor import IMAGE_EXTENSIONS
+from modules.pipeline import merge_options
+from modules.tiling import offset_item
+
+REVISION_TILE_SIZE = 512
+# Sa pixel rreth çdo zone të ndryshuar analizohen (që simbolet në skaj të mos priten)
+REVISION_MARGIN = 128
+# Pixelët e ndryshuar në një pllakë nën këtë numër konsiderohen zhurmë skanimi
+MIN_CHANGED_PIXELS = 24
+# Rezolucioni (pixel në brinjën më të gjatë) për shtrirjen e faqeve
+ALIGN_MAX_SIZE = 1600
+# Distanca maksimale (pixel) që një element i vjetër dhe i ri konsiderohen i njëjti
+MATCH_DISTANCE = 12.0
+# Nëse ndryshon më shumë se kjo pjesë e faqes, analiza e plotë është më e thjeshtë
+MAX_CHANGED_FRACTION = 0.6
+
+
+def _gray(image):
+    return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+
+def _center(item):
+    if item.get('bbox'):
+        x, y, w, h = item['bbox'][:4]
+        return x + w / 2.0, y + h / 2.0
+    x, y = item.get('position', (0, 0))[:2]
+    return float(x), float(y)
+
+
+def _item_key(item):
+    if 'content' in item:
+        return 'text', item.get('content')
+    return 'symbol', item.get('type'), item.get('name')
+
+
+def estimate_offset(base_gray, new_gray, max_size=ALIGN_MAX_SIZE):
+    """Zhvendosja (dx, dy) e përmbajtjes së base në new, e vlerësuar në rezolucion të ulët"""
+    height = max(base_gray.shape[0], new_gray.shape[0])
+    width = max(base_gray.shape[1], new_gray.shape[1])
+    scale = min(1.0, max_size / max(height, width))
+
+    def prepare(gray):
+        canvas = np.full((height, width), 255, dtype=np.uint8)
+        canvas[:gray.shape[0], :gray.shape[1]] = gray
+        small = cv2.resize(canvas, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        # Boja si sinjal pozitiv, sfondi zero
+        return (255.0 - small.astype(np.float32))
+
+    base_small, new_small = prepare(base_gray), prepare(new_gray)
+    window = cv2.createHanningWindow(base_small.shape[::-1], cv2.CV_32F)
+    (dx, dy), _ = cv2.phaseCorrelate(base_small, new_small, window)
+    return dx / scale, dy / scale, scale
+
+
+def shift_image(gray, dx, dy, shape):
+    """Zhvendos imazhin me (dx, dy) pixel të plotë në një kanavacë me madhësinë shape"""
+    matrix = np.float32([[1, 0, round(dx)], [0, 1, round(dy)]])
+    return cv2.warpAffine(gray, matrix, (shape[1], shape[0]), flags=cv2.INTER_NEAREST,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+
+def changed_mask(base_aligned, new_gray, tolerance=2):
+    """Pixelët e bojës që janë shtuar ose hequr, me tolerancë për shtrirjen jo të përsosur"""
+    _, base_ink = cv2.threshold(base_aligned, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    _, new_ink = cv2.threshold(new_gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    kernel = np.ones((2 * tolerance + 1, 2 * tolerance + 1), np.uint8)
+    added = cv2.subtract(new_ink, cv2.dilate(base_ink, kernel))
+    removed = cv2.subtract(base_ink, cv2.dilate(new_ink, kernel))
+    return cv2.bitwise_or(added, removed)
+
+
+def changed_regions(mask, tile_size=REVISION_TILE_SIZE, min_pixels=MIN_CHANGED_PIXELS):
+    """Pllakat e ndryshuara, të bashkuara në drejtkëndësha [x, y, w, h]; kthen edhe pjesën e ndryshuar"""
+    height, width = mask.shape[:2]
+    rows, cols = math.ceil(height / tile_size), math.ceil(width / tile_size)
+
+    padded = np.zeros((rows * tile_size, cols * tile_size), dtype=np.uint8)
+    padded[:height, :width] = mask > 0
+    counts = padded.reshape(rows, tile_size, cols, tile_size).sum(axis=(1, 3), dtype=np.int64)
+    changed = (counts >= min_pixels).astype(np.uint8)
+
+    # Pllakat fqinje të ndryshuara bashkohen në një zonë
+    _, _, stats, _ = cv2.connectedComponentsWithStats(changed, connectivity=8)
+    regions = []
+    for tx, ty, tw, th, _ in stats[1:]:
+        x, y = int(tx * tile_size), int(ty * tile_size)
+        regions.append([x, y, int(min(tw * tile_size, width - x)), int(min(th * tile_size, height - y))])
+    return regions, float(changed.mean()) if changed.size else 0.0
+
+
+def _inside(point, regions):
+    x, y = point
+    return any(rx <= x < rx + rw and ry <= y < ry + rh for rx, ry, rw, rh in regions)
+
+
+def diff_items(old_items, new_items, match_distance=MATCH_DISTANCE):
+    """Krahason dy lista elementesh; kthen (të shtuarat, të hequrat)
+
+    Dy elemente janë të njëjtë kur kanë të njëjtin lloj/emër (ose përmbajtje
+    teksti) dhe qendrat janë brenda match_distance.
+    """
+    remaining = {}
+    for index, item in enumerate(old_items):
+        remaining.setdefault(_item_key(item), []).append(index)
+
+    matched_old = set()
+    added = []
+    for item in new_items:
+        cx, cy = _center(item)
+        best, best_distance = None, match_distance
+        for index in remaining.get(_item_key(item), ()):
+            if index in matched_old:
+                continue
+            ox, oy = _center(old_items[index])
+            distance = math.hypot(cx - ox, cy - oy)
+            if distance <= best_distance:
+                best, best_distance = index, distance
+        if best is None:
+            added.append(item)
+        else:
+            matched_old.add(best)
+
+    removed = [item for index, item in enumerate(old_items) if index not in matched_old]
+    return added, removed
+
+
+class RevisionAnalyzer:
+    """Analizon një revizion të ri duke ripërdorur rezultatet e revizionit të mëparshëm"""
+
+    def __init__(self, pipeline, tile_size=REVISION_TILE_SIZE, margin=REVISION_MARGIN,
+                 max_changed_fraction=MAX_CHANGED_FRACTION):
+        self.pipeline = pipeline
+        self.tile_size = tile_size
+        self.margin = margin
+        self.max_changed_fraction = max_changed_fraction
+
+    def base_results(self, base_file, options, notify):
+        """Rezultatet e revizionit të vjetër, nga cache (ose analizë e plotë herën e parë)"""
+        cached = self.pipeline.cached_results(base_file, options)
+        if cached is not None:
+            return cached
+
+        notify("Revizioni i mëparshëm nuk është në cache; po analizohet...", 5)
+        return self.pipeline.analyze(base_file, options)
+
+    def can_compare(self, new_file, base_file, page_count):
+        """A mund të krahasohen rasterët e dy revizioneve
+
+        DXF lexohet si vektor (analiza e plotë është e shpejtë), dhe faqet
+        shumë të mëdha që procesohen me pllaka nuk ngarkohen të plota në memorie.
+        """
+        doc_processor = self.pipeline.doc_processor
+        for filepath in (new_file, base_file):
+            if not filepath.lower().endswith(('.pdf',) + IMAGE_EXTENSIONS):
+                return False
+            if doc_processor.should_tile(filepath):
+                return False
+        return doc_processor.page_count(base_file) == page_count
+
+    def analyze(self, new_file, base_file, options=None, status_callback=None):
+        """Kthen analysis_results për new_file plus 'revision' me diff-in ndaj base_file"""
+        options = merge_options(options)
+        notify = status_callback or (lambda message, progress: None)
+        started = time.perf_counter()
+        doc_processor = self.pipeline.doc_processor
+
+        base = self.base_results(base_file, options, notify)
+        page_count = doc_processor.page_count(new_file)
+
+        incremental = self.can_compare(new_file, base_file, page_count)
+
+        symbols, text_data, pipes, regions_by_page, offsets = [], [], [], [], []
+        full_pages = []
+        for page in range(page_count):
+            notify(f"Duke krahasuar faqen {page + 1}/{page_count}...", 10 + int(80 * page / page_count))
+            page_result = self._analyze_page(new_file, base_file, base, page, page_count, options) \
+                if incremental else None
+            if page_result is None:
+                full_pages.append(page)
+                continue
+            symbols.extend(page_result['symbols'])
+            text_data.extend(page_result['text'])
+            pipes.extend(page_result['pipes'])
+            regions_by_page.append({'page': page, 'regions': page_result['regions'],
+                                    'changed_fraction': page_result['changed_fraction']})
+            offsets.append({'page': page, 'offset': page_result['offset']})
+
+        if full_pages:
+            # Faqet që nuk mund të krahasohen (madhësi tjetër, shumë ndryshime) analizohen plotësisht
+            notify("Analizë e plotë e faqeve të ndryshuara shumë...", 50)
+            for page in full_pages:
+                result = self.pipeline.analyze_page(new_file, page, options)
+                tag = page_count > 1
+                symbols.extend(result['symbols'] if tag else [_untag(i) for i in result['symbols']])
+                text_data.extend(result['text'] if tag else [_untag(i) for i in result['text']])
+                pipes.extend(result['pipes'] if tag else [_untag(i) for i in result['pipes']])
+
+        bom_data = self._bom(symbols, text_data, pipes, options, page_count)
+
+        added_symbols, removed_symbols = self._diff_pages(base.get('symbols', []), symbols, offsets, page_count)
+        added_text, removed_text = self._diff_pages(base.get('text', []), text_data, offsets, page_count)
+
+        results = {
+            'symbols': symbols,
+            'text': text_data,
+            'bom': bom_data,
+            'pipes': pipes,
+            'file': new_file,
+            'timestamp': datetime.now().isoformat(),
+            'revision': {
+                'base_file': base_file,
+                'incremental_pages': [entry['page'] for entry in regions_by_page],
+                'full_pages': full_pages,
+                'offsets': offsets,
+                'changed_regions': regions_by_page,
+                'added': {'symbols': added_symbols, 'text': added_text},
+                'removed': {'symbols': removed_symbols, 'text': removed_text},
+                'seconds': round(time.perf_counter() - started, 3),
+            },
+        }
+        if page_count > 1:
+            results['page_count'] = page_count
+
+        self.pipeline.cache_results(new_file, options, results)
+
+        notify("Revizioni u analizua", 100)
+        return results
+
+    def _analyze_page(self, new_file, base_file, base, page, page_count, options):
+        """Krahason një faqe; kthen None kur duhet analizë e plotë"""
+        doc_processor = self.pipeline.doc_processor
+        new_data = doc_processor.process_file(new_file, tiled=False, page=page)
+        base_data = doc_processor.process_file(base_file, tiled=False, page=page)
+        new_image = new_data['image']
+        new_gray, base_gray = _gray(new_image), _gray(base_data['image'])
+        del base_data
+
+        # Revizioni me format tjetër faqeje nuk krahasohet pllakë pas pllake
+        if abs(new_gray.shape[0] - base_gray.shape[0]) > 0.02 * base_gray.shape[0] or \
+                abs(new_gray.shape[1] - base_gray.shape[1]) > 0.02 * base_gray.shape[1]:
+            return None
+
+        dx, dy, scale = estimate_offset(base_gray, new_gray)
+        aligned = shift_image(base_gray, dx, dy, new_gray.shape)
+        tolerance = max(2, int(math.ceil(1.0 / scale)) + 1)
+        mask = changed_mask(aligned, new_gray, tolerance=tolerance)
+        # Skaji i zbuluar nga zhvendosja nuk është ndryshim i vërtetë
+        mask[:, :max(0, int(round(dx)))] = 0
+        mask[:max(0, int(round(dy))), :] = 0
+        if dx < 0:
+            mask[:, mask.shape[1] + int(round(dx)):] = 0
+        if dy < 0:
+            mask[mask.shape[0] + int(round(dy)):, :] = 0
+        regions, changed_fraction = changed_regions(mask, self.tile_size)
+        if changed_fraction > self.max_changed_fraction:
+            return None
+
+        def on_page(item):
+            return item.get('page', 0) == page if page_count > 1 else True
+
+        # Rezultatet e vjetra jashtë zonave të ndryshuara kalojnë, të zhvendosura
+        symbols = [offset_item(item, dx, dy) for item in base.get('symbols', []) if on_page(item)]
+        text_data = [offset_item(item, dx, dy) for item in base.get('text', []) if on_page(item)]
+        symbols = [item for item in symbols if not _inside(_center(item), regions)]
+        text_data = [item for item in text_data if not _inside(_center(item), regions)]
+
+        recognizer = self.pipeline.symbol_recognizer
+        height, width = new_gray.shape[:2]
+        for x, y, w, h in regions:
+            x0, y0 = max(0, x - self.margin), max(0, y - self.margin)
+            x1, y1 = min(width, x + w + self.margin), min(height, y + h + self.margin)
+            crop = {'file': new_file, 'page': page, 'image': np.ascontiguousarray(new_image[y0:y1, x0:x1]),
+                    'width': x1 - x0, 'height': y1 - y0}
+            if options['pdf_text_layer'] and new_data.get('text_layer') is not None:
+                # Teksti i ngulitur i zonës, në koordinatat e prerjes
+                bounds = [(x0, y0, x1 - x0, y1 - y0)]
+                crop['text_layer'] = [offset_item(item, -x0, -y0) for item in new_data['text_layer']
+                                      if _inside(_center(item), bounds)]
+                crop['raster_regions'] = [[rx - x0, ry - y0, rw, rh]
+                                          for rx, ry, rw, rh in new_data.get('raster_regions') or []]
+            found_symbols = recognizer.detect_symbols(crop) if options['detect_symbols'] else []
+            found_text = recognizer.extract_text(crop) if options['extract_text'] else []
+            # Mbahen vetëm elementet me qendër brenda zonës (jo në marzh)
+            for item in found_symbols:
+                shifted = offset_item(item, x0, y0)
+                if _inside(_center(shifted), [(x, y, w, h)]):
+                    symbols.append(shifted)
+            for item in found_text:
+                shifted = offset_item(item, x0, y0)
+                if _inside(_center(shifted), [(x, y, w, h)]):
+                    text_data.append(shifted)
+
+        # Linjat e tubave gjurmohen në të gjithë faqen e re: një ndryshim i vogël lidh ose ndan linja
+        pipes = self.pipeline.trace_pipes(new_image, symbols, options, dpi=new_data.get('dpi')) \
+            if options['pipe_lengths'] else []
+
+        if page_count > 1:
+            symbols = [dict(item, page=page) for item in symbols]
+            text_data = [dict(item, page=page) for item in text_data]
+            pipes = [dict(item, page=page) for item in pipes]
+
+        return {
+            'symbols': symbols,
+            'text': text_data,
+            'pipes': pipes,
+            'regions': regions,
+            'changed_fraction': round(changed_fraction, 4),
+            'offset': [round(dx, 2), round(dy, 2)],
+        }
+
+    def _bom(self, symbols, text_data, pipes, options, page_count):
+        if not options['generate_bom']:
+            return []
+        generator = self.pipeline.output_generator
+
+        def page_bom(page_symbols, page_text, page_pipes):
+            if not options['pipe_lengths']:
+                return generator.generate_bom(page_symbols, page_text)
+            return generator.generate_bom(page_symbols, page_text, page_pipes)
+
+        if page_count <= 1:
+            return page_bom(symbols, text_data, pipes)
+        # BOM faqe pas faqeje, si në analizën e plotë (indekset 'symbols' të linjave janë sipas faqes)
+        bom = []
+        for page in range(page_count):
+            page_symbols = [s for s in symbols if s.get('page') == page]
+            page_text = [t for t in text_data if t.get('page') == page]
+            page_pipes = [p for p in pipes if p.get('page') == page]
+            bom.extend(dict(item, page=page) for item in page_bom(page_symbols, page_text, page_pipes))
+        return bom
+
+    @staticmethod
+    def _diff_pages(old_items, new_items, offsets, page_count):
+        """Diff-i i elementeve faqe pas faqeje, me elementet e vjetra të zhvendosura"""
+        shifts = {entry['page']: entry['offset'] for entry in offsets}
+        added, removed = [], []
+        for page in range(page_count):
+            dx, dy = shifts.get(page, (0.0, 0.0))
+            old_page = [offset_item(item, dx, dy) for item in old_items
+                        if page_count <= 1 or item.get('page', 0) == page]
+            new_page = [item for item in new_items if page_count <= 1 or item.get('page', 0) == page]
+            page_added, page_removed = diff_items(old_page, new_page)
+            added.extend(page_added)
+            removed.extend(page_removed)
+        return added, removed
+
+
+def _untag(item):
+    item = dict(item)
+    item.pop('page', None)
+    return item
+
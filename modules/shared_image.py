@@ -0,0 +1,189 @@
+"""
+Shared Image
+Buffer-a imazhesh të ndarë mes proceseve pa kopjim
+
+Faqja e dekoduar vendoset një herë në multiprocessing.shared_memory (ose në
+një skedar memmap për skanimet më të mëdha se RAM-i); worker-at marrin vetëm
+një ImageHandle të vogël (emri, forma, dtype) dhe e hapin si view numpy.
+Pronari i buffer-it e fshin segmentin në close(); një finalizer e fshin edhe
+kur objekti humbet pa u mbyllur ose kur procesi del, kështu që segmentet nuk
+mbeten në /dev/shm.
+"""
+
+import mmap
+import os
+import tempfile
+import weakref
+
+import numpy as np
+
+BACKEND_MEMORY = 'memory'
+BACKEND_FILE = 'file'
+
+# Prapashtesa e skedarëve memmap (p.sh. për t'i gjetur pas një crash-i)
+FILE_SUFFIX = '.tdaimg'
+
+
+class ImageHandle:
+    """Përshkrimi i lehtë (picklable) i një buffer-i të ndarë"""
+
+    def __init__(self, name, shape, dtype, backend):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = str(dtype)
+        self.backend = backend
+
+    def __repr__(self):
+        return f"ImageHandle({self.backend}:{self.name}, shape={self.shape}, dtype={self.dtype})"
+
+    def __eq__(self, other):
+        return isinstance(other, ImageHandle) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    @property
+    def key(self):
+        return (self.backend, self.name)
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+
+    def attach(self):
+        """Hap buffer-in si view (pa kopjim); kthen AttachedImage"""
+        return AttachedImage(self)
+
+
+class AttachedImage:
+    """View mbi një buffer të ndarë në procesin që e përdor (worker)
+
+    close() nuk e fshin segmentin; këtë e bën vetëm pronari (SharedImage).
+    """
+
+    def __init__(self, handle):
+        self.handle = handle
+        self._shm = None
+        if handle.backend == BACKEND_MEMORY:
+            from multiprocessing import shared_memory
+
+            self._shm = shared_memory.SharedMemory(name=handle.name)
+            self.array = np.ndarray(handle.shape, dtype=handle.dtype, buffer=self._shm.buf)
+        else:
+            self.array = np.memmap(handle.name, dtype=handle.dtype, mode='r', shape=handle.shape)
+
+    def close(self):
+        self.array = None
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                # Ka ende view të gjalla; segmenti mbyllet kur të lirohen
+                pass
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _release(shm, path):
+    """Fshin segmentin ose skedarin (thirret nga close() ose nga finalizer-i)"""
+    if shm is not None:
+        try:
+            shm.close()
+        except BufferError:
+            pass
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            # Windows nuk lejon fshirjen kur ka ende view të hapura
+            pass
+
+
+class SharedImage:
+    """Pronari i një buffer-i të ndarë; array është view i shkrueshëm mbi të"""
+
+    def __init__(self, shape, dtype=np.uint8, backend=BACKEND_MEMORY, directory=None):
+        shape = tuple(int(size) for size in shape)
+        dtype = np.dtype(dtype)
+        nbytes = max(1, int(np.prod(shape)) * dtype.itemsize)
+        self._shm = None
+        self._path = None
+
+        if backend == BACKEND_MEMORY:
+            from multiprocessing import shared_memory
+
+            self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            name = self._shm.name
+            self.array = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+        elif backend == BACKEND_FILE:
+            fd, self._path = tempfile.mkstemp(suffix=FILE_SUFFIX, dir=directory)
+            os.close(fd)
+            name = self._path
+            self.array = np.memmap(self._path, dtype=dtype, mode='w+', shape=shape)
+        else:
+            raise ValueError(f"Backend i panjohur: {backend}")
+
+        self.handle = ImageHandle(name, shape, dtype, backend)
+        # Segmenti fshihet edhe nëse close() harrohet (GC ose dalja e procesit)
+        self._finalizer = weakref.finalize(self, _release, self._shm, self._path)
+
+    @classmethod
+    def from_array(cls, image, backend=BACKEND_MEMORY, directory=None):
+        """Kopjon imazhin një herë në buffer-in e ndarë"""
+        shared = cls(image.shape, image.dtype, backend=backend, directory=directory)
+        shared.array[...] = image
+        if backend == BACKEND_FILE:
+            shared.array.flush()
+        return shared
+
+    @property
+    def closed(self):
+        return not self._finalizer.alive
+
+    def release_pages(self):
+        """Shkruan në disk dhe heq nga RSS faqet e buffer-it memmap (backend 'file'; të dhënat mbeten)"""
+        if self._path is None or self.array is None:
+            return
+        self.array.flush()
+        mapping = getattr(self.array, '_mmap', None)
+        if mapping is not None and hasattr(mmap, 'MADV_DONTNEED'):
+            mapping.madvise(mmap.MADV_DONTNEED)
+
+    def close(self):
+        """Liron view-n dhe fshin segmentin (idempotent)"""
+        self.array = None
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Buffer-at e hapur në këtë proces (worker), sipas handle; një attach për segment
+_attached = {}
+
+
+def attached_array(handle):
+    """View i buffer-it në procesin aktual; hapet një herë dhe ripërdoret nga detyrat e tjera"""
+    image = _attached.get(handle.key)
+    if image is None:
+        image = _attached[handle.key] = handle.attach()
+    return image.array
+
+
+def detach_all():
+    """Mbyll të gjitha view-t e hapura në këtë proces"""
+    for image in _attached.values():
+        image.close()
+    _attached.clear()
@@ -0,0 +1,245 @@
+"""
+Spatial Index
+Indeks hapësinor me grid uniform për kutitë [x, y, w, h]
+
+Kutitë ruhen në vektorë numpy dhe qelizat e grid-it në formë CSR (çelësa të
+renditur + fillimet), kështu që ndërtimi për qindra mijëra elemente bëhet me
+disa operacione numpy, pa cikël Python për çdo element.
+"""
+
+import math
+
+import numpy as np
+
+# Sa elemente mesatarisht synohen për qelizë kur cell_size zgjidhet automatikisht
+TARGET_ITEMS_PER_CELL = 4
+
+
+def boxes_from_items(items):
+    """Kthen kutitë (N, 4) [x0, y0, x1, y1] nga elementet me 'bbox' ose 'position'"""
+    boxes = np.zeros((len(items), 4), dtype=np.float64)
+    for i, item in enumerate(items):
+        if item.get('bbox'):
+            x, y, w, h = item['bbox'][:4]
+            boxes[i] = (x, y, x + w, y + h)
+        else:
+            x, y = item.get('position', (0, 0))[:2]
+            boxes[i] = (x, y, x, y)
+    return boxes
+
+
+class GridIndex:
+    """Grid uniform mbi kutitë; pyetje sipas drejtkëndëshit dhe fqinjit më të afërt"""
+
+    def __init__(self, boxes, cell_size=None):
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        if cell_size is None:
+            cell_size = self._auto_cell_size(self.boxes)
+        self.cell_size = float(cell_size)
+        self._build()
+
+    @classmethod
+    def from_items(cls, items, cell_size=None):
+        """Ndërton indeksin nga lista e simboleve/teksteve"""
+        return cls(boxes_from_items(items), cell_size)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    @staticmethod
+    def _auto_cell_size(boxes):
+        """Qeliza sa madhësia tipike e elementit, por jo shumë e vogël për faqen"""
+        if not len(boxes):
+            return 1.0
+        extents = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+        span_w = boxes[:, 2].max() - boxes[:, 0].min()
+        span_h = boxes[:, 3].max() - boxes[:, 1].min()
+        by_density = math.sqrt(max(span_w * span_h, 1.0) * TARGET_ITEMS_PER_CELL / len(boxes))
+        return max(float(np.median(extents)) * 2.0, by_density, 1e-6)
+
+    def _cell_ranges(self, boxes):
+        cell = self.cell_size
+        cx0 = np.floor(boxes[:, 0] / cell).astype(np.int64)
+        cy0 = np.floor(boxes[:, 1] / cell).astype(np.int64)
+        cx1 = np.floor(boxes[:, 2] / cell).astype(np.int64)
+        cy1 = np.floor(boxes[:, 3] / cell).astype(np.int64)
+        return cx0, cy0, cx1, cy1
+
+    def _build(self):
+        """Çdo kuti regjistrohet në të gjitha qelizat që prek"""
+        if not len(self.boxes):
+            self._origin = (0, 0)
+            self._stride, self._rows = 1, 1
+            self._keys = np.zeros(0, dtype=np.int64)
+            self._starts = np.zeros(1, dtype=np.int64)
+            self._members = np.zeros(0, dtype=np.int64)
+            return
+
+        cx0, cy0, cx1, cy1 = self._cell_ranges(self.boxes)
+        self._origin = (int(cx0.min()), int(cy0.min()))
+        self._stride = int(cx1.max() - self._origin[0] + 1)
+        self._rows = int(cy1.max() - self._origin[1] + 1)
+
+        spans_x = cx1 - cx0 + 1
+        counts = spans_x * (cy1 - cy0 + 1)
+        owners = np.repeat(np.arange(len(self.boxes), dtype=np.int64), counts)
+
+        # Pozicioni i çdo qelize brenda drejtkëndëshit të kutisë së vet
+        offsets = np.arange(owners.size, dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        gx = cx0[owners] + offsets % spans_x[owners]
+        gy = cy0[owners] + offsets // spans_x[owners]
+        keys = self._cell_key(gx, gy)
+
+        order = np.argsort(keys, kind='stable')
+        keys, self._members = keys[order], owners[order]
+        self._keys, first = np.unique(keys, return_index=True)
+        self._starts = np.append(first, keys.size).astype(np.int64)
+
+    def _cell_key(self, gx, gy):
+        return (gy - self._origin[1]) * self._stride + (gx - self._origin[0])
+
+    def _cell_members(self, gx0, gy0, gx1, gy1):
+        """Indekset e elementeve në qelizat e drejtkëndëshit (mund të përsëriten)"""
+        ox, oy = self._origin
+        gx0, gx1 = max(gx0, ox), min(gx1, ox + self._stride - 1)
+        gy0, gy1 = max(gy0, oy), min(gy1, oy + self._rows - 1)
+        if gx1 < gx0 or gy1 < gy0 or not self._keys.size:
+            return np.zeros(0, dtype=np.int64)
+
+        gys = np.arange(gy0, gy1 + 1, dtype=np.int64)
+        gxs = np.arange(gx0, gx1 + 1, dtype=np.int64)
+        wanted = self._cell_key(gxs[None, :], gys[:, None]).ravel()
+        positions = np.minimum(np.searchsorted(self._keys, wanted), self._keys.size - 1)
+        positions = positions[self._keys[positions] == wanted]
+        if not positions.size:
+            return np.zeros(0, dtype=np.int64)
+
+        starts, ends = self._starts[positions], self._starts[positions + 1]
+        counts = ends - starts
+        # Bashkon intervalet [start, end) pa cikël Python
+        index = np.arange(counts.sum(), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self._members[np.repeat(starts, counts) + index]
+
+    def query(self, x0, y0, x1, y1):
+        """Indekset e kutive që prekin drejtkëndëshin [x0, x1] x [y0, y1]"""
+        if not len(self.boxes):
+            return np.zeros(0, dtype=np.int64)
+        cell = self.cell_size
+        candidates = np.unique(self._cell_members(int(math.floor(x0 / cell)), int(math.floor(y0 / cell)),
+                                                  int(math.floor(x1 / cell)), int(math.floor(y1 / cell))))
+        boxes = self.boxes[candidates]
+        hit = (boxes[:, 0] <= x1) & (boxes[:, 2] >= x0) & (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0)
+        return candidates[hit]
+
+    def distances(self, x, y, indices):
+        """Distanca nga pika deri te kutitë (0 brenda kutisë)"""
+        boxes = self.boxes[indices]
+        dx = np.maximum(np.maximum(boxes[:, 0] - x, x - boxes[:, 2]), 0.0)
+        dy = np.maximum(np.maximum(boxes[:, 1] - y, y - boxes[:, 3]), 0.0)
+        return np.hypot(dx, dy)
+
+    def within(self, x, y, radius):
+        """Elementet brenda rrezes nga pika; kthen [(index, distance)] të renditur"""
+        candidates = self.query(x - radius, y - radius, x + radius, y + radius)
+        if not candidates.size:
+            return []
+        dist = self.distances(x, y, candidates)
+        order = np.argsort(dist, kind='stable')
+        return [(int(candidates[i]), float(dist[i])) for i in order if dist[i] <= radius]
+
+    def within_many(self, xs, ys, radii):
+        """Pyetje "brenda rrezes" për shumë pika njëherësh, pa cikël Python
+
+        Kthen tre vektorë (pika, elementi, distanca), të renditur sipas pikës
+        dhe pastaj sipas distancës.
+        """
+        xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+        radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), xs.shape)
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))
+        if not len(self.boxes) or not xs.size or not self._keys.size:
+            return empty
+
+        # Qelizat e katrorit rreth çdo pike, të prera në kufijtë e grid-it
+        ox, oy = self._origin
+        cell = self.cell_size
+        gx0 = np.maximum(np.floor((xs - radii) / cell).astype(np.int64), ox)
+        gy0 = np.maximum(np.floor((ys - radii) / cell).astype(np.int64), oy)
+        gx1 = np.minimum(np.floor((xs + radii) / cell).astype(np.int64), ox + self._stride - 1)
+        gy1 = np.minimum(np.floor((ys + radii) / cell).astype(np.int64), oy + self._rows - 1)
+        spans_x = np.maximum(gx1 - gx0 + 1, 0)
+        counts = spans_x * np.maximum(gy1 - gy0 + 1, 0)
+
+        points = np.repeat(np.arange(xs.size, dtype=np.int64), counts)
+        offsets = np.arange(points.size, dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        keys = self._cell_key(gx0[points] + offsets % spans_x[points], gy0[points] + offsets // spans_x[points])
+
+        positions = np.minimum(np.searchsorted(self._keys, keys), self._keys.size - 1)
+        found = self._keys[positions] == keys
+        points, positions = points[found], positions[found]
+
+        starts = self._starts[positions]
+        member_counts = self._starts[positions + 1] - starts
+        points = np.repeat(points, member_counts)
+        index = np.arange(points.size, dtype=np.int64) - np.repeat(np.cumsum(member_counts) - member_counts,
+                                                                   member_counts)
+        items = self._members[np.repeat(starts, member_counts) + index]
+        if not items.size:
+            return empty
+
+        # Kutitë që prekin disa qeliza dalin më shumë se një herë; sort + diff, sepse
+        # np.unique me hash (numpy 2.x) është shumë herë më i ngadaltë për miliona çifte
+        pairs = np.sort(points * len(self.boxes) + items)
+        pairs = pairs[np.append(True, pairs[1:] != pairs[:-1])]
+        points, items = pairs // len(self.boxes), pairs % len(self.boxes)
+
+        boxes = self.boxes[items]
+        dx = np.maximum(np.maximum(boxes[:, 0] - xs[points], xs[points] - boxes[:, 2]), 0.0)
+        dy = np.maximum(np.maximum(boxes[:, 1] - ys[points], ys[points] - boxes[:, 3]), 0.0)
+        dist = np.hypot(dx, dy)
+        inside = dist <= radii[points]
+        points, items, dist = points[inside], items[inside], dist[inside]
+
+        order = np.lexsort((items, dist, points))
+        return points[order], items[order], dist[order]
+
+    def nearest(self, x, y, k=1, max_distance=None):
+        """Deri në k elemente më të afërt me pikën; kthen [(index, distance)] të renditur
+
+        Kërkimi zgjerohet unazë pas unaze qelizash, deri sa k elementet e gjetura
+        të jenë më afër se unaza e radhës (ose të arrihet max_distance).
+        """
+        if not len(self.boxes) or k <= 0:
+            return []
+
+        cell = self.cell_size
+        gx, gy = int(math.floor(x / cell)), int(math.floor(y / cell))
+        limit = math.inf if max_distance is None else max_distance
+        ox, oy = self._origin
+        # Unaza që mbulon të gjithë grid-in
+        max_ring = max(abs(gx - ox), abs(gx - (ox + self._stride - 1)),
+                       abs(gy - oy), abs(gy - (oy + self._rows - 1)))
+        inner = min(x - gx * cell, (gx + 1) * cell - x, y - gy * cell, (gy + 1) * cell - y)
+
+        found = np.zeros(0, dtype=np.int64)
+        ring = 0
+        while True:
+            members = self._cell_members(gx - ring, gy - ring, gx + ring, gy + ring)
+            if members.size:
+                found = np.unique(members)
+            # Çdo element jashtë katrorit të kërkuar është të paktën kaq larg
+            covered = ring * cell + inner
+            if found.size >= k and covered >= self._kth_distance(x, y, found, k):
+                break
+            if covered >= limit or ring >= max_ring:
+                break
+            ring += 1
+
+        if not found.size:
+            return []
+        dist = self.distances(x, y, found)
+        order = np.argsort(dist, kind='stable')[:k]
+        return [(int(found[i]), float(dist[i])) for i in order if dist[i] <= limit]
+
+    def _kth_distance(self, x, y, indices, k):
+        dist = self.distances(x, y, indices)
+        return float(np.partition(dist, k - 1)[k - 1])
@@ -0,0 +1,116 @@
+"""
+Stage Graph
+Ekzekuton hapat e analizës si graf varësish, paralelisht kur është e mundur
+
+Çdo hap deklaron hapat nga të cilët varet; hapat e pavarur (p.sh. zbulimi i
+simboleve dhe OCR mbi të njëjtën faqe) ekzekutohen njëkohësisht në thread-e,
+kështu që koha e një vizatimi afrohet me hapin më të gjatë, jo me shumën.
+Anulimi është kooperativ: CancelToken kontrollohet mes hapave dhe brenda
+hapave të gjatë (pllakat, faqet); çdo hap mund të ketë edhe afat kohor.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Sa shpesh (s) kontrollohen anulimi dhe afatet ndërsa pritet një hap
+POLL_INTERVAL = 0.05
+
+
+class AnalysisCancelled(Exception):
+    """Analiza u anulua nga përdoruesi ose klienti"""
+
+
+class StageTimeout(TimeoutError):
+    """Një hap kaloi afatin e vet kohor"""
+
+
+class CancelToken:
+    """Flamuri i anulimit, i ndarë mes thread-it që anulon dhe hapave në ekzekutim"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason=None):
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """Ngre AnalysisCancelled nëse është kërkuar anulimi"""
+        if self._event.is_set():
+            raise AnalysisCancelled(self.reason or "Analiza u anulua")
+
+
+def check_cancelled(cancel_token):
+    """raise_if_cancelled për token-a opsionalë (None = pa anulim)"""
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+
+class StageGraph:
+    """Graf hapash: add() deklaron hapat dhe varësitë, run() i ekzekuton
+
+    Varësitë duhet të jenë shtuar më parë, kështu që grafi nuk mund të ketë
+    cikle. Funksioni i hapit merr rezultatet e varësive si argumente me emrin
+    e hapit. Hapi që kalon afatin ose mbetet pas anulimit nuk mund të
+    ndërpritet nga jashtë; rezultati i tij thjesht hidhet.
+    """
+
+    def __init__(self, cancel_token=None, timeouts=None, max_workers=None):
+        self.cancel_token = cancel_token
+        # Afatet (s) sipas emrit të hapit, p.sh. {'ocr': 120}
+        self.timeouts = dict(timeouts or {})
+        self.max_workers = max_workers
+        self._stages = {}
+
+    def add(self, name, func, deps=(), timeout=None):
+        """Shton një hap që ekzekutohet sapo të përfundojnë varësitë e tij"""
+        if name in self._stages:
+            raise ValueError(f"Hapi '{name}' është shtuar më parë")
+        missing = [dep for dep in deps if dep not in self._stages]
+        if missing:
+            raise ValueError(f"Hapi '{name}' varet nga hapa të panjohur: {', '.join(missing)}")
+        self._stages[name] = {
+            'func': func,
+            'deps': tuple(deps),
+            'timeout': timeout if timeout is not None else self.timeouts.get(name),
+        }
+        return self
+
+    def run(self):
+        """Ekzekuton hapat; kthen {emri: rezultati}. Gabimi i parë i një hapi ngrihet menjëherë"""
+        results = {}
+        if not self._stages:
+            return results
+
+        pending = dict(self._stages)
+        running = {}
+        pool = ThreadPoolExecutor(max_workers=self.max_workers or len(pending), thread_name_prefix='stage')
+        try:
+            while pending or running:
+                check_cancelled(self.cancel_token)
+                for name, stage in list(pending.items()):
+                    if all(dep in results for dep in stage['deps']):
+                        del pending[name]
+                        deadline = time.monotonic() + stage['timeout'] if stage['timeout'] else None
+                        future = pool.submit(stage['func'], **{dep: results[dep] for dep in stage['deps']})
+                        running[future] = (name, deadline)
+
+                done, _ = wait(running, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, _ = running.pop(future)
+                    results[name] = future.result()
+
+                now = time.monotonic()
+                for name, deadline in running.values():
+                    if deadline is not None and now > deadline:
+                        raise StageTimeout(f"Hapi '{name}' kaloi afatin prej {self._stages[name]['timeout']}s")
+        finally:
+            # Hapat që s'kanë nisur hiqen; ata në ekzekutim përfundojnë vetë në background
+            pool.shutdown(wait=False, cancel_futures=True)
+        return results
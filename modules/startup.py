@@ -0,0 +1,274 @@
+"""
+Startup
+Matja e kohës së nisjes dhe ngarkimi i shtyrë i varësive të rënda
+
+Dritarja Tk shfaqet e para; numpy, cv2, PIL, procesorët dhe modelet ngarkohen
+pas saj në background (ose në përdorimin e parë). StartupProfile mban pikat
+kryesore të nisjes dhe buxhetin, ndërsa ImportTimer mat çdo import si
+`python -X importtime` që raporti të merret nga vetë aplikacioni.
+
+Përdorimi (matja e nisjes në një proces të ri, kodi 1 kur kalohet buxheti):
+    python -m modules.startup --budget-ms 1500
+"""
+
+import builtins
+import importlib.util
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Koha maksimale (ms) nga fillimi i main.py deri te dritarja e dukshme
+STARTUP_BUDGET_MS = float(os.environ.get('TDA_STARTUP_BUDGET_MS', 1500))
+
+# Modulet që main.py i importon para dritares; duhet të mbeten të lehta (vetëm stdlib)
+STARTUP_MODULES = (
+    'tkinter',
+    'tkinter.ttk',
+    'modules.startup',
+    'modules.pipeline',
+    'modules.stage_graph',
+    'modules.database_manager',
+)
+
+# Modulet që ngarkohen në background pasi dritarja është e dukshme
+DEFERRED_MODULES = (
+    'numpy',
+    'cv2',
+    'PIL.Image',
+    'PIL.ImageTk',
+    'modules.result_table',
+    'modules.preview_pyramid',
+    'modules.document_processor',
+    'modules.symbol_recognizer',
+    'modules.output_generator',
+)
+
+# Sa importe shfaqen në raport (më të ngadaltët)
+REPORT_TOP_IMPORTS = 25
+
+
+class ImportTimer:
+    """Mat kohën e çdo importi të ri (self dhe kumulative), si `-X importtime`
+
+    Zëvendëson builtins.__import__ vetëm sa është i instaluar; importet që
+    janë tashmë në sys.modules nuk regjistrohen.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.installed = False
+        self._original = builtins.__import__
+        self._local = threading.local()
+
+    def install(self):
+        if not self.installed:
+            self._original = builtins.__import__
+            builtins.__import__ = self._import
+            self.installed = True
+        return self
+
+    def uninstall(self):
+        if self.installed:
+            builtins.__import__ = self._original
+            self.installed = False
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original
+        absolute = name
+        if level:
+            try:
+                absolute = importlib.util.resolve_name('.' * level + name, (globals or {}).get('__package__'))
+            except (ImportError, ValueError):
+                return original(name, globals, locals, fromlist, level)
+        if absolute in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        # Koha e importeve të brendshme zbritet nga koha "self" e prindit
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += cumulative
+            self.records.append({'name': absolute, 'self_ms': (cumulative - children) * 1000,
+                                 'cumulative_ms': cumulative * 1000, 'depth': len(stack)})
+
+    def total_ms(self):
+        """Koha e importeve të nivelit të parë (pa i numëruar dy herë ato të brendshme)"""
+        return sum(record['cumulative_ms'] for record in self.records if record['depth'] == 0)
+
+    def format(self, top=None):
+        """Tabela në formatin e `-X importtime` (mikrosekonda), me radhën e importimit
+
+        Me top shfaqen vetëm importet më të ngadalta sipas kohës kumulative.
+        """
+        records = self.records
+        if top:
+            records = sorted(records, key=lambda record: -record['cumulative_ms'])[:top]
+        lines = ["import time: self [us] | cumulative | imported package"]
+        for record in records:
+            lines.append(f"import time: {record['self_ms'] * 1000:9.0f} | {record['cumulative_ms'] * 1000:10.0f} | "
+                         f"{'  ' * record['depth']}{record['name']}")
+        return '\n'.join(lines)
+
+
+class StartupProfile:
+    """Pikat kryesore të nisjes (ms nga fillimi) dhe krahasimi me buxhetin"""
+
+    def __init__(self, started=None, budget_ms=None, trace_imports=True):
+        self.started = time.perf_counter() if started is None else started
+        self.budget_ms = STARTUP_BUDGET_MS if budget_ms is None else budget_ms
+        self.marks = []
+        self.imports = ImportTimer()
+        if trace_imports:
+            self.imports.install()
+
+    def mark(self, name):
+        """Regjistron një pikë të nisjes (p.sh. 'window', 'processors'); kthen ms nga fillimi"""
+        elapsed = self.elapsed_ms()
+        self.marks.append((name, elapsed))
+        return elapsed
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def mark_ms(self, name):
+        """Koha (ms) e pikës së regjistruar, ose None"""
+        for mark, elapsed in self.marks:
+            if mark == name:
+                return elapsed
+        return None
+
+    def within_budget(self, mark='window'):
+        """A u arrit pika (dritarja e dukshme) brenda buxhetit"""
+        elapsed = self.mark_ms(mark)
+        return elapsed is not None and elapsed <= self.budget_ms
+
+    def finish(self):
+        """Ndalon matjen e importeve (pas ngarkimit në background)"""
+        self.imports.uninstall()
+
+    def report(self, top=REPORT_TOP_IMPORTS):
+        """Raporti tekst: pikat e nisjes, buxheti dhe importet më të ngadalta"""
+        lines = ["Koha e nisjes (ms nga fillimi i main.py):"]
+        for name, elapsed in self.marks:
+            lines.append(f"  {name:<20} {elapsed:8.1f} ms")
+        window = self.mark_ms('window')
+        if window is not None:
+            verdict = "brenda buxhetit" if self.within_budget() else "MBI BUXHET"
+            lines.append(f"Dritarja: {window:.1f} ms / buxheti {self.budget_ms:.0f} ms ({verdict})")
+        lines.append(f"Importet: {len(self.imports.records)} module, {self.imports.total_ms():.1f} ms")
+        lines.append("")
+        lines.append(self.imports.format(top=top))
+        return '\n'.join(lines)
+
+
+class BackgroundLoader:
+    """Krijon një vlerë të rëndë (modulet, procesorët) një herë, në background ose në përdorimin e parë
+
+    get() pret derisa ngarkimi të përfundojë; nëse start() nuk është thirrur,
+    ngarkimi bëhet aty për aty në thread-in që e kërkon.
+    """
+
+    def __init__(self, factory, name='loader'):
+        self.factory = factory
+        self.name = name
+        self.value = None
+        self.error = None
+        self.seconds = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._started = False
+
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    def start(self):
+        """Fillon ngarkimin në një thread daemon"""
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        threading.Thread(target=self._load, name=self.name, daemon=True).start()
+        return self
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            self.value = self.factory()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.seconds = time.perf_counter() - started
+            self._done.set()
+
+    def get(self, timeout=None):
+        """Vlera e ngarkuar; ngre gabimin e factory-t nëse dështoi"""
+        with self._lock:
+            run_here = not self._started
+            self._started = True
+        if run_here:
+            self._load()
+        elif not self._done.wait(timeout):
+            raise TimeoutError(f"{self.name} nuk u ngarkua brenda {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def import_modules(names=DEFERRED_MODULES):
+    """Importon modulet e dhëna; kthen {emri: ms} (ato që mungojnë kalohen)"""
+    timings = {}
+    for name in names:
+        started = time.perf_counter()
+        try:
+            # __import__ (jo importlib) që importet të kalojnë nga ImportTimer
+            __import__(name)
+        except ImportError as e:
+            print(f"Deferred import error ({name}): {e}")
+            continue
+        timings[name] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def measure_startup(modules=STARTUP_MODULES, python=None):
+    """Mat në një proces të ri sa zgjat importimi i modulëve të nisjes; kthen ms"""
+    code = ("import time; started = time.perf_counter()\n"
+            f"for name in {list(modules)!r}: __import__(name)\n"
+            "print((time.perf_counter() - started) * 1000)")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([python or sys.executable, '-c', code], cwd=root, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mat kohën e importeve të nisjes kundrejt buxhetit")
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS,
+                        help="Buxheti i nisjes (ms); kodi 1 kur kalohet")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="Sa procese të reja (merret mediana)")
+    parser.add_argument('--deferred', action='store_true', help="Mat edhe modulet e ngarkuara në background")
+    args = parser.parse_args(argv)
+
+    runs = sorted(measure_startup() for _ in range(max(1, args.repeat)))
+    startup_ms = runs[len(runs) // 2]
+    print(f"Importet e nisjes: {startup_ms:.1f} ms (buxheti {args.budget_ms:.0f} ms)")
+    if args.deferred:
+        deferred = sorted(measure_startup(STARTUP_MODULES + DEFERRED_MODULES) for _ in range(max(1, args.repeat)))
+        print(f"Me modulet e shtyra: {deferred[len(deferred) // 2]:.1f} ms (ngarkohen pas dritares)")
+    return 0 if startup_ms <= args.budget_ms else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
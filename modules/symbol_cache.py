@@ -0,0 +1,292 @@
+"""
+Symbol Cache
+Memo i klasifikimit të prerjeve të simboleve, me çelës hash perceptual
+
+E njëjta valvolë ose instrument përsëritet mijëra herë në një set vizatimesh.
+Çdo prerje normalizohet (16x16, si deskriptori i indeksit) dhe hash-i i saj
+(256 bit: pixel mbi mesataren) bashkë me kovën e raportit të brinjëve është
+çelësi i rezultatit të klasifikimit. Si parazgjedhje pranohet vetëm hash-i i
+njëjtë; me max_distance > 0 pranohen edhe fqinjët Hamming (hash-i ndahet në
+max_distance + 1 copa dhe një fqinj i lejuar përputhet patjetër në të paktën
+një copë), por rezultati i tyre riverifikohet nga indeksi ndaj variantit të
+ruajtur. Cache-i ka madhësi të kufizuar (LRU) dhe mund të ruhet në disk mes
+ekzekutimeve.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+CACHE_FORMAT_VERSION = 1
+CACHE_FILENAME = '.symbol_cache.npz'
+
+DEFAULT_CACHE_SIZE = 4096
+# Bit të ndryshëm (nga 256) që dy prerje konsiderohen i njëjti simbol; 0 = vetëm hash-i i
+# njëjtë. Fqinjët riverifikohen ndaj variantit të ruajtur, ndaj kursejnë vetëm prefilter-in
+DEFAULT_MAX_DISTANCE = 0
+
+# Rezultati "nuk është simbol" ruhet edhe ai (blob-et e tekstit përsëriten po aq)
+NO_MATCH = -1
+
+# Numrat e stats() që mblidhen nga kopjet e cache-it në worker-a
+STAT_COUNTERS = ('lookups', 'exact_hits', 'near_hits', 'batch_hits', 'evictions')
+
+
+def perceptual_hashes(vectors):
+    """Hash-i i çdo prerjeje të normalizuar (rreshta me mesatare 0): bit 1 për pixel mbi mesataren"""
+    packed = np.packbits(np.asarray(vectors) > 0, axis=1)
+    return [int.from_bytes(row.tobytes(), 'big') for row in packed]
+
+
+def hamming(a, b):
+    """Numri i bit-ëve të ndryshëm"""
+    return bin(a ^ b).count('1')
+
+
+class _HashIndex:
+    """Indeks për fqinjët Hamming: hash-i ndahet në max_distance + 1 copa"""
+
+    def __init__(self, bits, max_distance):
+        self.max_distance = max_distance
+        count = min(max_distance + 1, bits)
+        self._chunks, start = [], 0
+        for i in range(count):
+            width = bits // count + (1 if i < bits % count else 0)
+            self._chunks.append((start, (1 << width) - 1))
+            start += width
+        self._members = {}
+
+    def _chunk_keys(self, bucket, value):
+        return [(i, bucket, (value >> shift) & mask) for i, (shift, mask) in enumerate(self._chunks)]
+
+    def add(self, key):
+        for chunk_key in self._chunk_keys(*key):
+            self._members.setdefault(chunk_key, set()).add(key)
+
+    def discard(self, key):
+        for chunk_key in self._chunk_keys(*key):
+            members = self._members.get(chunk_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._members[chunk_key]
+
+    def clear(self):
+        self._members.clear()
+
+    def nearest(self, bucket, value):
+        """Çelësi më i afërt në të njëjtën kovë brenda max_distance, ose None"""
+        best, best_distance = None, self.max_distance + 1
+        for chunk_key in self._chunk_keys(bucket, value):
+            for other in self._members.get(chunk_key, ()):
+                distance = hamming(value, other[1])
+                if distance < best_distance:
+                    best, best_distance = other, distance
+        return best
+
+
+class SymbolCache:
+    """Cache LRU: (kova, hash) -> (varianti i indeksit ose NO_MATCH, besueshmëria)
+
+    Rezultatet vlejnë vetëm për një indeks dhe një prag; bind() e zbraz
+    cache-in kur ndryshon hapësira (namespace) e tyre.
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, max_distance=DEFAULT_MAX_DISTANCE, bits=256, path=None):
+        self.max_size = max(1, int(max_size))
+        self.max_distance = max(0, int(max_distance))
+        self.bits = bits
+        self.path = path
+        self.namespace = None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._neighbors = _HashIndex(bits, self.max_distance)
+        self._dirty = False
+        self.reset_stats()
+        if path:
+            self.load(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        # Recognizer-i (bashkë me cache-in) dërgohet te worker-at e pllakave
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def reset_stats(self):
+        self.lookups = self.exact_hits = self.near_hits = self.batch_hits = self.evictions = 0
+
+    def merge_stats(self, stats):
+        """Shton numrat e një kopjeje tjetër të cache-it (p.sh. të worker-ave të pllakave)"""
+        with self._lock:
+            for name in STAT_COUNTERS:
+                setattr(self, name, getattr(self, name) + int(stats.get(name, 0)))
+
+    def stats(self):
+        """Numrat e kërkimeve: hits (të sakta, të përafërta, brenda grupit), misses, hit_rate, evictions"""
+        with self._lock:
+            hits = self.exact_hits + self.near_hits + self.batch_hits
+            return {
+                'entries': len(self._entries),
+                'max_size': self.max_size,
+                'max_distance': self.max_distance,
+                'lookups': self.lookups,
+                'hits': hits,
+                'exact_hits': self.exact_hits,
+                'near_hits': self.near_hits,
+                'batch_hits': self.batch_hits,
+                'misses': self.lookups - hits,
+                'hit_rate': round(hits / self.lookups, 3) if self.lookups else 0.0,
+                'evictions': self.evictions,
+            }
+
+    def bind(self, namespace):
+        """Lidh cache-in me një indeks/prag; rezultatet e hapësirës tjetër hidhen"""
+        with self._lock:
+            if namespace != self.namespace:
+                if self.namespace is not None or self._entries:
+                    self._clear()
+                self.namespace = namespace
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._neighbors.clear()
+        self._dirty = True
+
+    def get(self, bucket, value):
+        """Rezultati i ruajtur për (kova, hash), ose None; fqinjët deri në max_distance pranohen"""
+        return self._lookup(bucket, value)[0]
+
+    def _lookup(self, bucket, value):
+        """Kthen (rezultati ose None, True nëse erdhi nga një hash fqinj)"""
+        key = (bucket, value)
+        with self._lock:
+            self.lookups += 1
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return result, False
+            if not self.max_distance:
+                return None, False
+
+            best = self._neighbors.nearest(bucket, value)
+            if best is None:
+                return None, False
+            self._entries.move_to_end(best)
+            self.near_hits += 1
+            return self._entries[best], True
+
+    def lookup_batch(self, buckets, hashes):
+        """Kërkon një grup prerjesh; kthen (rezultatet, përfaqësuesit, fqinjët)
+
+        rezultatet[i] është rezultati i ruajtur ose None. Prerjet që mungojnë
+        dhe përsëriten brenda grupit (brenda max_distance) klasifikohen një herë:
+        përfaqësuesit[i] është indeksi i prerjes që klasifikohet për i.
+        fqinjët janë indekset që morën rezultatin e një hash-i tjetër (nga cache-i
+        ose nga përfaqësuesi); ato duhen riverifikuar para se të pranohen.
+        """
+        results = [None] * len(hashes)
+        representatives, near = {}, set()
+        local, owners = _HashIndex(self.bits, self.max_distance), {}
+        for i, (bucket, value) in enumerate(zip(buckets, hashes)):
+            results[i], from_neighbor = self._lookup(bucket, value)
+            if results[i] is not None:
+                if from_neighbor:
+                    near.add(i)
+                continue
+            key = (bucket, value)
+            owner = key if key in owners else (local.nearest(bucket, value) if self.max_distance else None)
+            if owner is None:
+                owners[key] = representatives[i] = i
+                local.add(key)
+            else:
+                representatives[i] = owners[owner]
+                if owner != key:
+                    near.add(i)
+                with self._lock:
+                    self.batch_hits += 1
+        return results, representatives, near
+
+    def put(self, bucket, value, entry, confidence):
+        """Ruan rezultatin e klasifikimit; më i vjetri hidhet kur cache-i mbushet"""
+        key = (bucket, value)
+        with self._lock:
+            if key not in self._entries:
+                self._neighbors.add(key)
+            self._entries[key] = (int(entry), float(confidence))
+            self._entries.move_to_end(key)
+            self._dirty = True
+            while len(self._entries) > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        key, _ = self._entries.popitem(last=False)
+        self._neighbors.discard(key)
+        self.evictions += 1
+
+    def save(self, path=None):
+        """Ruan cache-in në .npz (vetëm nëse ka ndryshuar); kthen True nëse u shkrua"""
+        path = path or self.path
+        if not path:
+            return False
+        with self._lock:
+            if not self._dirty:
+                return False
+            keys = list(self._entries)
+            values = list(self._entries.values())
+            namespace = self.namespace
+            self._dirty = False
+
+        nbytes = self.bits // 8
+        hashes = np.frombuffer(b''.join(value.to_bytes(nbytes, 'big') for _, value in keys), dtype=np.uint8)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path,
+                            hashes=hashes.reshape(len(keys), nbytes),
+                            buckets=np.array([bucket for bucket, _ in keys], dtype=np.int32),
+                            entries=np.array([entry for entry, _ in values], dtype=np.int32),
+                            confidences=np.array([confidence for _, confidence in values], dtype=np.float32),
+                            meta=np.array(json.dumps({
+                                'format': CACHE_FORMAT_VERSION,
+                                'bits': self.bits,
+                                'namespace': namespace,
+                            })))
+        os.replace(tmp_path, path)
+        return True
+
+    def load(self, path):
+        """Ngarkon cache-in nga disku (renditja LRU ruhet); kthen numrin e rezultateve"""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                if meta.get('format') != CACHE_FORMAT_VERSION or meta.get('bits') != self.bits:
+                    return 0
+                hashes, buckets = data['hashes'], data['buckets']
+                entries, confidences = data['entries'], data['confidences']
+        except Exception as e:
+            print(f"Symbol cache load error: {e}")
+            return 0
+
+        with self._lock:
+            self._clear()
+            self.namespace = meta.get('namespace')
+        # Më të fundit janë në fund; nëse max_size është më i vogël mbahen ato
+        for row, bucket, entry, confidence in list(zip(hashes, buckets, entries, confidences))[-self.max_size:]:
+            self.put(int(bucket), int.from_bytes(row.tobytes(), 'big'), int(entry), float(confidence))
+        self._dirty = False
+        return len(self._entries)
@@ -0,0 +1,431 @@
+"""
+Symbol Index
+Indeks i parallogaritur i template-ve të simboleve për zbulim të shpejtë
+
+Në vend që çdo template të kalojë mbi gjithë faqen në çdo shkallë, faqja
+ndahet në kandidatë (blob-e pa vijat e gjata të tubave). Çdo kandidat
+normalizohet në madhësi fikse, kështu që shkalla nuk kërkon më një cikël.
+Një prefilter i lirë (raporti i brinjëve + deskriptor 16x16 me një
+shumëzim matricash) lë vetëm disa variante për kandidat, dhe vetëm ato
+verifikohen me korrelacion të plotë. Indeksi ruhet në disk dhe rindërtohet
+vetëm kur ndryshon biblioteka.
+
+Në modalitetin kaskadë kandidatët kërkohen fillimisht në faqen e zvogëluar
+(morfologjia mbi 1/16 e pikselave) dhe krahasohen me deskriptorët me një
+prag më të ulët; vetëm rajonet që kalojnë procesohen në rezolucion të plotë.
+"""
+
+import json
+import math
+import os
+
+import cv2
+import numpy as np
+
+from modules.symbol_cache import NO_MATCH, perceptual_hashes
+
+INDEX_FORMAT_VERSION = 1
+INDEX_FILENAME = '.symbol_index.npz'
+
+DESCRIPTOR_SIZE = 16
+VERIFY_SIZE = 40
+
+# Hapi i kovave të raportit të brinjëve (në log2)
+ASPECT_BUCKET_STEP = 0.25
+
+# Kernel-i (pixel) që ribashkon copat e një simboli pas heqjes së vijave
+GROUPING_KERNEL = 7
+
+DEFAULT_TOP_K = 5
+DEFAULT_PREFILTER_MARGIN = 0.2
+
+# Kaskada: sa herë zvogëlohet faqja për kërkimin e rajoneve me interes
+DEFAULT_CASCADE_SCALE = 4
+# Pragu i korrelacionit të përafërt (deskriptorët e blob-eve të faqes së zvogëluar); rrathët e instrumenteve
+# dalin rreth 0.45 pas zvogëlimit, teksti dhe copat e tubave nën 0.3
+DEFAULT_CASCADE_THRESHOLD = 0.35
+# Hapësira (pixel në rezolucion të plotë) rreth çdo rajoni me interes
+CASCADE_PAD = 12
+
+# Një hash fqinj e pranon variantin e ruajtur vetëm nëse korrelacioni i tij nuk bie më shumë se
+# kaq nën atë të prerjes së ruajtur (simbolet e ngjashme, p.sh. valvolat, kalojnë lehtë pragun)
+NEAR_MATCH_MARGIN = 0.05
+
+
+def ink_map(gray):
+    """Imazh binar i bojës (1 = vijë, 0 = sfond)"""
+    _, binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    return binary
+
+
+def trim_to_ink(binary):
+    """Pret hapësirën e bardhë rreth simbolit"""
+    ys, xs = np.nonzero(binary)
+    if len(xs) == 0:
+        return binary
+    return binary[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+
+
+def _normalized_vectors(binaries, size):
+    """Ridimensionon dhe kthen vektorë me mesatare 0 dhe normë 1 (për korrelacion me dot)"""
+    vectors = np.empty((len(binaries), size * size), dtype=np.float32)
+    for i, binary in enumerate(binaries):
+        vectors[i] = cv2.resize(binary.astype(np.float32), (size, size), interpolation=cv2.INTER_AREA).ravel()
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.maximum(norms, 1e-6)
+    return vectors
+
+
+def aspect_bucket(width, height):
+    """Kova e raportit të brinjëve"""
+    return int(round(math.log2(max(width, 1) / max(height, 1)) / ASPECT_BUCKET_STEP))
+
+
+def line_length_for(max_size):
+    """Gjatësia mbi të cilën një vijë konsiderohet tub/kornizë, jo pjesë simboli
+
+    Cunget e tubit mes simbolit dhe një kryqëzimi janë shpesh më të shkurtra se
+    dy simbole; vijat e vetë simbolit mbrohen nga region_mask (hiqen vetëm
+    vargjet që arrijnë skajin e prerjes).
+    """
+    return int(max(max_size, 40))
+
+
+def remove_lines(binary, line_length):
+    """Heq vijat e gjata horizontale/vertikale; kthen (pa vija, vijat)"""
+    h_lines = cv2.morphologyEx(binary, cv2.MORPH_OPEN,
+                               cv2.getStructuringElement(cv2.MORPH_RECT, (line_length, 1)))
+    v_lines = cv2.morphologyEx(binary, cv2.MORPH_OPEN,
+                               cv2.getStructuringElement(cv2.MORPH_RECT, (1, line_length)))
+    lines = cv2.bitwise_or(h_lines, v_lines)
+    return cv2.subtract(binary, lines), lines
+
+
+def group_candidates(symbols_mask, min_size, max_size):
+    """Kutitë e blob-eve me madhësi simboli (copat e një simboli bashkohen me dilatim)"""
+    # Tubi që kalon përmes simbolit e ndan atë në copa; dilatimi i ribashkon për grupim
+    grouped = cv2.dilate(symbols_mask, np.ones((GROUPING_KERNEL, GROUPING_KERNEL), np.uint8))
+    _, _, stats, _ = cv2.connectedComponentsWithStats(grouped, connectivity=8)
+    candidates = []
+    pad = GROUPING_KERNEL // 2
+    for x, y, w, h, _ in stats[1:]:
+        # Kutia e dilatuar është më e madhe se simboli me gjysmën e kernel-it në çdo anë
+        x, y, w, h = x + pad, y + pad, max(1, w - 2 * pad), max(1, h - 2 * pad)
+        longest, shortest = max(w, h), min(w, h)
+        if min_size <= longest <= max_size and shortest >= max(2, min_size // 4):
+            candidates.append((int(x), int(y), int(w), int(h)))
+    return candidates
+
+
+def coarse_regions(binary, factor, line_length, grouping=3):
+    """Blob-et pa vija në faqen e zvogëluar factor herë
+
+    Një pixel i zvogëluar ka bojë nëse blloku i tij ka ndonjë pixel bojë, kështu
+    që edhe vijat e holla mbeten. Kthen (maska pa vija, vijat, kutitë e blob-eve),
+    të gjitha në koordinatat e faqes së zvogëluar.
+    """
+    height, width = binary.shape[:2]
+    rows, cols = height // factor, width // factor
+    # Faqja pritet në shumëfish të factor që pikselat e zvogëluar të bien saktë mbi blloqet
+    small = cv2.resize(binary[:rows * factor, :cols * factor] * np.uint8(255), (cols, rows),
+                       interpolation=cv2.INTER_AREA)
+    small = (small > 0).astype(np.uint8)
+    mask, lines = remove_lines(small, max(3, line_length // factor))
+
+    grouped = cv2.dilate(mask, np.ones((grouping, grouping), np.uint8))
+    _, _, stats, _ = cv2.connectedComponentsWithStats(grouped, connectivity=8)
+    pad = grouping // 2
+    boxes = [(int(x + pad), int(y + pad), int(max(1, w - 2 * pad)), int(max(1, h - 2 * pad)))
+             for x, y, w, h, _ in stats[1:]]
+    return mask, lines, boxes
+
+
+def _border_runs(binary):
+    """Pikselat në vargje horizontale/vertikale të pandërprera që arrijnë skajin e prerjes"""
+    runs = np.cumprod(binary, axis=1, dtype=np.uint8)
+    runs |= np.cumprod(binary[:, ::-1], axis=1, dtype=np.uint8)[:, ::-1]
+    runs |= np.cumprod(binary, axis=0, dtype=np.uint8)
+    runs |= np.cumprod(binary[::-1], axis=0, dtype=np.uint8)[::-1]
+    return runs
+
+
+def region_mask(binary, lines, box, factor, pad=CASCADE_PAD):
+    """Maska pa vija e një rajoni në rezolucion të plotë; kthen (maska, x0, y0)
+
+    Brenda prerjes tubat janë vargjet që arrijnë skajin dhe bien mbi vijat e
+    gjetura në faqen e zvogëluar; vetëm ato hiqen, pa morfologji mbi gjithë faqen.
+    """
+    rows, cols = lines.shape[:2]
+    margin = -(-pad // factor)
+    cx0, cy0 = max(0, box[0] - margin), max(0, box[1] - margin)
+    cx1, cy1 = min(cols, box[0] + box[2] + margin), min(rows, box[1] + box[3] + margin)
+    x0, y0 = cx0 * factor, cy0 * factor
+    crop = binary[y0:cy1 * factor, x0:cx1 * factor]
+
+    band = np.repeat(np.repeat(lines[cy0:cy1, cx0:cx1], factor, axis=0), factor, axis=1)
+    mask = crop & ~(_border_runs(crop) & band)
+    return mask, x0, y0
+
+
+class SymbolIndex:
+    """Variantet (rrotullime) e template-ve me deskriptorët e parallogaritur"""
+
+    def __init__(self, entries, descriptors, verify_vectors, sizes, fingerprint):
+        self.entries = entries
+        self.descriptors = descriptors
+        self.verify_vectors = verify_vectors
+        self.sizes = sizes
+        self.fingerprint = fingerprint
+
+        self.buckets = {}
+        for index, (w, h) in enumerate(self.sizes):
+            self.buckets.setdefault(aspect_bucket(w, h), []).append(index)
+        self.buckets = {key: np.array(value, dtype=np.int32) for key, value in self.buckets.items()}
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def build(cls, templates, fingerprint=''):
+        """Ndërton indeksin nga template-t (me 4 rrotullime, pa dublikatat simetrike)"""
+        entries, binaries = [], []
+
+        for template_index, template in enumerate(templates):
+            base = trim_to_ink(ink_map(template['image']))
+            seen = []
+            for quarter in range(4):
+                variant = np.ascontiguousarray(np.rot90(base, quarter))
+                descriptor = _normalized_vectors([variant], DESCRIPTOR_SIZE)[0]
+                # Simbolet simetrike (p.sh. rrathët) nuk kanë nevojë për çdo rrotullim
+                if any(float(descriptor @ other) > 0.98 for other in seen):
+                    continue
+                seen.append(descriptor)
+                entries.append({
+                    'template': template_index,
+                    'type': template['type'],
+                    'name': template['name'],
+                    'rotation': quarter * 90,
+                })
+                binaries.append(variant)
+
+        if not binaries:
+            empty = np.zeros((0, DESCRIPTOR_SIZE * DESCRIPTOR_SIZE), dtype=np.float32)
+            return cls([], empty, np.zeros((0, VERIFY_SIZE * VERIFY_SIZE), dtype=np.float32),
+                       np.zeros((0, 2), dtype=np.int32), fingerprint)
+
+        sizes = np.array([(b.shape[1], b.shape[0]) for b in binaries], dtype=np.int32)
+        return cls(entries, _normalized_vectors(binaries, DESCRIPTOR_SIZE),
+                   _normalized_vectors(binaries, VERIFY_SIZE), sizes, fingerprint)
+
+    def save(self, path):
+        """Ruan indeksin në një skedar .npz"""
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path,
+                            descriptors=self.descriptors,
+                            verify_vectors=self.verify_vectors,
+                            sizes=self.sizes,
+                            meta=np.array(json.dumps({
+                                'format': INDEX_FORMAT_VERSION,
+                                'fingerprint': self.fingerprint,
+                                'descriptor_size': DESCRIPTOR_SIZE,
+                                'verify_size': VERIFY_SIZE,
+                                'entries': self.entries,
+                            })))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, fingerprint=None):
+        """Ngarkon indeksin; kthen None nëse mungon ose është i vjetër"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                if (meta.get('format') != INDEX_FORMAT_VERSION
+                        or meta.get('descriptor_size') != DESCRIPTOR_SIZE
+                        or meta.get('verify_size') != VERIFY_SIZE
+                        or (fingerprint is not None and meta.get('fingerprint') != fingerprint)):
+                    return None
+                return cls(meta['entries'], data['descriptors'], data['verify_vectors'],
+                           data['sizes'], meta['fingerprint'])
+        except Exception as e:
+            print(f"Symbol index load error: {e}")
+            return None
+
+    def size_range(self, scales):
+        """Madhësia min/max (pixel) e simboleve në faqe për shkallët e dhëna"""
+        if not len(self):
+            return 0, 0
+        longest = self.sizes.max(axis=1)
+        return int(longest.min() * min(scales)), int(math.ceil(longest.max() * max(scales)))
+
+    def detect(self, gray, scales, threshold, top_k=DEFAULT_TOP_K, prefilter_margin=DEFAULT_PREFILTER_MARGIN,
+               cache=None):
+        """Zbulon simbolet në një faqe grayscale
+
+        Rezultati (besueshmëria) është korrelacioni me mesatare 0 dhe normë 1, i
+        njëjti që jep TM_CCOEFF_NORMED, ndaj pragu vlen njësoj si në kërkimin e plotë.
+        Rajonet që mbivendosen mund të japin të njëjtin simbol dy herë (NMS pas).
+        """
+        if not len(self):
+            return []
+
+        min_size, max_size = self.size_range(scales)
+        min_size = max(min_size, 6)
+        binary = ink_map(gray)
+        lines_mask, lines = remove_lines(binary, line_length_for(max_size))
+        # Hapja humb pixelin e fundit të tubit pranë simbolit; cungu i mbetur ul korrelacionin
+        lines = cv2.dilate(lines, np.ones((3, 3), np.uint8))
+
+        crops, candidates = [], []
+        for box in group_candidates(lines_mask, min_size, max_size):
+            # Maska globale pa vija pret edhe vijat e simbolit që bien mbi tub; brenda rajonit
+            # hiqen vetëm vargjet e tubit që arrijnë skajin (si në kaskadë)
+            mask, x0, y0 = region_mask(binary, lines, box, 1)
+            for x, y, w, h in group_candidates(mask, min_size, max_size):
+                crops.append(mask[y:y + h, x:x + w])
+                candidates.append((x + x0, y + y0, w, h))
+        return self.match(crops, candidates, threshold, top_k, prefilter_margin, cache)
+
+    def detect_cascade(self, gray, scales, threshold, cascade_threshold=DEFAULT_CASCADE_THRESHOLD,
+                       factor=DEFAULT_CASCADE_SCALE, top_k=DEFAULT_TOP_K,
+                       prefilter_margin=DEFAULT_PREFILTER_MARGIN, cache=None):
+        """Zbulim nga e trashë në të hollë: rajonet me interes në faqen e zvogëluar, verifikimi në të plotën
+
+        Blob-et e faqes së zvogëluar krahasohen me deskriptorët e variantëve;
+        ato nën cascade_threshold hidhen pa u prekur në rezolucion të plotë.
+        Rajonet që mbivendosen mund të japin të njëjtin simbol dy herë (NMS pas).
+        """
+        if not len(self):
+            return []
+
+        min_size, max_size = self.size_range(scales)
+        min_size = max(min_size, 6)
+        binary = ink_map(gray)
+        coarse_mask, lines, boxes = coarse_regions(binary, factor, line_length_for(max_size))
+        # Kufijtë e madhësisë zgjerohen me një pixel të zvogëluar për gabimin e rrumbullakimit
+        low, high = min_size / factor - 1, max_size / factor + 1
+        boxes = [box for box in boxes if low <= max(box[2], box[3]) <= high]
+        if not boxes:
+            return []
+
+        coarse = _normalized_vectors([coarse_mask[y:y + h, x:x + w] for x, y, w, h in boxes], DESCRIPTOR_SIZE)
+        scores = (coarse @ self.descriptors.T).max(axis=1)
+
+        crops, candidates = [], []
+        for box, score in zip(boxes, scores):
+            if score < cascade_threshold:
+                continue
+            mask, x0, y0 = region_mask(binary, lines, box, factor)
+            for x, y, w, h in group_candidates(mask, min_size, max_size):
+                crops.append(mask[y:y + h, x:x + w])
+                candidates.append((x + x0, y + y0, w, h))
+        return self.match(crops, candidates, threshold, top_k, prefilter_margin, cache)
+
+    def match(self, crops, candidates, threshold, top_k=DEFAULT_TOP_K, prefilter_margin=DEFAULT_PREFILTER_MARGIN,
+              cache=None):
+        """Krahason kandidatët (prerjet e maskës pa vija) me variantet e indeksit
+
+        Me cache (SymbolCache) prerjet me hash të njohur marrin rezultatin e
+        ruajtur; vetëm të tjerat kalojnë prefilter-in dhe verifikimin. Rezultatet
+        e një hash-i fqinj riverifikohen ndaj variantit të ruajtur dhe, nëse nuk
+        e kalojnë pragun, klasifikohen nga e para.
+        """
+        if not candidates:
+            return []
+
+        cand_descriptors = _normalized_vectors(crops, DESCRIPTOR_SIZE)
+        # Varianti më i mirë dhe besueshmëria për çdo kandidat (-1 = nuk u gjet)
+        best_entries = np.full(len(candidates), -1, dtype=np.int64)
+        best_scores = np.full(len(candidates), -1.0, dtype=np.float32)
+        buckets = [aspect_bucket(w, h) for _, _, w, h in candidates]
+
+        pending, hashes, representatives, near = range(len(candidates)), None, {}, set()
+        if cache is not None:
+            cache.bind(f"{self.fingerprint}:{threshold:g}:{top_k}:{prefilter_margin:g}")
+            hashes = perceptual_hashes(cand_descriptors)
+            cached, representatives, near = cache.lookup_batch(buckets, hashes)
+            for i, result in enumerate(cached):
+                if result is not None:
+                    best_entries[i], best_scores[i] = result
+            # Simbolet që përsëriten në këtë faqe klasifikohen një herë (përfaqësuesi)
+            pending = sorted(i for i, owner in representatives.items() if owner == i)
+
+        classify = (crops, cand_descriptors, buckets, threshold, top_k, prefilter_margin, best_entries, best_scores)
+        self._classify(pending, *classify)
+        for i, owner in representatives.items():
+            best_entries[i], best_scores[i] = best_entries[owner], best_scores[owner]
+
+        retry = self._reverify(sorted(near), crops, threshold, best_entries, best_scores) if near else []
+        self._classify(retry, *classify)
+
+        if cache is not None:
+            for i in list(pending) + retry:
+                matched = best_scores[i] >= threshold
+                cache.put(buckets[i], hashes[i], best_entries[i] if matched else NO_MATCH, best_scores[i])
+
+        detections = []
+        for i, (x, y, w, h) in enumerate(candidates):
+            score = float(best_scores[i])
+            if score < threshold or best_entries[i] < 0:
+                continue
+            entry = self.entries[int(best_entries[i])]
+            detections.append({
+                'type': entry['type'],
+                'name': entry['name'],
+                'confidence': round(score * 100.0, 1),
+                'position': [x + w // 2, y + h // 2],
+                'bbox': [x, y, w, h],
+                'rotation': entry['rotation'],
+            })
+
+        return detections
+
+    def _classify(self, indices, crops, cand_descriptors, buckets, threshold, top_k, prefilter_margin,
+                  best_entries, best_scores):
+        """Prefilter + verifikim për kandidatët e dhënë; plotëson best_entries/best_scores"""
+        # Kandidatët grupohen sipas kovës; secili krahasohet vetëm me variantet e kovave fqinje
+        groups = {}
+        for i in indices:
+            groups.setdefault(buckets[i], []).append(i)
+        if not groups:
+            return
+        cand_verify = _normalized_vectors([crops[i] for i in indices], VERIFY_SIZE)
+        verify_rows = {i: row for row, i in enumerate(indices)}
+        prefilter_threshold = threshold - prefilter_margin
+
+        for bucket, members in groups.items():
+            entry_ids = [self.buckets[b] for b in (bucket - 1, bucket, bucket + 1) if b in self.buckets]
+            if not entry_ids:
+                continue
+            entry_ids = np.concatenate(entry_ids)
+            members = np.array(members, dtype=np.int32)
+
+            # Prefilter: një GEMM (kandidatë x variante) mbi deskriptorët 16x16
+            coarse = cand_descriptors[members] @ self.descriptors[entry_ids].T
+            k = min(top_k, len(entry_ids))
+            top = np.argpartition(-coarse, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(coarse, top, axis=1)
+
+            # Verifikimi: korrelacion i plotë vetëm për variantet që kaluan prefilter-in
+            rows = [verify_rows[int(i)] for i in members]
+            verify = np.einsum('nd,nkd->nk', cand_verify[rows], self.verify_vectors[entry_ids[top]])
+            verify[top_scores < prefilter_threshold] = -1.0
+
+            best = verify.argmax(axis=1)
+            best_entries[members] = entry_ids[top[np.arange(len(members)), best]]
+            best_scores[members] = verify[np.arange(len(members)), best]
+
+    def _reverify(self, indices, crops, threshold, best_entries, best_scores):
+        """Korrelacioni me variantin e huazuar nga hash-i fqinj; kthen ata që duhen klasifikuar nga e para"""
+        entries = best_entries[indices]
+        floors = np.maximum(best_scores[indices] - NEAR_MATCH_MARGIN, threshold)
+        vectors = _normalized_vectors([crops[i] for i in indices], VERIFY_SIZE)
+        scores = np.einsum('nd,nd->n', vectors, self.verify_vectors[np.maximum(entries, 0)])
+        # Edhe "nuk është simbol" i fqinjit klasifikohet nga e para
+        scores[entries < 0] = -1.0
+        best_scores[indices] = scores
+        failed = [i for i, score, floor in zip(indices, scores, floors) if score < floor]
+        best_entries[failed] = -1
+        return failed
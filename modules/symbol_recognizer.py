@@ -0,0 +1,379 @@
+"""
+Symbol Recognizer
+Zbulon simbolet (valvola, tuba, instrumente) dhe ekstrakton tekstin nga vizatimet
+"""
+
+import hashlib
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from modules.ocr_engine import (DEFAULT_BATCH_SIZE, DEFAULT_LANGUAGE, OcrUnavailable, available_backends,
+                               backend_ready, get_ocr_pool)
+from modules.symbol_cache import CACHE_FILENAME, DEFAULT_MAX_DISTANCE, SymbolCache
+from modules.symbol_index import (DEFAULT_CASCADE_SCALE, DEFAULT_CASCADE_THRESHOLD, INDEX_FILENAME, SymbolIndex,
+                                  coarse_regions, ink_map, region_mask, remove_lines)
+
+RECOGNIZER_VERSION = '1.2'
+
+# Paralajmërimet OCR të shfaqura në këtë proces (një herë, jo për çdo faqe ose pllakë)
+_ocr_warnings = set()
+
+
+def _warn_ocr(error):
+    message = str(error)
+    if message not in _ocr_warnings:
+        _ocr_warnings.add(message)
+        print(f"OCR warning: {message}")
+
+# Biblioteka e simboleve: skedarë "<lloji>__<Emri>.png", p.sh. "valve__Gate Valve.png"
+SYMBOL_LIBRARY_DIR = Path(__file__).resolve().parent.parent / 'symbols'
+TEMPLATE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+DEFAULT_SYMBOL_THRESHOLD = 0.8
+DEFAULT_SCALES = (0.5, 0.75, 1.0, 1.25, 1.5, 2.0)
+
+# Besueshmëria minimale (%) që një rezultat OCR të mbahet
+MIN_TEXT_CONFIDENCE = 30.0
+
+
+def to_gray(image):
+    """Konverton imazhin në grayscale"""
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+
+def non_max_suppression(detections, overlap=0.3):
+    """Heq detektimet që mbivendosen, duke mbajtur ato me besueshmëri më të lartë"""
+    if not detections:
+        return []
+
+    boxes = np.array([d['bbox'] for d in detections], dtype=np.float32)
+    scores = np.array([d['confidence'] for d in detections], dtype=np.float32)
+    x1, y1 = boxes[:, 0], boxes[:, 1]
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    areas = boxes[:, 2] * boxes[:, 3]
+
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        inter = np.maximum(0, xx2 - xx1) * np.maximum(0, yy2 - yy1)
+        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-6)
+        order = order[1:][iou <= overlap]
+
+    return [detections[i] for i in keep]
+
+
+# Vijat më të gjata se kaq (pixel) janë tuba ose korniza, jo tekst
+TEXT_LINE_LENGTH = 60
+
+
+def _text_boxes(text_mask, page_size, offset=(0, 0), min_height=6, max_height=200):
+    """Kutitë e fjalëve/rreshtave në një maskë pa vija (koordinata faqeje)"""
+    # Shkronjat afër njëra-tjetrës bashkohen në fjalë
+    merged = cv2.dilate(text_mask, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 3)))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(merged, connectivity=8)
+
+    regions = []
+    width, height = page_size
+    for x, y, w, h, area in stats[1:]:
+        if not (min_height <= h <= max_height) or w < 4:
+            continue
+        if w > 40 * h or area < 0.15 * w * h:
+            continue
+        x, y = x + offset[0], y + offset[1]
+        pad = max(2, h // 6)
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(width, x + w + pad), min(height, y + h + pad)
+        regions.append([int(x0), int(y0), int(x1 - x0), int(y1 - y0)])
+    return regions
+
+
+def _reading_order(regions):
+    """Radhë leximi: nga lart poshtë, nga e majta në të djathtë"""
+    regions.sort(key=lambda box: (box[1] // 10, box[0]))
+    return regions
+
+
+def find_text_regions(gray, min_height=6, max_height=200):
+    """Gjen rajonet që duken si tekst (fjalë/rreshta), pa vijat e gjata të vizatimit"""
+    text_mask, _ = remove_lines(ink_map(gray), TEXT_LINE_LENGTH)
+    height, width = gray.shape[:2]
+    return _reading_order(_text_boxes(text_mask, (width, height), min_height=min_height, max_height=max_height))
+
+
+def find_text_regions_cascade(gray, factor=DEFAULT_CASCADE_SCALE, min_height=6, max_height=200):
+    """Si find_text_regions, por maskat pa vija ndërtohen vetëm rreth blob-eve të faqes së zvogëluar"""
+    binary = ink_map(gray)
+    _, lines, boxes = coarse_regions(binary, factor, TEXT_LINE_LENGTH)
+    height, width = gray.shape[:2]
+
+    regions, seen = [], set()
+    for box in boxes:
+        if box[3] > max_height / factor + 1:
+            continue
+        mask, x0, y0 = region_mask(binary, lines, box, factor)
+        for region in _text_boxes(mask, (width, height), (x0, y0), min_height, max_height):
+            # Rajonet fqinje mbivendosen; e njëjta fjalë mbahet një herë
+            if tuple(region) not in seen:
+                seen.add(tuple(region))
+                regions.append(region)
+    return _reading_order(regions)
+
+
+def _overlaps(box, boxes):
+    """A mbivendoset kutia [x, y, w, h] me ndonjë nga kutitë"""
+    x, y, w, h = box
+    return any(x < bx + bw and bx < x + w and y < by + bh and by < y + h for bx, by, bw, bh in boxes)
+
+
+def combine_text_layer(text_layer, ocr_text, raster_regions):
+    """Teksti i ngulitur (besueshmëri 100) plus OCR vetëm brenda imazheve raster, aty ku shtresa s'ka tekst"""
+    text_boxes = [item['bbox'] for item in text_layer]
+    extra = [item for item in ocr_text
+             if _overlaps(item['bbox'], raster_regions) and not _overlaps(item['bbox'], text_boxes)]
+    return [dict(item) for item in text_layer] + extra
+
+
+class SymbolRecognizer:
+    """Zbulim simbolesh me template matching dhe OCR për tekstin"""
+
+    def __init__(self, language=DEFAULT_LANGUAGE, ocr_backend=None, library_dir=SYMBOL_LIBRARY_DIR,
+                 threshold=DEFAULT_SYMBOL_THRESHOLD, scales=DEFAULT_SCALES, ocr_batch_size=DEFAULT_BATCH_SIZE,
+                 use_index=True, cascade=False, cascade_threshold=DEFAULT_CASCADE_THRESHOLD,
+                 cascade_scale=DEFAULT_CASCADE_SCALE, cache_size=0,
+                 cache_distance=DEFAULT_MAX_DISTANCE, persist_cache=False, ocr_workers=1):
+        self.language = language
+        self.ocr_backend = ocr_backend
+        # Sa motorë OCR mund të punojnë njëkohësisht (thread-et që ndajnë këtë recognizer)
+        self.ocr_workers = max(1, ocr_workers)
+        self.library_dir = Path(library_dir)
+        self.threshold = threshold
+        self.scales = tuple(scales)
+        self.ocr_batch_size = ocr_batch_size
+        self.use_index = use_index
+        # Kaskada: rajonet me interes gjenden në faqen e zvogëluar, zbulimi dhe OCR vetëm aty
+        self.cascade = cascade
+        self.cascade_threshold = cascade_threshold
+        self.cascade_scale = cascade_scale
+        self._templates = None
+        self.index = self.load_index() if use_index else None
+        # Memo i klasifikimit për simbolet që përsëriten (p.sh. cache_size=DEFAULT_CACHE_SIZE); joaktiv si
+        # parazgjedhje: klasifikimi është pjesa e vogël e zbulimit, kohën e marrin maskat e faqes
+        self.symbol_cache = None
+        if self.index is not None and cache_size:
+            path = None
+            if persist_cache and self.library_dir.is_dir():
+                path = str(self.library_dir / CACHE_FILENAME)
+            self.symbol_cache = SymbolCache(cache_size, cache_distance, path=path)
+
+    @property
+    def version(self):
+        """Versioni i modeleve; ndryshon kur ndryshon biblioteka, pragu, shkallët, gjuha ose motori OCR"""
+        # Pa motor OCR teksti i skanuar mungon; pas instalimit të motorit rezultatet rillogariten
+        ocr = 'none' if self.ocr_status() else self.ocr_backend or 'auto'
+        version = f"{RECOGNIZER_VERSION}:{ocr}:{self.language}:{self.library_fingerprint()}"
+        # Pragu ndryshohet nga slider-i i Cilësimeve; rezultatet e cache-it me pragun e vjetër nuk vlejnë
+        scales = ','.join(f"{float(scale):g}" for scale in self.scales)
+        version += f":t{float(self.threshold):g}:s{scales}"
+        if not self.use_index:
+            version += ':exhaustive'
+        if self.cascade:
+            version += f":cascade{self.cascade_scale}@{self.cascade_threshold:g}"
+        if self.symbol_cache is not None and self.symbol_cache.max_distance:
+            # Me tolerancë rezultati mund të vijë nga një prerje fqinje
+            version += f":memo{self.symbol_cache.max_distance}"
+        return version
+
+    def ocr_status(self):
+        """None kur motori OCR është gati, përndryshe arsyeja (pa e ngarkuar motorin)"""
+        if self.ocr_backend:
+            if backend_ready(self.ocr_backend):
+                return None
+            return f"motori OCR '{self.ocr_backend}' nuk është instaluar"
+        if available_backends():
+            return None
+        return "asnjë motor OCR nuk është instaluar (easyocr, ose pytesseract me binarin tesseract)"
+
+    def set_language(self, language):
+        """Zgjedh gjuhën OCR (pool-i i gjuhës ngarkohet në përdorimin e parë)"""
+        self.language = language
+
+    def library_fingerprint(self):
+        """Hash i shkurtër i skedarëve të bibliotekës së simboleve"""
+        digest = hashlib.sha1()
+        for path in self._template_files():
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+        return digest.hexdigest()[:12]
+
+    def _template_files(self):
+        if not self.library_dir.is_dir():
+            return []
+        return sorted(p for p in self.library_dir.iterdir() if p.suffix.lower() in TEMPLATE_EXTENSIONS)
+
+    @property
+    def templates(self):
+        """Template-t e bibliotekës (ngarkohen vetëm kur duhen)"""
+        if self._templates is None:
+            self._templates = self.load_templates()
+        return self._templates
+
+    def load_templates(self):
+        """Ngarkon template-t e simboleve nga biblioteka"""
+        templates = []
+        for path in self._template_files():
+            image = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                continue
+            symbol_type, _, name = path.stem.partition('__')
+            templates.append({
+                'type': symbol_type,
+                'name': name or symbol_type,
+                'image': image,
+            })
+        return templates
+
+    def load_index(self):
+        """Ngarkon indeksin e template-ve nga disku, ose e ndërton nëse biblioteka ka ndryshuar"""
+        fingerprint = self.library_fingerprint()
+        path = str(self.library_dir / INDEX_FILENAME) if self.library_dir.is_dir() else None
+
+        index = SymbolIndex.load(path, fingerprint) if path else None
+        if index is None:
+            index = SymbolIndex.build(self.templates, fingerprint)
+            if path:
+                try:
+                    index.save(path)
+                except OSError as e:
+                    print(f"Symbol index save error: {e}")
+        return index
+
+    def detect_symbols(self, data):
+        """Zbulon simbolet në imazh; kthen listë me type, name, confidence, position, bbox"""
+        image = data.get('image') if isinstance(data, dict) else None
+        if image is None:
+            return []
+
+        if self.index is not None and self.cascade:
+            # Pragu i përafërt nuk mund të jetë më i rreptë se pragu i verifikimit
+            return non_max_suppression(self.index.detect_cascade(
+                to_gray(image), self.scales, self.threshold, min(self.cascade_threshold, self.threshold),
+                self.cascade_scale, cache=self.symbol_cache))
+        if self.index is not None:
+            return non_max_suppression(self.index.detect(to_gray(image), self.scales, self.threshold,
+                                                         cache=self.symbol_cache))
+        return self.detect_symbols_exhaustive(data)
+
+    def detect_symbols_exhaustive(self, data):
+        """Template matching i plotë (çdo template, çdo shkallë mbi gjithë faqen); për krahasim"""
+        image = data.get('image') if isinstance(data, dict) else None
+        if image is None or not self.templates:
+            return []
+
+        gray = to_gray(image)
+        detections = []
+
+        for template in self.templates:
+            for scale in self.scales:
+                scaled = cv2.resize(template['image'], None, fx=scale, fy=scale,
+                                    interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+                th, tw = scaled.shape[:2]
+                if th > gray.shape[0] or tw > gray.shape[1] or th < 4 or tw < 4:
+                    continue
+
+                scores = cv2.matchTemplate(gray, scaled, cv2.TM_CCOEFF_NORMED)
+                ys, xs = np.where(scores >= self.threshold)
+                for x, y in zip(xs, ys):
+                    detections.append({
+                        'type': template['type'],
+                        'name': template['name'],
+                        'confidence': float(scores[y, x]) * 100.0,
+                        'position': [int(x + tw // 2), int(y + th // 2)],
+                        'bbox': [int(x), int(y), int(tw), int(th)],
+                    })
+
+        return non_max_suppression(detections)
+
+    def extract_text(self, data):
+        """Ekstrakton tekstin; rajonet i dërgohen motorit OCR në grupe
+
+        Kur data ka 'text_layer' (PDF me tekst të ngulitur) rreshtat e tij
+        kthehen drejtpërdrejt; OCR bëhet vetëm për rajonet brenda
+        'raster_regions' që shtresa nuk i mbulon.
+        """
+        image = data.get('image') if isinstance(data, dict) else None
+        text_layer = data.get('text_layer') if isinstance(data, dict) else None
+        if text_layer is not None:
+            raster_regions = data.get('raster_regions') or []
+            if image is None or not raster_regions:
+                return [dict(item) for item in text_layer]
+            text_boxes = [item['bbox'] for item in text_layer]
+            regions = [region for region in self._text_regions(image)
+                       if _overlaps(region, raster_regions) and not _overlaps(region, text_boxes)]
+            return combine_text_layer(text_layer, self._recognize(image, regions), raster_regions)
+
+        if image is None:
+            return []
+        return self._recognize(image, self._text_regions(image))
+
+    def _text_regions(self, image):
+        gray = to_gray(image)
+        return find_text_regions_cascade(gray, self.cascade_scale) if self.cascade else find_text_regions(gray)
+
+    def _recognize(self, image, regions):
+        """OCR i rajoneve [x, y, w, h]; kthen elementet e tekstit mbi MIN_TEXT_CONFIDENCE"""
+        if not regions:
+            return []
+
+        try:
+            pool = get_ocr_pool(self.language, self.ocr_backend, self.ocr_workers)
+            with pool.engine() as engine:
+                recognized = engine.recognize_batch(image, regions, batch_size=self.ocr_batch_size)
+        except OcrUnavailable as e:
+            # Vetëm teksti humbet; simbolet, tubat dhe BOM e analizës mbeten
+            _warn_ocr(e)
+            return []
+
+        text_data = []
+        for (x, y, w, h), (content, confidence) in zip(regions, recognized):
+            if not content or confidence < MIN_TEXT_CONFIDENCE:
+                continue
+            text_data.append({
+                'content': content,
+                'confidence': round(confidence, 1),
+                'position': [x + w // 2, y + h // 2],
+                'bbox': [x, y, w, h],
+            })
+        return text_data
+
+    def cache_stats(self):
+        """Statistikat e memo-s së klasifikimit (hit rate); None nëse është çaktivizuar"""
+        return self.symbol_cache.stats() if self.symbol_cache is not None else None
+
+    def save_cache(self):
+        """Ruan memo-n në bibliotekë (vetëm me persist_cache dhe nëse ka ndryshuar)"""
+        if self.symbol_cache is None:
+            return False
+        try:
+            return self.symbol_cache.save()
+        except OSError as e:
+            print(f"Symbol cache save error: {e}")
+            return False
+
+    def warm_up(self):
+        """Ngarkon motorin OCR paraprakisht; kthen False (me paralajmërim) kur motori mungon"""
+        try:
+            get_ocr_pool(self.language, self.ocr_backend, self.ocr_workers).warm_up()
+        except OcrUnavailable as e:
+            _warn_ocr(e)
+            return False
+        return True
@@ -0,0 +1,568 @@
+"""
+Tiled Processing
+Procesim me pllaka (tiles) për skanime shumë të mëdha, me memorie të kufizuar
+
+Faqja raster dekodohet një herë drejt e në një buffer të ndarë (SharedImage),
+pa kaluar si array i plotë në RAM; me workers > 1 pllakat analizohen në procese të veçanta që marrin vetëm një
+handle të burimit dhe lexojnë pllakën si view, pa kopjuar faqen.
+"""
+
+import io
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from modules.shared_image import BACKEND_FILE, SharedImage, attached_array
+
+DEFAULT_TILE_SIZE = 2048
+DEFAULT_TILE_OVERLAP = 256
+
+# Sa pixel larg skajit të brendshëm konsiderohet "e prerë" një detektim
+EDGE_MARGIN = 2
+
+
+def tile_grid(width, height, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_TILE_OVERLAP):
+    """Kthen pllakat (x, y, w, h) që mbulojnë faqen me mbivendosje"""
+    if overlap >= tile_size:
+        raise ValueError("Mbivendosja duhet të jetë më e vogël se madhësia e pllakës")
+
+    step = tile_size - overlap
+    xs = list(range(0, max(width - overlap, 1), step))
+    ys = list(range(0, max(height - overlap, 1), step))
+
+    for y in ys:
+        for x in xs:
+            yield x, y, min(tile_size, width - x), min(tile_size, height - y)
+
+
+def _as_rgb(tile):
+    """Konverton pllakën në RGB (kopje e vogël, sa pllaka)"""
+    if tile.ndim == 2:
+        return cv2.cvtColor(np.ascontiguousarray(tile), cv2.COLOR_GRAY2RGB)
+    return np.ascontiguousarray(tile)
+
+
+class ArrayTileSource:
+    """Burim pllakash mbi një array (view i buffer-it të ndarë në një worker)"""
+
+    def __init__(self, filepath, data):
+        self.filepath = filepath
+        self._data = data
+        self.height, self.width = data.shape[:2]
+        self.channels = 1 if data.ndim == 2 else data.shape[2]
+
+    def read_tile(self, x, y, w, h):
+        """Lexon një pllakë si RGB"""
+        return _as_rgb(self._data[y:y + h, x:x + w])
+
+    def close(self):
+        self._data = None
+
+
+class RasterTileHandle:
+    """Handle i lehtë (picklable) i një RasterTileSource për worker-at"""
+
+    def __init__(self, filepath, image):
+        self.filepath = filepath
+        self.image = image
+
+    @property
+    def key(self):
+        return self.image.key
+
+    def open(self):
+        """Burimi në procesin e worker-it: view mbi buffer-in, pa kopjuar faqen"""
+        return ArrayTileSource(self.filepath, attached_array(self.image))
+
+
+# Modet e PIL që dekodohen drejt e në buffer -> bytes për pixel në memorien e PIL (RGB ruhet si RGBX)
+STREAM_MODES = {'1': 1, 'L': 1, 'P': 1, 'RGB': 4, 'RGBA': 4, 'LA': 4}
+# Rreshtat që konvertohen njëherësh nga buffer-i i ndërmjetëm në buffer-in e faqes
+CONVERT_ROWS = 128
+EXIF_ORIENTATION = 0x0112
+# Sa shpesh (s) faqet e dekoduara hiqen nga RSS gjatë dekodimit
+RELEASE_INTERVAL = 0.05
+
+
+# Rezultati i kontrollit të dekodimit direkt me Pillow-in e instaluar (None = ende pa u kontrolluar)
+_streaming_ok = None
+
+
+def streaming_supported():
+    """A funksionon dekodimi direkt në buffer me këtë version të Pillow (kontrollohet një herë për proces)
+
+    _decode_into mbështetet në pjesë të brendshme të Pillow (Image.core.map_buffer, image.im, load_read).
+    Një version që i ndryshon ato kalon te dekodimi i plotë me cv2, jo te pikselë të gabuar.
+    """
+    global _streaming_ok
+    if _streaming_ok is None:
+        try:
+            _streaming_ok = _probe_streaming()
+        except Exception:
+            _streaming_ok = False
+        if not _streaming_ok:
+            import PIL
+
+            print(f"Pillow {PIL.__version__}: dekodimi direkt në buffer nuk funksionon, faqet dekodohen të plota")
+    return _streaming_ok
+
+
+def _probe_streaming():
+    """Dekodon dy PNG të vogla (gri dhe RGB) me _decode_into dhe i krahason me dekodimin e zakonshëm"""
+    from PIL import Image
+
+    pixels = np.random.default_rng(0).integers(0, 256, size=(5, 7, 3), dtype=np.uint8)
+    for mode in ('L', 'RGB'):
+        expected = Image.fromarray(pixels).convert(mode)
+        data = io.BytesIO()
+        expected.save(data, format='PNG')
+        data.seek(0)
+        buffer = np.zeros((5, 7 * STREAM_MODES[mode]), dtype=np.uint8)
+        with Image.open(data) as image:
+            _decode_into(image, SimpleNamespace(array=buffer, release_pages=lambda: None))
+        decoded = buffer if mode == 'L' else buffer.reshape(5, 7, 4)[:, :, :3]
+        if not np.array_equal(decoded, np.asarray(expected)):
+            return False
+    return True
+
+
+def _open_streamable(filepath):
+    """Imazhi PIL (ende i padekoduar) nëse mund të dekodohet drejt e në buffer, përndryshe None"""
+    from PIL import Image
+
+    if not streaming_supported():
+        return None
+    Image.MAX_IMAGE_PIXELS = None
+    try:
+        image = Image.open(filepath)
+    except Exception:
+        return None
+    # cv2.imread i rrotullon sipas EXIF; këto dhe modet e tjera (16 bit, CMYK) dekodohen me cv2
+    if image.mode not in STREAM_MODES or _orientation(image) != 1:
+        image.close()
+        return None
+    return image
+
+
+def _orientation(image):
+    """Orientimi EXIF pa dekoduar pikselat (getexif() i PNG-së e ngarkon imazhin)"""
+    from PIL import Image
+
+    if image.format == 'TIFF':
+        return image.getexif().get(EXIF_ORIENTATION, 1)
+    exif = Image.Exif()
+    if image.info.get('exif'):
+        exif.load(image.info['exif'])
+    return exif.get(EXIF_ORIENTATION, 1)
+
+
+def _decode_into(image, shared):
+    """Dekodon imazhin PIL drejt e në buffer-in (rreshta me gjerësi stride) pa kopje të faqes në RAM
+
+    Memoria e imazhit PIL vendoset mbi buffer-in, kështu që dekoderi shkruan
+    rreshtat direkt aty; me backend 'file' faqet e shkruara hiqen nga RSS pas
+    çdo blloku të lexuar. TIFF-et e kompresuara (libtiff) dekodohen me një
+    thirrje, por edhe aty rreshtat shkojnë direkt në skedarin memmap.
+    """
+    from PIL import Image
+
+    stride = image.size[0] * STREAM_MODES[image.mode]
+    # PIL e mban modin '1' me një byte (0/255) për pixel, si 'L'; map_buffer pranon vetëm 'L'
+    core_mode = 'L' if image.mode == '1' else image.mode
+    image.im = Image.core.map_buffer(shared.array, image.size, 'raw', 0, (core_mode, stride, 1))
+    read = getattr(image, 'load_read', None) or image.fp.read
+    released = [time.perf_counter()]
+
+    def load_read(size):
+        data = read(size)
+        # Rreshtat e dekoduar që nga hera e fundit (sa dekoderi prodhon në RELEASE_INTERVAL)
+        if time.perf_counter() - released[0] >= RELEASE_INTERVAL:
+            shared.release_pages()
+            released[0] = time.perf_counter()
+        return data
+
+    image.load_read = load_read
+    image.load()
+    shared.release_pages()
+
+
+def _convert_rows(rows, mode, width, grayscale, palette=None):
+    """Rreshtat në formatin e PIL -> rreshtat e faqes (gri ose RGB)"""
+    if mode == 'P':
+        values = palette[rows]
+        return cv2.cvtColor(values, cv2.COLOR_RGB2GRAY) if grayscale else values
+    if mode in ('1', 'L'):
+        return rows if grayscale else cv2.cvtColor(rows, cv2.COLOR_GRAY2RGB)
+    # RGB, RGBA dhe LA mbahen nga PIL me 4 byte për pixel
+    pixels = rows.reshape(len(rows), width, 4)
+    if mode == 'LA':
+        gray = np.ascontiguousarray(pixels[:, :, 0])
+        return gray if grayscale else cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
+    return cv2.cvtColor(pixels, cv2.COLOR_RGBA2GRAY if grayscale else cv2.COLOR_RGBA2RGB)
+
+
+class RasterTileSource(ArrayTileSource):
+    """Burim pllakash për imazhe raster, të dekoduara një herë në një buffer të ndarë
+
+    Si parazgjedhje buffer-i është një memmap në disk (RAM-i mban vetëm faqet e
+    pllakave aktive); me backend='memory' përdoret multiprocessing.shared_memory.
+    Skedarët 1 bit, gri, me paletë, RGB dhe RGBA dekodohen me PIL drejt e në
+    buffer (ose në një memmap të ndërmjetëm që konvertohet me breza rreshtash),
+    kështu që memoria e dekodimit nuk rritet me madhësinë e faqes.
+    """
+
+    def __init__(self, filepath, grayscale=True, cache_dir=None, backend=BACKEND_FILE):
+        image = _open_streamable(filepath)
+        if image is None:
+            self._buffer = self._decode_full(filepath, grayscale, cache_dir, backend)
+        else:
+            try:
+                self._buffer = self._decode_streaming(image, grayscale, cache_dir, backend)
+            finally:
+                image.close()
+        super().__init__(filepath, self._buffer.array)
+
+    @staticmethod
+    def _decode_full(filepath, grayscale, cache_dir, backend):
+        """Dekodimi me cv2 (e gjithë faqja në RAM një herë) për formatet e tjera"""
+        flag = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+        image = cv2.imread(filepath, flag)
+        if image is None:
+            raise ValueError(f"Could not load image: {filepath}")
+
+        if image.ndim == 3:
+            cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+        return SharedImage.from_array(image, backend=backend, directory=cache_dir)
+
+    @staticmethod
+    def _decode_streaming(image, grayscale, cache_dir, backend):
+        if grayscale and image.format == 'JPEG':
+            # libjpeg e bën vetë konvertimin në gri gjatë dekodimit
+            image.draft('L', image.size)
+        width, height = image.size
+        shape = (height, width) if grayscale else (height, width, 3)
+        shared = SharedImage(shape, backend=backend, directory=cache_dir)
+        try:
+            if grayscale and image.mode in ('1', 'L'):
+                _decode_into(image, shared)
+                return shared
+
+            # Formati i PIL ndryshon nga ai i faqes: dekodohet në një memmap të përkohshëm në disk
+            with SharedImage((height, width * STREAM_MODES[image.mode]), backend=BACKEND_FILE,
+                             directory=cache_dir) as native:
+                _decode_into(image, native)
+                palette = None
+                if image.mode == 'P':
+                    colors = (image.getpalette('RGB') or []) + [0] * 768
+                    palette = np.array(colors[:768], dtype=np.uint8).reshape(256, 3)
+                for y in range(0, height, CONVERT_ROWS):
+                    rows = np.asarray(native.array[y:y + CONVERT_ROWS])
+                    shared.array[y:y + len(rows)] = _convert_rows(rows, image.mode, width, grayscale, palette)
+                    native.release_pages()
+                    shared.release_pages()
+            return shared
+        except Exception:
+            shared.close()
+            raise
+
+    def handle(self):
+        """Përshkrimi i burimit për worker-at (emri i buffer-it, jo pikselat)"""
+        return RasterTileHandle(self.filepath, self._buffer.handle)
+
+    def close(self):
+        """Liron view-n dhe fshin buffer-in"""
+        self._data = None
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class PdfTileHandle:
+    """Handle i një PdfTileSource: worker-i rihap PDF-në dhe renderon vetë pllakat e veta"""
+
+    def __init__(self, filepath, page, dpi):
+        self.filepath = filepath
+        self.page = page
+        self.dpi = dpi
+
+    @property
+    def key(self):
+        return ('pdf', self.filepath, self.page, self.dpi)
+
+    def open(self):
+        return PdfTileSource(self.filepath, page=self.page, dpi=self.dpi)
+
+
+class PdfTileSource:
+    """Burim pllakash për PDF; çdo pllakë renderohet veçmas me PyMuPDF (clip)"""
+
+    def __init__(self, filepath, page=0, dpi=200):
+        import fitz
+
+        self.filepath = filepath
+        self.page_number = page
+        self.dpi = dpi
+        self.zoom = dpi / 72.0
+        self._doc = fitz.open(filepath)
+        self._page = self._doc[page]
+        rect = self._page.rect
+        self.width = int(rect.width * self.zoom)
+        self.height = int(rect.height * self.zoom)
+        self.channels = 3
+
+    def read_tile(self, x, y, w, h):
+        """Renderon vetëm zonën e pllakës"""
+        import fitz
+
+        z = self.zoom
+        clip = fitz.Rect(x / z, y / z, (x + w) / z, (y + h) / z)
+        pix = self._page.get_pixmap(matrix=fitz.Matrix(z, z), clip=clip, alpha=False)
+        tile = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
+        return _as_rgb(tile[:, :, :3]) if pix.n >= 3 else _as_rgb(tile[:, :, 0])
+
+    def handle(self):
+        return PdfTileHandle(self.filepath, self.page_number, self.dpi)
+
+    def close(self):
+        """Mbyll dokumentin PDF"""
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+
+def _bbox(item):
+    """Kthen bbox [x, y, w, h] të një elementi, ose pikë nëse mungon"""
+    if item.get('bbox'):
+        return [float(v) for v in item['bbox']]
+    x, y = item.get('position', [0, 0])[:2]
+    return [float(x), float(y), 0.0, 0.0]
+
+
+def offset_item(item, dx, dy):
+    """Zhvendos koordinatat e një elementi nga pllaka në faqe"""
+    shifted = dict(item)
+    if 'position' in item:
+        x, y = item['position'][:2]
+        shifted['position'] = [x + dx, y + dy]
+    if item.get('bbox'):
+        bx, by, bw, bh = item['bbox'][:4]
+        shifted['bbox'] = [bx + dx, by + dy, bw, bh]
+    return shifted
+
+
+def touches_inner_edge(item, tile, page_size, margin=EDGE_MARGIN):
+    """A e prek detektimi një skaj pllake që nuk është skaj i faqes"""
+    x, y, w, h = tile
+    page_w, page_h = page_size
+    bx, by, bw, bh = _bbox(item)
+
+    if x > 0 and bx - x <= margin:
+        return True
+    if y > 0 and by - y <= margin:
+        return True
+    if x + w < page_w and (x + w) - (bx + bw) <= margin:
+        return True
+    if y + h < page_h and (y + h) - (by + bh) <= margin:
+        return True
+    return False
+
+
+def _overlap_ratio(a, b):
+    """Pjesa e kutisë më të vogël që mbulohet nga tjetra"""
+    ix = max(0.0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    smaller = min(a[2] * a[3], b[2] * b[3])
+    if smaller <= 0:
+        return 0.0
+    return (ix * iy) / smaller
+
+
+def merge_detections(items, key_field, distance=16.0, overlap_threshold=0.5):
+    """Bashkon detektimet e dyfishta nga zonat e mbivendosura të pllakave
+
+    Dy elemente janë dublikatë kur kanë të njëjtin çelës (lloj simboli ose
+    përmbajtje teksti) dhe kutitë mbivendosen ose qendrat janë afër.
+    Ruhet ai me besueshmëri më të lartë. Kërkimi bëhet me grid, jo me të gjitha çiftet.
+    """
+    cell = max(distance, 1.0)
+    grid = {}
+    kept = []
+    max_extent = 0.0
+
+    ordered = sorted(items, key=lambda item: item.get('confidence', 0), reverse=True)
+    for item in ordered:
+        box = _bbox(item)
+        cx, cy = box[0] + box[2] / 2, box[1] + box[3] / 2
+        gx, gy = int(cx // cell), int(cy // cell)
+        extent = max(box[2], box[3])
+        reach = 1 + int(max(extent, max_extent) // cell)
+        key = item.get(key_field)
+
+        duplicate = False
+        for nx in range(gx - reach, gx + reach + 1):
+            for ny in range(gy - reach, gy + reach + 1):
+                for other_index in grid.get((nx, ny), ()):
+                    other = kept[other_index]
+                    if other.get(key_field) != key:
+                        continue
+                    obox = _bbox(other)
+                    ocx, ocy = obox[0] + obox[2] / 2, obox[1] + obox[3] / 2
+                    if (abs(cx - ocx) <= distance and abs(cy - ocy) <= distance) or \
+                            _overlap_ratio(box, obox) >= overlap_threshold:
+                        duplicate = True
+                        break
+                if duplicate:
+                    break
+            if duplicate:
+                break
+
+        if not duplicate:
+            grid.setdefault((gx, gy), []).append(len(kept))
+            kept.append(item)
+            max_extent = max(max_extent, extent)
+
+    return kept
+
+
+class TiledAnalyzer:
+    """Kalon pllakat nëpër zbulimin e simboleve dhe OCR, një nga një ose në procese paralele"""
+
+    def __init__(self, symbol_recognizer, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_TILE_OVERLAP, workers=1):
+        self.symbol_recognizer = symbol_recognizer
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.workers = max(1, workers or 1)
+
+    def analyze(self, source, detect_symbols=True, extract_text=True, extract_lines=False, progress_callback=None,
+                profiler=None):
+        """Kthen (symbols, text, segments) për të gjithë faqen; profiler (StageProfiler) mat hapat e çdo pllake
+
+        Me extract_lines segmentet e vijave të çdo pllake (line_network) kthehen
+        në koordinata faqeje, ende pa u bashkuar (bashkimi bëhet për të gjithë faqen).
+        """
+        if profiler is None:
+            from modules.profiler import StageProfiler
+            profiler = StageProfiler(trace_memory=False)
+        page_size = (source.width, source.height)
+        tiles = list(tile_grid(source.width, source.height, self.tile_size, self.overlap))
+
+        if self.workers > 1 and len(tiles) > 1 and hasattr(source, 'handle'):
+            results = self._analyze_parallel(source.handle(), tiles, page_size, detect_symbols, extract_text,
+                                             extract_lines, progress_callback, profiler)
+        else:
+            results = []
+            for index, tile in enumerate(tiles):
+                results.append(self.analyze_tile(source, tile, index, page_size, detect_symbols, extract_text,
+                                                 extract_lines, profiler))
+                if progress_callback:
+                    progress_callback(index + 1, len(tiles))
+
+        symbols = [item for tile_symbols, _, _ in results for item in tile_symbols]
+        text_data = [item for _, tile_text, _ in results for item in tile_text]
+        segments = np.concatenate([tile_segments for _, _, tile_segments in results] or [np.zeros((0, 4))])
+        with profiler.stage('merge_tiles', symbols=len(symbols), text=len(text_data)):
+            return merge_detections(symbols, 'type'), merge_detections(text_data, 'content'), segments
+
+    def analyze_tile(self, source, tile, index, page_size, detect_symbols=True, extract_text=True,
+                     extract_lines=False, profiler=None):
+        """Zbulim, OCR dhe vijat e një pllake; kthen (symbols, text, segments) në koordinata faqeje"""
+        if profiler is None:
+            from modules.profiler import StageProfiler
+            profiler = StageProfiler(trace_memory=False)
+        x, y, w, h = tile
+        with profiler.stage('tile_read', tile=index):
+            tile_data = {
+                'file': source.filepath,
+                'image': source.read_tile(x, y, w, h),
+                'width': w,
+                'height': h,
+                'tile': {'x': x, 'y': y, 'width': w, 'height': h},
+            }
+        found, text_data, segments = [], [], np.zeros((0, 4), dtype=np.float32)
+        if detect_symbols:
+            with profiler.stage('symbol_detection', tile=index):
+                found = self.symbol_recognizer.detect_symbols(tile_data)
+        if extract_text:
+            with profiler.stage('ocr', tile=index):
+                text_data = self._collect(self.symbol_recognizer.extract_text(tile_data), tile, page_size)
+        if extract_lines:
+            from modules.line_network import detect_segments
+
+            # Edhe simbolet e prera në skaj fshihen nga harta e vijave të pllakës
+            with profiler.stage('lines', tile=index):
+                segments = detect_segments(tile_data['image'], found) + np.float32([x, y, x, y])
+        # Pllaka lirohet para se të lexohet tjetra
+        del tile_data
+        return self._collect(found, tile, page_size), text_data, segments
+
+    def _analyze_parallel(self, handle, tiles, page_size, detect_symbols, extract_text, extract_lines,
+                          progress_callback, profiler):
+        """Pllakat në një pool procesesh; çdo detyrë merr vetëm handle-in dhe koordinatat e pllakës"""
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        results = [None] * len(tiles)
+        pool = ProcessPoolExecutor(max_workers=min(self.workers, len(tiles)), initializer=_init_tile_worker,
+                                   initargs=(self.symbol_recognizer,))
+        try:
+            futures = {pool.submit(_analyze_tile_task, handle, tile, index, page_size, detect_symbols,
+                                   extract_text, extract_lines): index for index, tile in enumerate(tiles)}
+            for done, future in enumerate(as_completed(futures), 1):
+                symbols, text_data, segments, events, cache_stats = future.result()
+                results[futures[future]] = (symbols, text_data, segments)
+                profiler.merge(events)
+                if cache_stats:
+                    # Çdo worker ka kopjen e vet të memo-s; numrat mblidhen te recognizer-i i procesit kryesor
+                    self.symbol_recognizer.symbol_cache.merge_stats(cache_stats)
+                if progress_callback:
+                    progress_callback(done, len(tiles))
+        finally:
+            # Pas anulimit/gabimit pllakat që s'kanë nisur hiqen; buffer-i mbyllet vetëm pasi worker-at dalin
+            pool.shutdown(wait=True, cancel_futures=True)
+        return results
+
+    def _collect(self, items, tile, page_size):
+        """Zhvendos në koordinata faqeje dhe heq detektimet e prera nga skajet"""
+        x, y = tile[0], tile[1]
+        collected = []
+        for item in items or []:
+            shifted = offset_item(item, x, y)
+            # Objekti i prerë shihet i plotë nga pllaka fqinje falë mbivendosjes
+            if shifted.get('bbox') and touches_inner_edge(shifted, tile, page_size):
+                continue
+            collected.append(shifted)
+        return collected
+
+
+# Gjendja e çdo procesi worker të pllakave, krijohet një herë në initializer
+_tile_analyzer = None
+_tile_sources = {}
+
+
+def _init_tile_worker(symbol_recognizer):
+    """Recognizer-i (me indeksin e simboleve) kalon një herë për worker, jo për pllakë"""
+    global _tile_analyzer
+    _tile_analyzer = TiledAnalyzer(symbol_recognizer)
+
+
+def _analyze_tile_task(handle, tile, index, page_size, detect_symbols, extract_text, extract_lines):
+    """Analizon një pllakë brenda worker-it; burimi hapet një herë për worker"""
+    from modules.profiler import StageProfiler
+
+    source = _tile_sources.get(handle.key)
+    if source is None:
+        source = _tile_sources[handle.key] = handle.open()
+    profiler = StageProfiler(trace_memory=False)
+    cache = getattr(_tile_analyzer.symbol_recognizer, 'symbol_cache', None)
+    if cache is not None:
+        cache.reset_stats()
+    symbols, text_data, segments = _tile_analyzer.analyze_tile(source, tile, index, page_size, detect_symbols,
+                                                               extract_text, extract_lines, profiler)
+    return symbols, text_data, segments, profiler.events, cache.stats() if cache is not None else None
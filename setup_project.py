@@ -24,6 +24,9 @@ Technical Drawing Analyzer
 Sistem i pavarur për analizë të vizatimeve teknike
 """
 
+import time
+APP_STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
@@ -31,19 +34,18 @@ import os
 import sys
 from pathlib import Path
 import json
-import cv2
-import numpy as np
-from PIL import Image, ImageTk
-import sqlite3
-from datetime import datetime
 
 # Import modulet tona
+# Para dritares importohen vetëm modulet e lehta; numpy, cv2, PIL, procesorët dhe
+# modelet ngarkohen në background pasi dritarja të jetë e dukshme (ose në përdorimin e parë)
 try:
-    from modules.document_processor import DocumentProcessor
-    from modules.symbol_recognizer import SymbolRecognizer
-    from modules.output_generator import OutputGenerator
+    from modules.startup import BackgroundLoader, StartupProfile, import_modules
+    STARTUP = StartupProfile(started=APP_STARTED)
+    from modules.pipeline import AnalysisPipeline, recognizer_version
+    from modules.stage_graph import AnalysisCancelled, CancelToken
     from modules.database_manager import DatabaseManager
 except ImportError:
+    STARTUP = None
     print("Modulet nuk janë gjetur, duke përdorur implementim bazë...")
 
 class TechnicalAnalyzerApp:
@@ -53,16 +55,25 @@ class TechnicalAnalyzerApp:
         self.root.geometry("1200x800")
         self.root.minsize(800, 600)
         
-        # Inicializimi i komponentëve
+        # Cilësimet e SettingsWindow
+        self.settings = {'ocr_language': 'eng', 'symbol_threshold': 0.8, 'cascade': False, 'cascade_threshold': 0.35,
+                         'pdf_text_layer': True}
+        
+        # Inicializimi i komponentëve; procesorët ngarkohen pasi të shfaqet dritarja
         self.setup_database()
         self.init_processors()
         self.create_widgets()
         self.setup_styles()
+        self.root.after(0, self.on_window_shown)
         
         # Variables
         self.current_file = None
         self.analysis_results = None
         self.processed_image = None
+        # Kohët e hapave të analizës së fundit (StageProfiler)
+        self.last_profiler = None
+        # Anulimi i procesimit në ekzekutim (butoni "Anulo")
+        self.cancel_token = None
         
     def setup_database(self):
         """Krijon bazën e të dhënave lokale"""
@@ -74,17 +85,111 @@ class TechnicalAnalyzerApp:
             self.db_manager = None
     
     def init_processors(self):
-        """Inicializon procesorët e sistemit"""
+        """Përgatit ngarkimin e procesorëve (në background, ose në përdorimin e parë)"""
         try:
-            self.doc_processor = DocumentProcessor()
-            self.symbol_recognizer = SymbolRecognizer()
-            self.output_generator = OutputGenerator()
+            self.processor_loader = BackgroundLoader(self._load_processors, name='processors')
+        except NameError:
+            self.processor_loader = None
+            self._mock_processors = self._fallback_processors()
+    
+    def _load_processors(self):
+        """Importon varësitë e rënda dhe krijon procesorët (thread-i i ngarkimit)"""
+        try:
+            import_modules()
+            from modules.preview_pyramid import PyramidCache
+            from modules.document_processor import DocumentProcessor
+            from modules.symbol_recognizer import SymbolRecognizer
+            from modules.output_generator import OutputGenerator
+            
+            processors = {
+                'doc_processor': DocumentProcessor(),
+                # Memo i klasifikimit ruhet në bibliotekë, simbolet e njohura nuk riklasifikohen
+                'symbol_recognizer': SymbolRecognizer(persist_cache=True),
+                'output_generator': OutputGenerator(),
+                # Piramidat e preview ndërtohen një herë për skedar
+                'pyramid_cache': PyramidCache(),
+            }
+            self._apply_recognizer_settings(processors['symbol_recognizer'])
+            
+            # Rezultatet e modeleve të vjetra nuk do të përdoren më
+            if self.db_manager:
+                self.db_manager.invalidate_cache(keep_version=recognizer_version(processors['symbol_recognizer']))
+            return processors
         except Exception as e:
             print(f"Processor initialization error: {e}")
-            # Fallback implementations
-            self.doc_processor = MockDocumentProcessor()
-            self.symbol_recognizer = MockSymbolRecognizer()
-            self.output_generator = MockOutputGenerator()
+            return self._fallback_processors()
+    
+    def _fallback_processors(self):
+        """Fallback implementations"""
+        return {
+            'doc_processor': MockDocumentProcessor(),
+            'symbol_recognizer': MockSymbolRecognizer(),
+            'output_generator': MockOutputGenerator(),
+            'pyramid_cache': None,
+        }
+    
+    def _processor(self, name):
+        # Pret ngarkimin në background nëse procesori kërkohet para se të jetë gati
+        if self.processor_loader is None:
+            return self._mock_processors[name]
+        return self.processor_loader.get()[name]
+    
+    @property
+    def doc_processor(self):
+        return self._processor('doc_processor')
+    
+    @property
+    def symbol_recognizer(self):
+        return self._processor('symbol_recognizer')
+    
+    @property
+    def output_generator(self):
+        return self._processor('output_generator')
+    
+    @property
+    def pyramid_cache(self):
+        return self._processor('pyramid_cache')
+    
+    def on_window_shown(self):
+        """Dritarja është e dukshme: mat nisjen dhe fillo ngarkimin e procesorëve"""
+        if STARTUP is not None:
+            elapsed = STARTUP.mark('window')
+            if not STARTUP.within_budget():
+                print(f"Startup budget exceeded: window after {elapsed:.0f} ms (budget {STARTUP.budget_ms:.0f} ms)")
+        if self.processor_loader is None:
+            return
+        
+        self.status_var.set("Duke ngarkuar modulet...")
+        self.processor_loader.start()
+        self._wait_for_processors()
+    
+    def _wait_for_processors(self):
+        if not self.processor_loader.ready:
+            self.root.after(100, self._wait_for_processors)
+            return
+        
+        if STARTUP is not None:
+            STARTUP.mark('processors')
+            STARTUP.finish()
+            # TDA_IMPORTTIME=1: raporti i importeve në stderr, si python -X importtime
+            if os.environ.get('TDA_IMPORTTIME'):
+                print(STARTUP.report(), file=sys.stderr)
+        if self.status_var.get() == "Duke ngarkuar modulet...":
+            self.status_var.set("Gati për procesim...")
+    
+    def show_startup_report(self):
+        """Shfaq kohën e nisjes dhe importet më të ngadalta"""
+        if STARTUP is None:
+            messagebox.showinfo("Nisja", "Matja e nisjes nuk është e disponueshme.")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Koha e Nisjes")
+        window.geometry("720x480")
+        text = tk.Text(window, font=("Courier", 9), wrap=tk.NONE)
+        text.insert(tk.END, STARTUP.report())
+        text.config(state=tk.DISABLED)
+        text.pack(fill=tk.BOTH, expand=True)
     
     def create_widgets(self):
         """Krijon interface-in e përdoruesit"""
@@ -117,7 +222,17 @@ class TechnicalAnalyzerApp:
         # Process button
         self.process_btn = ttk.Button(left_panel, text="Proceso Dokumentin", 
                                     command=self.process_document, state=tk.DISABLED)
-        self.process_btn.pack(fill=tk.X, pady=10)
+        self.process_btn.pack(fill=tk.X, pady=(10, 0))
+        
+        # Anulimi ndalon analizën në hapin e ardhshëm
+        self.cancel_btn = ttk.Button(left_panel, text="Anulo", 
+                                   command=self.cancel_processing, state=tk.DISABLED)
+        self.cancel_btn.pack(fill=tk.X, pady=(5, 10))
+        
+        # Ri-analizë inkrementale ndaj një revizioni të mëparshëm
+        self.revision_btn = ttk.Button(left_panel, text="Krahaso me Revizionin...", 
+                                     command=self.process_revision, state=tk.DISABLED)
+        self.revision_btn.pack(fill=tk.X, pady=(0, 10))
         
         # Progress bar
         self.progress_var = tk.DoubleVar()
@@ -137,11 +252,13 @@ class TechnicalAnalyzerApp:
         self.extract_text = tk.BooleanVar(value=True)
         self.generate_bom = tk.BooleanVar(value=True)
         self.calculate_dimensions = tk.BooleanVar(value=True)
+        self.pipe_lengths = tk.BooleanVar(value=True)
         
         ttk.Checkbutton(options_frame, text="Zbulo Simbolet", variable=self.detect_symbols).pack(anchor=tk.W)
         ttk.Checkbutton(options_frame, text="Ekstrakto Tekstin", variable=self.extract_text).pack(anchor=tk.W)
         ttk.Checkbutton(options_frame, text="Gjeneroj BOM", variable=self.generate_bom).pack(anchor=tk.W)
         ttk.Checkbutton(options_frame, text="Kalkulo Dimensionet", variable=self.calculate_dimensions).pack(anchor=tk.W)
+        ttk.Checkbutton(options_frame, text="Gjatësitë e Tubave", variable=self.pipe_lengths).pack(anchor=tk.W)
         
         # Export options
         export_frame = ttk.LabelFrame(left_panel, text="Eksporto Rezultatet", padding=10)
@@ -150,6 +267,7 @@ class TechnicalAnalyzerApp:
         ttk.Button(export_frame, text="Eksporto si Excel", command=self.export_excel).pack(fill=tk.X, pady=2)
         ttk.Button(export_frame, text="Eksporto si PDF", command=self.export_pdf).pack(fill=tk.X, pady=2)
         ttk.Button(export_frame, text="Ruaj JSON", command=self.export_json).pack(fill=tk.X, pady=2)
+        ttk.Button(export_frame, text="Eksporto Trace", command=self.export_trace).pack(fill=tk.X, pady=2)
         
         # Right panel - Display area
         right_panel = ttk.Frame(content_frame)
@@ -168,8 +286,9 @@ class TechnicalAnalyzerApp:
         canvas_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         self.canvas = tk.Canvas(canvas_frame, bg="white")
-        h_scroll = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
-        v_scroll = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.viewer = TiledImageViewer(self.canvas)
+        h_scroll = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=self.viewer.xview)
+        v_scroll = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.viewer.yview)
         self.canvas.configure(xscrollcommand=h_scroll.set, yscrollcommand=v_scroll.set)
         
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -180,36 +299,28 @@ class TechnicalAnalyzerApp:
         self.results_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.results_frame, text="Rezultatet")
         
-        # Results tree
-        self.results_tree = ttk.Treeview(self.results_frame, columns=("Type", "Value", "Confidence"), show="tree headings")
-        self.results_tree.heading("#0", text="Elementi")
-        self.results_tree.heading("Type", text="Lloji")
-        self.results_tree.heading("Value", text="Vlera")
-        self.results_tree.heading("Confidence", text="Siguria %")
-        
-        results_scroll = ttk.Scrollbar(self.results_frame, orient=tk.VERTICAL, command=self.results_tree.yview)
-        self.results_tree.configure(yscrollcommand=results_scroll.set)
-        
-        self.results_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
-        results_scroll.pack(side=tk.RIGHT, fill=tk.Y, pady=5)
+        # Results view: vetëm rreshtat e dukshëm krijohen si elemente Treeview
+        self.results_view = VirtualTreeview(self.results_frame, [
+            ("category", "Elementi", 100),
+            ("type", "Lloji", 120),
+            ("value", "Vlera", 300),
+            ("confidence", "Siguria %", 80),
+            ("page", "Faqja", 60),
+        ])
         
         # BOM tab
         self.bom_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.bom_frame, text="Bill of Materials")
         
-        self.bom_tree = ttk.Treeview(self.bom_frame, columns=("Quantity", "Description", "Size", "Material", "Cost"), show="tree headings")
-        self.bom_tree.heading("#0", text="Item")
-        self.bom_tree.heading("Quantity", text="Sasia")
-        self.bom_tree.heading("Description", text="Përshkrimi")
-        self.bom_tree.heading("Size", text="Madhësia")
-        self.bom_tree.heading("Material", text="Materiali")
-        self.bom_tree.heading("Cost", text="Kostoja")
-        
-        bom_scroll = ttk.Scrollbar(self.bom_frame, orient=tk.VERTICAL, command=self.bom_tree.yview)
-        self.bom_tree.configure(yscrollcommand=bom_scroll.set)
-        
-        self.bom_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
-        bom_scroll.pack(side=tk.RIGHT, fill=tk.Y, pady=5)
+        self.bom_view = VirtualTreeview(self.bom_frame, [
+            ("item", "Item", 60),
+            ("quantity", "Sasia", 60),
+            ("unit", "Njësia", 50),
+            ("description", "Përshkrimi", 300),
+            ("size", "Madhësia", 90),
+            ("material", "Materiali", 90),
+            ("cost", "Kostoja", 80),
+        ])
     
     def create_toolbar(self, parent):
         """Krijon toolbar-in"""
@@ -224,6 +335,7 @@ class TechnicalAnalyzerApp:
         
         ttk.Button(toolbar, text="Cilësimet", command=self.show_settings).pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text="Ndihmë", command=self.show_help).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Nisja", command=self.show_startup_report).pack(side=tk.LEFT, padx=5)
         
         # Version info
         ttk.Label(toolbar, text="v1.0", font=("Arial", 8)).pack(side=tk.RIGHT)
@@ -255,6 +367,7 @@ class TechnicalAnalyzerApp:
             self.file_var.set(filename)
             self.current_file = filename
             self.process_btn.config(state=tk.NORMAL)
+            self.revision_btn.config(state=tk.NORMAL)
             self.load_preview()
     
     def load_preview(self):
@@ -267,22 +380,23 @@ class TechnicalAnalyzerApp:
             
             file_ext = Path(self.current_file).suffix.lower()
             
+            if self.pyramid_cache is not None and file_ext not in ('.dwg', '.dxf'):
+                self.root.update_idletasks()
+                self.viewer.show_pyramid(self.pyramid_cache.get(self.current_file))
+                self.status_var.set("Preview i ngarkuar. Gati për procesim.")
+                return
+            
             if file_ext == '.pdf':
                 image = self.doc_processor.pdf_to_image(self.current_file, page=0)
             else:
+                import cv2
                 image = cv2.imread(self.current_file)
                 if image is not None:
                     image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
                 else:
                     raise ValueError("Could not load image")
             
-            display_image = self.resize_for_display(image)
-            pil_image = Image.fromarray(display_image)
-            self.photo = ImageTk.PhotoImage(pil_image)
-            
-            self.canvas.delete("all")
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
-            self.canvas.config(scrollregion=self.canvas.bbox("all"))
+            self.viewer.show_image(self.resize_for_display(image))
             
             self.status_var.set("Preview i ngarkuar. Gati për procesim.")
             
@@ -292,6 +406,7 @@ class TechnicalAnalyzerApp:
     
     def resize_for_display(self, image, max_size=800):
         """Ridimensionon imazhin për display"""
+        import cv2
         h, w = image.shape[:2]
         if max(h, w) > max_size:
             if h > w:
@@ -310,58 +425,131 @@ class TechnicalAnalyzerApp:
         
         self.process_btn.config(state=tk.DISABLED)
         self.progress_var.set(0)
+        self.cancel_token = CancelToken()
+        self.cancel_btn.config(state=tk.NORMAL)
         
-        thread = threading.Thread(target=self._process_worker)
+        thread = threading.Thread(target=self._process_worker, args=(self.cancel_token,))
         thread.daemon = True
         thread.start()
     
-    def _process_worker(self):
-        """Worker thread për procesimin"""
+    def cancel_processing(self):
+        """Kërkon ndalimin e procesimit në ekzekutim"""
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
+            self.cancel_btn.config(state=tk.DISABLED)
+            self.status_var.set("Duke anuluar procesimin...")
+    
+    def process_revision(self):
+        """Analizon skedarin aktual si revizion të ri të një skedari të analizuar më parë"""
+        if not self.current_file:
+            return
+        
+        base_file = filedialog.askopenfilename(
+            title="Zgjidhni revizionin e mëparshëm",
+            filetypes=[
+                ("Të gjitha të mbështeturit", "*.pdf *.png *.jpg *.jpeg *.tiff *.bmp"),
+                ("Të gjitha skedarët", "*.*")
+            ]
+        )
+        if not base_file:
+            return
+        
+        self.process_btn.config(state=tk.DISABLED)
+        self.revision_btn.config(state=tk.DISABLED)
+        self.progress_var.set(0)
+        
+        thread = threading.Thread(target=self._revision_worker, args=(base_file,))
+        thread.daemon = True
+        thread.start()
+    
+    def _revision_worker(self, base_file):
+        """Worker thread për analizën inkrementale të revizionit"""
         try:
-            self.update_status("Duke filluar procesimin...")
-            self.update_progress(10)
+            options = {
+                'detect_symbols': self.detect_symbols.get(),
+                'extract_text': self.extract_text.get(),
+                'generate_bom': self.generate_bom.get(),
+                'calculate_dimensions': self.calculate_dimensions.get(),
+                'pdf_text_layer': self.settings.get('pdf_text_layer', True),
+                'pipe_lengths': self.pipe_lengths.get(),
+            }
             
-            processed_data = self.doc_processor.process_file(self.current_file)
-            self.update_progress(30)
+            pipeline = AnalysisPipeline(self.doc_processor, self.symbol_recognizer, self.output_generator,
+                                        cache=self.db_manager, result_store=self.db_manager)
             
-            if self.detect_symbols.get():
-                self.update_status("Duke zbuluár simbolet...")
-                symbols = self.symbol_recognizer.detect_symbols(processed_data)
-                self.update_progress(50)
-            else:
-                symbols = []
+            def on_progress(message, value):
+                self.update_status(message)
+                self.update_progress(value)
             
-            if self.extract_text.get():
-                self.update_status("Duke ekstraktuar tekstin...")
-                text_data = self.symbol_recognizer.extract_text(processed_data)
-                self.update_progress(70)
-            else:
-                text_data = []
+            from modules.revision import RevisionAnalyzer
+            self.analysis_results = RevisionAnalyzer(pipeline).analyze(
+                self.current_file, base_file, options, status_callback=on_progress)
             
-            if self.generate_bom.get():
-                self.update_status("Duke gjeneruar BOM...")
-                bom_data = self.output_generator.generate_bom(symbols, text_data)
-                self.update_progress(90)
-            else:
-                bom_data = []
+            revision = self.analysis_results['revision']
+            added = len(revision['added']['symbols']) + len(revision['added']['text'])
+            removed = len(revision['removed']['symbols']) + len(revision['removed']['text'])
+            self.update_progress(100)
+            self.update_status(f"Revizioni: {added} të shtuara, {removed} të hequra "
+                               f"({revision['seconds']:.1f}s)")
             
-            self.analysis_results = {
-                'symbols': symbols,
-                'text': text_data,
-                'bom': bom_data,
-                'file': self.current_file,
-                'timestamp': datetime.now().isoformat()
+            self.root.after(0, self.display_results)
+            
+        except Exception as e:
+            self.root.after(0, lambda: self.handle_error(f"Gabim në analizën e revizionit: {str(e)}"))
+        finally:
+            self.root.after(0, lambda: self.process_btn.config(state=tk.NORMAL))
+            self.root.after(0, lambda: self.revision_btn.config(state=tk.NORMAL))
+    
+    def _process_worker(self, cancel_token=None):
+        """Worker thread për procesimin"""
+        try:
+            self.update_status("Duke filluar procesimin...")
+            self.update_progress(0)
+            
+            options = {
+                'detect_symbols': self.detect_symbols.get(),
+                'extract_text': self.extract_text.get(),
+                'generate_bom': self.generate_bom.get(),
+                'calculate_dimensions': self.calculate_dimensions.get(),
+                'pdf_text_layer': self.settings.get('pdf_text_layer', True),
+                'pipe_lengths': self.pipe_lengths.get(),
             }
             
-            self.update_progress(100)
-            self.update_status("Procesimi përfundoi me sukses!")
+            # Faqet shumë të mëdha procesohen me pllaka; rezultatet e njohura vijnë nga cache
+            # PDF-të me shumë faqe analizohen paralelisht, faqe pas faqe; pllakat e një skanimi
+            # të madh ndahen mes proceseve, që lexojnë faqen nga një buffer i përbashkët
+            # Simbolet dhe teksti ruhen edhe në bazë për kërkim (FTS5)
+            workers = max(1, (os.cpu_count() or 2) // 2)
+            pipeline = AnalysisPipeline(self.doc_processor, self.symbol_recognizer, self.output_generator,
+                                        cache=self.db_manager, result_store=self.db_manager,
+                                        page_workers=workers, tile_workers=workers)
+            
+            def on_progress(message, value):
+                self.update_status(message)
+                self.update_progress(value)
+            
+            # Progresi vjen nga hapat e matur (peshat nga kohët e ekzekutimeve të mëparshme)
+            # Zbulimi i simboleve dhe OCR ekzekutohen njëkohësisht (grafi i hapave)
+            self.analysis_results = pipeline.analyze(self.current_file, options, status_callback=on_progress,
+                                                     cancel_token=cancel_token)
+            self.last_profiler = pipeline.last_profiler
+            
+            memo = self.analysis_results.get('symbol_cache')
+            if memo and memo['lookups']:
+                self.update_status(f"Analiza përfundoi (memo i simboleve: {memo['hit_rate']:.0%} hits)")
+            if self.analysis_results.get('warnings'):
+                self.update_status(f"Analiza përfundoi: {'; '.join(self.analysis_results['warnings'])}")
             
             self.root.after(0, self.display_results)
             
+        except AnalysisCancelled:
+            self.update_progress(0)
+            self.update_status("Procesimi u anulua")
         except Exception as e:
             self.root.after(0, lambda: self.handle_error(f"Gabim në procesim: {str(e)}"))
         finally:
             self.root.after(0, lambda: self.process_btn.config(state=tk.NORMAL))
+            self.root.after(0, lambda: self.cancel_btn.config(state=tk.DISABLED))
     
     def update_status(self, message):
         """Përditëson status në main thread"""
@@ -382,35 +570,10 @@ class TechnicalAnalyzerApp:
         if not self.analysis_results:
             return
         
-        self.results_tree.delete(*self.results_tree.get_children())
-        self.bom_tree.delete(*self.bom_tree.get_children())
-        
-        if self.analysis_results.get('symbols'):
-            symbols_node = self.results_tree.insert("", "end", text="Simbolet e Zbuluara")
-            for i, symbol in enumerate(self.analysis_results['symbols']):
-                self.results_tree.insert(symbols_node, "end", 
-                                       text=f"Simboli {i+1}",
-                                       values=(symbol.get('type', 'N/A'), 
-                                             symbol.get('name', 'N/A'),
-                                             f"{symbol.get('confidence', 0):.1f}%"))
-        
-        if self.analysis_results.get('text'):
-            text_node = self.results_tree.insert("", "end", text="Teksti i Ekstraktuar")
-            for i, text in enumerate(self.analysis_results['text']):
-                self.results_tree.insert(text_node, "end",
-                                       text=f"Tekst {i+1}",
-                                       values=("Text", text.get('content', 'N/A'),
-                                             f"{text.get('confidence', 0):.1f}%"))
-        
-        if self.analysis_results.get('bom'):
-            for i, item in enumerate(self.analysis_results['bom']):
-                self.bom_tree.insert("", "end",
-                                   text=f"Item {i+1}",
-                                   values=(item.get('quantity', 1),
-                                         item.get('description', 'N/A'),
-                                         item.get('size', 'N/A'),
-                                         item.get('material', 'N/A'),
-                                         item.get('cost', 'N/A')))
+        # Tabelat me kolona; sortimi dhe filtrimi bëhen aty, jo mbi elementet Treeview
+        from modules.result_table import bom_table, results_table
+        self.results_view.set_table(results_table(self.analysis_results))
+        self.bom_view.set_table(bom_table(self.analysis_results.get('bom')))
         
         self.notebook.select(1)
     
@@ -421,23 +584,27 @@ class TechnicalAnalyzerApp:
         if result:
             self.current_file = None
             self.analysis_results = None
+            self.last_profiler = None
             self.file_var.set("")
-            self.canvas.delete("all")
-            self.results_tree.delete(*self.results_tree.get_children())
-            self.bom_tree.delete(*self.bom_tree.get_children())
+            self.viewer.clear()
+            self.results_view.clear()
+            self.bom_view.clear()
             self.status_var.set("Projekti i ri krijuar. Zgjidhni një skedar.")
             self.process_btn.config(state=tk.DISABLED)
+            self.revision_btn.config(state=tk.DISABLED)
     
     def open_project(self):
-        """Hap projekt të ruajtur"""
+        """Hap projekt të ruajtur (.tdap ose JSON)"""
+        from modules.project_store import PROJECT_EXTENSION, load_project
         filename = filedialog.askopenfilename(
             title="Hap Projektin",
-            filetypes=[("JSON files", "*.json"), ("Të gjitha skedarët", "*.*")]
+            filetypes=[("Projekt TDA", f"*{PROJECT_EXTENSION}"), ("JSON files", "*.json"),
+                       ("Të gjitha skedarët", "*.*")]
         )
         if filename:
             try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    project_data = json.load(f)
+                # .tdap lexon vetëm indeksin; elementet ngarkohen kur kërkohen
+                project_data = load_project(filename)
                 
                 self.analysis_results = project_data
                 self.current_file = project_data.get('file', '')
@@ -453,22 +620,24 @@ class TechnicalAnalyzerApp:
             except Exception as e:
                 messagebox.showerror("Gabim", f"Nuk mund të hapë projektin: {str(e)}")
     
-    def save_project(self):
-        """Ruaj projektin"""
+    def save_project(self, json_format=False):
+        """Ruaj projektin (.tdap kompakt; JSON kur zgjidhet prapashtesa .json)"""
         if not self.analysis_results:
             messagebox.showwarning("Paralajmërim", "Nuk ka rezultate për të ruajtur!")
             return
         
+        from modules.project_store import PROJECT_EXTENSION, save_project as write_project
+        project_type = ("Projekt TDA", f"*{PROJECT_EXTENSION}")
+        json_type = ("JSON files", "*.json")
         filename = filedialog.asksaveasfilename(
-            title="Ruaj Projektin",
-            defaultextension=".json",
-            filetypes=[("JSON files", "*.json"), ("Të gjitha skedarët", "*.*")]
+            title="Eksporto JSON" if json_format else "Ruaj Projektin",
+            defaultextension=".json" if json_format else PROJECT_EXTENSION,
+            filetypes=[json_type, project_type] if json_format else [project_type, json_type]
         )
         
         if filename:
             try:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(self.analysis_results, f, indent=2, ensure_ascii=False)
+                write_project(self.analysis_results, filename)
                 messagebox.showinfo("Sukses", "Projekti u ruajt me sukses!")
             except Exception as e:
                 messagebox.showerror("Gabim", f"Nuk mund të ruajë projektin: {str(e)}")
@@ -513,11 +682,59 @@ class TechnicalAnalyzerApp:
     
     def export_json(self):
         """Ruaj si JSON"""
-        self.save_project()
+        self.save_project(json_format=True)
+    
+    def export_trace(self):
+        """Eksporton kohët e hapave të analizës së fundit (Chrome trace ose JSON)"""
+        if self.last_profiler is None:
+            messagebox.showwarning("Paralajmërim", "Nuk ka analizë të matur për eksport!")
+            return
+        
+        filename = filedialog.asksaveasfilename(
+            title="Eksporto Trace",
+            defaultextension=".trace.json",
+            filetypes=[("Chrome trace", "*.trace.json"), ("JSON files", "*.json")]
+        )
+        
+        if filename:
+            try:
+                self.last_profiler.save(filename)
+                messagebox.showinfo("Sukses", "Trace u eksportua (hapeni në chrome://tracing ose Perfetto)")
+            except Exception as e:
+                messagebox.showerror("Gabim", f"Gabim në eksport: {str(e)}")
     
     def show_settings(self):
         """Shfaq cilësimet"""
-        SettingsWindow(self.root)
+        SettingsWindow(self.root, self.settings, self.apply_settings)
+    
+    def apply_settings(self, settings):
+        """Zbaton cilësimet e reja në procesorët"""
+        language_changed = settings.get('ocr_language') != self.settings.get('ocr_language')
+        self.settings.update(settings)
+        
+        # Para se procesorët të jenë gati, cilësimet zbatohen në fund të ngarkimit
+        if self.processor_loader is not None and not self.processor_loader.ready:
+            return
+        self._apply_recognizer_settings(self.symbol_recognizer)
+        # Pool-i OCR i gjuhës së re ngarkohet në background
+        if language_changed and hasattr(self.symbol_recognizer, 'warm_up'):
+            threading.Thread(target=self._warm_up_ocr, daemon=True).start()
+    
+    def _apply_recognizer_settings(self, recognizer):
+        if hasattr(recognizer, 'threshold'):
+            recognizer.threshold = self.settings['symbol_threshold']
+        if hasattr(recognizer, 'cascade'):
+            recognizer.cascade = self.settings['cascade']
+            recognizer.cascade_threshold = self.settings['cascade_threshold']
+        if hasattr(recognizer, 'set_language'):
+            recognizer.set_language(self.settings['ocr_language'])
+    
+    def _warm_up_ocr(self):
+        """Ngarkon motorin OCR pa bllokuar interface-in"""
+        try:
+            self.symbol_recognizer.warm_up()
+        except Exception as e:
+            print(f"OCR warm-up error: {e}")
     
     def show_help(self):
         """Shfaq ndihmën"""
@@ -530,6 +747,7 @@ class MockDocumentProcessor:
         return {"processed": True, "file": filepath}
     
     def pdf_to_image(self, filepath, page=0):
+        import numpy as np
         return np.ones((400, 600, 3), dtype=np.uint8) * 255
 
 class MockSymbolRecognizer:
@@ -548,11 +766,13 @@ class MockSymbolRecognizer:
         ]
 
 class MockOutputGenerator:
-    def generate_bom(self, symbols, text):
+    def generate_bom(self, symbols, text, pipes=None):
+        # Gjatësia e tubit vjen nga linjat e gjurmuara (pixel -> metra me dpi), jo sasi fikse
+        pipe_length = sum(pipe['length'] / pipe['dpi'] * 0.0254 for pipe in pipes or [] if pipe.get('dpi'))
         return [
-            {"quantity": 2, "description": "Gate Valve DN100", "size": "DN100", "material": "Cast Iron", "cost": "150.00 EUR"},
-            {"quantity": 5, "description": "Pipe Segment", "size": "DN100", "material": "Steel", "cost": "75.00 EUR"},
-            {"quantity": 1, "description": "Pressure Gauge", "size": "0-16 bar", "material": "Stainless Steel", "cost": "45.00 EUR"}
+            {"quantity": 2, "unit": "copë", "description": "Gate Valve DN100", "size": "DN100", "material": "Cast Iron", "cost": "150.00 EUR"},
+            {"quantity": round(pipe_length, 2), "unit": "m", "description": "Pipe DN100", "size": "DN100", "material": "Steel", "cost": "75.00 EUR"},
+            {"quantity": 1, "unit": "copë", "description": "Pressure Gauge", "size": "0-16 bar", "material": "Stainless Steel", "cost": "45.00 EUR"}
         ]
     
     def export_to_excel(self, data, filename):
@@ -565,11 +785,288 @@ class MockOutputGenerator:
     def export_to_pdf(self, data, filename):
         print(f"PDF export to {filename} completed (mock)")
 
+class TiledImageViewer:
+    """Shfaq preview në canvas; renderohen vetëm pllakat e dukshme të piramidës"""
+    
+    ZOOM_STEP = 1.25
+    MIN_SCALE = 0.01
+    MAX_SCALE = 8.0
+    
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.pyramid = None
+        self.scale = 1.0
+        self.tiles = {}
+        self.photo = None
+        self._render_pending = False
+        
+        canvas.bind("<Configure>", lambda e: self.schedule_render())
+        canvas.bind("<MouseWheel>", self.on_mousewheel)
+        canvas.bind("<Button-4>", lambda e: self.zoom(self.ZOOM_STEP, e.x, e.y))
+        canvas.bind("<Button-5>", lambda e: self.zoom(1 / self.ZOOM_STEP, e.x, e.y))
+        canvas.bind("<ButtonPress-1>", lambda e: self.canvas.scan_mark(e.x, e.y))
+        canvas.bind("<B1-Motion>", self.on_drag)
+    
+    def xview(self, *args):
+        self.canvas.xview(*args)
+        self.schedule_render()
+    
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.schedule_render()
+    
+    def clear(self):
+        """Pastron canvas-in"""
+        self.canvas.delete("all")
+        self.tiles = {}
+        self.photo = None
+        self.pyramid = None
+    
+    def show_image(self, image):
+        """Shfaq një imazh statik (pa piramidë)"""
+        from PIL import Image, ImageTk
+        self.clear()
+        self.photo = ImageTk.PhotoImage(Image.fromarray(image))
+        self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
+        self.canvas.config(scrollregion=self.canvas.bbox("all"))
+    
+    def show_pyramid(self, pyramid):
+        """Shfaq piramidën, fillimisht e përshtatur me dritaren"""
+        self.clear()
+        self.pyramid = pyramid
+        width = max(self.canvas.winfo_width(), 1)
+        height = max(self.canvas.winfo_height(), 1)
+        self.scale = max(self.MIN_SCALE, min(width / pyramid.width, height / pyramid.height, 1.0))
+        self._update_scrollregion()
+        self.canvas.xview_moveto(0)
+        self.canvas.yview_moveto(0)
+        self.schedule_render()
+    
+    def _update_scrollregion(self):
+        self.canvas.config(scrollregion=(0, 0, int(self.pyramid.width * self.scale),
+                                         int(self.pyramid.height * self.scale)))
+    
+    def zoom(self, factor, x, y):
+        """Zoom rreth pikës (x, y) të canvas-it"""
+        if self.pyramid is None:
+            return
+        
+        new_scale = min(self.MAX_SCALE, max(self.MIN_SCALE, self.scale * factor))
+        if new_scale == self.scale:
+            return
+        
+        # Pika nën kursor mbetet në vend pas zoom-it
+        image_x = self.canvas.canvasx(x) / self.scale
+        image_y = self.canvas.canvasy(y) / self.scale
+        self.scale = new_scale
+        
+        for item, _ in self.tiles.values():
+            self.canvas.delete(item)
+        self.tiles = {}
+        self._update_scrollregion()
+        
+        total_w = self.pyramid.width * self.scale
+        total_h = self.pyramid.height * self.scale
+        self.canvas.xview_moveto(max(0, image_x * self.scale - x) / total_w)
+        self.canvas.yview_moveto(max(0, image_y * self.scale - y) / total_h)
+        self.schedule_render()
+    
+    def on_mousewheel(self, event):
+        self.zoom(self.ZOOM_STEP if event.delta > 0 else 1 / self.ZOOM_STEP, event.x, event.y)
+    
+    def on_drag(self, event):
+        self.canvas.scan_dragto(event.x, event.y, gain=1)
+        self.schedule_render()
+    
+    def schedule_render(self):
+        """Bashkon shumë ngjarje scroll/zoom në një render të vetëm"""
+        if not self._render_pending:
+            self._render_pending = True
+            self.canvas.after_idle(self.render)
+    
+    def render(self):
+        """Krijon pllakat e dukshme dhe fshin ato që kanë dalë nga ekrani"""
+        self._render_pending = False
+        if self.pyramid is None:
+            return
+        
+        import cv2
+        from PIL import Image, ImageTk
+        pyramid = self.pyramid
+        level = pyramid.level_for_scale(self.scale)
+        level_scale = self.scale * (2 ** level)
+        
+        x0, y0 = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        x1 = x0 + self.canvas.winfo_width()
+        y1 = y0 + self.canvas.winfo_height()
+        
+        visible = set()
+        for tx, ty in pyramid.visible_tiles(level, x0 / level_scale, y0 / level_scale,
+                                            x1 / level_scale, y1 / level_scale):
+            key = (level, tx, ty)
+            visible.add(key)
+            if key in self.tiles:
+                continue
+            
+            bx0, by0, bx1, by1 = pyramid.tile_bounds(level, tx, ty)
+            dx0, dy0 = int(round(bx0 * level_scale)), int(round(by0 * level_scale))
+            dx1, dy1 = int(round(bx1 * level_scale)), int(round(by1 * level_scale))
+            
+            tile = pyramid.get_tile(level, tx, ty)
+            size = (max(1, dx1 - dx0), max(1, dy1 - dy0))
+            if size != (tile.shape[1], tile.shape[0]):
+                interpolation = cv2.INTER_AREA if level_scale < 1 else cv2.INTER_NEAREST
+                tile = cv2.resize(tile, size, interpolation=interpolation)
+            
+            photo = ImageTk.PhotoImage(Image.fromarray(tile))
+            item = self.canvas.create_image(dx0, dy0, anchor=tk.NW, image=photo)
+            self.tiles[key] = (item, photo)
+        
+        for key in list(self.tiles):
+            if key not in visible:
+                self.canvas.delete(self.tiles.pop(key)[0])
+
+
+class VirtualTreeview:
+    """Treeview që materializon vetëm rreshtat e dukshëm të një ResultTable"""
+    
+    DEFAULT_ROW_HEIGHT = 20
+    WHEEL_ROWS = 3
+    FILTER_DELAY_MS = 200
+    
+    def __init__(self, parent, columns):
+        # columns: [(çelësi i ResultTable, titulli, gjerësia)]
+        self.columns = columns
+        self.table = None
+        self.offset = 0
+        self._filter_job = None
+        
+        top = ttk.Frame(parent)
+        top.pack(fill=tk.X, padx=5, pady=(5, 0))
+        ttk.Label(top, text="Filtro:").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *args: self.schedule_filter())
+        ttk.Entry(top, textvariable=self.filter_var, width=30).pack(side=tk.LEFT, padx=5)
+        self.count_var = tk.StringVar()
+        ttk.Label(top, textvariable=self.count_var).pack(side=tk.RIGHT)
+        
+        body = ttk.Frame(parent)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(body, columns=[key for key, _, _ in columns], show="headings",
+                                 selectmode="browse")
+        for key, heading, width in columns:
+            self.tree.heading(key, text=heading, command=lambda key=key: self.sort_by(key))
+            self.tree.column(key, width=width)
+        
+        # Scrollbar-i lëviz offset-in në tabelë, jo Treeview-n (që ka vetëm rreshtat e dukshëm)
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.yview)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=5)
+        
+        self.tree.bind("<Configure>", lambda e: self.render())
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-self.WHEEL_ROWS if e.delta > 0 else self.WHEEL_ROWS))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-self.WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(self.WHEEL_ROWS))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible_rows()))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible_rows()))
+        self.tree.bind("<Home>", lambda e: self.scroll_to(0))
+        self.tree.bind("<End>", lambda e: self.scroll_to(len(self.table or ())))
+    
+    def set_table(self, table):
+        """Shfaq një ResultTable të re (filtri aktual zbatohet menjëherë)"""
+        self.table = table
+        self.offset = 0
+        if table is not None and self.filter_var.get():
+            table.set_filter(self.filter_var.get())
+        self.render()
+    
+    def clear(self):
+        self.set_table(None)
+    
+    def visible_rows(self):
+        """Sa rreshta hyjnë në lartësinë aktuale të Treeview"""
+        try:
+            row_height = int(ttk.Style().lookup("Treeview", "rowheight") or self.DEFAULT_ROW_HEIGHT)
+        except (tk.TclError, ValueError):
+            row_height = self.DEFAULT_ROW_HEIGHT
+        # Një rresht i zënë nga titujt e kolonave
+        return max(1, self.tree.winfo_height() // row_height - 1)
+    
+    def scroll(self, rows):
+        self.scroll_to(self.offset + rows)
+    
+    def scroll_to(self, offset):
+        total = len(self.table) if self.table is not None else 0
+        self.offset = max(0, min(offset, total - self.visible_rows()))
+        self.render()
+    
+    def yview(self, *args):
+        """Komandat e scrollbar-it: moveto / scroll units|pages"""
+        if not args or self.table is None:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.table)))
+        elif args[0] == "scroll":
+            step = self.visible_rows() if args[2] == "pages" else 1
+            self.scroll(int(args[1]) * step)
+    
+    def schedule_filter(self):
+        """Filtri zbatohet pasi përdoruesi ndalon së shkruari"""
+        if self._filter_job is not None:
+            self.tree.after_cancel(self._filter_job)
+        self._filter_job = self.tree.after(self.FILTER_DELAY_MS, self.apply_filter)
+    
+    def apply_filter(self):
+        self._filter_job = None
+        if self.table is not None:
+            self.table.set_filter(self.filter_var.get())
+            self.offset = 0
+        self.render()
+    
+    def sort_by(self, key):
+        if self.table is None:
+            return
+        self.table.sort_by(key)
+        self.offset = 0
+        for column, heading, _ in self.columns:
+            arrow = ""
+            if column == key:
+                arrow = " ▼" if self.table.descending else " ▲"
+            self.tree.heading(column, text=heading + arrow)
+        self.render()
+    
+    def render(self):
+        """Rindërton vetëm elementet e dritares së dukshme"""
+        self.tree.delete(*self.tree.get_children())
+        if self.table is None:
+            self.count_var.set("")
+            self.scrollbar.set(0, 1)
+            return
+        
+        total = len(self.table)
+        visible = self.visible_rows()
+        self.offset = max(0, min(self.offset, total - visible))
+        for values in self.table.rows(self.offset, self.offset + visible):
+            self.tree.insert("", "end", values=values)
+        
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + visible) / total))
+        else:
+            self.scrollbar.set(0, 1)
+        if self.table.size != total:
+            self.count_var.set(f"{total} nga {self.table.size} rreshta")
+        else:
+            self.count_var.set(f"{total} rreshta")
+
+
 class SettingsWindow:
-    def __init__(self, parent):
+    def __init__(self, parent, settings=None, on_apply=None):
+        self.settings = dict(settings or {})
+        self.on_apply = on_apply
+        
         self.window = tk.Toplevel(parent)
         self.window.title("Cilësimet")
-        self.window.geometry("400x300")
+        self.window.geometry("400x480")
         self.window.transient(parent)
         self.window.grab_set()
         
@@ -579,14 +1076,46 @@ class SettingsWindow:
         ocr_frame.pack(fill=tk.X, padx=20, pady=10)
         
         ttk.Label(ocr_frame, text="Gjuha e OCR:").pack(anchor=tk.W)
-        ocr_lang = ttk.Combobox(ocr_frame, values=["eng", "alb", "eng+alb"])
-        ocr_lang.set("eng")
-        ocr_lang.pack(fill=tk.X, pady=5)
+        self.ocr_lang = ttk.Combobox(ocr_frame, values=["eng", "alb", "eng+alb"], state="readonly")
+        self.ocr_lang.set(self.settings.get('ocr_language', "eng"))
+        self.ocr_lang.pack(fill=tk.X, pady=5)
+        
+        # PDF-të nga CAD kanë tekst të vërtetë; OCR mbetet për faqet e skanuara dhe imazhet
+        self.text_layer_var = tk.BooleanVar(value=self.settings.get('pdf_text_layer', True))
+        ttk.Checkbutton(ocr_frame, text="Përdor tekstin e ngulitur të PDF (pa OCR)", 
+                        variable=self.text_layer_var).pack(anchor=tk.W)
         
         proc_frame = ttk.LabelFrame(self.window, text="Processing Settings", padding=10)
         proc_frame.pack(fill=tk.X, padx=20, pady=10)
         
         ttk.Label(proc_frame, text="Threshold për symbols:").pack(anchor=tk.W)
-        threshold_scale = ttk.Scale(proc_frame, from_=0.5, to=1.0, orient=tk.HORIZONTAL)
-        threshold_scale.set(0.8)
-        threshold_scale.pack(fill=tk.X, pady=5)
+        self.threshold_scale = ttk.Scale(proc_frame, from_=0.5, to=1.0, orient=tk.HORIZONTAL)
+        self.threshold_scale.set(self.settings.get('symbol_threshold', 0.8))
+        self.threshold_scale.pack(fill=tk.X, pady=5)
+        
+        # Kaskada: kandidatët kërkohen në faqen e zvogëluar; pragu i përafërt mbahet nën pragun e simboleve
+        self.cascade_var = tk.BooleanVar(value=self.settings.get('cascade', False))
+        ttk.Checkbutton(proc_frame, text="Zbulim kaskadë (faqja e zvogëluar së pari)", 
+                        variable=self.cascade_var).pack(anchor=tk.W, pady=(5, 0))
+        ttk.Label(proc_frame, text="Threshold i përafërt i kaskadës:").pack(anchor=tk.W)
+        self.cascade_scale = ttk.Scale(proc_frame, from_=0.2, to=1.0, orient=tk.HORIZONTAL)
+        self.cascade_scale.set(self.settings.get('cascade_threshold', 0.35))
+        self.cascade_scale.pack(fill=tk.X, pady=5)
+        
+        button_frame = ttk.Frame(self.window)
+        button_frame.pack(fill=tk.X, padx=20, pady=10)
+        ttk.Button(button_frame, text="Mbyll", command=self.window.destroy).pack(side=tk.RIGHT)
+        ttk.Button(button_frame, text="Apliko", command=self.apply).pack(side=tk.RIGHT, padx=5)
+    
+    def apply(self):
+        """Kthen cilësimet te aplikacioni dhe mbyll dritaren"""
+        self.settings['ocr_language'] = self.ocr_lang.get()
+        self.settings['pdf_text_layer'] = self.text_layer_var.get()
+        self.settings['symbol_threshold'] = round(float(self.threshold_scale.get()), 2)
+        self.settings['cascade'] = self.cascade_var.get()
+        self.settings['cascade_threshold'] = min(round(float(self.cascade_scale.get()), 2),
+                                                 self.settings['symbol_threshold'])
+        if self.on_apply:
+            self.on_apply(self.settings)
+        self.window.destroy()
+
@@ -25,7 +25,8 @@ def create_basic_structure():
     # Krijoni requirements.txt
     requirements = """# Core dependencies
 opencv-python>=4.5.0
-Pillow>=8.0.0
+# modules/tiling.py dekodon skanimet direkt në buffer me pjesë të brendshme të Pillow (testuar me 12.x)
+Pillow>=8.0.0,<13
 numpy>=1.20.0
 pandas>=1.3.0
 openpyxl>=3.0.0
@@ -0,0 +1,39 @@
+"""Fixtures të përbashkëta: biblioteka e simboleve dhe vizatimet sintetike të benchmark-ut"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Faqe të vogla, që testet të mbeten të shpejta
+SMALL_MULTIPAGE = {'width': 1600, 'height': 1100, 'density': 4.0, 'pages': 3}
+
+
+@pytest.fixture(scope='session')
+def workdir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp('tda'))
+
+
+@pytest.fixture(scope='session')
+def symbol_library(workdir):
+    from modules.benchmark import write_symbol_library
+
+    return write_symbol_library(os.path.join(workdir, 'symbols'))
+
+
+@pytest.fixture(scope='session')
+def multipage_pdf(workdir):
+    from modules.benchmark import write_scenario
+
+    return write_scenario('multipage', os.path.join(workdir, 'drawings'), scenario=SMALL_MULTIPAGE)['file']
+
+
+@pytest.fixture
+def processors(symbol_library):
+    from modules.document_processor import DocumentProcessor
+    from modules.output_generator import OutputGenerator
+    from modules.symbol_recognizer import SymbolRecognizer
+
+    return DocumentProcessor(), SymbolRecognizer(library_dir=symbol_library), OutputGenerator()
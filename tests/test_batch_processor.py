@@ -0,0 +1,18 @@
+import shlex
+
+from modules import batch_processor
+
+
+def test_usage_examples_parse():
+    usage = [line.strip() for line in batch_processor.__doc__.splitlines()
+             if line.strip().startswith('python -m modules.batch_processor')]
+    assert usage
+
+    for line in usage:
+        argv = shlex.split(line)[3:]
+        batch_processor.build_parser().parse_args(argv)
+
+
+def test_no_extract_text_disables_ocr():
+    args = batch_processor.build_parser().parse_args(['a.pdf', '--no-extract-text'])
+    assert args.extract_text is False and args.detect_symbols is True
@@ -0,0 +1,80 @@
+import copy
+import json
+import os
+
+import numpy as np
+
+from modules.benchmark import (Benchmark, detection_recall, format_scenario, generate_drawing, is_regression, main,
+                               write_scenario)
+
+TINY = {'width': 1200, 'height': 900, 'density': 4.0, 'pages': 1}
+
+
+def test_generated_drawing_is_deterministic():
+    first, symbols, labels = generate_drawing(1600, 1100, 4.0, seed=7)
+    again, symbols_again, labels_again = generate_drawing(1600, 1100, 4.0, seed=7)
+    other, _, _ = generate_drawing(1600, 1100, 4.0, seed=8)
+
+    assert np.array_equal(first, again) and symbols == symbols_again and labels == labels_again
+    assert not np.array_equal(first, other)
+    for symbol in symbols:
+        x, y, w, h = symbol['bbox']
+        assert 0 <= x and x + w <= 1600 and 0 <= y and y + h <= 1100
+
+
+def test_scenario_checksum_is_stable(tmp_path):
+    first = write_scenario('tiny', os.path.join(str(tmp_path), 'a'), scenario=TINY)
+    second = write_scenario('tiny', os.path.join(str(tmp_path), 'b'), scenario=TINY)
+    multipage = write_scenario('multi', str(tmp_path), scenario=dict(TINY, pages=2))
+
+    assert first['checksum'] == second['checksum']
+    assert first['file'].endswith('.png') and multipage['file'].endswith('.pdf')
+    assert len(multipage['pages']) == 2
+
+
+def test_detection_recall():
+    truth = [{'bbox': [0, 0, 10, 10]}, {'bbox': [100, 100, 10, 10]}]
+    assert detection_recall([{'position': [5, 5]}], truth) == 0.5
+    assert detection_recall([{'position': [5, 5]}, {'position': [105, 110]}], truth) == 1.0
+    assert detection_recall([], truth) == 0.0
+    assert detection_recall([{'position': [5, 5]}], []) is None
+
+
+def test_regression_needs_both_thresholds():
+    assert is_regression({'median_ms': 120.0}, {'median_ms': 100.0})
+    # +10% pa kaluar 5 ms nuk është regresion, as +4 ms mbi 10 ms
+    assert not is_regression({'median_ms': 3.0}, {'median_ms': 2.0})
+    assert not is_regression({'median_ms': 109.0}, {'median_ms': 100.0})
+    assert not is_regression({'median_ms': 50.0}, None)
+
+
+def test_run_scenario_reports_stages_and_recall(tmp_path):
+    benchmark = Benchmark(workdir=str(tmp_path), repeat=1, ocr=False)
+
+    result = benchmark.run_scenario('tiny', TINY)
+
+    assert result['detection_recall'] == 1.0
+    assert {'symbol_detection', 'bom', 'end_to_end'} <= set(result['stages'])
+    assert 'symbol_cache' not in result
+    baseline = copy.deepcopy(result)
+    baseline['checksum'] = 'other'
+    for entry in baseline['stages'].values():
+        entry['median_ms'] /= 10.0
+    text = format_scenario('tiny', result, baseline)
+    assert 'REGRESION' in text and 'vizatimet ndryshojnë' in text
+
+
+def test_cli_compare_exit_code(tmp_path):
+    workdir, report = str(tmp_path), os.path.join(str(tmp_path), 'bench.json')
+    args = ['--scenarios', 'small', '-r', '1', '--no-ocr', '--workdir', workdir]
+
+    assert main(args + ['-o', report]) == 0
+    with open(report, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    for entry in saved['scenarios']['small']['stages'].values():
+        entry['median_ms'] = entry['median_ms'] / 10.0
+    faster = os.path.join(workdir, 'faster.json')
+    with open(faster, 'w', encoding='utf-8') as f:
+        json.dump(saved, f)
+
+    assert main(args + ['--compare', faster]) == 3
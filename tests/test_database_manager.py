@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from modules.database_manager import DatabaseManager, fts_query, make_cache_key
+
+OPTIONS = {'detect_symbols': True, 'extract_text': False}
+RESULTS = {'symbols': [{'type': 'valve', 'confidence': 90.0}], 'text': []}
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'tda.db'))
+    db.initialize_database()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def drawing(tmp_path):
+    path = tmp_path / 'a.png'
+    path.write_bytes(b'drawing-v1')
+    return str(path)
+
+
+def test_cache_key_depends_on_content_options_and_version():
+    key = make_cache_key('hash', OPTIONS, 'v1')
+
+    assert make_cache_key('hash', dict(reversed(list(OPTIONS.items()))), 'v1') == key
+    assert make_cache_key('other', OPTIONS, 'v1') != key
+    assert make_cache_key('hash', dict(OPTIONS, extract_text=True), 'v1') != key
+    assert make_cache_key('hash', OPTIONS, 'v2') != key
+
+
+def test_cached_analysis_round_trip_and_misses(db, drawing):
+    assert db.get_cached_analysis(drawing, OPTIONS, 'v1') is None
+    db.store_analysis(drawing, OPTIONS, 'v1', RESULTS)
+
+    assert db.get_cached_analysis(drawing, OPTIONS, 'v1') == RESULTS
+    assert db.get_cached_analysis(drawing, dict(OPTIONS, extract_text=True), 'v1') is None
+    assert db.get_cached_analysis(drawing, OPTIONS, 'v2') is None
+
+
+def test_cache_misses_after_file_changes(db, drawing):
+    db.store_analysis(drawing, OPTIONS, 'v1', RESULTS)
+    with open(drawing, 'wb') as f:
+        f.write(b'drawing-v2, more bytes')
+    os.utime(drawing, (1, 1))
+
+    assert db.get_cached_analysis(drawing, OPTIONS, 'v1') is None
+
+
+def test_invalidate_cache_keeps_current_version(db, drawing):
+    db.store_analysis(drawing, OPTIONS, 'v1', RESULTS)
+    db.store_analysis(drawing, dict(OPTIONS, extract_text=True), 'v2', RESULTS)
+
+    assert db.invalidate_cache(keep_version='v2') == 1
+    assert db.get_cached_analysis(drawing, OPTIONS, 'v1') is None
+    assert db.get_cached_analysis(drawing, dict(OPTIONS, extract_text=True), 'v2') == RESULTS
+    assert db.invalidate_cache() == 1
+
+
+def test_fts_query_quotes_words_and_keeps_prefixes():
+    assert fts_query('PN16 gate') == '"PN16" "gate"'
+    assert fts_query('DN*') == '"DN"*'
+    assert fts_query('say "hi"') == '"say" """hi"""'
+    assert fts_query('  ') == ''
+
+
+def _store(db, tmp_path, name, symbols, text):
+    return db.store_results({'file': str(tmp_path / name), 'page_count': 2, 'symbols': symbols, 'text': text})
+
+
+@pytest.fixture
+def store(db, tmp_path):
+    _store(db, tmp_path, 'a.pdf',
+           [{'type': 'valve', 'name': 'Gate Valve', 'page': 0, 'bbox': [0, 0, 10, 10]},
+            {'type': 'pump', 'name': 'Pump', 'page': 1, 'bbox': [0, 0, 10, 10]}],
+           [{'content': 'DN50 PN16', 'page': 1}, {'content': 'DN80', 'page': 0}])
+    _store(db, tmp_path, 'b.pdf',
+           [{'type': 'valve', 'name': 'Ball Valve', 'page': 0, 'bbox': [0, 0, 10, 10]}],
+           [{'content': 'PN10', 'page': 0}, {'content': 'DN100', 'page': 0}])
+    return db
+
+
+def _names(drawings):
+    return [drawing['name'] for drawing in drawings]
+
+
+def test_find_drawings_by_text(store):
+    assert store.fts_enabled, "SQLite pa FTS5"
+    assert _names(store.find_drawings('PN16')) == ['a.pdf']
+    assert _names(store.find_drawings('DN*')) == ['a.pdf', 'b.pdf']
+    assert store.find_drawings('DN*')[0]['text'] == 2
+    assert _names(store.find_drawings('DN50 PN16')) == ['a.pdf']
+    assert store.find_drawings('DN') == []
+
+
+def test_find_drawings_combines_text_and_symbols(store):
+    assert _names(store.find_drawings('PN*', symbol_type='valve')) == ['a.pdf', 'b.pdf']
+    assert _names(store.find_drawings('PN16', symbol_name='Ball Valve')) == []
+    # PN16 është në faqen 1, valvola në faqen 0
+    assert _names(store.find_drawings('PN16', symbol_type='valve', same_page=True)) == []
+    assert _names(store.find_drawings('PN16', symbol_type='pump', same_page=True)) == ['a.pdf']
+
+
+def test_stored_results_replace_previous_analysis(store, tmp_path):
+    _store(store, tmp_path, 'a.pdf', [], [{'content': 'DN25', 'page': 0}])
+
+    assert _names(store.find_drawings('PN16')) == []
+    assert _names(store.find_drawings('DN25')) == ['a.pdf']
+    assert sorted(match['content'] for match in store.search_text('DN*')) == ['DN100', 'DN25']
@@ -0,0 +1,65 @@
+import os
+
+import cv2
+import numpy as np
+
+from modules.benchmark import write_scenario
+from modules.document_processor import DocumentProcessor
+
+CAD_PDF = {'width': 1600, 'height': 1100, 'density': 4.0, 'pages': 1, 'text_layer': True}
+
+
+def _rotated_pdf(directory):
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page(width=300, height=200)
+    page.insert_text((50, 60), "DN50 PN16", fontsize=12)
+    _, png = cv2.imencode('.png', np.zeros((20, 30, 3), np.uint8))
+    page.insert_image(fitz.Rect(200, 100, 260, 140), stream=png.tobytes())
+    page.set_rotation(90)
+    path = os.path.join(directory, 'rrotulluar.pdf')
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_text_layer_lines_land_on_drawn_labels(tmp_path):
+    scenario = write_scenario('cad', str(tmp_path), scenario=CAD_PDF)
+
+    data = DocumentProcessor().process_file(scenario['file'])
+
+    labels = scenario['pages'][0]['labels']
+    assert len(data['text_layer']) == len(labels)
+    for item in data['text_layer']:
+        assert item['confidence'] == 100.0
+        nearest = min(labels, key=lambda label: np.hypot(*np.subtract(label['position'], item['position'])))
+        assert nearest['content'] == item['content']
+        assert np.abs(np.subtract(nearest['position'], item['position'])).max() <= 2
+    # Imazhi sa gjithë faqja është skanim, jo rajon raster për OCR
+    assert data['raster_regions'] == []
+
+
+def test_pdf_without_text_needs_full_ocr(multipage_pdf):
+    data = DocumentProcessor().process_file(multipage_pdf, page=1)
+    assert data['text_layer'] is None
+
+    # Me opsionin e fikur fushat nuk shtohen fare
+    assert 'text_layer' not in DocumentProcessor(text_layer=False).process_file(multipage_pdf)
+
+
+def test_rotated_page_boxes_follow_rendering(tmp_path):
+    path = _rotated_pdf(str(tmp_path))
+    processor = DocumentProcessor()
+
+    text, raster_regions = processor.extract_text_layer(path, dpi=144)
+    ink = processor.pdf_to_image(path, dpi=144)[:, :, 0] < 128
+
+    assert ink.shape == (600, 400)
+    assert [item['content'] for item in text] == ['DN50 PN16']
+    # Faqja e rrotulluar: teksti vertikal dhe gjithë boja jashtë imazhit bie brenda kutisë së tij
+    x, y, w, h = text[0]['bbox']
+    assert h > w
+    rx, ry, rw, rh = raster_regions[0]
+    assert ink[ry:ry + rh, rx:rx + rw].all()
+    assert ink[y:y + h, x:x + w].sum() == ink.sum() - rw * rh
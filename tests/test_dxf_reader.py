@@ -0,0 +1,95 @@
+import os
+
+from modules.dxf_reader import block_symbol_type, read_dxf, scan_entities
+
+
+def _pairs(*entities):
+    lines = []
+    for entity in entities:
+        for code, value in entity:
+            lines += [code, value]
+    return lines
+
+
+def test_scan_entities_collects_inserts_attribs_and_text():
+    lines = _pairs(
+        [('  0', 'INSERT'), ('  2', 'valve__Gate Valve'), ('  8', 'P&ID'), (' 10', '5.0'), (' 20', '6.0'),
+         (' 66', '1')],
+        [('  0', 'ATTRIB'), ('  2', 'TAG'), ('  1', 'V-101')],
+        [('  0', 'ATTRIB'), ('  2', 'SIZE'), ('  1', 'DN50')],
+        [('  0', 'SEQEND')],
+        [('  0', 'LINE'), (' 10', '0'), (' 20', '0'), (' 11', '9'), (' 21', '9')],
+        [('  0', 'INSERT'), ('  2', 'pump__P'), (' 67', '     1'), (' 10', '1'), (' 20', '1')],
+        [('  0', 'TEXT'), ('  1', 'PN16'), ('10', '1.5'), ('20', '2.5'), (' 40', '2.5')],
+        [('  0', 'MTEXT'), ('  3', 'long '), ('  1', 'label'), (' 10', '0'), (' 20', '0')],
+    )
+
+    inserts, texts, mtexts = scan_entities(lines, 0, len(lines))
+
+    # INSERT-i i paperspace (67 = 1) dhe LINE anashkalohen
+    assert len(inserts) == 1
+    assert inserts[0]['2'] == ['valve__Gate Valve'] and inserts[0]['10'] == ['5.0']
+    assert inserts[0]['attribs'] == [('TAG', 'V-101'), ('SIZE', 'DN50')]
+    assert texts == [{'1': ['PN16'], '10': ['1.5'], '20': ['2.5'], '40': ['2.5']}]
+    assert mtexts[0]['3'] == ['long '] and mtexts[0]['1'] == ['label']
+
+
+def test_block_symbol_type():
+    assert block_symbol_type('valve__Gate Valve') == ('valve', 'Gate Valve')
+    assert block_symbol_type('CTRL_VALVE_01') == ('valve', 'CTRL_VALVE_01')
+    assert block_symbol_type('PRESSURE_GAUGE') == ('instrument', 'PRESSURE_GAUGE')
+    assert block_symbol_type('NORTH_ARROW') == ('block', 'NORTH_ARROW')
+
+
+def _write_dxf(directory):
+    import ezdxf
+
+    doc = ezdxf.new()
+    gate = doc.blocks.new('valve__Gate Valve')
+    gate.add_lwpolyline([(-5, -5), (5, -5), (5, 5), (-5, 5)], close=True)
+    gate.add_attdef('TAG', (0, 6), dxfattribs={'height': 1})
+    frame = doc.blocks.new('FRAME')
+    frame.add_lwpolyline([(0, 0), (420, 0), (420, 297), (0, 297)], close=True)
+
+    msp = doc.modelspace()
+    msp.add_blockref('FRAME', (0, 0))
+    msp.add_blockref('valve__Gate Valve', (100, 200)).add_auto_attribs({'TAG': 'V-101'})
+    msp.add_blockref('valve__Gate Valve', (300, 100), dxfattribs={'rotation': 90, 'xscale': 2})
+    msp.add_text('DN50', dxfattribs={'height': 2.5, 'insert': (110, 190)})
+    msp.add_mtext('PI\\P101', dxfattribs={'char_height': 2, 'insert': (200, 50)})
+    doc.layouts.get('Layout1').add_blockref('valve__Gate Valve', (10, 10))
+
+    paths = os.path.join(directory, 'drawing.dxf'), os.path.join(directory, 'drawing_bin.dxf')
+    doc.saveas(paths[0])
+    doc.saveas(paths[1], fmt='bin')
+    return paths
+
+
+def test_read_dxf_symbols_text_and_page_coordinates(tmp_path):
+    text_path, _ = _write_dxf(str(tmp_path))
+
+    drawing = read_dxf(text_path)
+
+    # Korniza (më shumë se 25% e vizatimit) nuk është simbol
+    assert [s['name'] for s in drawing.symbols] == ['Gate Valve', 'Gate Valve']
+    first, rotated = drawing.symbols
+    assert first['attributes'] == {'TAG': 'V-101'}
+    assert rotated['rotation'] == 90.0
+    # Origjina lart majtas, y poshtë: korniza 420 x 297
+    assert (drawing.width, drawing.height) == (420.0, 297.0)
+    assert first['position'] == [100.0, 97.0]
+    assert rotated['bbox'] == [295.0, 187.0, 10.0, 20.0]
+    assert sorted(item['content'] for item in drawing.text) == ['DN50', 'PI 101']
+
+    found = drawing.query(90, 90, 110, 110)
+    assert [s['position'] for s in found['symbols']] == [[100.0, 97.0]]
+    assert [t['content'] for t in found['text']] == ['DN50']
+
+
+def test_scanner_matches_ezdxf_modelspace(tmp_path):
+    text_path, binary_path = _write_dxf(str(tmp_path))
+
+    scanned, loaded = read_dxf(text_path), read_dxf(binary_path)
+
+    assert scanned.symbols == loaded.symbols
+    assert scanned.text == loaded.text
@@ -0,0 +1,99 @@
+import os
+import threading
+
+import pytest
+
+from modules.database_manager import JOB_DONE
+from modules.job_service import JobClient, JobService, create_server
+
+OPTIONS = {'extract_text': False}
+
+
+@pytest.fixture
+def service(tmp_path, processors):
+    service = JobService(str(tmp_path / 'jobs.db'), workers=2, processors=processors, warm_up=False).start()
+    yield service
+    service.stop(timeout=10)
+
+
+@pytest.fixture
+def client(service):
+    server = create_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield JobClient(f"http://127.0.0.1:{server.server_port}", timeout=30)
+    server.shutdown()
+    server.server_close()
+
+
+def test_upload_is_removed_when_job_finishes(service, client, multipage_pdf):
+    job = client.submit(multipage_pdf, OPTIONS, upload=True)
+    assert os.path.dirname(job['file']) == os.path.abspath(service.upload_dir)
+
+    finished = client.wait(job['id'], poll=0.1, timeout=60)
+    assert finished['status'] == JOB_DONE
+    assert client.result(job['id'])['symbols']
+    assert not os.path.exists(job['file'])
+
+
+def test_upload_is_removed_when_queued_job_is_cancelled(service, multipage_pdf):
+    service.stop(timeout=10)
+    with open(multipage_pdf, 'rb') as f:
+        job = service.submit_upload('a.pdf', f.read(), OPTIONS)
+
+    assert service.cancel(job['id']) == 'cancelled'
+    assert not os.path.exists(job['file'])
+
+
+def test_purge_keeps_only_active_uploads(service, multipage_pdf):
+    service.stop(timeout=10)
+    with open(multipage_pdf, 'rb') as f:
+        queued = service.submit_upload('a.pdf', f.read(), OPTIONS)
+    orphan = os.path.join(service.upload_dir, 'old_b.pdf')
+    with open(orphan, 'wb') as f:
+        f.write(b'%PDF')
+
+    assert service.purge_uploads() == 1
+    assert os.path.exists(queued['file'])
+    assert not os.path.exists(orphan)
+
+
+@pytest.mark.parametrize('limit', ['abc', '0'])
+def test_invalid_limit_is_bad_request(client, limit):
+    with pytest.raises(RuntimeError, match='HTTP 400'):
+        client._request('GET', f"/jobs?limit={limit}")
+
+
+def test_ocr_engines_follow_workers(service):
+    assert service.ocr_engines == 2
+    assert service.processors[1].ocr_workers == 2
+
+
+def test_paths_are_limited_to_file_root(tmp_path, processors, multipage_pdf):
+    service = JobService(str(tmp_path / 'jobs.db'), workers=1, processors=processors, warm_up=False,
+                         file_root=str(tmp_path / 'vizatimet'), allow_paths=False)
+    (tmp_path / 'vizatimet').mkdir()
+    inside = tmp_path / 'vizatimet' / 'a.pdf'
+    inside.write_bytes(open(multipage_pdf, 'rb').read())
+    service.db.initialize_database()
+
+    assert service.submit(str(inside), OPTIONS)['file'] == os.path.realpath(inside)
+    with pytest.raises(PermissionError):
+        service.submit(multipage_pdf, OPTIONS)
+    with pytest.raises(PermissionError):
+        service.submit(str(tmp_path / 'vizatimet' / '..' / 'jobs.db'), OPTIONS)
+
+
+def test_remote_server_accepts_only_uploads(service, client, multipage_pdf):
+    service.allow_paths = False
+
+    with pytest.raises(RuntimeError, match='HTTP 403'):
+        client.submit(multipage_pdf, OPTIONS)
+    assert client.submit(multipage_pdf, OPTIONS, upload=True)['status'] in ('queued', 'running', 'done')
+
+
+def test_local_host_detection():
+    from modules.job_service import is_local_host
+
+    assert is_local_host('127.0.0.1') and is_local_host('localhost') and is_local_host('::1')
+    assert not is_local_host('0.0.0.0') and not is_local_host('192.168.1.5')
@@ -0,0 +1,139 @@
+import math
+
+import cv2
+import numpy as np
+import pytest
+
+from modules.line_network import (ANGLE_TOLERANCE, _merge_pass, build_runs, connected_components, detect_segments,
+                                  merge_segments, segment_lengths)
+from modules.output_generator import OutputGenerator
+
+
+def _sorted(segments):
+    """Segmentet me skajet e renditura, për krahasim pa varësi nga drejtimi"""
+    rows = []
+    for x0, y0, x1, y1 in np.round(np.asarray(segments, dtype=np.float64), 1).tolist():
+        rows.append(tuple(sorted([(x0, y0), (x1, y1)])))
+    return sorted(rows)
+
+
+def test_merge_joins_overlapping_and_gapped_pieces():
+    pieces = [[0, 100, 120, 100], [100, 100, 250, 100], [254, 100, 400, 100],
+              # Vija e trashë: HoughLinesP jep një segment për çdo rresht pixel-ash
+              [0, 101, 400, 101],
+              # Vertikale pa lidhje me horizontalen
+              [500, 0, 500, 300], [500, 320, 500, 400]]
+
+    merged = merge_segments(pieces)
+
+    assert len(merged) == 3
+    lengths = sorted(np.round(segment_lengths(merged)).tolist())
+    assert lengths == [80.0, 300.0, 400.0]
+
+
+def test_merge_keeps_parallel_lines_apart():
+    merged = merge_segments([[0, 0, 200, 0], [0, 10, 200, 10], [0, 20, 200, 20]])
+    assert len(merged) == 3
+
+
+def test_merge_across_angle_bin_boundary():
+    # Këndet në të dy anët e kufirit të koshit bashkohen në kalimin e dytë
+    width = math.pi / round(math.pi / ANGLE_TOLERANCE)
+    angle_low, angle_high = width * 10 - 1e-3, width * 10 + 1e-3
+    pieces = [[0, 0, 200 * math.cos(angle_low), 200 * math.sin(angle_low)],
+              [190 * math.cos(angle_high), 190 * math.sin(angle_high),
+               400 * math.cos(angle_high), 400 * math.sin(angle_high)]]
+
+    merged = merge_segments(pieces)
+
+    assert len(_merge_pass(np.array(pieces), ANGLE_TOLERANCE, 2.5, 6.0, 0.0)) == 2
+    assert len(merged) == 1
+    assert abs(segment_lengths(merged)[0] - 400) < 1.0
+
+
+def test_merge_does_not_depend_on_order():
+    rng = np.random.default_rng(2)
+    pieces = []
+    for row in range(20):
+        y = row * 40.0
+        for start in range(0, 600, 90):
+            pieces.append([start, y, start + 95, y])
+    shuffled = np.array(pieces)[rng.permutation(len(pieces))]
+
+    assert _sorted(merge_segments(pieces)) == _sorted(merge_segments(shuffled))
+    assert len(merge_segments(pieces)) == 20
+
+
+def test_connected_components():
+    labels = connected_components(6, [0, 1, 4], [1, 2, 3])
+    assert labels.tolist() == [0, 0, 0, 1, 1, 2]
+    assert connected_components(3, [], []).tolist() == [0, 1, 2]
+
+
+def _symbol(x, y, size=40):
+    return {'type': 'valve', 'name': 'Gate Valve', 'bbox': [x, y, size, size],
+            'position': [x + size // 2, y + size // 2]}
+
+
+def test_build_runs_follows_t_and_l_joints_between_symbols():
+    symbols = [_symbol(0, 80), _symbol(400, 280)]
+    segments = [[40, 100, 200, 100],     # nga simboli i parë
+                [200, 100, 200, 300],    # kthesë L
+                [200, 300, 400, 300],    # te simboli i dytë
+                [200, 200, 300, 200],    # degë T pa simbol në fund
+                [5, 90, 35, 90],         # vizatimi i simbolit, hiqet
+                [600, 0, 900, 0]]        # kornizë që nuk prek simbole
+
+    runs = build_runs(segments, symbols)
+
+    assert len(runs) == 1
+    assert runs[0]['symbols'] == [0, 1]
+    assert runs[0]['length'] == 160 + 200 + 200 + 100
+    assert runs[0]['bbox'] == [40.0, 100.0, 360.0, 200.0]
+    assert len(build_runs(segments, symbols, require_symbols=False)) == 2
+
+
+def test_symbol_drawn_over_continuous_pipe_is_attached():
+    runs = build_runs([[0, 100, 500, 100]], [_symbol(230, 80)])
+    assert [run['symbols'] for run in runs] == [[0]]
+
+
+def test_detect_segments_skips_symbol_boxes():
+    image = np.full((300, 600), 255, np.uint8)
+    cv2.line(image, (20, 150), (580, 150), 0, 2)
+    # Simboli me vija të brendshme të gjata sa një tub
+    cv2.rectangle(image, (250, 100), (350, 200), 0, 2)
+    symbols = [{'bbox': [248, 98, 105, 105]}]
+
+    merged = merge_segments(detect_segments(image, symbols))
+
+    # Tubi ndërpritet te simboli; anët e kutisë së simbolit nuk janë tuba
+    assert all(abs(y0 - 150) <= 2 and abs(y1 - 150) <= 2 for _, y0, _, y1 in merged)
+    assert sorted(np.round(segment_lengths(merged) / 10).tolist()) == [23.0, 23.0]
+
+
+def test_bom_sums_pipe_lengths_per_size():
+    generator = OutputGenerator(drawing_scale=50.0)
+    symbols = [_symbol(0, 80), _symbol(400, 80), _symbol(0, 480)]
+    text = [{'content': 'DN50', 'bbox': [150, 85, 40, 12]},
+            {'content': 'DN80', 'bbox': [0, 60, 40, 12]},
+            {'content': 'DN80', 'bbox': [0, 460, 40, 12]}]
+    pipes = [
+        # Etiketa pranë vijës ka përparësi mbi madhësinë e simbolit
+        {'length': 200.0, 'segments': [[40, 100, 400, 100]], 'symbols': [0, 1], 'dpi': 200},
+        # Pa etiketë pranë: madhësia merret nga simboli në skaj
+        {'length': 400.0, 'segments': [[40, 500, 440, 500]], 'symbols': [2], 'dpi': 200},
+        {'length': 200.0, 'segments': [[40, 700, 240, 700]], 'symbols': [2], 'dpi': 200},
+    ]
+
+    bom = generator.generate_bom(symbols, text, pipes)
+
+    pipe_rows = [(row['size'], row['quantity'], row['unit']) for row in bom if row['type'] == 'pipe']
+    # 200 px në 200 dpi = 1 inç = 0.0254 m, herë shkallën 1:50
+    assert pipe_rows == [('DN50', 1.27, 'm'), ('DN80', 3.81, 'm')]
+    assert [pipe['size'] for pipe in pipes] == ['DN50', 'DN80', 'DN80']
+
+
+def test_pipe_length_without_dpi_stays_in_pixels():
+    assert OutputGenerator().pipe_length({'length': 123.4}) == (123.4, 'px')
+    assert OutputGenerator(drawing_scale=100.0).pipe_length({'length': 100.0, 'dpi': 100}) == (pytest.approx(2.54), 'm')
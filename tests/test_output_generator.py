@@ -0,0 +1,151 @@
+import json
+import os
+
+from openpyxl import Workbook, load_workbook
+
+from modules.benchmark import generate_drawing
+from modules.output_generator import LabelIndex, OutputGenerator, _SheetWriter, parse_label
+
+
+def _text(content, x, y, page=None):
+    item = {'content': content, 'confidence': 90.0, 'bbox': [x, y, 40, 12]}
+    if page is not None:
+        item['page'] = page
+    return item
+
+
+def _symbol(name, x, y, page=None, **extra):
+    item = dict({'type': 'valve', 'name': name, 'confidence': 95.0, 'bbox': [x, y, 30, 30]}, **extra)
+    if page is not None:
+        item['page'] = page
+    return item
+
+
+def test_parse_label_fields():
+    assert parse_label('DN 100 PN16') == {'size': 'DN100', 'rating': 'PN16'}
+    assert parse_label('V-101') == {'tag': 'V-101'}
+    assert parse_label('2" CLASS 300 SS316L') == {'size': '2"', 'rating': 'CLASS300', 'material': 'SS316L'}
+    assert parse_label('shënim') == {}
+
+
+def test_label_index_takes_each_field_from_nearest_label():
+    labels = LabelIndex([
+        _text('DN50', 100, 100),
+        _text('DN80 PN16', 160, 100),
+        _text('shënim pa fusha', 100, 110),
+    ])
+
+    # Teksti pa fusha BOM nuk indeksohet
+    assert len(labels) == 2
+    assert labels.fields_near(110, 105, 100) == {'size': 'DN50', 'rating': 'PN16'}
+    assert labels.fields_near(110, 105, 10) == {'size': 'DN50'}
+    assert labels.fields_near(1000, 1000, 50) == {}
+    assert [fields for _, fields, _ in labels.nearest(200, 106)] == [{'size': 'DN80', 'rating': 'PN16'}]
+
+
+def test_labels_on_other_pages_are_ignored():
+    labels = LabelIndex([_text('DN50', 100, 100, page=0), _text('DN80', 100, 100, page=1)])
+
+    assert labels.fields_near_many([110, 110], [105, 105], [50, 50], [0, 1]) == [{'size': 'DN50'},
+                                                                                {'size': 'DN80'}]
+
+
+def test_block_attributes_take_precedence_over_nearby_text():
+    symbols = [_symbol('Gate Valve', 100, 100, attributes={'TAG': 'V-7', 'SIZE': 'DN25'})]
+    text = [_text('DN50 PN40 V-101', 100, 140)]
+
+    assert OutputGenerator().associate_labels(symbols, text) == [{'tag': 'V-7', 'size': 'DN25', 'rating': 'PN40'}]
+
+
+def test_generate_bom_groups_by_label_fields():
+    symbols = [_symbol('Gate Valve', 100, 100), _symbol('Gate Valve', 600, 100), _symbol('Gate Valve', 1100, 100)]
+    text = [_text('DN50', 100, 140), _text('V-101', 100, 60), _text('DN50', 600, 140), _text('V-102', 600, 60),
+            _text('DN100', 1100, 140)]
+
+    bom = OutputGenerator().generate_bom(symbols, text)
+
+    assert [(row['quantity'], row['size'], row['tags']) for row in bom] == [(2, 'DN50', 'V-101, V-102'),
+                                                                            (1, 'DN100', '')]
+    assert bom[0]['description'] == 'Gate Valve DN50'
+
+
+def test_every_synthetic_symbol_gets_its_own_tag():
+    _, symbols, labels = generate_drawing(3200, 2200, 6.0, seed=4)
+
+    associations = OutputGenerator().associate_labels(symbols, labels)
+
+    # Tag-u vizatohet mbi simbolin e vet; numrat rriten sipas renditjes së simboleve
+    tags = [fields.get('tag') for fields in associations]
+    assert [int(tag.split('-')[1]) for tag in tags] == list(range(101, 101 + len(symbols)))
+    assert all(fields.get('size', '').startswith('DN') and fields.get('rating') for fields in associations)
+
+
+def _sheet_rows(workbook, title):
+    return [list(row) for row in workbook[title].iter_rows(values_only=True)]
+
+
+def test_excel_export_has_main_and_page_sheets(tmp_path):
+    data = {
+        'symbols': [_symbol('Gate Valve', 10, 20, page=0), _symbol('Pump', 30, 40, page=1)],
+        'text': [_text('DN50\x07', 1, 2, page=1)],
+        'bom': [{'quantity': 2, 'unit': 'copë', 'type': 'valve', 'name': 'Gate Valve', 'tags': 'V-101'}],
+    }
+    path = os.path.join(str(tmp_path), 'rezultatet.xlsx')
+
+    OutputGenerator().export_to_excel(data, path)
+
+    workbook = load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ['BOM', 'Simbolet', 'Teksti', 'Faqja 1', 'Faqja 2']
+    symbols = _sheet_rows(workbook, 'Simbolet')
+    assert symbols[0][-1] == 'Faqja'
+    assert [row[1] for row in symbols[1:]] == ['Gate Valve', 'Pump']
+    assert [row[-1] for row in symbols[1:]] == [1, 2]
+    # Karakteret që Excel nuk i pranon hiqen
+    assert _sheet_rows(workbook, 'Teksti')[1][0] == 'DN50'
+    assert [row[:3] for row in _sheet_rows(workbook, 'Faqja 2')[1:]] == [['Simbol', 'valve', 'Pump'],
+                                                                          ['Tekst', 'Text', 'DN50']]
+    workbook.close()
+
+
+def test_single_page_export_has_no_page_sheets(tmp_path):
+    path = os.path.join(str(tmp_path), 'nje.xlsx')
+
+    OutputGenerator().export_to_excel({'symbols': [_symbol('Gate Valve', 10, 20)], 'text': [], 'bom': []}, path)
+
+    workbook = load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ['BOM', 'Simbolet', 'Teksti']
+    assert _sheet_rows(workbook, 'Teksti') == [['Teksti', 'Siguria %', 'X', 'Y', 'Gjerësia', 'Lartësia', 'Shtresa']]
+    workbook.close()
+
+
+def test_full_sheet_continues_on_a_new_sheet(tmp_path):
+    workbook = Workbook(write_only=True)
+    writer = _SheetWriter(workbook, 'Simbolet', (('Emri', 'name'),), max_rows=2)
+    for name in 'abcde':
+        writer.append({'name': name})
+    path = os.path.join(str(tmp_path), 'ndare.xlsx')
+    workbook.save(path)
+
+    workbook = load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ['Simbolet', 'Simbolet (2)', 'Simbolet (3)']
+    assert [_sheet_rows(workbook, title) for title in workbook.sheetnames] == [
+        [['Emri'], ['a'], ['b']], [['Emri'], ['c'], ['d']], [['Emri'], ['e']]]
+    workbook.close()
+
+
+def test_batch_export_merges_result_files(tmp_path):
+    files = []
+    for index, name in enumerate(('a.pdf', 'b.png')):
+        files.append(os.path.join(str(tmp_path), f'{index}.json'))
+        with open(files[-1], 'w', encoding='utf-8') as f:
+            json.dump({'file': name, 'page_count': 1, 'symbols': [_symbol('Gate Valve', 1, 2, page=0)],
+                       'text': [], 'bom': [{'quantity': 1, 'name': 'Gate Valve'}]}, f)
+    path = os.path.join(str(tmp_path), 'batch.xlsx')
+
+    OutputGenerator().export_batch_to_excel(files, path)
+
+    workbook = load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ['Skedarët', 'BOM', 'Simbolet', 'Teksti']
+    assert [row[:3] for row in _sheet_rows(workbook, 'Skedarët')[1:]] == [['a.pdf', 1, 1], ['b.png', 1, 1]]
+    assert [(row[0], row[-1]) for row in _sheet_rows(workbook, 'Simbolet')[1:]] == [('a.pdf', 1), ('b.png', 1)]
+    workbook.close()
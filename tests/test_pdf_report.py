@@ -0,0 +1,128 @@
+import json
+import os
+
+import cv2
+import fitz
+import numpy as np
+
+from modules.benchmark import write_scenario
+from modules.pdf_report import (PdfReportGenerator, annotate, bom_rows, build_drawing_pdf, collect_results,
+                                load_thumbnail, main, symbol_rows)
+
+SINGLE = {'width': 1600, 'height': 1100, 'density': 4.0, 'pages': 1}
+
+
+def _results(scenario, multipage=False):
+    """Rezultatet e analizës nga e vërteta e skenarit (pa ekzekutuar pipeline-in)"""
+    symbols, bom = [], []
+    for page, truth in enumerate(scenario['pages']):
+        for symbol in truth['symbols']:
+            symbols.append(dict(symbol, page=page) if multipage else dict(symbol))
+        bom.append({'quantity': len(truth['symbols']), 'unit': 'copë', 'description': 'Gate Valve DN50',
+                    'size': 'DN50', 'page': page})
+    pipes = [{'segments': [[0, 50, 400, 50]], 'page': 0, 'length': 400.0}]
+    return {'file': scenario['file'], 'page_count': len(scenario['pages']), 'symbols': symbols, 'text': [],
+            'bom': bom, 'pipes': pipes}
+
+
+def _write_json(directory, name, data):
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    return path
+
+
+def _text(path):
+    with fitz.open(path) as doc:
+        return [page.get_text() for page in doc]
+
+
+def test_thumbnail_is_read_at_reduced_size(tmp_path, multipage_pdf):
+    png = os.path.join(str(tmp_path), 'faqe.png')
+    cv2.imwrite(png, np.full((1000, 2000, 3), 255, np.uint8))
+
+    image, scale = load_thumbnail(png, max_size=500)
+    assert image.shape == (250, 500, 3) and scale == 0.25
+
+    # PDF-ja renderohet direkt në dpi të zvogëluar; shkalla është ndaj koordinatave në 200 dpi
+    image, scale = load_thumbnail(multipage_pdf, page=1, max_size=400)
+    assert max(image.shape[:2]) <= 401
+    assert abs(image.shape[1] - 1600 * scale) <= 1
+
+
+def test_annotate_draws_scaled_boxes_and_pipes():
+    image = np.full((100, 200, 3), 255, np.uint8)
+
+    marked = annotate(image, [{'bbox': [100, 40, 60, 60]}, {'name': 'pa kuti'}],
+                      [{'segments': [[0, 180, 398, 180]]}], 0.5)
+
+    assert tuple(marked[20, 60]) == (220, 30, 30)
+    # Tubat vizatohen me anti-aliasing: ngjyra blu mbizotëron
+    red, _, blue = marked[90, 100].tolist()
+    assert blue > 200 and red < 100
+    assert tuple(marked[60, 100]) == (255, 255, 255)
+
+
+def test_symbol_and_bom_rows():
+    symbols = [{'type': 'valve', 'name': 'Gate Valve', 'confidence': 90},
+               {'type': 'valve', 'name': 'Gate Valve', 'confidence': 80},
+               {'type': 'pump', 'name': 'Pump', 'confidence': 70}]
+    assert symbol_rows(symbols)[1:] == [['valve', 'Gate Valve', 2, '85.0'], ['pump', 'Pump', 1, '70.0']]
+
+    bom = [{'quantity': 12.5, 'unit': 'm', 'description': 'Pipe DN50', 'size': 'DN50', 'page': 1}]
+    assert bom_rows(bom)[1] == [1, '12.5', 'm', 'Pipe DN50', 'DN50', 'N/A']
+    assert bom_rows(bom, multipage=True)[0][-1] == 'Faqja' and bom_rows(bom, multipage=True)[1][-1] == 2
+
+
+def test_drawing_section_has_thumbnail_per_page(tmp_path, multipage_pdf):
+    scenario = {'file': multipage_pdf, 'pages': [{'symbols': []}] * 3}
+    data = _results(scenario, multipage=True)
+    data['symbols'] = [{'type': 'valve', 'name': 'Gate Valve', 'confidence': 90.0, 'bbox': [10, 10, 40, 40],
+                        'page': 2}]
+    filename = os.path.join(str(tmp_path), 'vizatimi.pdf')
+
+    pages = build_drawing_pdf(data, filename, thumbnail_size=300)
+
+    text = '\n'.join(_text(filename))
+    assert pages == len(_text(filename))
+    assert all(f"Faqja {page}" in text for page in (1, 2, 3)) and 'BOM' in text
+    with fitz.open(filename) as doc:
+        assert sum(len(page.get_images()) for page in doc) == 3
+    # Dosja e përkohshme e thumbnail-eve fshihet
+    assert os.listdir(str(tmp_path)) == ['vizatimi.pdf']
+
+
+def test_batch_report_keeps_order_and_skips_broken_results(tmp_path, multipage_pdf):
+    directory = str(tmp_path)
+    single = write_scenario('nje', os.path.join(directory, 'vizatime'), scenario=SINGLE)
+    files = [
+        _write_json(directory, 'a.json', _results(single)),
+        _write_json(directory, 'b.json', {'file': 'mungon.png', 'symbols': 'jo listë'}),
+        _write_json(directory, 'c.json', _results({'file': multipage_pdf, 'pages': [{'symbols': []}] * 3},
+                                                  multipage=True)),
+    ]
+    _write_json(directory, 'summary.json', {})
+    assert collect_results([directory]) == files
+    filename = os.path.join(directory, 'raporti.pdf')
+    progress = []
+
+    summary = PdfReportGenerator(workers=2, thumbnail_size=300, flush_every=1).build(
+        files, filename, progress_callback=lambda record, done, total: progress.append((done, total)))
+
+    assert (summary['drawings'], summary['failed']) == (2, 1)
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    pages = _text(filename)
+    assert len(pages) == summary['pages'] + 1
+    assert 'Gabim' in pages[0]
+    with fitz.open(filename) as doc:
+        toc = doc.get_toc()
+    assert [title for _, title, _ in toc] == ['Indeksi', 'nje.png', os.path.basename(multipage_pdf)]
+    # Faqja e çdo seksioni në indeks/bookmark tregon te skedari i vet
+    for _, title, page in toc[1:]:
+        assert title in pages[page - 1]
+    assert not [name for name in os.listdir(directory) if name.startswith('tda_report_')]
+
+
+def test_cli_without_results(tmp_path, capsys):
+    assert main([str(tmp_path), '-o', os.path.join(str(tmp_path), 'r.pdf')]) == 1
+    assert 'Nuk u gjet' in capsys.readouterr().out
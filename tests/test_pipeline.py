@@ -0,0 +1,27 @@
+from modules.pipeline import AnalysisPipeline
+
+OPTIONS = {'extract_text': False}
+
+
+def _elements(results):
+    return {key: results[key] for key in ('symbols', 'bom', 'pipes', 'pages')}
+
+
+def test_parallel_pages_match_sequential(processors, multipage_pdf):
+    sequential = AnalysisPipeline(*processors, page_workers=1).analyze(multipage_pdf, OPTIONS, use_cache=False)
+    parallel = AnalysisPipeline(*processors, page_workers=2).analyze(multipage_pdf, OPTIONS, use_cache=False)
+
+    assert sequential['symbols'], "vizatimi sintetik duhet të ketë simbole"
+    assert _elements(parallel) == _elements(sequential)
+
+
+def test_batch_stops_when_processor_modules_are_missing(tmp_path, monkeypatch, capsys):
+    from modules import batch_processor, pipeline
+
+    drawing = tmp_path / 'a.png'
+    drawing.write_bytes(b'')
+    monkeypatch.setattr(pipeline, 'PROCESSOR_MODULES', pipeline.PROCESSOR_MODULES + ('modules.not_installed',))
+
+    assert batch_processor.main([str(drawing), '-o', str(tmp_path / 'out'), '-j', '1']) == 1
+    assert 'modules.not_installed' in capsys.readouterr().out
+    assert not (tmp_path / 'out' / 'summary.json').exists()
@@ -0,0 +1,87 @@
+import os
+
+import cv2
+import numpy as np
+
+from modules.preview_pyramid import PdfPyramid, PyramidCache, RasterPyramid
+
+
+def _drawing(width=1000, height=600):
+    image = np.full((height, width), 255, np.uint8)
+    # Vijë 1 pixel: duhet të mbijetojë zvogëlimin në çdo nivel
+    image[301, :] = 0
+    image[:, 777] = 0
+    return image
+
+
+def test_levels_and_level_for_scale():
+    pyramid = RasterPyramid(image=_drawing())
+    try:
+        assert pyramid.level_count == 3
+        assert [pyramid.level_size(level) for level in range(3)] == [(1000, 600), (500, 300), (250, 150)]
+        assert pyramid.level_for_scale(2.0) == 0
+        assert pyramid.level_for_scale(0.5) == 1
+        assert pyramid.level_for_scale(0.3) == 1
+        assert pyramid.level_for_scale(0.01) == 2
+    finally:
+        pyramid.close()
+
+
+def test_visible_tiles_cover_only_viewport():
+    pyramid = RasterPyramid(image=_drawing())
+    try:
+        assert pyramid.visible_tiles(0, 300, 0, 600, 100) == [(1, 0), (2, 0)]
+        assert pyramid.visible_tiles(0, 0, 0, 5000, 5000) == [(tx, ty) for ty in range(3) for tx in range(4)]
+        assert pyramid.tile_bounds(0, 3, 2) == (768, 512, 1000, 600)
+    finally:
+        pyramid.close()
+
+
+def test_tiles_stitch_back_and_keep_thin_lines():
+    image = _drawing()
+    pyramid = RasterPyramid(image=image)
+    directory = pyramid._dir
+    try:
+        level_w, level_h = pyramid.level_size(0)
+        stitched = np.zeros((level_h, level_w, 3), np.uint8)
+        for tx, ty in pyramid.visible_tiles(0, 0, 0, level_w, level_h):
+            x0, y0, x1, y1 = pyramid.tile_bounds(0, tx, ty)
+            stitched[y0:y1, x0:x1] = pyramid.get_tile(0, tx, ty)
+        assert np.array_equal(stitched, cv2.cvtColor(image, cv2.COLOR_GRAY2RGB))
+        assert pyramid.get_tile(0, 1, 1) is pyramid.get_tile(0, 1, 1)
+
+        overview = pyramid.overview(max_size=300)
+        assert overview.shape == (150, 250, 3)
+        assert overview[301 // 4].min() == 0 and overview[:, 777 // 4].min() == 0
+    finally:
+        pyramid.close()
+    assert not os.path.exists(directory)
+
+
+def test_pdf_tiles_match_bounds(multipage_pdf):
+    pyramid = PdfPyramid(multipage_pdf, page=1, dpi=100)
+    try:
+        for level in range(pyramid.level_count):
+            x0, y0, x1, y1 = pyramid.tile_bounds(level, 0, 0)
+            assert pyramid.get_tile(level, 0, 0).shape == (y1 - y0, x1 - x0, 3)
+    finally:
+        pyramid.close()
+
+
+def test_pyramid_cache_reuses_and_evicts(tmp_path):
+    paths = []
+    for name in ('a.png', 'b.png', 'c.png'):
+        paths.append(os.path.join(str(tmp_path), name))
+        cv2.imwrite(paths[-1], _drawing(900, 400))
+
+    cache = PyramidCache(max_items=2)
+    try:
+        first = cache.get(paths[0])
+        assert cache.get(paths[0]) is first
+        cache.get(paths[1])
+        cache.get(paths[2])
+        # Më i vjetri mbyllet (nivelet në disk fshihen)
+        assert first._levels == []
+        assert cache.get(paths[0]) is not first
+    finally:
+        cache.clear()
@@ -0,0 +1,43 @@
+import tracemalloc
+
+from modules.profiler import StageProfiler
+
+
+def test_memory_tracing_is_off_by_default():
+    profiler = StageProfiler()
+    with profiler.stage('decode'):
+        pass
+    profiler.close()
+
+    assert not tracemalloc.is_tracing()
+    assert profiler.events[0]['peak_mem_mb'] is None
+
+
+def test_closing_one_profiler_keeps_tracing_for_another():
+    first = StageProfiler(trace_memory=True)
+    second = StageProfiler(trace_memory=True)
+    first.close()
+    assert tracemalloc.is_tracing()
+
+    with second.stage('bom'):
+        buffer = bytearray(4 * 1024 * 1024)
+    second.close()
+
+    assert not tracemalloc.is_tracing()
+    assert second.events[0]['peak_mem_mb'] >= 4
+    del buffer
+
+
+def test_nested_stage_peak_is_kept_by_parent():
+    profiler = StageProfiler(trace_memory=True)
+    with profiler.stage('tiles'):
+        with profiler.stage('ocr'):
+            buffer = bytearray(8 * 1024 * 1024)
+            del buffer
+        with profiler.stage('bom'):
+            pass
+    profiler.close()
+
+    peaks = {event['name']: event['peak_mem_mb'] for event in profiler.events}
+    assert peaks['ocr'] >= 8
+    assert peaks['tiles'] >= peaks['ocr']
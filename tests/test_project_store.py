@@ -0,0 +1,54 @@
+from modules.project_store import ProjectReader, convert_project, load_project, save_project
+
+RESULTS = {
+    'file': '/vizatimet/a.pdf',
+    'page_count': 2,
+    'timestamp': '2026-10-17T10:00:00',
+    'symbols': [
+        {'type': 'valve', 'name': 'Gate Valve', 'confidence': 91.5, 'page': 0, 'bbox': [10, 20, 30, 40],
+         'position': [25, 40]},
+        {'type': 'pump', 'name': 'Pump', 'confidence': 80.0, 'page': 0, 'bbox': [100, 20, 50, 50],
+         'position': [125, 45], 'tags': ['P-101']},
+        {'type': 'valve', 'name': 'Ball Valve', 'confidence': 77.25, 'page': 1, 'position': [5, 5]},
+    ],
+    'text': [
+        {'content': 'DN50', 'confidence': 88.0, 'page': 0, 'bbox': [1, 2, 3, 4], 'position': [2, 4]},
+        {'content': 'PN16 Ç', 'confidence': 100.0, 'page': 1, 'bbox': [5, 6, 7, 8], 'position': [8, 10]},
+    ],
+    'bom': [
+        {'item': 1, 'description': 'Gate Valve', 'quantity': 1, 'unit': 'pcs'},
+        {'item': 2, 'description': 'Pipe DN50', 'quantity': 12.5, 'unit': 'm'},
+    ],
+}
+
+
+def test_tdap_round_trip(tmp_path):
+    path = str(tmp_path / 'projekti.tdap')
+    save_project(RESULTS, path)
+
+    loaded = load_project(path)
+    assert not loaded.is_loaded('symbols')
+    assert loaded == RESULTS
+    assert loaded.materialize() == RESULTS
+
+
+def test_reader_reads_pages_and_columns(tmp_path):
+    path = str(tmp_path / 'projekti.tdap')
+    save_project(RESULTS, path)
+    reader = ProjectReader(path)
+
+    assert reader.count('symbols') == 3
+    assert reader.items('symbols', page=1) == RESULTS['symbols'][2:]
+    assert reader.items('text', page=0) == RESULTS['text'][:1]
+    assert list(reader.strings('symbols', 'type')) == ['valve', 'pump', 'valve']
+    assert reader.kind('symbols', 'bbox') == 'vector'
+
+
+def test_json_conversion_round_trip(tmp_path):
+    source, packed, unpacked = (str(tmp_path / name) for name in ('a.json', 'a.tdap', 'b.json'))
+    save_project(RESULTS, source)
+
+    convert_project(source, packed)
+    convert_project(packed, unpacked)
+
+    assert load_project(unpacked) == RESULTS
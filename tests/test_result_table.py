@@ -0,0 +1,83 @@
+from modules.project_store import load_project, save_project
+from modules.result_table import BOM_COLUMNS, RESULT_COLUMNS, ResultTable, bom_table, results_table
+
+ROWS = [
+    ("Simbol", "valve", "Gate Valve", 91.5, 1),
+    ("Simbol", "pump", "pump P-101", 80.0, 2),
+    ("Tekst", "Text", "DN50 PN16", None, 1),
+    ("Simbol", "Valve", "ball valve", 77.25, 1),
+    ("Tekst", "Text", "dn80", 99.0, None),
+]
+
+
+def _values(table, column='value'):
+    position = table.columns.index(column)
+    return [row[position] for row in table.rows(0, len(table))]
+
+
+def test_filter_matches_all_words_case_insensitive():
+    table = ResultTable(RESULT_COLUMNS, ROWS)
+
+    table.set_filter('VALVE')
+    assert _values(table) == ['Gate Valve', 'ball valve']
+    table.set_filter('simbol  p-101')
+    assert _values(table) == ['pump P-101']
+    table.set_filter('dn')
+    assert [table.source_index(i) for i in range(len(table))] == [2, 4]
+    table.set_filter('')
+    assert len(table) == len(ROWS)
+
+
+def test_sort_numbers_keeps_missing_values_last():
+    table = ResultTable(RESULT_COLUMNS, ROWS)
+
+    table.sort_by('confidence')
+    assert _values(table, 'confidence') == ['77.2%', '80.0%', '91.5%', '99.0%', '']
+    # Klikimi i dytë në të njëjtën kolonë e kthen renditjen
+    table.sort_by('confidence')
+    assert table.descending
+    assert _values(table, 'confidence') == ['99.0%', '91.5%', '80.0%', '77.2%', '']
+
+
+def test_sort_text_is_case_insensitive_and_stable():
+    table = ResultTable(RESULT_COLUMNS, ROWS)
+
+    table.sort_by('type')
+    assert [table.source_index(i) for i in range(len(table))] == [1, 2, 4, 0, 3]
+    table.sort_by('type', descending=True)
+    assert [table.source_index(i) for i in range(len(table))] == [0, 3, 2, 4, 1]
+
+    # Filtri dhe renditja kombinohen
+    table.set_filter('valve')
+    assert _values(table) == ['Gate Valve', 'ball valve']
+
+
+def test_rows_window_and_formats():
+    table = bom_table([{'quantity': 3, 'unit': 'copë', 'description': 'Gate Valve DN50'},
+                       {'quantity': 12.25, 'unit': 'm', 'description': 'Pipe DN50', 'size': 'DN50'}])
+
+    assert [name for name, _, _ in BOM_COLUMNS] == table.columns
+    assert table.rows(1, 10) == [('2', '12.25', 'm', 'Pipe DN50', 'DN50', 'N/A', 'N/A')]
+    assert table.rows(-5, 1)[0][:2] == ('1', '3')
+
+
+def test_results_table_reads_unloaded_project_columns(tmp_path):
+    results = {
+        'file': 'a.pdf',
+        'symbols': [{'type': 'valve', 'name': 'Gate Valve', 'confidence': 91.5, 'page': 0},
+                    {'type': 'pump', 'name': 'Pump', 'confidence': 80.0, 'page': 1}],
+        'text': [{'content': 'DN50', 'confidence': 88.0, 'page': 0}],
+        'bom': [],
+    }
+    path = str(tmp_path / 'projekti.tdap')
+    save_project(results, path)
+
+    project = load_project(path)
+    from_project = results_table(project)
+    # Kolonat lexohen pa materializuar elementet
+    assert not project.is_loaded('symbols') and not project.is_loaded('text')
+    assert from_project.rows(0, 10) == results_table(results).rows(0, 10) == [
+        ('Simbol', 'valve', 'Gate Valve', '91.5%', '1'),
+        ('Simbol', 'pump', 'Pump', '80.0%', '2'),
+        ('Tekst', 'Text', 'DN50', '88.0%', '1'),
+    ]
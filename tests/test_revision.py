@@ -0,0 +1,73 @@
+import numpy as np
+
+from modules.database_manager import DatabaseManager
+from modules.pipeline import AnalysisPipeline, merge_options
+from modules.revision import RevisionAnalyzer, changed_mask, changed_regions, diff_items, estimate_offset, shift_image
+
+OPTIONS = {'extract_text': False}
+
+
+def _symbol(kind, x, y):
+    return {'type': kind, 'name': kind.title(), 'bbox': [x, y, 20, 20]}
+
+
+def test_diff_items_matches_by_kind_and_distance():
+    old = [_symbol('valve', 100, 100), _symbol('pump', 300, 100), {'content': 'DN50', 'position': [50, 50]}]
+    new = [_symbol('valve', 105, 103), _symbol('valve', 300, 100), {'content': 'DN50', 'position': [52, 50]},
+           {'content': 'PN16', 'position': [80, 80]}]
+
+    added, removed = diff_items(old, new)
+
+    assert added == [new[1], new[3]]
+    assert removed == [old[1]]
+
+
+def test_diff_items_pairs_each_old_item_once():
+    old = [_symbol('valve', 100, 100)]
+    new = [_symbol('valve', 101, 100), _symbol('valve', 99, 100)]
+
+    added, removed = diff_items(old, new)
+
+    assert len(added) == 1 and removed == []
+
+
+def test_changed_regions_merges_neighbour_tiles_and_ignores_noise():
+    mask = np.zeros((1000, 2560), dtype=np.uint8)
+    mask[100:140, 100:140] = 255
+    # Dy pllaka fqinje në rreshtin e dytë -> një zonë
+    mask[600:640, 1600:1640] = 255
+    mask[600:640, 2100:2140] = 255
+    # Zhurmë nën MIN_CHANGED_PIXELS
+    mask[900, 1100:1105] = 255
+
+    regions, fraction = changed_regions(mask, tile_size=512)
+
+    assert sorted(regions) == [[0, 0, 512, 512], [1536, 512, 1024, 488]]
+    assert fraction == 3 / 10
+
+
+def test_aligned_revision_only_reports_the_edit():
+    rng = np.random.default_rng(3)
+    base = np.full((800, 1000), 255, dtype=np.uint8)
+    for x, y in rng.integers(50, 700, size=(40, 2)):
+        base[y:y + 30, x:x + 4] = 0
+    new = shift_image(base, 7, -5, base.shape)
+    new[400:440, 850:900] = 0
+
+    dx, dy, _ = estimate_offset(base, new)
+    assert round(dx) == 7 and round(dy) == -5
+
+    regions, _ = changed_regions(changed_mask(shift_image(base, dx, dy, new.shape), new), tile_size=256)
+    assert regions == [[768, 256, 232, 256]]
+
+
+def test_revision_uses_pipeline_cache_entry(tmp_path, processors, multipage_pdf, monkeypatch):
+    cache = DatabaseManager(str(tmp_path / 'cache.db'))
+    cache.initialize_database()
+    pipeline = AnalysisPipeline(*processors, cache=cache)
+    analyzed = pipeline.analyze(multipage_pdf, OPTIONS)
+
+    monkeypatch.setattr(pipeline, 'analyze', lambda *args, **kwargs: None)
+    base = RevisionAnalyzer(pipeline).base_results(multipage_pdf, merge_options(OPTIONS), lambda *args: None)
+
+    assert base['symbols'] == analyzed['symbols']
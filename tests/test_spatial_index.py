@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from modules.spatial_index import GridIndex, boxes_from_items
+
+
+def _random_boxes(count=400, seed=3):
+    rng = np.random.default_rng(seed)
+    corners = rng.uniform(0, 2000, (count, 2))
+    sizes = rng.uniform(0, 80, (count, 2))
+    # Disa elemente të mëdha që prekin shumë qeliza
+    sizes[:5] *= 10
+    return np.hstack([corners, corners + sizes])
+
+
+def _distances(boxes, x, y):
+    dx = np.maximum(np.maximum(boxes[:, 0] - x, x - boxes[:, 2]), 0.0)
+    dy = np.maximum(np.maximum(boxes[:, 1] - y, y - boxes[:, 3]), 0.0)
+    return np.hypot(dx, dy)
+
+
+def test_boxes_from_items_accepts_bbox_and_position():
+    boxes = boxes_from_items([{'bbox': [10, 20, 30, 40]}, {'position': [5, 6]}])
+    assert boxes.tolist() == [[10, 20, 40, 60], [5, 6, 5, 6]]
+
+
+@pytest.mark.parametrize('cell_size', [None, 7.0, 500.0])
+def test_query_matches_brute_force(cell_size):
+    boxes = _random_boxes()
+    index = GridIndex(boxes, cell_size)
+    for x0, y0, x1, y1 in [(0, 0, 100, 100), (500, 700, 900, 760), (-50, -50, 3000, 3000), (2500, 0, 2600, 10)]:
+        expected = np.nonzero((boxes[:, 0] <= x1) & (boxes[:, 2] >= x0) &
+                              (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0))[0]
+        assert sorted(index.query(x0, y0, x1, y1).tolist()) == expected.tolist()
+
+
+def test_nearest_and_within_match_brute_force():
+    boxes = _random_boxes()
+    index = GridIndex(boxes)
+    rng = np.random.default_rng(5)
+    for x, y in rng.uniform(-200, 2200, (25, 2)):
+        dist = _distances(boxes, x, y)
+        found = index.nearest(x, y, k=3)
+        assert np.allclose([d for _, d in found], np.sort(dist)[:3])
+
+        within = index.within(x, y, 60.0)
+        assert sorted(i for i, _ in within) == np.nonzero(dist <= 60.0)[0].tolist()
+
+    # Asgjë brenda max_distance: kërkimi ndalet pa kthyer elementin më të afërt
+    far = index.nearest(-1000, -1000, k=1, max_distance=10.0)
+    assert far == [] and index.nearest(-1000, -1000, k=1)
+
+
+def test_within_many_equals_single_queries():
+    boxes = _random_boxes()
+    index = GridIndex(boxes)
+    rng = np.random.default_rng(8)
+    xs, ys = rng.uniform(0, 2000, 40), rng.uniform(0, 2000, 40)
+    radii = rng.uniform(0, 120, 40)
+
+    points, items, dist = index.within_many(xs, ys, radii)
+
+    for p in range(len(xs)):
+        single = index.within(xs[p], ys[p], radii[p])
+        mask = points == p
+        assert items[mask].tolist() == [i for i, _ in single]
+        assert np.allclose(dist[mask], [d for _, d in single])
+
+
+def test_empty_index():
+    index = GridIndex(np.zeros((0, 4)))
+    assert len(index) == 0
+    assert index.query(0, 0, 10, 10).size == 0
+    assert index.nearest(1, 1) == []
+    assert [part.size for part in index.within_many([1.0], [1.0], 5.0)] == [0, 0, 0]
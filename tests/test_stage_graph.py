@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from modules.stage_graph import AnalysisCancelled, CancelToken, StageGraph, StageTimeout
+
+
+def test_independent_stages_run_concurrently():
+    both_started = threading.Barrier(2, timeout=5)
+
+    def branch(load):
+        both_started.wait()
+        return load + 1
+
+    graph = StageGraph()
+    graph.add('load', lambda: 1)
+    graph.add('symbols', branch, deps=('load',))
+    graph.add('ocr', branch, deps=('load',))
+    graph.add('bom', lambda symbols, ocr: symbols + ocr, deps=('symbols', 'ocr'))
+
+    assert graph.run() == {'load': 1, 'symbols': 2, 'ocr': 2, 'bom': 4}
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        StageGraph().add('bom', lambda symbols: symbols, deps=('symbols',))
+
+
+def test_cancel_stops_before_next_stage():
+    token = CancelToken()
+    ran = []
+
+    def slow():
+        time.sleep(0.2)
+        ran.append('slow')
+
+    graph = StageGraph(cancel_token=token)
+    graph.add('slow', slow)
+    graph.add('after', lambda slow: ran.append('after'), deps=('slow',))
+
+    threading.Timer(0.05, token.cancel, args=("u anulua",)).start()
+    started = time.monotonic()
+    with pytest.raises(AnalysisCancelled, match="u anulua"):
+        graph.run()
+
+    assert time.monotonic() - started < 0.2
+    time.sleep(0.3)
+    assert ran == ['slow']
+
+
+def test_stage_timeout():
+    release = threading.Event()
+    graph = StageGraph(timeouts={'ocr': 0.1})
+    graph.add('ocr', lambda: release.wait(5))
+
+    started = time.monotonic()
+    with pytest.raises(StageTimeout, match="ocr"):
+        graph.run()
+    release.set()
+
+    assert time.monotonic() - started < 1.0
+
+
+def test_stage_error_is_raised():
+    def failing():
+        raise RuntimeError("gabim në hap")
+
+    graph = StageGraph()
+    graph.add('symbols', failing)
+
+    with pytest.raises(RuntimeError, match="gabim në hap"):
+        graph.run()
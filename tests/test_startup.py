@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from modules.startup import BackgroundLoader, ImportTimer, StartupProfile, import_modules, main, measure_startup
+
+
+def test_import_timer_records_new_imports_only():
+    sys.modules.pop('json.tool', None)
+    timer = ImportTimer().install()
+    try:
+        import json
+        import json.tool  # noqa: F401
+    finally:
+        timer.uninstall()
+
+    names = [record['name'] for record in timer.records]
+    # json është tashmë në sys.modules, json.tool jo
+    assert 'json.tool' in names and 'json' not in names
+    assert all(record['cumulative_ms'] >= record['self_ms'] >= 0 for record in timer.records)
+    assert timer.total_ms() > 0
+    assert timer.format().splitlines()[0].startswith('import time:') and 'json.tool' in timer.format()
+    assert json is not None and not timer.installed
+
+
+def test_uninstall_restores_builtin_import():
+    import builtins
+
+    original = builtins.__import__
+    timer = ImportTimer().install()
+    assert builtins.__import__ == timer._import
+    timer.uninstall()
+    assert builtins.__import__ is original
+
+
+def test_profile_marks_and_budget():
+    profile = StartupProfile(budget_ms=10000.0, trace_imports=False)
+
+    profile.mark('window')
+    profile.mark('processors')
+
+    assert [name for name, _ in profile.marks] == ['window', 'processors']
+    assert profile.mark_ms('window') <= profile.mark_ms('processors')
+    assert profile.mark_ms('mungon') is None
+    assert profile.within_budget()
+    assert not profile.within_budget('mungon')
+    report = profile.report()
+    assert 'brenda buxhetit' in report and 'processors' in report
+
+    profile.budget_ms = -1.0
+    assert not profile.within_budget()
+    assert 'MBI BUXHET' in profile.report()
+
+
+def test_background_loader_runs_factory_once():
+    calls = []
+    release = threading.Event()
+
+    def factory():
+        release.wait(5)
+        calls.append(1)
+        return 'procesorët'
+
+    loader = BackgroundLoader(factory, name='test').start()
+    loader.start()
+    assert not loader.ready
+    with pytest.raises(TimeoutError):
+        loader.get(timeout=0.01)
+    release.set()
+
+    assert loader.get(timeout=5) == 'procesorët'
+    assert loader.ready and calls == [1] and loader.seconds is not None
+
+
+def test_background_loader_without_start_loads_on_first_use():
+    loader = BackgroundLoader(lambda: threading.current_thread().name)
+
+    # Pa start() ngarkimi bëhet në thread-in që e kërkon
+    assert loader.get() == threading.current_thread().name
+    assert loader.ready
+
+
+def test_background_loader_reraises_factory_error():
+    def factory():
+        raise ValueError("modeli mungon")
+
+    loader = BackgroundLoader(factory).start()
+
+    with pytest.raises(ValueError, match="modeli mungon"):
+        loader.get(timeout=5)
+
+
+def test_import_modules_skips_missing(capsys):
+    timings = import_modules(('json', 'modul_qe_nuk_ekziston'))
+
+    assert list(timings) == ['json']
+    assert 'modul_qe_nuk_ekziston' in capsys.readouterr().out
+
+
+def test_startup_modules_stay_light():
+    # Modulet e nisjes nuk duhet të tërheqin numpy/cv2 para dritares
+    code = ("import sys\n"
+            "from modules.startup import STARTUP_MODULES\n"
+            "for name in STARTUP_MODULES: __import__(name)\n"
+            "print(' '.join(name for name in ('numpy', 'cv2', 'PIL') if name in sys.modules))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', code], cwd=root, check=True, capture_output=True, text=True)
+    assert output.stdout.strip() == ''
+    assert measure_startup() > 0
+
+
+def test_cli_exit_code_follows_budget(capsys):
+    assert main(['--budget-ms', '100000', '-r', '1']) == 0
+    assert main(['--budget-ms', '0', '-r', '1']) == 1
+    assert 'buxheti' in capsys.readouterr().out
@@ -0,0 +1,111 @@
+import os
+
+import cv2
+import numpy as np
+
+from modules.benchmark import draw_ball_valve, draw_gate_valve, generate_drawing
+from modules.symbol_cache import NO_MATCH, SymbolCache
+from modules.symbol_index import ink_map, trim_to_ink
+from modules.symbol_recognizer import SymbolRecognizer
+
+HASH = (1 << 255) | 0b1011
+
+
+def _flip(value, *bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+def test_exact_match_by_default():
+    cache = SymbolCache()
+    cache.put(0, HASH, 3, 0.9)
+
+    assert cache.get(0, HASH) == (3, 0.9)
+    assert cache.get(0, _flip(HASH, 7)) is None
+    # Kova tjetër (raport tjetër i brinjëve) nuk ndan rezultatin
+    assert cache.get(1, HASH) is None
+    assert cache.stats()['exact_hits'] == 1
+
+
+def test_hamming_lookup_within_max_distance():
+    cache = SymbolCache(max_distance=4)
+    cache.put(0, HASH, 3, 0.9)
+    cache.put(0, _flip(HASH, 100, 101, 102), 5, 0.8)
+
+    assert cache.get(0, _flip(HASH, 7, 200)) == (3, 0.9)
+    assert cache.get(0, _flip(HASH, 1, 2, 3, 4)) == (3, 0.9)
+    assert cache.get(0, _flip(HASH, 1, 2, 3, 4, 5)) is None
+    # Fqinji më i afërt fiton
+    assert cache.get(0, _flip(HASH, 100, 101)) == (5, 0.8)
+    assert cache.stats()['near_hits'] == 3
+
+
+def test_lookup_batch_reports_neighbors():
+    cache = SymbolCache(max_distance=2)
+    cache.put(0, HASH, 3, 0.9)
+    other = _flip(HASH, 50, 60, 70, 80)
+    hashes = [HASH, _flip(HASH, 9), other, other, _flip(other, 1)]
+
+    results, representatives, near = cache.lookup_batch([0] * len(hashes), hashes)
+
+    assert results[:2] == [(3, 0.9), (3, 0.9)]
+    assert results[2:] == [None, None, None]
+    assert representatives == {2: 2, 3: 2, 4: 2}
+    # Dublikata e saktë nuk riverifikohet, fqinjët po
+    assert near == {1, 4}
+
+
+def test_merge_stats_adds_worker_counts():
+    cache = SymbolCache()
+    cache.put(0, HASH, NO_MATCH, 0.1)
+    cache.get(0, HASH)
+    worker = SymbolCache()
+    worker.get(0, HASH)
+    worker.put(0, HASH, 1, 0.9)
+    worker.get(0, HASH)
+
+    cache.merge_stats(worker.stats())
+
+    stats = cache.stats()
+    assert (stats['lookups'], stats['hits'], stats['misses']) == (3, 2, 1)
+
+
+def test_near_match_is_reverified_against_stored_variant(symbol_library):
+    recognizer = SymbolRecognizer(library_dir=symbol_library, cache_size=64, cache_distance=256)
+    index, cache = recognizer.index, recognizer.symbol_cache
+
+    def crop(draw):
+        mask = trim_to_ink(ink_map(draw(60)))
+        return mask, (0, 0, mask.shape[1], mask.shape[0])
+
+    ball_crop, ball_box = crop(draw_ball_valve)
+    assert index.match([ball_crop], [ball_box], 0.8, cache=cache)[0]['name'] == 'Ball Valve'
+
+    # Me tolerancën maksimale valvola gate merr rezultatin e valvolës ball (korrelacion 0.91),
+    # por riverifikimi e refuzon sepse bie nën atë të prerjes së ruajtur
+    gate_crop, gate_box = crop(draw_gate_valve)
+    found = index.match([gate_crop], [gate_box], 0.8, cache=cache)
+    assert [item['name'] for item in found] == ['Gate Valve']
+    assert cache.stats()['near_hits'] == 1
+
+
+def test_tile_workers_report_cache_stats(tmp_path, symbol_library):
+    from modules.tiling import RasterTileSource, TiledAnalyzer
+
+    image, _, _ = generate_drawing(1600, 1100, 4.0, draw_labels=False)
+    path = os.path.join(str(tmp_path), 'drawing.png')
+    cv2.imwrite(path, image)
+    recognizer = SymbolRecognizer(library_dir=symbol_library, cache_size=256)
+
+    source = RasterTileSource(path)
+    try:
+        symbols, _, _ = TiledAnalyzer(recognizer, tile_size=800, overlap=128, workers=2).analyze(
+            source, extract_text=False)
+    finally:
+        source.close()
+
+    stats = recognizer.cache_stats()
+    assert symbols
+    assert stats['lookups'] > 0 and stats['misses'] > 0
+    assert np.isclose(stats['hits'] + stats['misses'], stats['lookups'])
@@ -0,0 +1,122 @@
+import cv2
+import numpy as np
+
+from modules.benchmark import SYMBOL_KINDS, detection_recall, draw_gate_valve, generate_drawing
+from modules.symbol_index import coarse_regions, region_mask
+from modules.symbol_recognizer import SymbolRecognizer, find_text_regions, find_text_regions_cascade, to_gray
+
+
+def _drawings(seeds=(0, 1), draw_labels=False):
+    return [generate_drawing(1600, 1100, 4.0, seed=seed, draw_labels=draw_labels)[:2] for seed in seeds]
+
+
+def _recall(recognizer, drawings):
+    """Recall-i mesatar dhe zbulimet mbi numrin e simboleve; çdo vizatim krahasohet me simbolet e veta
+
+    Simbolet e vizatimeve të ndryshme bien në të njëjtat pozicione, ndaj bashkimi i
+    zbulimeve do të fshihte simbolet e humbura.
+    """
+    recalls, extra = [], 0
+    for image, symbols in drawings:
+        detections = recognizer.detect_symbols({'image': image})
+        recalls.append(detection_recall(detections, symbols))
+        extra += len(detections) - len(symbols)
+    return sum(recalls) / len(recalls), extra
+
+
+def test_indexed_recall_matches_exhaustive(symbol_library):
+    drawings = _drawings()
+
+    recall, extra = _recall(SymbolRecognizer(library_dir=symbol_library, cache_size=0), drawings)
+    exhaustive, _ = _recall(SymbolRecognizer(library_dir=symbol_library, use_index=False), drawings)
+
+    assert recall >= 0.95
+    assert recall >= exhaustive - 0.05
+    # Pa dublikata: NMS zbatohet edhe në rrugën e indeksit
+    assert extra <= 0
+
+
+def test_pipe_through_symbol_keeps_symbol_body(symbol_library):
+    image = np.full((200, 400), 255, np.uint8)
+    image[99:101, :] = 0
+    image[70:130, 170:230] = draw_gate_valve(60)
+
+    detections = SymbolRecognizer(library_dir=symbol_library, cache_size=0).detect_symbols({'image': image})
+
+    assert len(detections) == 1
+    found = detections[0]
+    assert found['name'] == SYMBOL_KINDS[0][1]
+    # Cungjet e tubit hiqen, ndaj kutia nuk del jashtë simbolit dhe korrelacioni mbetet i lartë
+    x, y, w, h = found['bbox']
+    assert 170 <= x and x + w <= 230 and 70 <= y and y + h <= 130
+    assert found['confidence'] >= 90
+
+
+def test_version_tells_exhaustive_from_indexed(symbol_library):
+    indexed = SymbolRecognizer(library_dir=symbol_library)
+    exhaustive = SymbolRecognizer(library_dir=symbol_library, use_index=False)
+    assert indexed.version != exhaustive.version
+
+
+def test_cascade_recall_close_to_full_detection(symbol_library):
+    # Me etiketa: teksti nuk duhet të kalojë pragun e përafërt si simbol
+    drawings = _drawings(range(4), draw_labels=True)
+    full = SymbolRecognizer(library_dir=symbol_library)
+    cascade = SymbolRecognizer(library_dir=symbol_library, cascade=True)
+
+    recall, extra = _recall(cascade, drawings)
+
+    assert recall >= 0.95
+    assert recall >= _recall(full, drawings)[0] - 0.05
+    assert extra <= 0
+    assert cascade.version != full.version
+
+
+def test_cascade_threshold_drops_coarse_regions(symbol_library):
+    image, symbols, _ = generate_drawing(1600, 1100, 4.0, seed=0, draw_labels=False)
+
+    strict = SymbolRecognizer(library_dir=symbol_library, cascade=True, cascade_threshold=0.99)
+
+    assert len(strict.detect_symbols({'image': image})) < len(symbols)
+
+
+def test_coarse_regions_remove_long_lines():
+    binary = np.zeros((400, 800), np.uint8)
+    binary[200:202, :] = 1
+    binary[100:140, 300:340] = 1
+
+    mask, lines, boxes = coarse_regions(binary, 4, 120)
+
+    # Koordinatat në faqen e zvogëluar 4 herë; tubi mbetet vetëm te vijat
+    assert mask.shape == lines.shape == (100, 200)
+    assert boxes == [(75, 25, 10, 10)]
+    assert lines[50].all() and not mask[50].any()
+
+
+def test_region_mask_removes_pipe_runs_only():
+    binary = np.zeros((400, 800), np.uint8)
+    binary[199:201, :] = 1
+    binary[180:220, 380:420] = draw_gate_valve(40) < 128
+    _, lines, boxes = coarse_regions(binary, 4, 120)
+    lines = cv2.dilate(lines, np.ones((3, 3), np.uint8))
+
+    mask, x0, y0 = region_mask(binary, lines, boxes[0], 4)
+
+    crop = binary[y0:y0 + mask.shape[0], x0:x0 + mask.shape[1]]
+    # Cungjet e tubit deri në skaj hiqen, trupi i simbolit mbetet i paprekur
+    assert not mask[:, 0].any() and not mask[:, -1].any()
+    symbol = (slice(180 - y0, 220 - y0), slice(380 - x0, 420 - x0))
+    assert mask[symbol].sum() >= 0.9 * crop[symbol].sum()
+
+
+def test_cascade_text_regions_match_full_page():
+    image, _, labels = generate_drawing(1600, 1100, 4.0, seed=2)
+    gray = to_gray(image)
+
+    full, cascade = find_text_regions(gray), find_text_regions_cascade(gray)
+
+    assert len(cascade) == len(full)
+    for label in labels:
+        x, y, w, h = label['bbox']
+        cx, cy = x + w / 2, y + h / 2
+        assert any(rx <= cx <= rx + rw and ry <= cy <= ry + rh for rx, ry, rw, rh in cascade)
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from modules.symbol_recognizer import SymbolRecognizer, combine_text_layer
+
+
+def test_version_changes_with_threshold_and_scales(symbol_library):
+    recognizer = SymbolRecognizer(library_dir=symbol_library)
+    original = recognizer.version
+
+    recognizer.threshold = 0.6
+    lowered = recognizer.version
+    assert lowered != original
+
+    recognizer.scales = (1.0,)
+    assert recognizer.version not in (original, lowered)
+
+    recognizer.threshold, recognizer.scales = 0.8, SymbolRecognizer(library_dir=symbol_library).scales
+    assert recognizer.version == original
+
+
+def test_missing_tesseract_binary_skips_only_ocr(monkeypatch, processors, multipage_pdf):
+    from modules import ocr_engine
+    from modules.pipeline import AnalysisPipeline
+
+    monkeypatch.setattr(ocr_engine.shutil, 'which', lambda cmd: None)
+    assert 'tesseract' not in ocr_engine.available_backends()
+
+    doc_processor, recognizer, output_generator = processors
+    recognizer.ocr_backend = 'tesseract'
+    assert recognizer.ocr_status()
+    assert recognizer.warm_up() is False
+
+    results = AnalysisPipeline(doc_processor, recognizer, output_generator).analyze(multipage_pdf, use_cache=False)
+
+    assert results['symbols'] and results['bom']
+    assert results['text'] == []
+    assert results['warnings'] and 'OCR' in results['warnings'][0]
+
+
+def _layer_item(content, bbox):
+    x, y, w, h = bbox
+    return {'content': content, 'confidence': 100.0, 'position': [x + w // 2, y + h // 2], 'bbox': list(bbox)}
+
+
+def test_text_layer_is_returned_without_ocr(monkeypatch, symbol_library):
+    recognizer = SymbolRecognizer(library_dir=symbol_library)
+    monkeypatch.setattr(recognizer, '_recognize', lambda image, regions: pytest.fail("OCR nuk duhet thirrur"))
+    layer = [_layer_item('DN50', [10, 10, 40, 12])]
+
+    text = recognizer.extract_text({'image': np.full((100, 100, 3), 255, np.uint8), 'text_layer': layer,
+                                    'raster_regions': []})
+
+    assert text == layer and text[0] is not layer[0]
+
+
+def test_ocr_runs_only_inside_raster_regions(monkeypatch, symbol_library):
+    recognizer = SymbolRecognizer(library_dir=symbol_library)
+    layer = [_layer_item('DN50', [110, 110, 40, 12])]
+    raster = [[100, 100, 200, 200]]
+    # Një rajon brenda imazhit, një i mbuluar nga shtresa dhe një jashtë imazhit
+    monkeypatch.setattr(recognizer, '_text_regions',
+                        lambda image: [[150, 200, 50, 14], [112, 110, 30, 12], [10, 10, 50, 14]])
+    sent = []
+
+    def recognize(image, regions):
+        sent.extend(regions)
+        return [_layer_item('PN16', region) for region in regions]
+
+    monkeypatch.setattr(recognizer, '_recognize', recognize)
+
+    text = recognizer.extract_text({'image': np.full((400, 400, 3), 255, np.uint8), 'text_layer': layer,
+                                    'raster_regions': raster})
+
+    assert sent == [[150, 200, 50, 14]]
+    assert [item['content'] for item in text] == ['DN50', 'PN16']
+
+
+def test_combine_text_layer_keeps_layer_first():
+    layer = [_layer_item('DN50', [0, 0, 40, 12])]
+    ocr = [_layer_item('DN50', [2, 0, 40, 12]), _layer_item('V-101', [100, 100, 40, 12]),
+           _layer_item('jashtë', [500, 500, 40, 12])]
+
+    combined = combine_text_layer(layer, ocr, [[0, 0, 200, 200]])
+
+    assert [item['content'] for item in combined] == ['DN50', 'V-101']
+    assert combined[0]['bbox'] == [0, 0, 40, 12]
+
+
+def test_pipeline_option_switches_text_layer_off(monkeypatch, processors, tmp_path):
+    from modules.benchmark import write_scenario
+    from modules.pipeline import AnalysisPipeline
+
+    scenario = write_scenario('cad', str(tmp_path), scenario={'width': 1600, 'height': 1100, 'density': 4.0,
+                                                             'pages': 1, 'text_layer': True})
+    doc_processor, recognizer, output_generator = processors
+    ocr_calls = []
+    monkeypatch.setattr(recognizer, '_recognize', lambda image, regions: ocr_calls.append(len(regions)) or [])
+    pipeline = AnalysisPipeline(doc_processor, recognizer, output_generator)
+
+    with_layer = pipeline.analyze(scenario['file'], {'extract_text': True}, use_cache=False)
+    assert ocr_calls == []
+    assert len(with_layer['text']) == len(scenario['pages'][0]['labels'])
+    # BOM merr madhësitë dhe tag-et nga teksti i ngulitur
+    items = [row for row in with_layer['bom'] if row['type'] != 'pipe']
+    assert items and all(row['size'] != 'N/A' and row['tags'] for row in items)
+
+    without = pipeline.analyze(scenario['file'], {'extract_text': True, 'pdf_text_layer': False}, use_cache=False)
+    assert ocr_calls and without['text'] == []
@@ -0,0 +1,153 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from modules.shared_image import BACKEND_FILE, BACKEND_MEMORY
+from modules import tiling
+from modules.tiling import RasterTileSource, merge_detections, tile_grid
+
+
+def _sample_image():
+    rng = np.random.default_rng(1)
+    image = (rng.random((300, 500, 3)) * 255).astype(np.uint8)
+    image[50:80] = 0
+    return Image.fromarray(image)
+
+
+@pytest.mark.parametrize('name, mode, save_args', [
+    ('gray.png', 'L', {}),
+    ('bilevel.png', '1', {}),
+    ('palette.png', 'P', {}),
+    ('color.png', 'RGB', {}),
+    ('alpha.png', 'RGBA', {}),
+    ('scan.jpg', 'RGB', {}),
+    ('scan.tif', 'RGB', {'compression': 'tiff_lzw'}),
+    ('fax.tif', '1', {'compression': 'group4'}),
+    ('scan.bmp', 'RGB', {}),
+    ('deep.png', 'I;16', {}),
+])
+@pytest.mark.parametrize('grayscale', [True, False])
+@pytest.mark.parametrize('backend', [BACKEND_FILE, BACKEND_MEMORY])
+def test_raster_source_matches_cv2(tmp_path, name, mode, save_args, grayscale, backend):
+    filepath = str(tmp_path / name)
+    _sample_image().convert(mode).save(filepath, **save_args)
+
+    expected = cv2.imread(filepath, cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR)
+    if expected.ndim == 3:
+        expected = cv2.cvtColor(expected, cv2.COLOR_BGR2RGB)
+    source = RasterTileSource(filepath, grayscale=grayscale, backend=backend)
+    try:
+        decoded = np.asarray(source.read_tile(0, 0, source.width, source.height))
+        if grayscale:
+            decoded = decoded[:, :, 0]
+        assert decoded.shape == expected.shape
+        # Konvertimi në gri i cv2.imread dhe i cvtColor rrumbullakosen ndryshe me 1 nivel
+        assert np.abs(decoded.astype(int) - expected).max() <= 1
+    finally:
+        source.close()
+
+
+def test_raster_source_respects_exif_orientation(tmp_path):
+    filepath = str(tmp_path / 'rotated.jpg')
+    image = _sample_image()
+    exif = image.getexif()
+    exif[0x0112] = 6
+    image.save(filepath, exif=exif)
+
+    source = RasterTileSource(filepath)
+    try:
+        assert (source.height, source.width) == cv2.imread(filepath, cv2.IMREAD_GRAYSCALE).shape
+    finally:
+        source.close()
+
+
+def test_installed_pillow_decodes_into_buffer(tmp_path, monkeypatch):
+    # Dështon kur një version i ri i Pillow prish dekodimin direkt (dhe analiza kalon te dekodimi i plotë)
+    assert tiling.streaming_supported()
+
+    filepath = str(tmp_path / 'gray.png')
+    _sample_image().convert('L').save(filepath)
+
+    def full_decode(*args):
+        raise AssertionError("faqja u dekodua e plotë")
+
+    monkeypatch.setattr(RasterTileSource, '_decode_full', staticmethod(full_decode))
+    RasterTileSource(filepath).close()
+
+
+def test_broken_pillow_internals_fall_back_to_full_decode(tmp_path, monkeypatch):
+    filepath = str(tmp_path / 'gray.png')
+    _sample_image().convert('L').save(filepath)
+
+    def broken(image, shared):
+        shared.array[:] = 0
+
+    monkeypatch.setattr(tiling, '_streaming_ok', None)
+    monkeypatch.setattr(tiling, '_decode_into', broken)
+    assert not tiling.streaming_supported()
+
+    source = RasterTileSource(filepath)
+    try:
+        decoded = np.asarray(source.read_tile(0, 0, source.width, source.height))[:, :, 0]
+        assert np.array_equal(decoded, cv2.imread(filepath, cv2.IMREAD_GRAYSCALE))
+    finally:
+        source.close()
+
+
+@pytest.mark.parametrize('width, height', [(5000, 3000), (2048, 2048), (300, 200), (4097, 2049)])
+def test_tile_grid_covers_page_with_overlap(width, height):
+    tiles = list(tile_grid(width, height, tile_size=1024, overlap=128))
+
+    covered = np.zeros((height, width), dtype=bool)
+    for x, y, w, h in tiles:
+        assert 0 < w <= 1024 and 0 < h <= 1024
+        covered[y:y + h, x:x + w] = True
+    assert covered.all()
+
+    xs = sorted({x for x, _, _, _ in tiles})
+    assert all(b - a == 1024 - 128 for a, b in zip(xs, xs[1:]))
+
+
+def test_tile_grid_rejects_overlap_larger_than_tile():
+    with pytest.raises(ValueError):
+        list(tile_grid(1000, 1000, tile_size=256, overlap=256))
+
+
+def _symbol(x, y, w=40, h=40, confidence=90.0, kind='valve'):
+    return {'type': kind, 'confidence': confidence, 'bbox': [x, y, w, h], 'position': [x + w // 2, y + h // 2]}
+
+
+def test_merge_keeps_best_duplicate_from_overlapping_tiles():
+    # I njëjti simbol i parë nga dy pllaka fqinje, me zhvendosje të vogël nga pragu i pllakës
+    left, right = _symbol(1000, 500, confidence=82.0), _symbol(1003, 501, confidence=91.0)
+    other_kind = _symbol(1001, 500, kind='instrument')
+    neighbour = _symbol(1100, 500)
+
+    merged = merge_detections([left, right, other_kind, neighbour], 'type')
+
+    assert right in merged and left not in merged
+    assert other_kind in merged and neighbour in merged
+    assert len(merged) == 3
+
+
+def test_merge_large_symbol_spanning_tiles():
+    # Simboli i madh është prerë nga pllakat: pjesët kanë qendra larg njëra-tjetrës por mbivendosen
+    whole = _symbol(900, 400, w=600, h=300, confidence=95.0)
+    part = _symbol(1200, 450, w=200, h=150, confidence=80.0)
+    far = _symbol(2000, 400, w=40, h=40, confidence=70.0)
+
+    merged = merge_detections([part, far, whole], 'type')
+
+    assert merged == [whole, far]
+
+
+def test_merge_text_by_content():
+    items = [{'content': 'DN50', 'confidence': 80.0, 'bbox': [10, 10, 60, 20]},
+             {'content': 'DN50', 'confidence': 85.0, 'bbox': [12, 10, 60, 20]},
+             {'content': 'PN16', 'confidence': 85.0, 'bbox': [12, 10, 60, 20]}]
+
+    merged = merge_detections(items, 'content')
+
+    assert [item['content'] for item in merged] == ['DN50', 'PN16']
+    assert merged[0]['confidence'] == 85.0